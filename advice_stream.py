@@ -0,0 +1,77 @@
+import json
+import re
+
+
+# GPT 자문 응답 형식 (구조화 출력은 속성 순서대로 생성되므로 매매 판단이 reasoning보다 먼저 도착)
+ADVICE_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "trading_decision",
+        "description": "Trading decision with recommendation and reasoning",
+        "schema": {
+            "type": "object",
+            "properties": {
+                "trade_recommendation": {
+                    "type": "string",
+                    "enum": ["매수", "매도", "관망"]
+                },
+                "investment_percentage": {
+                    "type": "integer",
+                    "minimum": 0,
+                    "maximum": 100
+                },
+                "confidence_score": {
+                    "type": "integer",
+                    "minimum": 0,
+                    "maximum": 100
+                },
+                "reasoning": {
+                    "type": "string"
+                }
+            },
+            "required": ["trade_recommendation", "investment_percentage", "confidence_score", "reasoning"]
+        }
+    }
+}
+
+# 응답 스키마 순서상 reasoning보다 먼저 오는 매매 판단 필드 (execute_trade에 필요한 값)
+DECISION_FIELDS = ('trade_recommendation', 'investment_percentage', 'confidence_score')
+EARLY_REASONING = '스트리밍 조기 실행 (전체 근거는 gpt_advice_log 참조)'
+
+# 문자열은 닫는 따옴표, 숫자는 뒤따르는 구분자까지 도착해야 완성된 값으로 봄
+_FIELD_PATTERNS = {
+    'trade_recommendation': re.compile(r'"trade_recommendation"\s*:\s*"((?:[^"\\]|\\.)*)"'),
+    'investment_percentage': re.compile(r'"investment_percentage"\s*:\s*(-?\d+(?:\.\d+)?)\s*[,}]'),
+    'confidence_score': re.compile(r'"confidence_score"\s*:\s*(-?\d+(?:\.\d+)?)\s*[,}]')
+}
+
+
+class AdviceStreamParser:
+    """스트리밍 JSON 응답 조각을 이어 붙이며 매매 판단 필드를 먼저 추출"""
+
+    def __init__(self):
+        self.text = ''
+        self.fields = {}
+        self.decision = None
+
+    def feed(self, chunk):
+        """조각 추가 - 이번 조각으로 판단 필드가 모두 모이면 조기 자문 dict, 아니면 None"""
+        self.text += chunk
+        if self.decision is not None:
+            return None
+
+        for name in DECISION_FIELDS:
+            if name in self.fields:
+                continue
+            match = _FIELD_PATTERNS[name].search(self.text)
+            if match is None:
+                continue
+            if name == 'trade_recommendation':
+                self.fields[name] = json.loads(f'"{match.group(1)}"')
+            else:
+                self.fields[name] = int(round(float(match.group(1))))
+
+        if len(self.fields) < len(DECISION_FIELDS):
+            return None
+        self.decision = dict(self.fields, reasoning=EARLY_REASONING)
+        return dict(self.decision)
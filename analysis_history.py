@@ -0,0 +1,483 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from knn_index import time_decay_multiplier
+
+
+BOLLINGER_POSITIONS = {
+    5: 'extreme_upper',
+    4: 'upper_strong',
+    3: 'upper_weak',
+    2: 'lower_weak',
+    1: 'lower_strong',
+    0: 'extreme_lower'
+}
+
+EMA_RIBBON_STATUSES = {
+    4: '강한 상승세',
+    3: '약한 상승세',
+    2: '상승 가능성',
+    1: '약한 하락세',
+    0: '강한 하락세'
+}
+
+
+def _window_starts(n, window):
+    """캔들 t에서 라이브가 보는 윈도우의 첫 캔들 위치"""
+    t = np.arange(n)
+    return t if window is None else np.maximum(t - window + 1, 0)
+
+
+def windowed_ema(close, span, starts, lag=0):
+    """캔들마다 윈도우 첫 캔들에서 새로 시작한 ewm(span, adjust=False)의 t-lag 위치 값
+
+    전체 구간 EMA E와 윈도우 EMA의 차이는 시작점에서 x[s] - E(s-1)이고
+    이후 (1-a)배씩 줄어들므로 E(p) + (1-a)^(p-s+1) * (x[s] - E(s-1))로 보정함.
+    """
+    alpha = 2 / (span + 1)
+    full = pd.Series(close).ewm(span=span, adjust=False).mean().to_numpy()
+    n = len(close)
+    positions = np.arange(n) - lag
+    result = np.full(n, np.nan)
+    valid = positions >= starts
+    p, s = positions[valid], starts[valid]
+
+    start_gap = np.where(s > 0, close[s] - full[np.maximum(s - 1, 0)], 0.0)
+    # 시작점은 보정식의 반올림 오차 없이 x[s] 그대로 (EMA 교차 비교가 라이브와 같도록)
+    result[valid] = np.where(p == s, close[s], full[p] + (1 - alpha) ** (p - s + 1) * start_gap)
+    return result
+
+
+def windowed_rsi_matrix(bot, close, starts, columns, periods=14, rows=None):
+    """캔들마다 윈도우 기준 calculate_rsi의 마지막 columns개 값 (n x columns)
+
+    Wilder 평활은 선형이므로 전체 구간 RMA에 윈도우 SMA 시드와의 차이를
+    (1-1/periods)^(p-q)만큼 더해 윈도우별 RMA를 구함 (q: 윈도우의 시드 위치).
+    rows를 주면 그 캔들들의 행만 계산 (len(rows) x columns).
+    """
+    n = len(close)
+    changes = np.empty(n)
+    changes[0] = np.nan
+    changes[1:] = close[1:] - close[:-1]
+    gains = np.where(changes < 0, 0.0, changes)
+    losses = np.abs(np.where(changes > 0, 0.0, changes))
+
+    full_gain = bot._wilder_rma(gains, periods)
+    full_loss = bot._wilder_rma(losses, periods)
+
+    # 윈도우 시작 s의 시드: s+1 ~ s+periods 구간 평균
+    seed_gain = np.full(n, np.nan)
+    seed_loss = np.full(n, np.nan)
+    if n > periods:
+        seed_gain[:n - periods] = np.lib.stride_tricks.sliding_window_view(gains[1:], periods).mean(axis=1)
+        seed_loss[:n - periods] = np.lib.stride_tricks.sliding_window_view(losses[1:], periods).mean(axis=1)
+
+    rows = np.arange(n) if rows is None else np.asarray(rows)
+    positions = rows[:, None] - (columns - 1) + np.arange(columns)[None, :]
+    s = np.broadcast_to(starts[rows][:, None], positions.shape)
+    q = s + periods
+    valid = (positions >= q) & (positions >= 0)
+    p = np.where(valid, positions, 0)
+    q_safe = np.minimum(q, n - 1)
+
+    decay = (1 - 1 / periods) ** np.where(valid, p - q, 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        avg_gain = full_gain[p] + decay * (seed_gain[s] - full_gain[q_safe])
+        avg_loss = full_loss[p] + decay * (seed_loss[s] - full_loss[q_safe])
+        rsi = 100 - (100 / (1 + avg_gain / avg_loss))
+    rsi[~valid | ~np.isfinite(rsi)] = 50.0
+    return np.clip(rsi, 0, 100), positions - s
+
+
+def stoch_rsi_last(rsi_matrix, window_positions, lengths, period=14, smoothK=3, smoothD=3):
+    """calculate_stoch_rsi의 마지막 K/D 값 (rsi_matrix: 윈도우별 마지막 RSI 값들)"""
+    windows = np.lib.stride_tricks.sliding_window_view(rsi_matrix, period, axis=1)
+    current = rsi_matrix[:, period - 1:]
+    high = windows.max(axis=2)
+    low = windows.min(axis=2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        raw_k = 100 * (current - low) / (high - low)
+    raw_k = np.where(high != low, raw_k, 50.0)
+    raw_k[window_positions[:, period - 1:] < period] = np.nan
+
+    # 모두 NaN인 구간의 평균은 NaN (경고 없이 50으로 채움)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        k_line = np.stack([
+            np.nanmean(raw_k[:, j - smoothK + 1:j + 1], axis=1)
+            for j in range(raw_k.shape[1] - smoothD, raw_k.shape[1])
+        ], axis=1)
+        d_last = np.nanmean(k_line, axis=1)
+    k_last = k_line[:, -1]
+
+    k_last = np.clip(np.nan_to_num(k_last, nan=50.0), 0, 100)
+    d_last = np.clip(np.nan_to_num(d_last, nan=50.0), 0, 100)
+
+    # 윈도우가 짧으면 calculate_stoch_rsi는 50을 반환
+    short = lengths < period + smoothK + smoothD
+    k_last[short] = 50.0
+    d_last[short] = 50.0
+    return k_last, d_last
+
+
+def _centered(values, reducer):
+    """rolling(3, center=True)와 같은 중심 윈도우 집계 (양 끝은 NaN, 마지막 축 기준)"""
+    result = np.full(values.shape, np.nan)
+    result[..., 1:-1] = reducer(np.lib.stride_tricks.sliding_window_view(values, 3, axis=-1), axis=-1)
+    return result
+
+
+def rolling_divergence(bot, high, low, close, lag=1, window=20):
+    """캔들마다 detect_divergence(최근 window개 캔들)를 적용한 결과
+
+    detect_divergence는 윈도우 마지막 캔들의 값을 읽지만 3개 중심 윈도우의
+    마지막 값은 항상 NaN이라 lag=0이면 신호가 나오지 않음. lag=1은 현재
+    캔들로 확정되는 직전 고점/저점 비교를 사용함 (미래 데이터는 쓰지 않음).
+
+    Returns:
+        tuple: (bullish, bearish) bool 배열 (앞쪽 window-1개 캔들은 False)
+    """
+    n = len(close)
+    bullish = np.zeros(n, dtype=bool)
+    bearish = np.zeros(n, dtype=bool)
+    if n < window or not 1 <= lag <= window - 3:
+        return bullish, bearish
+
+    # 가격 중심 윈도우는 전체 시계열 기준과 같음 (현재 캔들 이후 값은 쓰지 않음)
+    price_highs = _centered(high, np.max)
+    price_lows = _centered(low, np.min)
+
+    # RSI는 윈도우(최근 window개 캔들)마다 새로 계산한 값
+    ends = np.arange(window - 1, n)
+    rsi, _ = windowed_rsi_matrix(bot, close, _window_starts(n, window), window, rows=ends)
+    rsi_highs = _centered(rsi, np.max)
+    rsi_lows = _centered(rsi, np.min)
+
+    position = window - 1 - lag
+    current = ends - lag
+    with np.errstate(invalid='ignore'):
+        bearish[ends] = (
+            (price_highs[current] > price_highs[current - 1]) &
+            (rsi_highs[:, position] < rsi_highs[:, position - 1])
+        )
+        bullish[ends] = (
+            (price_lows[current] < price_lows[current - 1]) &
+            (rsi_lows[:, position] > rsi_lows[:, position - 1])
+        )
+    return bullish, bearish
+
+
+def analysis_history(bot, data, window=200, divergence_lag=0):
+    """캔들마다 calculate_indicators 분석 결과를 한 번에 계산한 열 단위 표
+
+    각 캔들 t는 라이브와 같이 최근 window개 캔들(data.iloc[t-window+1:t+1])만
+    본 값으로 계산함. EMA/RSI처럼 시작점에 따라 값이 달라지는 지표는 전체
+    구간 값에 윈도우 시작점 보정을 더해 구하므로 캔들마다 다시 계산하지 않음.
+    window=None이면 전체 구간 기준.
+
+    divergence_lag=0은 detect_divergence와 같음 (마지막 캔들의 중심 윈도우는
+    비어 있어 항상 False). 확정된 직전 고점/저점을 쓰려면 1.
+    KNN 예측은 포함하지 않음 (knn_window_history 참고).
+
+    Returns:
+        pd.DataFrame: 캔들별 current_price, rsi, stoch_rsi_k/d, ema_ribbon_status(_num),
+            bb_upper/middle/lower, bollinger_position(_num), band_width,
+            band_position_percentage, momentum, volatility_ratio,
+            bearish/bullish_divergence, counter_trend_buy/sell
+    """
+    close = data['close'].to_numpy(dtype=float)
+    high = data['high'].to_numpy(dtype=float)
+    low = data['low'].to_numpy(dtype=float)
+    n = len(close)
+    starts = _window_starts(n, window)
+    lengths = np.arange(n) - starts + 1
+
+    # RSI / Stoch RSI (윈도우 기준)
+    columns = 14 + 3 + 3 - 2
+    rsi_matrix, window_positions = windowed_rsi_matrix(bot, close, starts, columns)
+    rsi = rsi_matrix[:, -1]
+    stoch_k, stoch_d = stoch_rsi_last(rsi_matrix, window_positions, lengths)
+
+    # EMA Ribbon (analyze_ema_ribbon과 같은 규칙)
+    ema = {period: windowed_ema(close, period, starts) for period in (5, 10, 30, 50, 200)}
+    slopes = [ema[period] - windowed_ema(close, period, starts, lag=1) for period in (5, 10, 30, 50)]
+    trend_strength = (ema[5] > ema[30]).astype(int) + (ema[10] > ema[50]).astype(int)
+    with np.errstate(invalid='ignore'):
+        slope_strength = sum((slope > 0).astype(int) for slope in slopes)
+    bullish_trend = close > ema[200]
+    ema_status = np.select(
+        [
+            (trend_strength >= 2) & (slope_strength >= 3) & bullish_trend,
+            (trend_strength >= 2) & bullish_trend,
+            (trend_strength == 1) | bullish_trend,
+            (trend_strength == 0) & (slope_strength <= 1)
+        ],
+        [4, 3, 2, 1], default=0
+    )
+    ema_status[lengths < 2] = 2  # 직전 값이 없으면 calculate_indicators 기본값 (중립)
+
+    # 볼린저 밴드 (이동평균/표준편차는 윈도우와 무관)
+    close_series = pd.Series(close)
+    bb_middle = close_series.rolling(window=bot.BOLLINGER_PERIOD).mean().to_numpy()
+    bb_std = close_series.rolling(window=bot.BOLLINGER_PERIOD).std().to_numpy()
+    bb_upper = bb_middle + bb_std * bot.BOLLINGER_STD
+    bb_lower = bb_middle - bb_std * bot.BOLLINGER_STD
+    upper_third = bb_upper - ((bb_upper - bb_middle) * 0.33)
+    lower_third = bb_lower + ((bb_middle - bb_lower) * 0.33)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        bollinger_position = np.select(
+            [close >= bb_upper, close >= upper_third, close >= bb_middle, close >= lower_third, close >= bb_lower],
+            [5, 4, 3, 2, 1], default=0
+        )
+        band_width = ((bb_upper - bb_lower) / bb_middle) * 100
+        band_position = ((close - bb_lower) / (bb_upper - bb_lower)) * 100
+
+    # 모멘텀 / 변동성 (get_average_true_range와 같은 10개 캔들 TR 평균)
+    momentum = np.zeros(n)
+    momentum[1:] = (close[1:] - close[:-1]) / close[:-1]
+    prev_close = np.append(np.nan, close[:-1])
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    atr = pd.Series(true_range).rolling(window=10).mean().to_numpy()
+    volatility_ratio = atr / close * 100
+
+    # 다이버전스 및 역추세 신호
+    if divergence_lag > 0:
+        bullish, bearish = rolling_divergence(bot, high, low, close, lag=divergence_lag)
+    else:
+        bullish, bearish = np.zeros(n, dtype=bool), np.zeros(n, dtype=bool)
+    with np.errstate(invalid='ignore'):
+        counter_trend_buy = (
+            (close <= bb_lower) & (rsi <= bot.OVERSOLD_RSI) & (momentum < -bot.MOMENTUM_THRESHOLD) &
+            bullish & (volatility_ratio > bot.VOLATILITY_THRESHOLD)
+        )
+        counter_trend_sell = (
+            (close >= bb_upper) & (rsi >= bot.OVERBOUGHT_RSI) & (momentum > bot.MOMENTUM_THRESHOLD) &
+            bearish & (volatility_ratio > bot.VOLATILITY_THRESHOLD)
+        )
+
+    return pd.DataFrame({
+        'current_price': close,
+        'rsi': rsi,
+        'stoch_rsi_k': stoch_k,
+        'stoch_rsi_d': stoch_d,
+        'ema_ribbon_status_num': ema_status,
+        'ema_ribbon_status': pd.Categorical.from_codes(ema_status, [EMA_RIBBON_STATUSES[i] for i in range(5)]),
+        'bb_upper': bb_upper,
+        'bb_middle': bb_middle,
+        'bb_lower': bb_lower,
+        'bollinger_position_num': bollinger_position,
+        'bollinger_position': pd.Categorical.from_codes(bollinger_position, [BOLLINGER_POSITIONS[i] for i in range(6)]),
+        'band_width': band_width,
+        'band_position_percentage': band_position,
+        'momentum': momentum,
+        'volatility_ratio': volatility_ratio,
+        'bearish_divergence': bearish,
+        'bullish_divergence': bullish,
+        'counter_trend_buy': counter_trend_buy,
+        'counter_trend_sell': counter_trend_sell
+    }, index=data.index)
+
+
+
+def _windowed_ema_matrix(close, full, span, starts, positions):
+    """윈도우 첫 캔들 starts[i]에서 새로 시작한 EMA의 positions[i, j] 위치 값 (windowed_ema 참고)
+
+    full은 전체 구간 ewm(span, adjust=False) 값.
+    """
+    alpha = 2 / (span + 1)
+    s = starts[:, None]
+    start_gap = np.where(s > 0, close[s] - full[np.maximum(s - 1, 0)], 0.0)
+    corrected = full[positions] + (1 - alpha) ** (positions - s + 1) * start_gap
+    return np.where(positions == s, close[s], corrected)
+
+
+def _tail_stats(values, lookback, length):
+    """길이 length인 꼬리 구간에서 앞쪽 lookback개가 NaN인 롤링 지표의 (nanmean, nanstd ddof=1)"""
+    rolling = pd.Series(values).rolling(window=length - lookback)
+    return rolling.mean().to_numpy(), rolling.std().to_numpy()
+
+
+def knn_window_history(bot, data, window=200, tail=50, chunk_size=256):
+    """캔들마다 라이브 predict_next_move와 같은 KNN 예측 (연속성 보너스 전)
+
+    캔들 t는 라이브처럼 최근 window개 캔들만 보고 계산함: 윈도우 안에서
+    prepare_knn_features와 같이 정규화한 특징 행렬(마지막 행 제외)을 이웃
+    후보로, prepare_current_features와 같이 마지막 tail개 캔들 기준으로
+    정규화한 현재 특징을 질의점으로 씀. 롤링 지표는 전체 구간 값에 윈도우
+    앞쪽 결측만 반영하고, RSI/EMA는 윈도우 시작점 보정으로 구함.
+
+    연속성 보너스는 직전 호출의 예측에 따라 달라지므로 적용하지 않음
+    (bot._finish_knn_confidences로 호출 순서에 맞게 마무리).
+    전체 window개 캔들을 볼 수 있는 캔들(t >= window-1)만 계산하고 나머지는 NaN.
+
+    Returns:
+        pd.DataFrame: 캔들별 knn_prediction, knn_base_confidence, knn_signal (|신호 강도|), knn_k
+    """
+    close = data['close'].to_numpy(dtype=float)
+    volume = data['volume'].to_numpy(dtype=float)
+    n = len(close)
+    result = pd.DataFrame(np.nan, index=data.index,
+                          columns=['knn_prediction', 'knn_base_confidence', 'knn_signal', 'knn_k'])
+    if window is None or n < window or window < tail:
+        return result
+
+    close_series = pd.Series(close)
+    volume_series = pd.Series(volume)
+    sma_20 = close_series.rolling(window=20).mean().to_numpy()
+    std_20 = close_series.rolling(window=20).std().to_numpy()
+    volume_ma = volume_series.rolling(window=20).mean().to_numpy()
+    bb_upper = sma_20 + 2 * std_20
+    bb_lower = sma_20 - 2 * std_20
+    returns = close_series.pct_change()
+    volatility = returns.rolling(window=20).std().to_numpy()
+
+    # 윈도우와 무관한 롤링 특징과 윈도우 안에서 결측인 앞쪽 행 수
+    with np.errstate(divide='ignore', invalid='ignore'):
+        base = np.column_stack([
+            (close - sma_20) / std_20,  # price_position
+            bot._pct_change(close, 5),  # price_momentum
+            np.full(n, np.nan),  # price_trend (아래에서 계산)
+            (close - sma_20) / (bb_upper - bb_lower),  # bb_position
+            (bb_upper - bb_lower) / sma_20,  # bb_width
+            volume / volume_ma,  # volume_ratio
+            bot._pct_change(volume, 3),  # volume_trend
+            volatility,  # volatility
+        ])
+    lookbacks = np.array([19, 5, 0, 19, 19, 19, 3, 20])
+    binary_columns = [2, 9]  # price_trend, ema_cross
+    columns = [i for i in range(10) if i not in binary_columns]
+
+    # 현재 특징 정규화 기준 (prepare_current_features: 데이터프레임 열 + 꼬리 구간 롤링 지표의 i번째 열)
+    reference = [(data[name].to_numpy(dtype=float), 0) for name in data.columns]
+    reference += [(sma_20, 19), (std_20, 19), (volume_ma, 19), (sma_20, 19), (bb_upper, 19), (bb_lower, 19)]
+    current_mean = np.empty((n, len(columns)))
+    current_std = np.empty((n, len(columns)))
+    for column, i in enumerate(columns):
+        current_mean[:, column], current_std[:, column] = _tail_stats(*reference[i], tail)
+
+    # calculate_adaptive_k (윈도우 수익률 표준편차) 및 변동성 팩터용 최근 변동성
+    window_volatility = np.nan_to_num(returns.rolling(window=window - 1).std().to_numpy())
+    size_factor = np.clip(window / 100, 0.5, 2.0)
+    k_all = np.clip((16 * size_factor * np.clip(1 - window_volatility, 0.5, 1.5)).astype(int), 8, 32)
+
+    # 윈도우/꼬리 구간 시작점 및 EMA (현재 특징의 EMA 교차는 꼬리 구간 기준)
+    window_starts = np.maximum(np.arange(n) - window + 1, 0)
+    tail_starts = np.maximum(np.arange(n) - tail + 1, 0)
+    full_ema = {span: close_series.ewm(span=span, adjust=False).mean().to_numpy() for span in (5, 20)}
+    current_ema_cross = np.where(windowed_ema(close, 5, tail_starts) > windowed_ema(close, 20, tail_starts), 1, -1)
+
+    feature_weights = np.asarray(bot.KNN_FEATURE_WEIGHTS, dtype=float)
+    multiplier = time_decay_multiplier(np.arange(window - 1), window - 2, bot.KNN_TIME_DECAY, bot.KNN_TIME_WINDOW)
+    offsets = np.arange(window)
+
+    for chunk_start in range(window - 1, n, chunk_size):
+        t = np.arange(chunk_start, min(chunk_start + chunk_size, n))
+        starts = t - window + 1
+        positions = starts[:, None] + offsets
+
+        # 윈도우 특징 행렬 (bars x window x 10)
+        features = np.empty((len(t), window, 10))
+        features[:, :, :8] = base[positions]
+        for column, lookback in enumerate(lookbacks):
+            features[:, :lookback, column] = np.nan
+        with np.errstate(invalid='ignore'):
+            trend = close[positions] > np.where(offsets >= 19, sma_20[positions], np.nan)
+        features[:, :, 2] = np.where(trend, 1, -1)
+        features[:, :, 8], _ = windowed_rsi_matrix(bot, close, window_starts, window, rows=t)
+        ema_5 = _windowed_ema_matrix(close, full_ema[5], 5, starts, positions)
+        ema_20 = _windowed_ema_matrix(close, full_ema[20], 20, starts, positions)
+        features[:, :, 9] = np.where(ema_5 > ema_20, 1, -1)
+
+        # prepare_knn_features와 같은 윈도우별 정규화 및 결측 처리
+        with warnings.catch_warnings(), np.errstate(divide='ignore', invalid='ignore'):
+            warnings.simplefilter('ignore', RuntimeWarning)
+            selected = features[:, :, columns]
+            features[:, :, columns] = (
+                (selected - np.nanmean(selected, axis=1, keepdims=True)) /
+                np.nanstd(selected, axis=1, ddof=1, keepdims=True)
+            )
+        features[~np.isfinite(features)] = np.nan
+        valid = ~np.isnan(features)
+        filled = np.where(valid, offsets[None, :, None], 0)
+        np.maximum.accumulate(filled, axis=1, out=filled)
+        features = np.take_along_axis(features, filled, axis=1)
+        features[np.isnan(features)] = 0
+        labels = np.where(close[positions[:, 1:]] > close[positions[:, :-1]], 1.0, -1.0)
+
+        # 현재 특징 (마지막 tail개 캔들 기준 RSI/EMA, 꼬리 구간 통계로 정규화)
+        current = np.empty((len(t), 10))
+        current[:, :8] = base[t]
+        with np.errstate(invalid='ignore'):
+            current[:, 2] = np.where(close[t] > sma_20[t], 1, -1)
+        current[:, 8] = windowed_rsi_matrix(bot, close, tail_starts, 1, rows=t)[0][:, 0]
+        current[:, 9] = current_ema_cross[t]
+        mean, std = current_mean[t], current_std[t]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            normalized = (current[:, columns] - mean) / np.where(std != 0, std, 1.0)
+        current[:, columns] = np.where(std != 0, normalized, current[:, columns])
+
+        # find_k_nearest (마지막 행 제외, float32 가중 거리 * 시간 배수)
+        weighted = (features[:, :-1].astype(np.float32) * feature_weights.astype(np.float32))
+        query = current.astype(np.float32) * feature_weights.astype(np.float32)
+        squared = (
+            np.einsum('ijk,ijk->ij', weighted, weighted) + np.einsum('ij,ij->i', query, query)[:, None]
+            - 2 * np.einsum('ijk,ik->ij', weighted, query)
+        )
+        distances = np.sqrt(np.maximum(squared, 0)).astype(np.float64) * multiplier
+        weights = np.exp(-(distances - distances.min(axis=1, keepdims=True)))
+        weights = weights / weights.sum(axis=1, keepdims=True)
+
+        k = k_all[t]
+        k_max = int(k.max())
+        candidates = np.argpartition(distances, k_max - 1, axis=1)[:, :k_max]
+        order = np.argsort(np.take_along_axis(distances, candidates, axis=1), axis=1, kind='stable')
+        nearest = np.take_along_axis(candidates, order, axis=1)
+
+        predictions, confidences, strength = bot._score_knn_batch_base(
+            np.take_along_axis(labels, nearest, axis=1),
+            np.take_along_axis(distances, nearest, axis=1),
+            np.take_along_axis(weights, nearest, axis=1),
+            k, volatility[t]
+        )
+        result.iloc[t, 0] = predictions
+        result.iloc[t, 1] = confidences
+        result.iloc[t, 2] = strength
+        result.iloc[t, 3] = k
+
+    return result
+
+
+def analysis_results_from_row(row):
+    """analysis_history 한 행(dict)을 calculate_indicators와 같은 형식의 분석 결과로 변환
+
+    KNN 열(knn_prediction, knn_signal_strength)이 없으면 0으로 채움.
+    """
+    return {
+        'current_price': float(row['current_price']),
+        'knn_prediction': float(row.get('knn_prediction', 0)),
+        'knn_signal_strength': float(row.get('knn_signal_strength', 0)),
+        'rsi': float(row['rsi']),
+        'stoch_rsi_k': float(row['stoch_rsi_k']),
+        'stoch_rsi_d': float(row['stoch_rsi_d']),
+        'ema_ribbon_status': str(row['ema_ribbon_status']),
+        'ema_ribbon_status_num': int(row['ema_ribbon_status_num']),
+        'bb_upper': float(row['bb_upper']),
+        'bb_middle': float(row['bb_middle']),
+        'bb_lower': float(row['bb_lower']),
+        'bollinger_position_num': int(row['bollinger_position_num']),
+        'bollinger_position': str(row['bollinger_position']),
+        'band_width': float(row['band_width']),
+        'band_position_percentage': float(row['band_position_percentage']),
+        'momentum': float(row['momentum']),
+        'volatility_ratio': float(row['volatility_ratio']),
+        'divergence': {
+            'bearish_divergence': bool(row['bearish_divergence']),
+            'bullish_divergence': bool(row['bullish_divergence'])
+        },
+        'counter_trend_signals': {
+            'buy': bool(row['counter_trend_buy']),
+            'sell': bool(row['counter_trend_sell'])
+        }
+    }
@@ -1,2977 +1,4658 @@
-import pyupbit
-import re
-import numpy as np
-import pandas as pd
-import time
-import warnings
-import openai
-import json
-import sqlite3
-import gc
-from datetime import datetime, timedelta
-from zoneinfo import ZoneInfo
-from serpapi import GoogleSearch
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
-warnings.filterwarnings('ignore')
-
-class BTCTradingBot:
-    #----------------
-    # 1. Initialization and Setup
-    #----------------
-    def __init__(self, ticker="KRW-BTC", interval="minute240"):
-        # 먼저 timezone 설정
-        self.timezone = ZoneInfo('Asia/Seoul')
-
-        self.ticker = ticker
-        self.interval = interval
-        
-        self.access_key = os.getenv('UPBIT_ACCESS_KEY')
-        self.secret_key = os.getenv('UPBIT_SECRET_KEY')
-        self.openai_api_key = os.getenv('OPENAI_API_KEY')
-        self.serpapi_key_1 = os.getenv('SERPAPI_KEY_1')
-        self.serpapi_key_2 = os.getenv('SERPAPI_KEY_2')
-        self.current_serpapi_key = self.serpapi_key_1 
-
-        # 뉴스 검색 키워드 초기화 추가
-        self.news_keywords = [
-            "BTC Crypto news"
-        ]
-
-        self.api_call_counts = {
-            self.serpapi_key_1: 0,
-            self.serpapi_key_2: 0
-        }
-        self.last_api_reset = {
-            self.serpapi_key_1: datetime.now(self.timezone),
-            self.serpapi_key_2: datetime.now(self.timezone)
-        }
-
-        self.TRADING_FEE_RATE = 0.0005
-        self.MIN_ORDER_AMOUNT = 5000
-        
-        openai.api_key = self.openai_api_key
-        self.upbit = pyupbit.Upbit(self.access_key, self.secret_key)
-        self.db_path = 'trading_log.db'
-        
-
-        # 뉴스 캐싱 관련 변수
-        self.NEWS_UPDATE_INTERVAL = 14400  # 4시간 (초)
-        
-        # 데이터베이스 생성
-        self.create_database()
-        
-        # 초기 뉴스 로드
-        cached_news = self.load_cached_news()
-        if cached_news:
-            self.cached_news = cached_news
-            self.last_news_update = time.time()
-        else:
-            self.cached_news = self.fetch_BTC_news()
-            self.last_news_update = time.time()
-
-        # GPT 자문 관련 변수 초기화
-        self.last_gpt_market_state = None
-        self.last_gpt_advice = None
-
-        # 역추세 매매를 위한 추가 파라미터
-        self.OVERSOLD_RSI = 25  # RSI 과매도 기준
-        self.OVERBOUGHT_RSI = 75  # RSI 과매수 기준
-        self.BOLLINGER_PERIOD = 20  # 볼린저 밴드 기간
-        self.BOLLINGER_STD = 2.2  # 볼린저 밴드 표준편차
-        self.MOMENTUM_THRESHOLD = 0.025  # 모멘텀 임계값 (2.5%)
-
-        from threading import Lock
-        self.market_data_lock = Lock()
-
-        # 임계값을 설정으로 분리
-        self.VOLATILITY_THRESHOLD = 2
-        self.CONFIDENCE_THRESHOLD = 60
-        self.MIN_TRADE_INTERVAL = 180  # 3분
-        self.SLEEP_INTERVAL = 180      # 3분
-
-        # 거래 제한 관련 새로운 변수들
-        self.last_gpt_advice = None
-        self.last_market_state = None
-        self.COOLDOWN_HOURS = 2  # 거래 후 대기 시간 (시간)
-        self.MARKET_CHANGE_THRESHOLD = 0.02  # 시장 변화 감지 임계값 (2%)
-        
-        # DB 커넥션 풀 설정
-        self.db_connection = None
-        self.init_database_connection()
-
-        # Stoch RSI 크로스 관련 변수 추가
-        self.last_stoch_cross_time = None
-        self.last_stoch_cross_type = None
-        self.STOCH_CROSS_COOLDOWN = 600  # 1시간 쿨다운
-        self.STOCH_CROSS_THRESHOLD = 2  # 크로스 발생 후 최소 2% 이상 벌어져야 다음 크로스로 인정
-
-        # KNN 방향 변화 관련 변수 추가
-        self.last_knn_change_time = None
-        self.last_knn_direction = None
-        self.KNN_CHANGE_COOLDOWN = 600  # 1시간 쿨다운
-        self.KNN_SIGNAL_MIN_STRENGTH = 0.25  # 최소 신호 강도
-        self.KNN_DIRECTION_CHANGE_THRESHOLD = 0.3  # 방향 전환 최소 차이
-
-        # API 키 사용 정보 초기화
-        self.init_api_key_usage()
-
-    def get_next_serpapi_key(self):
-        """개선된 다음 SerpAPI 키 선택 및 사용량 추적"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            korean_time = datetime.now(self.timezone)
-            current_month = korean_time.month
-            current_year = korean_time.year
-            
-            # 월별 리셋 로직
-            cursor.execute('''
-            UPDATE serpapi_usage 
-            SET usage_count = 0, last_reset_month = ?, last_reset_year = ?
-            WHERE last_reset_month != ? OR last_reset_year != ?
-            ''', (current_month, current_year, current_month, current_year))
-            
-            # 각 키의 사용량 조회
-            cursor.execute('''
-            SELECT api_key, usage_count 
-            FROM serpapi_usage 
-            WHERE usage_count < 95
-            ORDER BY usage_count ASC
-            ''')
-            
-            available_keys = cursor.fetchall()
-            
-            if not available_keys:
-                print("모든 API 키의 사용량이 한도에 도달했습니다.")
-                return None
-            
-            selected_key = available_keys[0][0]
-            
-            # 선택된 키의 사용량 증가
-            cursor.execute('''
-            UPDATE serpapi_usage 
-            SET usage_count = usage_count + 1 
-            WHERE api_key = ?
-            ''', (selected_key,))
-            
-            conn.commit()
-            conn.close()
-            
-            print(f"선택된 API 키: {selected_key}")
-            return selected_key
-            
-        except Exception as e:
-            print(f"API 키 선택 중 오류: {e}")
-            return self.current_serpapi_key
-
-    def init_database_connection(self):
-        """데이터베이스 연결 초기화"""
-        try:
-            self.db_connection = sqlite3.connect(
-                self.db_path,
-                timeout=30,
-                check_same_thread=False
-            )
-            # WAL 모드 활성화로 성능 향상
-            self.db_connection.execute('PRAGMA journal_mode=WAL')
-        except Exception as e:
-            print(f"데이터베이스 연결 실패: {e}")
-            raise
-
-    def create_database(self):
-        """데이터베이스 및 테이블 생성 함수 수정"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # 기존 코드 유지
-            
-            # news_cache 테이블 추가
-            cursor.execute("""
-            CREATE TABLE IF NOT EXISTS news_cache (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                news_content TEXT NOT NULL,
-                timestamp TEXT NOT NULL
-            )
-            """)
-            
-            # trade_log 테이블 추가 (추가적으로 필요할 수 있음)
-            cursor.execute("""
-            CREATE TABLE IF NOT EXISTS trade_log (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                trade_type TEXT NOT NULL,
-                amount REAL NOT NULL,
-                price REAL NOT NULL,
-                timestamp TEXT NOT NULL,
-                confidence_score INTEGER,
-                reasoning TEXT,
-                rsi REAL,
-                volatility REAL,
-                strategy_type TEXT
-            )
-            """)
-
-            cursor.execute("""
-            CREATE TABLE IF NOT EXISTS gpt_advice_log (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp TEXT NOT NULL,
-                trade_recommendation TEXT NOT NULL,
-                investment_percentage INTEGER NOT NULL,
-                confidence_score INTEGER NOT NULL,
-                reasoning TEXT,
-                market_state TEXT
-            )
-            """)
-
-            cursor.execute("""
-            CREATE TABLE IF NOT EXISTS serpapi_usage (
-                api_key TEXT PRIMARY KEY,
-                usage_count INTEGER NOT NULL,
-                last_reset_month INTEGER NOT NULL,
-                last_reset_year INTEGER NOT NULL
-            )
-            """)
-
-            cursor.execute("""
-            CREATE TABLE IF NOT EXISTS news_fetch_log (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                fetch_timestamp TEXT NOT NULL,
-                news_content TEXT NOT NULL,
-                keywords TEXT NOT NULL
-            )
-            """)
-
-            conn.commit()
-            conn.close()
-            
-        except Exception as e:
-            print(f"데이터베이스 생성 중 오류: {e}")
-            import traceback
-            traceback.print_exc()
-
-    def init_api_key_usage(self):
-        """초기 API 키 사용 정보 초기화"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            korean_time = datetime.now(self.timezone)
-            
-            # 각 API 키에 대한 사용 정보 초기화
-            for api_key in [self.serpapi_key_1, self.serpapi_key_2]:
-                cursor.execute('''
-                INSERT OR REPLACE INTO serpapi_usage 
-                (api_key, usage_count, last_reset_month, last_reset_year) 
-                VALUES (?, ?, ?, ?)
-                ''', (
-                    api_key, 
-                    0, 
-                    korean_time.month, 
-                    korean_time.year
-                ))
-            
-            conn.commit()
-            conn.close()
-        except Exception as e:
-            print(f"API 키 사용 정보 초기화 중 오류: {e}")
-        
-    #----------------
-    # 2. Data Management
-    #----------------
-    def get_historical_data(self, count=200):
-        """과거 거래 데이터 가져오기 (충분한 데이터 보장)"""
-        try:
-            # RSI 계산에 필요한 최소 데이터 수 고려
-            required_count = max(count, 50)  # RSI 계산을 위해 충분한 데이터 확보
-            
-            df = pyupbit.get_ohlcv(self.ticker, interval=self.interval, count=required_count)
-            if df is None or df.empty:
-                raise ValueError("데이터를 가져올 수 없습니다.")
-            return df
-        except Exception as e:
-            print(f"Historical data 조회 중 오류: {e}")
-            return None
-        
-    def get_portfolio_status(self):
-        try:
-            krw_balance = self.upbit.get_balance("KRW")
-            coin_balance = self.upbit.get_balance(self.ticker)
-            current_price = pyupbit.get_current_price(self.ticker)
-            
-            coin_value = coin_balance * current_price if coin_balance and current_price else 0
-            total_value = krw_balance + coin_value
-            
-            avg_buy_price = self.upbit.get_avg_buy_price(self.ticker)
-            roi = ((current_price - avg_buy_price) / avg_buy_price * 100) if avg_buy_price and coin_balance else 0
-            coin_ratio = (coin_value / total_value * 100) if total_value > 0 else 0
-            
-            print(f"\n현재 포트폴리오 상태:")
-            print(f"KRW 잔고: {krw_balance:.2f}원")
-            print(f"BTC 잔고: {coin_balance:.8f}")
-            rounded_price = round(current_price / 100) * 100
-            print(f"현재 가격: {rounded_price:,.0f}원")
-            if avg_buy_price > 0:
-                print(f"평균 매수가: {avg_buy_price:.2f}원")
-            print(f"코인 가치: {coin_value:.2f}원")
-            print(f"총 자산: {total_value:.2f}원")
-            print(f"수익률: {roi:.2f}%")
-            print(f"코인 비중: {coin_ratio:.2f}%")
-            
-            return {
-                'krw_balance': krw_balance,
-                'coin_balance': coin_balance,
-                'current_price': current_price,
-                'avg_buy_price': avg_buy_price,
-                'coin_value': coin_value,
-                'total_value': total_value,
-                'roi': roi,
-                'coin_ratio': coin_ratio
-            }
-        except Exception as e:
-            print(f"포트폴리오 상태 조회 중 오류: {e}")
-            return None
-
-    def get_next_news_update_time(self, current_time):
-        """정해진 시간 (00, 04, 08, 12, 16, 20)의 다음 업데이트 시간 계산
-        
-        Args:
-            current_time (datetime): 현재 시간
-        
-        Returns:
-            datetime: 다음 업데이트 예정 시간
-        """
-        fixed_hours = [0, 4, 8, 12, 16, 20]
-        current_hour = current_time.hour
-        
-        # 현재 시간 이후의 다음 고정 시간 찾기
-        next_hour = next((h for h in fixed_hours if h > current_hour), fixed_hours[0])
-        
-        next_update = current_time.replace(
-            hour=next_hour,
-            minute=0,
-            second=0,
-            microsecond=0
-        )
-        
-        # 다음 시간이 현재 시간보다 이전이면 다음 날로 설정
-        if next_update <= current_time:
-            next_update += timedelta(days=1)
-        
-        return next_update
-
-    def fetch_BTC_news(self, num_articles=5, max_retries=3):
-        """개선된 뉴스 수집 함수"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            current_time = datetime.now(self.timezone)
-            fixed_hours = [0, 4, 8, 12, 16, 20]
-            
-            # 마지막으로 저장된 뉴스 조회
-            cursor.execute('''
-            SELECT news_content, fetch_timestamp 
-            FROM news_fetch_log 
-            ORDER BY fetch_timestamp DESC 
-            LIMIT 1
-            ''')
-            
-            last_news = cursor.fetchone()
-            
-            if last_news:
-                last_fetch_time = datetime.strptime(
-                    last_news[1], 
-                    '%Y-%m-%d %H:%M:%S'
-                ).replace(tzinfo=self.timezone)
-                
-                # 현재 시간이 정해진 시간이 아닌 경우 캐시된 뉴스 반환
-                if current_time.hour not in fixed_hours:
-                    print(f"정해진 시간이 아님 - 마지막 업데이트: {last_fetch_time}")
-                    return last_news[0]
-                
-                # 마지막 업데이트가 현재 시간대와 같은 경우 캐시된 뉴스 반환
-                if (last_fetch_time.date() == current_time.date() and 
-                    last_fetch_time.hour == current_time.hour):
-                    print(f"이미 현재 시간대의 뉴스가 있음: {last_fetch_time}")
-                    return last_news[0]
-            
-            # 여기서부터는 새로운 뉴스를 가져오는 로직
-            default_keywords = ["BTC cryptocurrency OR BTC"]
-            keywords_to_use = getattr(self, 'news_keywords', default_keywords)
-            
-            # API 키 사용량 확인 및 초기화 로직
-            cursor.execute('''
-            SELECT api_key, usage_count, last_reset_month, last_reset_year
-            FROM serpapi_usage
-            WHERE usage_count < 95
-            ORDER BY usage_count ASC
-            ''')
-            
-            available_keys = cursor.fetchall()
-            
-            if not available_keys:
-                print("모든 API 키의 사용량이 한도에 도달했습니다.")
-                return self._get_cached_news(cursor)
-                
-            all_news = []
-            api_success = False
-            retry_count = 0
-            
-            while not api_success and retry_count < max_retries:
-                try:
-                    for api_key, current_usage, last_month, last_year in available_keys:
-                        # 월간 사용량 초기화 확인
-                        if (current_time.month != last_month or 
-                            current_time.year != last_year):
-                            cursor.execute('''
-                            UPDATE serpapi_usage
-                            SET usage_count = 0,
-                                last_reset_month = ?,
-                                last_reset_year = ?
-                            WHERE api_key = ?
-                            ''', (current_time.month, current_time.year, api_key))
-                            conn.commit()
-                            current_usage = 0
-                        
-                        if current_usage >= 95:
-                            continue
-                            
-                        print(f"\nAPI 키 시도: {api_key[:8]}... (현재 사용량: {current_usage})")
-                        
-                        success_with_current_key = False
-                        for keyword in keywords_to_use:
-                            try:
-                                params = {
-                                    "engine": "google_news",
-                                    "q": keyword,
-                                    "api_key": api_key,
-                                    "num": num_articles,
-                                    "gl": "us",
-                                    "hl": "en",
-                                    "time_period": "1h"  # 최근 4시간 뉴스로 제한
-                                }
-                                
-                                search = GoogleSearch(params)
-                                results = search.get_dict()
-                                
-                                if 'error' in results:
-                                    print(f"API 오류 ({api_key[:8]}...): {results['error']}")
-                                    continue
-                                
-                                if 'news_results' in results:
-                                    news_results = results['news_results']
-                                    if news_results:  # 결과가 있는 경우만 처리
-                                        news_count = len(news_results)
-                                        print(f"뉴스 검색 성공 (키: {api_key[:8]}...): {news_count}개 기사")
-                                        all_news.extend(news_results)
-                                        success_with_current_key = True
-                                        api_success = True
-                                        
-                                        # 성공한 API 키의 사용량 증가
-                                        cursor.execute('''
-                                        UPDATE serpapi_usage 
-                                        SET usage_count = usage_count + 1 
-                                        WHERE api_key = ?
-                                        ''', (api_key,))
-                                        conn.commit()
-                                        break
-                                    
-                            except Exception as e:
-                                print(f"키워드 '{keyword}' 검색 중 오류: {e}")
-                                continue
-                        
-                        if success_with_current_key:
-                            break
-                            
-                    if not api_success:
-                        retry_count += 1
-                        if retry_count < max_retries:
-                            print(f"\n재시도 {retry_count}/{max_retries}...")
-                            time.sleep(5)  # 재시도 전 5초 대기
-                        
-                except Exception as e:
-                    print(f"API 호출 중 오류: {e}")
-                    retry_count += 1
-                    if retry_count < max_retries:
-                        time.sleep(5)
-                    continue
-                    
-            if api_success:
-                # 뉴스 처리 및 저장
-                news_summary = self._process_news(all_news)
-                
-                try:
-                    # 기존 데이터 삭제
-                    cursor.execute('DELETE FROM news_fetch_log')
-                    
-                    # 새로운 뉴스 저장
-                    cursor.execute('''
-                    INSERT INTO news_fetch_log 
-                    (fetch_timestamp, news_content, keywords) 
-                    VALUES (?, ?, ?)
-                    ''', (
-                        current_time.strftime('%Y-%m-%d %H:%M:%S'),
-                        news_summary,
-                        ','.join(keywords_to_use)
-                    ))
-                    
-                    conn.commit()
-                    print(f"\n새로운 뉴스 수집 및 저장 완료 ({len(all_news)}개 기사)")
-                    return news_summary
-                    
-                except sqlite3.Error as e:
-                    print(f"데이터베이스 저장 중 오류: {e}")
-                    return self._get_cached_news(cursor)
-            else:
-                print("\n모든 API 키 시도 실패")
-                return self._get_cached_news(cursor)
-                
-        except Exception as e:
-            print(f"뉴스 수집 중 오류: {e}")
-            import traceback
-            traceback.print_exc()
-            if 'cursor' in locals():
-                return self._get_cached_news(cursor)
-            return "뉴스를 가져올 수 없습니다."
-            
-        finally:
-            if 'conn' in locals():
-                conn.close()
-
-    def _get_cached_news(self, cursor):
-        """캐시된 뉴스 조회"""
-        cursor.execute('''
-        SELECT news_content, fetch_timestamp 
-        FROM news_fetch_log 
-        ORDER BY fetch_timestamp DESC 
-        LIMIT 1
-        ''')
-        
-        result = cursor.fetchone()
-        if result:
-            news_content, timestamp = result
-            print(f"캐시된 뉴스 반환 (최종 업데이트: {timestamp})")
-            return news_content
-        return "뉴스를 가져올 수 없습니다."
-
-    def _fetch_news_with_key(self, api_key, num_articles):
-        """특정 API 키로 뉴스 수집"""
-        news_results = []
-        for keyword in self.news_keywords:
-            params = {
-                "engine": "google_news",
-                "q": keyword,
-                "api_key": api_key,
-                "num": num_articles
-            }
-            
-            search = GoogleSearch(params)
-            results = search.get_dict()
-            
-            if 'news_results' in results:
-                news_results.extend(results['news_results'])
-            
-        return news_results
-
-    def _process_news(self, news_results):
-        """뉴스 결과 처리"""
-        # 중복 제거
-        unique_news = {article.get('title', ''): article for article in news_results}
-        sorted_news = sorted(unique_news.values(), key=lambda x: x.get('date', ''), reverse=True)
-        
-        # 뉴스 요약 생성
-        news_summary = ""
-        for idx, article in enumerate(sorted_news, 1):
-            is_important = any(keyword.lower() in article.get('title', '').lower() 
-                             for keyword in ['sec', 'regulation', 'bitcoin'])
-            prefix = "🔥 " if is_important else ""
-            news_summary += f"{prefix}{idx}. {article.get('title', '')}\n"
-            news_summary += f"   {article.get('snippet', '')}\n\n"
-        
-        return news_summary
-
-    def update_news_cache(self, news_content):
-        """개선된 뉴스 캐시 업데이트"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            korean_time = datetime.now(self.timezone)
-            
-            # 현재 시간이 정해진 시간인 경우에만 업데이트
-            if korean_time.hour in [0, 4, 8, 12, 16, 20]:
-                cursor.execute('''
-                INSERT INTO news_fetch_log 
-                (fetch_timestamp, news_content, keywords) 
-                VALUES (?, ?, ?)
-                ''', (
-                    korean_time.strftime('%Y-%m-%d %H:%M:%S'),
-                    news_content,
-                    ','.join(self.news_keywords)
-                ))
-                
-                print(f"뉴스 캐시 업데이트 완료: {korean_time}")
-            else:
-                print(f"정해진 시간이 아니므로 뉴스 캐시 업데이트 건너뜀: {korean_time}")
-            
-            conn.commit()
-            
-        except sqlite3.Error as e:
-            print(f"뉴스 캐시 업데이트 중 SQLite 오류: {e}")
-        except Exception as e:
-            print(f"뉴스 캐시 업데이트 중 오류: {e}")
-        finally:
-            if 'conn' in locals():
-                conn.close()
-
-    def load_cached_news(self):
-        """개선된 캐시된 뉴스 로드"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-            SELECT news_content, fetch_timestamp 
-            FROM news_fetch_log 
-            ORDER BY fetch_timestamp DESC 
-            LIMIT 1
-            ''')
-            
-            result = cursor.fetchone()
-            
-            if result:
-                cached_news, timestamp_str = result
-                print(f"캐시된 뉴스 로드 (최종 업데이트: {timestamp_str})")
-                return cached_news
-            
-            return None
-            
-        except sqlite3.Error as e:
-            print(f"캐시된 뉴스 로드 중 SQLite 오류: {e}")
-            return None
-        except Exception as e:
-            print(f"캐시된 뉴스 로드 중 오류: {e}")
-            return None
-        finally:
-            if 'conn' in locals():
-                conn.close()
-
-    def log_trade(self, trade_type, amount, price, confidence_score, reasoning, rsi, volatility, strategy_type):
-        """거래 로깅 개선 및 디버깅 기능 추가"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            korean_time = datetime.now(self.timezone)
-            timestamp = korean_time.strftime('%Y-%m-%d %H:%M:%S')
-            
-            # 디버그 출력
-            print(f"\n=== 거래 로깅 디버그 ===")
-            print(f"시간: {timestamp}")
-            print(f"거래 유형: {trade_type}")
-            print(f"거래량: {amount}")
-            print(f"가격: {price}")
-            print(f"신뢰도: {confidence_score}")
-            
-            cursor.execute('''
-            INSERT INTO trade_log 
-            (trade_type, amount, price, timestamp, confidence_score, reasoning, rsi, volatility, strategy_type) 
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                str(trade_type),  # 문자열 타입 보장
-                float(amount),    # 실수 타입 보장
-                float(price),     # 실수 타입 보장
-                timestamp,
-                int(confidence_score) if confidence_score else 0,  # NULL 처리
-                str(reasoning) if reasoning else '',
-                float(rsi) if rsi else 0.0,
-                float(volatility) if volatility else 0.0,
-                str(strategy_type) if strategy_type else '미정'
-            ))
-            
-            conn.commit()
-            
-            # 저장 확인
-            cursor.execute('''
-            SELECT * FROM trade_log WHERE timestamp = ? ORDER BY id DESC LIMIT 1
-            ''', (timestamp,))
-            
-            result = cursor.fetchone()
-            if result:
-                print("\n✅ 거래 기록 저장 완료:")
-                print(f"ID: {result[0]}")
-                print(f"저장된 거래 유형: {result[1]}")
-                print(f"저장된 거래량: {result[2]}")
-            else:
-                print("❌ 거래 기록 확인 실패")
-                
-            return True
-
-        except Exception as e:
-            print(f"❌ 거래 로깅 오류: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            return False
-            
-        finally:
-            if 'conn' in locals():
-                conn.close()
-        
-    def get_recent_gpt_advice(self, limit=5):
-        """최근 GPT 자문 내역 조회 함수 개선"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-            SELECT 
-                timestamp,
-                trade_recommendation,
-                investment_percentage,
-                confidence_score,
-                reasoning,
-                market_state
-            FROM gpt_advice_log
-            ORDER BY timestamp DESC
-            LIMIT ?
-            ''', (limit,))
-            
-            results = cursor.fetchall()
-            
-            # 결과를 딕셔너리 리스트로 변환
-            advice_list = []
-            for row in results:
-                try:
-                    market_state = json.loads(row[5]) if row[5] else None
-                except json.JSONDecodeError:
-                    market_state = None
-                
-                advice_list.append({
-                    'timestamp': row[0],
-                    'trade_recommendation': row[1],
-                    'investment_percentage': row[2],
-                    'confidence_score': row[3],
-                    'reasoning': row[4],
-                    'market_state': market_state
-                })
-            
-            print(f"\n최근 {len(advice_list)}개의 GPT 자문 기록 조회됨")
-            for advice in advice_list:
-                print(f"시간: {advice['timestamp']}")
-                print(f"추천: {advice['trade_recommendation']}")
-                print(f"신뢰도: {advice['confidence_score']}%")
-                print("---")
-            
-            return advice_list
-                
-        except Exception as e:
-            print(f"GPT 자문 내역 조회 중 오류: {e}")
-            import traceback
-            traceback.print_exc()
-            return []
-            
-        finally:
-            if 'conn' in locals():
-                conn.close()
-    
-    def get_recent_trades(self, limit=5):
-        """최근 거래 내역 조회 개선"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # 컬럼 존재 여부 확인 없이 바로 조회
-            cursor.execute('''
-            SELECT 
-                trade_type,
-                amount,
-                price,
-                timestamp,
-                confidence_score,
-                reasoning,
-                rsi,
-                volatility,
-                strategy_type
-            FROM trade_log
-            WHERE trade_type != 'hold'
-            ORDER BY timestamp DESC
-            LIMIT ?
-            ''', (limit,))
-            
-            trades = cursor.fetchall()
-            conn.close()
-            
-            return trades
-        except Exception as e:
-            print(f"거래 내역 조회 중 오류: {e}")
-            return []
-
-    def get_recent_trades_volume(self, hours=24):
-        """최근 거래량 집계"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            time_threshold = (datetime.now(self.timezone) - timedelta(hours=hours)).strftime('%Y-%m-%d %H:%M:%S')
-            
-            cursor.execute('''
-            SELECT trade_type, SUM(amount) as total_amount
-            FROM trade_log
-            WHERE timestamp > ? AND trade_type IN ('buy', 'sell')
-            GROUP BY trade_type
-            ''', (time_threshold,))
-            
-            results = cursor.fetchall()
-            trades = {row[0]: row[1] for row in results}
-            
-            # 총 거래 비율 계산
-            portfolio = self.get_portfolio_status()
-            total_assets = portfolio['total_value']
-            total_traded = sum(trades.values())
-            
-            return {
-                'buy_volume': trades.get('buy', 0),
-                'sell_volume': trades.get('sell', 0),
-                'total_ratio': total_traded / total_assets if total_assets > 0 else 0
-            }
-            
-        except Exception as e:
-            print(f"거래량 집계 중 오류: {e}")
-            return {'buy_volume': 0, 'sell_volume': 0, 'total_ratio': 0}
-        finally:
-            conn.close()
-
-    def get_recent_trading_summary(self, days=7):
-        """최근 거래 요약"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            korean_time = datetime.now(self.timezone)
-            past_date = (korean_time - timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
-            
-            cursor.execute('''
-            SELECT 
-                COUNT(CASE WHEN trade_type = 'buy' THEN 1 END) as buy_count,
-                COUNT(CASE WHEN trade_type = 'sell' THEN 1 END) as sell_count,
-                AVG(CASE WHEN trade_type != 'hold' THEN confidence_score END) as avg_confidence
-            FROM trade_log 
-            WHERE timestamp > ? AND trade_type != 'hold'
-            ''', (past_date,))
-            
-            result = cursor.fetchone()
-            buy_count, sell_count, avg_confidence = result
-            
-            return {
-                'period_days': days,
-                'buy_count': buy_count or 0,
-                'sell_count': sell_count or 0,
-                'avg_confidence': avg_confidence or 0
-            }
-        except Exception as e:
-            print(f"거래 요약 조회 중 오류: {e}")
-            return None
-        finally:
-            conn.close()
-
-    def get_gpt_advice_history(self, limit=1, formatted=False):
-        """GPT 자문 내역을 조회하는 통합 함수
-        
-        Args:
-            limit (int): 조회할 최근 자문 개수 (기본값: 1)
-            formatted (bool): 프롬프트용 포맷팅 여부 (기본값: False)
-            
-        Returns:
-            str: 자문 내역 문자열
-        """
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # 최근 자문 데이터 조회
-            cursor.execute('''
-            SELECT 
-                timestamp,
-                trade_recommendation,
-                investment_percentage,
-                confidence_score,
-                reasoning,
-                market_state
-            FROM gpt_advice_log
-            ORDER BY timestamp DESC
-            LIMIT ?
-            ''', (limit,))
-            
-            results = cursor.fetchall()
-            if not results:
-                return "자문 내역이 없습니다."
-                
-            if formatted:
-                # 프롬프트용 포맷
-                advice_history = "이전 자문 내역:\n"
-                for idx, result in enumerate(results, 1):
-                    timestamp_str, recommendation, investment, confidence, reasoning, market_state = result
-                    
-                    # 한국 시간대로 시간 변환
-                    advice_time = datetime.strptime(timestamp_str, '%Y-%m-%d %H:%M:%S')
-                    advice_time = advice_time.replace(tzinfo=self.timezone)
-                    current_time = datetime.now(self.timezone)
-                    minutes_passed = (current_time - advice_time).total_seconds() / 60
-                    
-                    # 시장 상태 파싱
-                    market_status = ""
-                    if market_state:
-                        try:
-                            market_data = json.loads(market_state)
-                            market_status = f"""
-                            - 당시 시장 상황:
-                            * 가격: {market_data.get('price', 'N/A'):,.0f}원
-                            * RSI: {market_data.get('rsi', 'N/A'):.1f}
-                            * 변동성: {market_data.get('volatility', 'N/A'):.1f}%
-                            * EMA: {market_data.get('ema_status', 'N/A')}
-                            * 모멘텀: {market_data.get('momentum', 'N/A')*100:.1f}%
-                            * 볼린저밴드: {market_data.get('bollinger_position', 'N/A')}
-                            """
-                        except json.JSONDecodeError:
-                            market_status = "  (시장 상태 데이터 없음)"
-                    
-                    advice_history += f"""
-                    {idx}. {int(minutes_passed)}분 전 당신의 자문:
-                    - 추천: {recommendation}
-                    - 투자비율: {investment}%
-                    - 신뢰도: {confidence}%
-                    - 근거: {reasoning}
-                    {market_status}
-                    """
-                return advice_history
-            else:
-                # 일반 포맷
-                result = results[0]  # limit=1일 때의 결과
-                timestamp_str, recommendation, investment, confidence, reasoning, market_state = result
-                
-                # 한국 시간대로 시간 변환
-                advice_time = datetime.strptime(timestamp_str, '%Y-%m-%d %H:%M:%S')
-                advice_time = advice_time.replace(tzinfo=self.timezone)
-                current_time = datetime.now(self.timezone)
-                minutes_passed = (current_time - advice_time).total_seconds() / 60
-                
-                # 시장 상태 파싱
-                if market_state:
-                    try:
-                        market_data = json.loads(market_state)
-                        market_status = f"""
-                        시장 상황:
-                        - 가격: {market_data.get('price', 'N/A'):,.0f}원
-                        - RSI: {market_data.get('rsi', 'N/A'):.1f}
-                        - 변동성: {market_data.get('volatility', 'N/A'):.1f}%
-                        - EMA 상태: {market_data.get('ema_status', 'N/A')}
-                        - 모멘텀: {market_data.get('momentum', 'N/A')*100:.1f}%
-                        - 볼린저밴드: {market_data.get('bollinger_position', 'N/A')}
-                        """
-                    except json.JSONDecodeError:
-                        market_status = "시장 상태 데이터 파싱 실패"
-                else:
-                    market_status = "시장 상태 정보 없음"
-                
-                return f"""
-                마지막 GPT 자문 (약 {minutes_passed:.0f}분 전):
-                - 추천: {recommendation}
-                - 투자비율: {investment}%
-                - 신뢰도: {confidence}%
-                - 근거: {reasoning}
-                
-                {market_status}
-                """
-                
-        except Exception as e:
-            print(f"자문 내역 조회 중 오류: {e}")
-            return "자문 내역 조회 실패"
-            
-        finally:
-            if 'conn' in locals():
-                conn.close()
-
-    #----------------
-    # 3. Technical Analysis
-    #----------------
-    def calculate_ema_ribbon(self, data, periods=[5, 10, 20, 30, 50]):
-        """EMA Ribbon 계산"""
-        ema_ribbon = pd.DataFrame()
-        for period in periods:
-            ema_ribbon[f'EMA_{period}'] = data['close'].ewm(span=period, adjust=False).mean()
-        return ema_ribbon
-
-    def calculate_ema_200(self, data):
-        """200 기간 EMA 계산"""
-        return data['close'].ewm(span=200, adjust=False).mean().iloc[-1]
-
-    def calculate_rsi(self, prices, periods=14):
-        """
-        Pine Script 스타일의 RSI 계산 함수
-        
-        Args:
-            prices: 가격 데이터 (pandas Series)
-            periods: RSI 계산 기간 (기본값: 14)
-            
-        Returns:
-            RSI 값을 담은 pandas Series
-        """
-        try:
-            # 필요한 데이터 포인트 수 확인
-            if len(prices) < periods + 1:
-                print(f"RSI 계산을 위한 충분한 데이터가 없습니다. (필요: {periods + 1}, 현재: {len(prices)})")
-                return pd.Series(50, index=prices.index)  # 기본값 50 반환
-                
-            # 가격 변화 계산 (Pine Script의 change(close)와 동일)
-            changes = prices.diff()
-            
-            # gains와 losses 분리 (Pine Script 스타일)
-            gains = changes.copy()
-            losses = changes.copy()
-            
-            # gain = change >= 0 ? change : 0.0
-            gains[gains < 0] = 0.0
-            
-            # loss = change < 0 ? (-1) * change : 0.0
-            losses[losses > 0] = 0.0
-            losses = losses.abs()  # (-1) * change 부분
-            
-            # avgGain = rma(gain, 14) 구현
-            # rma(x, n) = (x + ((n-1) * prevRma)) / n
-            avg_gains = pd.Series(index=prices.index, dtype=float)
-            avg_losses = pd.Series(index=prices.index, dtype=float)
-            
-            # 첫 번째 평균값 계산
-            avg_gains.iloc[periods] = gains.iloc[1:periods + 1].mean()
-            avg_losses.iloc[periods] = losses.iloc[1:periods + 1].mean()
-            
-            # 나머지 기간에 대해 RMA 계산
-            for i in range(periods + 1, len(prices)):
-                avg_gains.iloc[i] = (gains.iloc[i] + (periods - 1) * avg_gains.iloc[i-1]) / periods
-                avg_losses.iloc[i] = (losses.iloc[i] + (periods - 1) * avg_losses.iloc[i-1]) / periods
-            
-            # rs = avgGain / avgLoss
-            rs = avg_gains / avg_losses
-            
-            # rsi = 100 - (100 / (1 + rs))
-            rsi = 100 - (100 / (1 + rs))
-            
-            # 무한값 및 NaN 처리
-            rsi = rsi.replace([np.inf, -np.inf], np.nan)
-            rsi = rsi.fillna(50)  # NaN값은 50으로 채움
-            
-            return rsi.clip(0, 100)  # 0-100 범위로 제한
-            
-        except Exception as e:
-            print(f"RSI 계산 중 오류 발생: {str(e)}")
-            return pd.Series(50, index=prices.index)  # 오류 발생 시 기본값 50 반환
-
-    def calculate_cci(self, high, low, close, periods=14):
-        """CCI 계산"""
-        tp = (high + low + close) / 3
-        tp_sma = tp.rolling(window=periods).mean()
-        mad = tp.rolling(window=periods).apply(lambda x: np.abs(x - x.mean()).mean())
-        cci = (tp - tp_sma) / (0.015 * mad)
-        return cci
-    
-    def calculate_roc(self, close, periods=14):
-        """ROC 계산"""
-        return close.pct_change(periods=periods) * 100
-
-    def normalize_volume(self, volume, window=14):
-        """거래량 정규화"""
-        try:
-            if len(volume) < window:
-                raise ValueError(f"데이터가 부족합니다. 필요: {window}, 실제: {len(volume)}")
-                
-            rolling_max = volume.rolling(window=window).max()
-            rolling_min = volume.rolling(window=window).min()
-            
-            # 분모가 0이 되는 경우 처리
-            denominator = rolling_max - rolling_min
-            denominator = denominator.replace(0, 1)  # 0을 1로 대체
-            
-            normalized = 99 * (volume - rolling_min) / denominator
-            
-            # NaN 값 처리
-            normalized = normalized.fillna(method='ffill').fillna(50)
-            
-            # 범위를 벗어난 값 클리핑
-            normalized = normalized.clip(0, 100)
-            
-            return normalized
-
-        except Exception as e:
-            print(f"거래량 정규화 중 오류 발생: {str(e)}")
-            return pd.Series(index=volume.index)  # 빈 시리즈 반환
-    
-    def calculate_bollinger_bands(self, data):
-        """볼린저 밴드 계산"""
-        df = data.copy()
-        
-        # 중심선 (20일 이동평균)
-        df['bb_middle'] = df['close'].rolling(window=self.BOLLINGER_PERIOD).mean()
-        
-        # 표준편차
-        bb_std = df['close'].rolling(window=self.BOLLINGER_PERIOD).std()
-        
-        # 상단/하단 밴드
-        df['bb_upper'] = df['bb_middle'] + (bb_std * self.BOLLINGER_STD)
-        df['bb_lower'] = df['bb_middle'] - (bb_std * self.BOLLINGER_STD)
-        
-        return df
-
-    def calculate_momentum(self, data, period=10):
-        """모멘텀 지표 계산
-        
-        Args:
-            data (pd.DataFrame): OHLCV 데이터
-            period (int): 모멘텀 계산 기간 (기본값: 10)
-            
-        Returns:
-            float: 현재 모멘텀 값 (백분율)
-        """
-        try:
-            if len(data) < period + 1:
-                print(f"모멘텀 계산을 위한 충분한 데이터가 없습니다. 필요: {period + 1}, 현재: {len(data)}")
-                return 0.0
-                
-            # 현재 가격과 n기간 전 가격
-            current_price = float(data['close'].iloc[-1])
-            past_price = float(data['close'].iloc[-period-1])
-            
-            # 모멘텀 계산 (백분율)
-            momentum = ((current_price - past_price) / past_price)
-            
-            # 디버깅 정보 출력
-            print(f"\n모멘텀 계산 디버그:")
-            print(f"현재 가격: {current_price:,.0f}")
-            print(f"과거 가격({period}기간 전): {past_price:,.0f}")
-            print(f"모멘텀: {momentum*100:.2f}%")
-            
-            return momentum
-            
-        except Exception as e:
-            print(f"모멘텀 계산 중 오류: {e}")
-            return 0.0
-
-    def calculate_stoch_rsi(self, data, period=14, smoothK=3, smoothD=3):
-        """
-        수정된 Stochastic RSI 계산 함수
-        
-        Args:
-            data (pd.Series): 가격 데이터
-            period (int): RSI 및 Stoch RSI 계산 기간 (기본값: 14)
-            smoothK (int): K 라인 스무딩 기간 (기본값: 3)
-            smoothD (int): D 라인 스무딩 기간 (기본값: 3)
-            
-        Returns:
-            tuple: (K 라인, D 라인)
-        """
-        try:
-            # 충분한 데이터가 있는지 확인
-            if len(data) < period + smoothK + smoothD:
-                print(f"Stoch RSI 계산을 위한 충분한 데이터가 없습니다. 필요: {period + smoothK + smoothD}, 현재: {len(data)}")
-                return pd.Series(50, index=data.index), pd.Series(50, index=data.index)
-
-            # 기본 RSI 계산
-            rsi = self.calculate_rsi(data)
-            
-            # Stochastic RSI 계산
-            stoch_rsi = pd.DataFrame(index=data.index)
-            
-            # 각 시점에서 이전 period 기간 동안의 RSI 범위 계산
-            for i in range(period, len(rsi)):
-                period_rsi = rsi[i-period+1:i+1]
-                high = period_rsi.max()
-                low = period_rsi.min()
-                current = rsi[i]
-                
-                # 분모가 0인 경우 처리 (RSI 최고값과 최저값이 같은 경우)
-                if high == low:
-                    stoch_rsi.loc[rsi.index[i], 'K'] = 50  # RSI가 변화없을 때는 중간값 사용
-                else:
-                    stoch_rsi.loc[rsi.index[i], 'K'] = 100 * (current - low) / (high - low)
-
-            # K% 스무딩
-            stoch_rsi['K'] = stoch_rsi['K'].rolling(window=smoothK, min_periods=1).mean()
-            
-            # D% 계산
-            stoch_rsi['D'] = stoch_rsi['K'].rolling(window=smoothD, min_periods=1).mean()
-            
-            # NaN 값 처리
-            stoch_rsi = stoch_rsi.fillna(method='ffill').fillna(50)
-            
-            # 0-100 범위로 제한
-            stoch_rsi = stoch_rsi.clip(0, 100)
-            
-            # 디버깅 정보 출력
-            last_k = stoch_rsi['K'].iloc[-1]
-            last_d = stoch_rsi['D'].iloc[-1]
-            last_rsi = rsi.iloc[-1]
-            print(f"\nStoch RSI 디버그 정보:")
-            print(f"기준 RSI: {last_rsi:.2f}")
-            last_period_rsi = rsi.tail(period)
-            print(f"최근 {period}기간 RSI 범위: {last_period_rsi.min():.2f} - {last_period_rsi.max():.2f}")
-            print(f"K값: {last_k:.2f} (최근 {smoothK}기간 평균)")
-            print(f"D값: {last_d:.2f} (최근 {smoothD}기간 평균)")
-            
-            if last_k <= 20:
-                print("과매도 구간 (K ≤ 20)")
-            elif last_k >= 80:
-                print("과매수 구간 (K ≥ 80)")
-                
-            prev_k = stoch_rsi['K'].iloc[-2]
-            prev_d = stoch_rsi['D'].iloc[-2]
-            if prev_k < prev_d and last_k > last_d:
-                print("K선이 D선을 상향돌파 (매수신호)")
-            elif prev_k > prev_d and last_k < last_d:
-                print("K선이 D선을 하향돌파 (매도신호)")
-            
-            return stoch_rsi['K'], stoch_rsi['D']
-
-        except Exception as e:
-            print(f"Stoch RSI 계산 중 오류: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            return pd.Series(50, index=data.index), pd.Series(50, index=data.index)
-
-    def calculate_indicators(self, data):
-        """통합 지표 계산 및 분석 결과 포맷팅"""
-        try:
-            if data is None or len(data) == 0:
-                print("데이터가 없거나 비어있습니다.")
-                return None
-                
-            # 데이터 복사 및 유효성 확인
-            df = data.copy()
-            
-            analysis_results = {}
-
-            # 현재 가격 계산
-            try:
-                current_price = float(df['close'].iloc[-1])
-                if pd.isna(current_price):
-                    raise ValueError("현재 가격이 NaN입니다")
-                analysis_results['current_price'] = current_price
-                print(f"\nCurrent Price: {current_price}")
-            except Exception as e:
-                print(f"현재 가격 추출 중 오류: {e}")
-                return None
-
-            # KNN 예측
-            try:
-                prediction, confidence = self.predict_next_move(df)
-                analysis_results['knn_prediction'] = prediction
-                analysis_results['knn_signal_strength'] = confidence
-                print(f"KNN 예측: {prediction}, 신뢰도: {confidence}")
-            except Exception as e:
-                print(f"KNN 예측 중 오류: {e}")
-                analysis_results['knn_prediction'] = 0
-                analysis_results['knn_signal_strength'] = 0
-
-            # RSI 계산 부분 수정
-            try:
-                close_prices = df['close'].values
-                close_series = pd.Series(close_prices)
-                rsi = self.calculate_rsi(close_series)
-                if rsi is not None and len(rsi) > 0:
-                    analysis_results['rsi'] = float(rsi.iloc[-1])
-                    
-                    # Stoch RSI 계산 추가
-                    stoch_k, stoch_d = self.calculate_stoch_rsi(close_series)
-                    analysis_results['stoch_rsi_k'] = float(stoch_k.iloc[-1])
-                    analysis_results['stoch_rsi_d'] = float(stoch_d.iloc[-1])
-                    print(f"RSI: {analysis_results['rsi']}, Stoch RSI K: {analysis_results['stoch_rsi_k']:.1f}, D: {analysis_results['stoch_rsi_d']:.1f}")
-                else:
-                    analysis_results['rsi'] = 50.0
-                    analysis_results['stoch_rsi_k'] = 50.0
-                    analysis_results['stoch_rsi_d'] = 50.0
-                    print("RSI 계산 실패, 기본값 50.0 사용")
-            except Exception as e:
-                print(f"RSI 계산 중 오류: {e}")
-                analysis_results['rsi'] = 50.0
-                analysis_results['stoch_rsi_k'] = 50.0
-                analysis_results['stoch_rsi_d'] = 50.0
-
-            # EMA Ribbon 계산
-            try:
-                ema_ribbon = self.calculate_ema_ribbon(df)
-                ema_200 = self.calculate_ema_200(df)
-                ema_status = self.analyze_ema_ribbon(ema_ribbon, current_price, ema_200)
-                analysis_results['ema_ribbon_status'] = ema_status['status']
-                analysis_results['ema_ribbon_status_num'] = ema_status['status_num']
-                print(f"EMA Status: {ema_status['status']} (레벨: {ema_status['status_num']})")
-            except Exception as e:
-                print(f"EMA 계산 중 오류: {e}")
-                analysis_results['ema_ribbon_status'] = "중립"
-                analysis_results['ema_ribbon_status_num'] = 2  # 중립 상태를 2로 설정
-
-            # 볼린저 밴드 계산
-            try:
-                bb_df = self.calculate_bollinger_bands(df)
-                bb_upper = float(bb_df['bb_upper'].iloc[-1])
-                bb_middle = float(bb_df['bb_middle'].iloc[-1])
-                bb_lower = float(bb_df['bb_lower'].iloc[-1])
-                
-                analysis_results['bb_upper'] = bb_upper
-                analysis_results['bb_middle'] = bb_middle
-                analysis_results['bb_lower'] = bb_lower
-                
-                # 상단과 중간, 중간과 하단 사이의 간격을 3등분
-                upper_third = bb_upper - ((bb_upper - bb_middle) * 0.33)
-                lower_third = bb_lower + ((bb_middle - bb_lower) * 0.33)
-                
-                # 세분화된 위치 판단
-                if current_price >= bb_upper:
-                    bollinger_position = 5  # extreme_upper
-                elif current_price >= upper_third:
-                    bollinger_position = 4  # upper_strong
-                elif current_price >= bb_middle:
-                    bollinger_position = 3  # upper_weak
-                elif current_price >= lower_third:
-                    bollinger_position = 2  # lower_weak
-                elif current_price >= bb_lower:
-                    bollinger_position = 1  # lower_strong
-                else:
-                    bollinger_position = 0  # extreme_lower
-                    
-                # 숫자를 문자열로 매핑
-                position_mapping = {
-                    5: 'extreme_upper',
-                    4: 'upper_strong',
-                    3: 'upper_weak',
-                    2: 'lower_weak',
-                    1: 'lower_strong',
-                    0: 'extreme_lower'
-                }
-                
-                # 추가적인 볼린저 밴드 정보 계산
-                band_width = ((bb_upper - bb_lower) / bb_middle) * 100  # 밴드폭
-                price_position = ((current_price - bb_lower) / (bb_upper - bb_lower)) * 100  # 상대적 위치
-                
-                # 숫자와 문자열 모두 저장
-                analysis_results['bollinger_position_num'] = bollinger_position
-                analysis_results['bollinger_position'] = position_mapping[bollinger_position]
-                analysis_results['band_width'] = band_width
-                analysis_results['band_position_percentage'] = price_position
-                
-                print(f"Bollinger Position: {bollinger_position}")
-                print(f"Band Width: {band_width:.2f}%")
-                print(f"Price Position: {price_position:.2f}%")
-                
-            except Exception as e:
-                print(f"볼린저 밴드 계산 중 오류: {e}")
-                analysis_results['bollinger_position'] = 'undefined'
-                analysis_results['bb_upper'] = current_price * 1.02
-                analysis_results['bb_middle'] = current_price
-                analysis_results['bb_lower'] = current_price * 0.98
-                analysis_results['band_width'] = 4.0
-                analysis_results['band_position_percentage'] = 50.0
-
-            # 모멘텀 계산
-            try:
-                previous_price = float(df['close'].iloc[-2])
-                momentum = (current_price - previous_price) / previous_price
-                analysis_results['momentum'] = float(momentum)
-                print(f"Momentum: {momentum}")
-            except Exception as e:
-                print(f"모멘텀 계산 중 오류: {e}")
-                analysis_results['momentum'] = 0.0
-
-            # 변동성 계산
-            try:
-                tr = pd.DataFrame()
-                tr['hl'] = df['high'] - df['low']
-                tr['hc'] = abs(df['high'] - df['close'].shift())
-                tr['lc'] = abs(df['low'] - df['close'].shift())
-                tr['tr'] = tr[['hl', 'hc', 'lc']].max(axis=1)
-                volatility_ratio = (float(tr['tr'].rolling(window=10).mean().iloc[-1]) / current_price) * 100
-                analysis_results['volatility_ratio'] = float(volatility_ratio)
-                print(f"Volatility Ratio: {volatility_ratio}")
-            except Exception as e:
-                print(f"변동성 계산 중 오류: {e}")
-                analysis_results['volatility_ratio'] = 0.0
-
-            # 다이버전스 감지
-            try:
-                divergence = self.detect_divergence(df)
-                analysis_results['divergence'] = {
-                    'bearish_divergence': bool(divergence['bearish_divergence']),
-                    'bullish_divergence': bool(divergence['bullish_divergence'])
-                }
-                print(f"Divergence: {analysis_results['divergence']}")
-            except Exception as e:
-                print(f"다이버전스 감지 중 오류: {e}")
-                analysis_results['divergence'] = {
-                    'bearish_divergence': False,
-                    'bullish_divergence': False
-                }
-
-            # Counter trend 신호
-            try:
-                counter_trend_buy = (
-                    current_price <= analysis_results['bb_lower'] and
-                    analysis_results['rsi'] <= self.OVERSOLD_RSI and
-                    analysis_results['momentum'] < -self.MOMENTUM_THRESHOLD and
-                    analysis_results['divergence']['bullish_divergence'] and
-                    analysis_results['volatility_ratio'] > self.VOLATILITY_THRESHOLD
-                )
-                
-                counter_trend_sell = (
-                    current_price >= analysis_results['bb_upper'] and
-                    analysis_results['rsi'] >= self.OVERBOUGHT_RSI and
-                    analysis_results['momentum'] > self.MOMENTUM_THRESHOLD and
-                    analysis_results['divergence']['bearish_divergence'] and
-                    analysis_results['volatility_ratio'] > self.VOLATILITY_THRESHOLD
-                )
-                
-                analysis_results['counter_trend_signals'] = {
-                    'buy': bool(counter_trend_buy),
-                    'sell': bool(counter_trend_sell)
-                }
-                print(f"Counter Trend Signals - Buy: {counter_trend_buy}, Sell: {counter_trend_sell}")
-            except Exception as e:
-                print(f"Counter trend 신호 계산 중 오류: {e}")
-                analysis_results['counter_trend_signals'] = {
-                    'buy': False,
-                    'sell': False
-                }
-
-            return analysis_results
-
-        except Exception as e:
-            print(f"지표 계산 중 오류 발생: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            return None
-
-    def analyze_ema_ribbon(self, ema_ribbon, current_price, ema_200):
-        """개선된 EMA Ribbon 분석"""
-        ribbon_values = ema_ribbon.iloc[-1]
-        
-        # EMA 값들의 기울기 계산 (추세의 강도를 더 정확히 측정)
-        ema_slopes = {
-            period: (ribbon_values[f'EMA_{period}'] - ema_ribbon[f'EMA_{period}'].iloc[-2]) 
-            for period in [5, 10, 30, 50]
-        }
-        
-        short_term_values = [ribbon_values['EMA_5'], ribbon_values['EMA_10']]
-        long_term_values = [ribbon_values['EMA_30'], ribbon_values['EMA_50']]
-        
-        # 추세 강도 계산 개선
-        trend_strength = sum(1 for short, long in zip(short_term_values, long_term_values) if short > long)
-        slope_strength = sum(1 for slope in ema_slopes.values() if slope > 0)
-        
-        bullish_trend = current_price > ema_200
-        
-        # 상태 판단 로직 개선
-        if trend_strength >= 2 and slope_strength >= 3 and bullish_trend:
-            status_num = 4  # 강한 상승세
-        elif trend_strength >= 2 and bullish_trend:
-            status_num = 3  # 약한 상승세
-        elif trend_strength == 1 or bullish_trend:
-            status_num = 2  # 상승 가능성
-        elif trend_strength == 0 and slope_strength <= 1:
-            status_num = 1  # 약한 하락세
-        else:
-            status_num = 0  # 강한 하락세
-            
-        status_mapping = {
-            4: '강한 상승세',
-            3: '약한 상승세',
-            2: '상승 가능성',
-            1: '약한 하락세',
-            0: '강한 하락세'
-        }
-        
-        return {
-            'status': status_mapping[status_num],
-            'status_num': status_num
-        }
-
-    def detect_divergence(self, data):
-        """가격과 기술적 지표 간의 다이버전스 감지"""
-        # 데이터 포인트 수 증가 (15개 이상 확보)
-        df = data.tail(20).copy()  # 20개로 증가
-        
-        # 가격 고점/저점
-        price_highs = df['high'].rolling(window=3, center=True).max()
-        price_lows = df['low'].rolling(window=3, center=True).min()
-        
-        # RSI 고점/저점
-        rsi_values = self.calculate_rsi(df['close'])
-        rsi_highs = rsi_values.rolling(window=3, center=True).max()
-        rsi_lows = rsi_values.rolling(window=3, center=True).min()
-        
-        # 베어리시 다이버전스 (가격은 상승, RSI는 하락)
-        bearish_div = (price_highs > price_highs.shift(1)) & (rsi_highs < rsi_highs.shift(1))
-        
-        # 불리시 다이버전스 (가격은 하락, RSI는 상승)
-        bullish_div = (price_lows < price_lows.shift(1)) & (rsi_lows > rsi_lows.shift(1))
-        
-        return {
-            'bearish_divergence': bearish_div.iloc[-1],
-            'bullish_divergence': bullish_div.iloc[-1]
-        }
-
-    #----------------
-    # 4. Machine Learning
-    #----------------
-    def prepare_knn_features(self, data):
-        """개선된 KNN 특징 준비 함수
-        
-        Args:
-            data (pd.DataFrame): OHLCV 데이터
-            
-        Returns:
-            features: 준비된 특징 행렬
-            labels: 레이블 벡터
-        """
-        try:
-            df = data.copy()
-            if df is None or df.empty:
-                print("prepare_knn_features: 데이터가 없거나 비어있습니다")
-                return None, None
-
-            # 기본 지표 계산
-            df['sma_20'] = df['close'].rolling(window=20).mean()
-            df['std_20'] = df['close'].rolling(window=20).std()
-            df['volume_ma'] = df['volume'].rolling(window=20).mean()
-            
-            # 볼린저 밴드
-            df['bb_middle'] = df['sma_20']
-            df['bb_upper'] = df['bb_middle'] + 2 * df['std_20']
-            df['bb_lower'] = df['bb_middle'] - 2 * df['std_20']
-
-            # 특징 데이터프레임 생성
-            features = pd.DataFrame(index=df.index)
-
-            # 1. 가격 모멘텀 특징들
-            features['price_position'] = (df['close'] - df['sma_20']) / df['std_20']
-            features['price_momentum'] = df['close'].pct_change(5)
-            features['price_trend'] = np.where(df['close'] > df['sma_20'], 1, -1)
-            
-            # 2. 볼린저 밴드 관련 특징
-            features['bb_position'] = (df['close'] - df['bb_middle']) / (df['bb_upper'] - df['bb_lower'])
-            features['bb_width'] = (df['bb_upper'] - df['bb_lower']) / df['bb_middle']
-            
-            # 3. 거래량 특징들
-            features['volume_ratio'] = df['volume'] / df['volume_ma']
-            features['volume_trend'] = df['volume'].pct_change(3)
-            
-            # 4. 변동성 특징
-            features['volatility'] = df['close'].pct_change().rolling(window=20).std()
-            
-            # 5. RSI 추가
-            features['rsi'] = self.calculate_rsi(df['close'])
-            
-            # 6. 이동평균 교차 신호
-            ema_5 = df['close'].ewm(span=5, adjust=False).mean()
-            ema_20 = df['close'].ewm(span=20, adjust=False).mean()
-            features['ema_cross'] = np.where(ema_5 > ema_20, 1, -1)
-
-            # 다음 기간의 수익률 계산 (레이블)
-            df['next_return'] = df['close'].shift(-1) / df['close'] - 1
-            df['next_direction'] = np.where(df['next_return'] > 0, 1, -1)
-
-            # 특징 정규화 (이진 특징 제외)
-            binary_features = ['price_trend', 'ema_cross']
-            for col in features.columns:
-                if col not in binary_features:
-                    features[col] = (features[col] - features[col].mean()) / features[col].std()
-
-            # NaN 제거
-            features = features.replace([np.inf, -np.inf], np.nan)
-            features = features.fillna(method='ffill').fillna(0)
-            
-            # 레이블 준비
-            labels = df['next_direction'].fillna(0)
-
-            return features.values, labels.values
-
-        except Exception as e:
-            print(f"KNN 특징 준비 중 오류: {e}")
-            import traceback
-            traceback.print_exc()
-            return None, None
-
-    def prepare_current_features(self, current_data):
-        """현재 시점의 특징 준비 함수
-        
-        Args:
-            current_data (pd.DataFrame): 현재 시점까지의 OHLCV 데이터
-            
-        Returns:
-            현재 시점의 특징 벡터
-        """
-        try:
-            df = current_data.copy()
-            
-            # 기본 지표 계산
-            df['sma_20'] = df['close'].rolling(window=20).mean()
-            df['std_20'] = df['close'].rolling(window=20).std()
-            df['volume_ma'] = df['volume'].rolling(window=20).mean()
-            
-            # 볼린저 밴드
-            df['bb_middle'] = df['sma_20']
-            df['bb_upper'] = df['bb_middle'] + 2 * df['std_20']
-            df['bb_lower'] = df['bb_middle'] - 2 * df['std_20']
-            
-            # EMA 계산
-            ema_5 = df['close'].ewm(span=5, adjust=False).mean()
-            ema_20 = df['close'].ewm(span=20, adjust=False).mean()
-
-            # 마지막 행 추출
-            last_row = df.iloc[-1]
-            
-            # 현재 특징 벡터 생성
-            current_features = np.array([
-                (last_row['close'] - last_row['sma_20']) / last_row['std_20'],  # price_position
-                df['close'].pct_change(5).iloc[-1],  # price_momentum
-                1 if last_row['close'] > last_row['sma_20'] else -1,  # price_trend
-                (last_row['close'] - last_row['bb_middle']) / (last_row['bb_upper'] - last_row['bb_lower']),  # bb_position
-                (last_row['bb_upper'] - last_row['bb_lower']) / last_row['bb_middle'],  # bb_width
-                last_row['volume'] / last_row['volume_ma'],  # volume_ratio
-                df['volume'].pct_change(3).iloc[-1],  # volume_trend
-                df['close'].pct_change().rolling(window=20).std().iloc[-1],  # volatility
-                self.calculate_rsi(df['close']).iloc[-1],  # rsi
-                1 if ema_5.iloc[-1] > ema_20.iloc[-1] else -1  # ema_cross
-            ]).reshape(1, -1)
-            
-            # 이진 특징을 제외한 정규화
-            binary_indices = [2, 9]  # price_trend와 ema_cross의 인덱스
-            for i in range(current_features.shape[1]):
-                if i not in binary_indices:
-                    mean_val = df[df.columns[i]].mean()
-                    std_val = df[df.columns[i]].std()
-                    if std_val != 0:
-                        current_features[0, i] = (current_features[0, i] - mean_val) / std_val
-
-            return current_features
-
-        except Exception as e:
-            print(f"현재 특징 준비 중 오류: {e}")
-            import traceback
-            traceback.print_exc()
-            return None
-
-    def find_k_nearest(self, features, labels, current_point, k=16):
-        """개선된 K-최근접 이웃 찾기 함수
-        
-        Args:
-            features: 과거 데이터의 특징 행렬
-            labels: 과거 데이터의 레이블
-            current_point: 현재 시점의 특징 벡터
-            k: 이웃 개수
-            
-        Returns:
-            k_nearest_labels: k개 이웃의 레이블
-            k_nearest_distances: k개 이웃까지의 거리
-            k_nearest_weights: k개 이웃의 가중치
-        """
-        try:
-            if features is None or len(features) < k:
-                print("find_k_nearest: 충분한 데이터가 없습니다")
-                return np.array([]), np.array([]), np.array([])
-
-            # 특징별 가중치 정의
-            feature_weights = np.array([
-                1.2,  # price_position
-                1.0,  # price_momentum
-                1.5,  # price_trend
-                1.3,  # bb_position
-                1.0,  # bb_width
-                0.8,  # volume_ratio
-                0.7,  # volume_trend
-                1.1,  # volatility
-                1.4,  # rsi
-                1.2   # ema_cross
-            ])
-            
-            # 시간 가중치 (최근 데이터에 더 높은 가중치)
-            time_weights = np.exp(-np.arange(len(features)) / 100)
-            
-            # 가중치를 적용한 거리 계산
-            weighted_features = features * feature_weights
-            weighted_current = current_point * feature_weights
-            
-            # 거리 계산
-            distances = np.zeros(len(features))
-            for i in range(len(features)):
-                # 유클리디안 거리 계산
-                dist = np.sqrt(np.sum((weighted_features[i] - weighted_current) ** 2))
-                # 시간 가중치 적용
-                distances[i] = dist * (1 / time_weights[i])
-
-            # 거리에 따른 가중치 계산 (지수 감쇠)
-            weights = np.exp(-distances)
-            weights = weights / np.sum(weights)  # 정규화
-            
-            # k개의 가장 가까운 이웃 찾기
-            k_nearest_indices = np.argsort(distances)[:k]
-            k_nearest_labels = labels[k_nearest_indices]
-            k_nearest_distances = distances[k_nearest_indices]
-            k_nearest_weights = weights[k_nearest_indices]
-            
-            return k_nearest_labels, k_nearest_distances, k_nearest_weights
-
-        except Exception as e:
-            print(f"K-최근접 이웃 찾기 중 오류: {e}")
-            import traceback
-            traceback.print_exc()
-            return np.array([]), np.array([]), np.array([])
-
-    def calculate_adaptive_k(self, data_size, volatility):
-        """데이터 크기와 변동성에 따른 적응형 K값 계산"""
-        try:
-            # 기본 K값 설정
-            base_k = 16
-            
-            # 데이터 크기에 따른 조정
-            size_factor = np.clip(data_size / 100, 0.5, 2.0)
-            
-            # 변동성에 따른 조정 (변동성이 높을수록 더 적은 이웃 사용)
-            volatility_factor = np.clip(1 - volatility, 0.5, 1.5)
-            
-            # 최종 K값 계산
-            adjusted_k = int(base_k * size_factor * volatility_factor)
-            
-            # K값 범위 제한
-            final_k = np.clip(adjusted_k, 8, 32)
-            
-            print(f"적응형 K값 계산:")
-            print(f"데이터 크기: {data_size}, 크기 팩터: {size_factor:.2f}")
-            print(f"변동성: {volatility:.2f}, 변동성 팩터: {volatility_factor:.2f}")
-            print(f"조정된 K값: {final_k}")
-            
-            return final_k
-            
-        except Exception as e:
-            print(f"적응형 K값 계산 중 오류: {e}")
-            return 16  # 오류 발생시 기본값 반환
-
-    def predict_next_move(self, data):
-        """개선된 다음 움직임 예측 함수"""
-        try:
-            # 특징과 레이블 준비
-            features, labels = self.prepare_knn_features(data)
-            if features is None or labels is None:
-                return 0, 0
-                    
-            # 현재 특징 준비
-            current_data = data.tail(50).copy()
-            current_features = self.prepare_current_features(current_data)
-            if current_features is None:
-                return 0, 0
-                    
-            # 적응형 k값 계산
-            k = self.calculate_adaptive_k(
-                data_size=len(features),
-                volatility=data['close'].pct_change().std()
-            )
-                    
-            # 최근접 이웃 찾기
-            k_nearest_labels, distances, weights = self.find_k_nearest(
-                features[:-1], 
-                labels[:-1], 
-                current_features,
-                k=k
-            )
-            
-            if len(k_nearest_labels) == 0:
-                return 0, 0
-            
-            # 가중 투표로 예측 (신호 강도 조절)
-            weighted_sum = np.sum(k_nearest_labels * weights)
-            
-            # 신호 강도 조절을 위한 시그모이드 함수 적용 (더 엄격하게)
-            signal_strength = 2 / (1 + np.exp(-1.5 * weighted_sum)) - 1  # 기울기 증가로 더 강한 신호 요구
-            
-            # 더 세분화된 신호 강도 구간 분류 (임계값 상향)
-            if abs(signal_strength) < 0.25:  # 중립 구간 확대
-                prediction = 0  # 중립
-            elif abs(signal_strength) < 0.4:  # 약한 신호 구간 확대
-                prediction = np.sign(signal_strength) * 0.25  # 매우 약한 신호
-            elif abs(signal_strength) < 0.6:
-                prediction = np.sign(signal_strength) * 0.5  # 약한 신호
-            elif abs(signal_strength) < 0.8:
-                prediction = np.sign(signal_strength) * 0.75  # 중강도 신호
-            else:
-                prediction = np.sign(signal_strength) * 0.8  # 강한 신호 (최대치 제한)
-            
-            # 1. 방향 일치도 계산 (35% 비중으로 하향)
-            direction_agreement = np.mean(k_nearest_labels == np.sign(prediction))
-            strong_signal = np.mean(abs(weighted_sum) > 0.6)  # 강한 신호 기준 상향
-            direction_confidence = (direction_agreement * 0.7 + strong_signal * 0.3) * 35
-            
-            # 2. 거리 기반 신뢰도 (35% 비중)
-            closest_neighbors = distances[:int(len(distances) * 0.3)]  # 상위 30%로 축소
-            max_distance = np.percentile(distances, 90)  # 90 퍼센타일로 강화
-            distance_confidence = (1 - (np.mean(closest_neighbors) / max_distance)) * 35
-            
-            # 3. 가중치 분포 (15% 비중)
-            top_weights = weights[:int(len(weights) * 0.25)]  # 상위 25%로 축소
-            weight_concentration = min((np.mean(top_weights) / np.mean(weights)) * 15, 15)
-            
-            # 4. 신호 강도 기반 신뢰도 (15% 비중)
-            signal_base = abs(signal_strength)
-            signal_boost = min(np.exp(signal_base) / (np.e * 1.5), 1.0)  # 부스트 감소
-            signal_confidence = signal_boost * 15
-            
-            # 최종 신뢰도 계산 및 스케일링
-            base_confidence = (
-                direction_confidence +
-                distance_confidence +
-                weight_concentration +
-                signal_confidence
-            )
-            
-            # 초기 신뢰도에 대한 비선형 스케일링 적용 (더 엄격하게)
-            scaled_confidence = 25 + (base_confidence * 1.1)  # 기본 스케일 하향
-            
-            # 변동성 기반 신뢰도 조정 (더 민감하게)
-            recent_volatility = data['close'].pct_change().rolling(20).std().iloc[-1]
-            volatility_factor = np.clip(1 - (recent_volatility * 5), 0.8, 1.05)  # 변동성 영향 강화
-            confidence = scaled_confidence * volatility_factor
-            
-            # 연속성 보너스 조정 (감소)
-            if hasattr(self, 'last_prediction') and self.last_prediction is not None:
-                if np.sign(prediction) == np.sign(self.last_prediction):
-                    confidence = confidence * 1.05  # 5% 부스트로 감소
-            self.last_prediction = prediction
-            
-            # 신뢰도 범위 제한 (더 엄격하게)
-            confidence = np.clip(confidence, 30, 95) 
-            
-            # 신호 강도에 따른 신뢰도 조정 (더 엄격하게)
-            if abs(signal_strength) < 0.3:  # 매우 약한 신호 임계값 상향
-                confidence = confidence * 0.65
-            elif abs(signal_strength) < 0.45:  # 약한 신호 임계값 상향
-                confidence = confidence * 0.8
-            elif abs(signal_strength) > 0.7:  # 강한 신호 임계값 상향
-                confidence = min(confidence * 1.1, 95)  # 최대 95로 제한
-            
-            # 디버깅 정보 출력
-            print(f"\nKNN 예측 세부 정보:")
-            print(f"신호 강도: {signal_strength:.3f}")
-            print(f"예측값: {prediction:.3f}")
-            print(f"방향 일치도: {direction_confidence:.1f}/35")
-            print(f"거리 기반 신뢰도: {distance_confidence:.1f}/35")
-            print(f"가중치 분포: {weight_concentration:.1f}/15")
-            print(f"신호 강도 신뢰도: {signal_confidence:.1f}/15")
-            print(f"기본 신뢰도: {base_confidence:.1f}")
-            print(f"스케일링 후 신뢰도: {scaled_confidence:.1f}")
-            print(f"변동성 팩터: {volatility_factor:.2f}")
-            print(f"최종 신뢰도: {confidence:.1f}%")
-            
-            return prediction, confidence
-
-        except Exception as e:
-            print(f"다음 움직임 예측 중 오류: {e}")
-            import traceback
-            traceback.print_exc()
-            return 0, 0
-        
-    #----------------
-    # 5. Trading Logic
-    #----------------
-    def generate_trading_signal(self, data, market_changed=False, force_check=False):
-            """향상된 트레이딩 신호 생성"""
-            default_gpt_advice = {
-                'trade_recommendation': '관망',
-                'investment_percentage': 0,
-                'confidence_score': 0,
-                'reasoning': '기본값'
-            }
-            
-            default_response = (False, False, default_gpt_advice, None)
-
-            try:
-                if data is None:
-                    print("❌ 데이터 없음")
-                    return default_response
-
-                current_price = pyupbit.get_current_price(self.ticker)
-                if current_price is None:
-                    print("❌ 현재 가격 조회 실패")
-                    return default_response
-                print(f"현재 가격: {current_price:,} KRW")
-
-                try:
-                    balance = self.upbit.get_balance("KRW")
-                    coin_balance = self.upbit.get_balance(self.ticker)
-                    net_balance = balance * (1 - self.TRADING_FEE_RATE)
-                    expected_sell_value = coin_balance * current_price * (1 - self.TRADING_FEE_RATE)
-                    print(f"KRW 잔고: {balance:,} 원")
-                    print(f"BTC 잔고: {coin_balance:.8f}")
-
-                    # 최소 주문금액 체크
-                    if net_balance < self.MIN_ORDER_AMOUNT and expected_sell_value < self.MIN_ORDER_AMOUNT:
-                        print(f"❌ 최소 주문금액({self.MIN_ORDER_AMOUNT:,}원) 미달")
-                        return default_response
-
-                except Exception as e:
-                    print(f"❌ 기본 정보 조회 실패: {e}")
-                    return default_response
-
-                analysis_results = self.calculate_indicators(data)
-                if analysis_results is None:
-                    print("❌ 기술적 분석 실패")
-                    return default_response
-
-                analysis_results['current_price'] = current_price
-                print(f"\n기술적 분석 - RSI: {analysis_results['rsi']:.2f}, 변동성: {analysis_results['volatility_ratio']:.2f}%")
-
-                try:
-                    gpt_advice = self.consult_gpt_for_trading(data, analysis_results, market_changed, force_check)
-                    if gpt_advice is None:
-                        print("❌ GPT 자문 실패")
-                        gpt_advice = default_gpt_advice.copy()
-                    print(f"\nGPT 자문: {gpt_advice.get('trade_recommendation')}, 신뢰도: {gpt_advice.get('confidence_score')}%")
-                except Exception as e:
-                    print(f"❌ GPT 자문 처리 실패: {e}")
-                    gpt_advice = default_gpt_advice.copy()
-
-                buy_signal = (gpt_advice['trade_recommendation'] == '매수' and net_balance >= self.MIN_ORDER_AMOUNT)
-                sell_signal = (gpt_advice['trade_recommendation'] == '매도' and expected_sell_value >= self.MIN_ORDER_AMOUNT)
-
-                print(f"\n최종 신호 - 매수: {buy_signal}, 매도: {sell_signal}")
-                if not buy_signal and gpt_advice['trade_recommendation'] == '매수':
-                    print(f"매수 신호 무시: 최소 주문금액 미달 (필요: {self.MIN_ORDER_AMOUNT:,}원, 가능: {net_balance:,.0f}원)")
-                if not sell_signal and gpt_advice['trade_recommendation'] == '매도':
-                    print(f"매도 신호 무시: 최소 주문금액 미달 (필요: {self.MIN_ORDER_AMOUNT:,}원, 가능: {expected_sell_value:,.0f}원)")
-
-                return buy_signal, sell_signal, gpt_advice, analysis_results
-
-            except Exception as e:
-                print(f"❌ 거래 신호 생성 중 오류: {e}")
-                import traceback
-                traceback.print_exc()
-                return default_response
-
-    def is_significant_level_change(self, current_level, base_level, indicator_type='ema'):
-        """의미있는 레벨 변화인지 확인"""
-        # 2단계 이상 차이
-        if abs(current_level - base_level) >= 2:
-            return True
-            
-        # 특정 임계값을 넘어가는 경우
-        if indicator_type == 'ema':
-            significant_boundaries = {
-                2: [0, 4],  # 레벨 2에서 0이나 4로 갈 때
-                3: [0, 4]   # 레벨 3에서 0이나 4로 갈 때
-            }
-        else:  # bollinger
-            significant_boundaries = {
-                2: [0, 4, 5],  # 레벨 2에서 0, 4, 5로 갈 때
-                3: [0, 5]      # 레벨 3에서 0이나 5로 갈 때
-            }
-        
-        if base_level in significant_boundaries:
-            return current_level in significant_boundaries[base_level]
-            
-        return False
-
-    def monitor_knn_changes(self, current_knn, last_knn, current_time):
-        """KNN 예측 방향 변화 감지 함수"""
-        try:
-            knn_direction_change = False
-            
-            # 현재 방향 결정
-            if abs(current_knn) < self.KNN_SIGNAL_MIN_STRENGTH:
-                current_direction = 'neutral'
-            else:
-                current_direction = 'up' if current_knn > 0 else 'down'
-                
-            # 이전 방향 확인
-            if self.last_knn_direction is None:
-                self.last_knn_direction = current_direction
-                return False
-                
-            # 방향 전환 감지
-            if current_direction != self.last_knn_direction and current_direction != 'neutral':
-                # 쿨다운 확인
-                if (self.last_knn_change_time is None or 
-                    current_time - self.last_knn_change_time >= self.KNN_CHANGE_COOLDOWN):
-                    
-                    # 충분한 강도 차이 확인
-                    if abs(current_knn - last_knn) >= self.KNN_DIRECTION_CHANGE_THRESHOLD:
-                        knn_direction_change = True
-                        self.last_knn_change_time = current_time
-                        self.last_knn_direction = current_direction
-                        
-                        print("\nKNN 예측 방향 변화 감지:")
-                        print(f"- 이전 예측: {last_knn:+.2f}")
-                        print(f"- 현재 예측: {current_knn:+.2f}")
-                        print(f"- 새로운 예측: {current_direction} ")
-                        print(f"- 신호 강도 변화: {abs(current_knn - last_knn):.2f}")
-                else:
-                    cooldown_remaining = (self.KNN_CHANGE_COOLDOWN - 
-                                        (current_time - self.last_knn_change_time)) / 60
-                    print(f"\nKNN 방향 전환 쿨다운 중... (남은 시간: {cooldown_remaining:.1f}분)")
-                    
-            return knn_direction_change
-            
-        except Exception as e:
-            print(f"KNN 변화 감지 중 오류: {e}")
-            return False
-
-    def monitor_market_conditions(self, data, analysis_results):
-        """시장 상황 모니터링 및 유의미한 변화 감지"""
-        try:
-            # 1. 데이터 유효성 검사
-            if data is None or analysis_results is None:
-                print("데이터 또는 분석 결과가 없습니다.")
-                return True
-                    
-            if data.empty or 'close' not in data.columns:
-                print("가격 데이터가 유효하지 않습니다.")
-                return True
-
-            # 2. 필수 키 확인
-            required_keys = [
-                'rsi', 'volatility_ratio', 'ema_ribbon_status', 
-                'ema_ribbon_status_num', 'momentum', 'bollinger_position', 
-                'bollinger_position_num', 'stoch_rsi_k', 'stoch_rsi_d',
-                'knn_prediction'
-            ]
-                
-            if not all(key in analysis_results for key in required_keys):
-                missing_keys = [key for key in required_keys if key not in analysis_results]
-                print(f"분석 결과에 필요한 키가 없습니다: {missing_keys}")
-                return True
-
-            # 3. 현재 상태 데이터 구성
-            try:
-                current_state = {
-                    'price': float(data['close'].iloc[-1]),
-                    'rsi': float(analysis_results['rsi']),
-                    'volatility': float(analysis_results['volatility_ratio']),
-                    'ema_status': str(analysis_results['ema_ribbon_status']),
-                    'ema_ribbon_status_num': int(analysis_results['ema_ribbon_status_num']),
-                    'ema_base_num': int(analysis_results['ema_ribbon_status_num']),
-                    'momentum': float(analysis_results['momentum']),
-                    'bollinger_position': str(analysis_results['bollinger_position']),
-                    'bollinger_position_num': int(analysis_results['bollinger_position_num']),
-                    'bollinger_base_num': int(analysis_results['bollinger_position_num']),
-                    'ema_direction': 'neutral',
-                    'bb_direction': 'neutral',
-                    'ema_change_start_time': time.time(),
-                    'bb_change_start_time': time.time(),
-                    'stoch_rsi_k': float(analysis_results['stoch_rsi_k']),
-                    'stoch_rsi_d': float(analysis_results['stoch_rsi_d']),
-                    'knn_prediction': float(analysis_results['knn_prediction'])
-                }
-            except (ValueError, TypeError) as e:
-                print(f"데이터 변환 중 오류: {e}")
-                return True
-
-            # 4. 이전 상태 확인
-            if not hasattr(self, 'last_gpt_market_state') or self.last_gpt_market_state is None:
-                print("마지막 GPT 자문 시점의 시장 상태 정보 없음")
-                return True
-
-            current_time = time.time()
-
-            # 5. Stoch RSI 변화 감지
-            last_k = self.last_gpt_market_state.get('stoch_rsi_k', 50)
-            last_d = self.last_gpt_market_state.get('stoch_rsi_d', 50)
-            current_k = current_state['stoch_rsi_k']
-            current_d = current_state['stoch_rsi_d']
-
-            # K와 D의 차이 계산
-            current_diff = current_k - current_d
-            last_diff = last_k - last_d
-
-            # 크로스 감지 로직
-            stoch_cross_up = False
-            stoch_cross_down = False
-            
-            if last_diff < 0 and current_diff > 0:  # 상향돌파 가능성
-                if abs(current_diff) >= self.STOCH_CROSS_THRESHOLD:  # 최소 차이 확인
-                    if (self.last_stoch_cross_time is None or 
-                        current_time - self.last_stoch_cross_time >= self.STOCH_CROSS_COOLDOWN or
-                        self.last_stoch_cross_type == 'down'):  # 다른 방향 크로스는 즉시 허용
-                        stoch_cross_up = True
-                        self.last_stoch_cross_time = current_time
-                        self.last_stoch_cross_type = 'up'
-                    else:
-                        cooldown_remaining = (self.STOCH_CROSS_COOLDOWN - 
-                                            (current_time - self.last_stoch_cross_time)) / 60
-                        if cooldown_remaining > 0:
-                            print(f"Stoch RSI 상향돌파 쿨다운 중... (남은 시간: {cooldown_remaining:.1f}분)")
-            
-            elif last_diff > 0 and current_diff < 0:  # 하향돌파 가능성
-                if abs(current_diff) >= self.STOCH_CROSS_THRESHOLD:  # 최소 차이 확인
-                    if (self.last_stoch_cross_time is None or 
-                        current_time - self.last_stoch_cross_time >= self.STOCH_CROSS_COOLDOWN or
-                        self.last_stoch_cross_type == 'up'):  # 다른 방향 크로스는 즉시 허용
-                        stoch_cross_down = True
-                        self.last_stoch_cross_time = current_time
-                        self.last_stoch_cross_type = 'down'
-                    else:
-                        cooldown_remaining = (self.STOCH_CROSS_COOLDOWN - 
-                                            (current_time - self.last_stoch_cross_time)) / 60
-                        if cooldown_remaining > 0:
-                            print(f"Stoch RSI 하향돌파 쿨다운 중... (남은 시간: {cooldown_remaining:.1f}분)")
-
-            # 과매수/과매도 구간 진입 감지
-            stoch_oversold = current_k <= 20 and last_k > 20
-            stoch_overbought = current_k >= 80 and last_k < 80
-
-            significant_stoch_change = (
-                stoch_cross_up or 
-                stoch_cross_down or 
-                stoch_oversold or 
-                stoch_overbought or
-                abs(current_k - last_k) > 15  # K값이 15 이상 급격히 변화
-            )
-
-            # 6. KNN 예측 방향 변화 감지
-            last_knn = self.last_gpt_market_state.get('knn_prediction', 0)
-            current_knn = current_state['knn_prediction']
-            
-            knn_direction_change = self.monitor_knn_changes(
-                current_knn=current_knn,
-                last_knn=last_knn,
-                current_time=current_time
-            )
-
-            # 7. 기존 지표들의 변화 감지
-            price_change = abs(current_state['price'] - self.last_gpt_market_state['price']) / self.last_gpt_market_state['price']
-            significant_price_change = price_change > 0.005
-            
-            rsi_change = abs(current_state['rsi'] - self.last_gpt_market_state['rsi'])
-            significant_rsi_change = rsi_change > 5
-            
-            volatility_change = abs(current_state['volatility'] - self.last_gpt_market_state['volatility'])
-            significant_volatility_change = volatility_change > 0.1
-
-            # 8. EMA 변화 감지
-            current_ema_num = current_state['ema_ribbon_status_num']
-            base_ema_num = self.last_gpt_market_state.get('ema_base_num', current_ema_num)
-            last_ema_num = self.last_gpt_market_state.get('ema_ribbon_status_num', current_ema_num)
-            
-            if current_ema_num > last_ema_num:
-                current_ema_direction = 'up'
-            elif current_ema_num < last_ema_num:
-                current_ema_direction = 'down'
-            else:
-                current_ema_direction = self.last_gpt_market_state.get('ema_direction', 'neutral')
-
-            last_ema_direction = self.last_gpt_market_state.get('ema_direction', 'neutral')
-            last_ema_change_time = self.last_gpt_market_state.get('ema_change_start_time', current_time)
-
-            ema_significant_change = (
-                current_ema_direction != last_ema_direction and
-                abs(current_ema_num - base_ema_num) >= 2
-            )
-
-            # 9. 볼린저 밴드 변화 감지
-            current_bb_num = current_state['bollinger_position_num']
-            base_bb_num = self.last_gpt_market_state.get('bollinger_base_num', current_bb_num)
-            last_bb_num = self.last_gpt_market_state.get('bollinger_position_num', current_bb_num)
-
-            if current_bb_num > last_bb_num:
-                current_bb_direction = 'up'
-            elif current_bb_num < last_bb_num:
-                current_bb_direction = 'down'
-            else:
-                current_bb_direction = self.last_gpt_market_state.get('bb_direction', 'neutral')
-
-            bb_significant_change = (
-                current_bb_direction != self.last_gpt_market_state.get('bb_direction', 'neutral') and
-                abs(current_bb_num - base_bb_num) >= 2
-            )
-
-            # 10. 모멘텀 방향 변화 감지
-            MOMENTUM_THRESHOLD = 0.01
-            momentum_direction_change = (
-                (current_state['momentum'] > MOMENTUM_THRESHOLD and 
-                self.last_gpt_market_state['momentum'] < -MOMENTUM_THRESHOLD) or
-                (current_state['momentum'] < -MOMENTUM_THRESHOLD and 
-                self.last_gpt_market_state['momentum'] > MOMENTUM_THRESHOLD)
-            )
-
-            # 11. 변화 상태 통합 및 출력
-            significant_change = (
-                significant_price_change or
-                significant_rsi_change or
-                significant_volatility_change or
-                ema_significant_change or
-                momentum_direction_change or
-                bb_significant_change or
-                significant_stoch_change or
-                knn_direction_change
-            )
-
-            if significant_change:
-                print("\n유의미한 변화 감지:")
-
-                # Stoch RSI 변화 출력
-                if significant_stoch_change:
-                    print("\nStoch RSI 변화:")
-                    if stoch_cross_up:
-                        print(f"- 골든크로스 발생 (K-D: {current_diff:.1f}%)")
-                    if stoch_cross_down:
-                        print(f"- 데드크로스 발생 (K-D: {current_diff:.1f}%)")
-                    if stoch_oversold:
-                        print("- 과매도 구간 진입")
-                    if stoch_overbought:
-                        print("- 과매수 구간 진입")
-                    print(f"- K값 변화: {last_k:.1f} → {current_k:.1f}")
-                    print(f"- K-D 차이: {current_diff:.1f}%")
-
-                # KNN 변화 출력
-                if knn_direction_change:
-                    print("\nKNN 변화:")
-                    print(f"- 이전 예측: {last_knn:+.2f}")
-                    print(f"- 현재 예측: {current_knn:+.2f}")
-                    print(f"- 신호 강도 변화: {abs(current_knn - last_knn):.2f}")
-
-                # 가격 및 기술적 지표 변화 출력
-                changes = {
-                    '가격 변화': f"{price_change*100:.3f}%" if significant_price_change else None,
-                    'RSI 변화': f"{rsi_change:.2f}" if significant_rsi_change else None,
-                    '변동성 변화': f"{volatility_change:.3f}" if significant_volatility_change else None,
-                    'EMA 상태 변화': "감지됨" if ema_significant_change else None,
-                    '모멘텀 방향 변화': "감지됨" if momentum_direction_change else None,
-                    '볼린저 밴드 변화': "감지됨" if bb_significant_change else None
-                }
-                
-                for key, value in changes.items():
-                    if value:
-                        print(f"- {key}: {value}")
-
-            return significant_change
-
-        except Exception as e:
-            print(f"시장 상황 모니터링 중 오류: {e}")
-            import traceback
-            traceback.print_exc()
-            return True
-
-    def _print_market_changes(self, current_state, current_diff, stoch_cross_up, 
-                            stoch_cross_down, stoch_oversold, stoch_overbought,
-                            current_k, last_k, current_knn, last_knn,
-                            price_change, rsi_change, volatility_change,
-                            ema_significant_change, momentum_direction_change,
-                            bb_significant_change):
-        """변화 상태 출력 함수"""
-        
-        # Stoch RSI 변화 출력
-        if stoch_cross_up or stoch_cross_down or stoch_oversold or stoch_overbought:
-            print("\nStoch RSI 유의미한 변화 감지:")
-            if stoch_cross_up:
-                print(f"- 골든크로스 발생 (K-D: {current_diff:.1f}%)")
-            if stoch_cross_down:
-                print(f"- 데드크로스 발생 (K-D: {current_diff:.1f}%)")
-            if stoch_oversold:
-                print("- 과매도 구간 진입")
-            if stoch_overbought:
-                print("- 과매수 구간 진입")
-            print(f"- K값 변화: {last_k:.1f} → {current_k:.1f}")
-            print(f"- K-D 차이: {current_diff:.1f}%")
-
-        # KNN 변화 출력
-        if current_knn != last_knn:
-            print("\nKNN 예측 방향 변화 감지:")
-            print(f"- 이전 예측: {last_knn:+.2f}")
-            print(f"- 현재 예측: {current_knn:+.2f}")
-            direction = "상승" if current_knn > 0 else "하락"
-            strength = "강" if abs(current_knn) > 0.5 else "중" if abs(current_knn) > 0.2 else "약"
-            print(f"- 새로운 예측: {direction} ({strength}한 신호)")
-
-        # 종합 변화 출력
-        print("\n유의미한 변화 감지:")
-        changes = {
-            '가격 변화': f"{price_change*100:.3f}%" if price_change > 0.005 else None,
-            'RSI 변화': f"{rsi_change:.2f}" if rsi_change > 5 else None,
-            '변동성 변화': f"{volatility_change:.3f}" if volatility_change > 0.1 else None,
-            'EMA 상태 변화': "감지됨" if ema_significant_change else None,
-            '모멘텀 방향 변화': "감지됨" if momentum_direction_change else None,
-            '볼린저 밴드 변화': "감지됨" if bb_significant_change else None
-        }
-        
-        for key, value in changes.items():
-            if value:
-                print(f"- {key}: {value}")
-
-    def execute_trade(self, buy_signal, sell_signal, gpt_advice, analysis_results):
-        """거래 실행 로직"""
-        try:
-            if analysis_results is None:
-                print("분석 결과가 없습니다.")
-                return False
-
-            # GPT 자문 확인
-            gpt_confidence = gpt_advice.get('confidence_score', 0)
-            trade_recommendation = gpt_advice.get('trade_recommendation', '관망')
-
-            print(f"\n=== 거래 실행 검토 ===")
-            print(f"GPT 추천: {trade_recommendation}, 신뢰도: {gpt_confidence}%")
-
-            current_price = pyupbit.get_current_price(self.ticker)
-            if current_price is None:
-                print("현재 가격을 가져올 수 없습니다.")
-                return False
-
-            balance = self.upbit.get_balance("KRW")
-            coin_balance = self.upbit.get_balance(self.ticker.split('-')[1])
-
-            # 매수 로직
-            if buy_signal and trade_recommendation == '매수' and gpt_confidence >= 60:
-                # 총자산 계산
-                total_assets = balance + (coin_balance * current_price)
-                
-                # 현재 BTC 보유 비율 계산
-                current_BTC_ratio = (coin_balance * current_price) / total_assets * 100 if total_assets > 0 else 0
-                
-                # GPT가 제안한 목표 BTC 보유 비율
-                target_BTC_ratio = gpt_advice.get('investment_percentage', 10)
-                
-                # 목표 비율과 현재 비율 차이 계산
-                ratio_difference = target_BTC_ratio - current_BTC_ratio
-                
-                print(f"\n=== 매수 분석 ===")
-                print(f"총자산: {total_assets:,.0f} KRW")
-                print(f"현재 BTC 비율: {current_BTC_ratio:.2f}%")
-                print(f"목표 BTC 비율: {target_BTC_ratio:.2f}%")
-                print(f"비율 차이: {ratio_difference:.2f}%")
-
-                if ratio_difference > 1:  # 1% 이상 차이가 날 때만 매수
-                    # 추가로 필요한 BTC 가치 계산
-                    additional_BTC_value = total_assets * (ratio_difference / 100)
-                    buy_amount = min(additional_BTC_value * 0.9995, balance * 0.9995)
-
-                    if buy_amount >= self.MIN_ORDER_AMOUNT:
-                        try:
-                            print(f"\n매수 주문 시도:")
-                            print(f"주문 금액: {buy_amount:,.0f} KRW")
-                            
-                            order = self.upbit.buy_market_order(self.ticker, buy_amount)
-                            
-                            if order and 'uuid' in order:
-                                print(f"매수 성공! 주문 ID: {order['uuid']}")
-                                self.log_trade(
-                                    trade_type='buy',
-                                    amount=buy_amount,
-                                    price=current_price,
-                                    confidence_score=gpt_confidence,
-                                    reasoning=gpt_advice.get('reasoning', '매수 실행'),
-                                    rsi=analysis_results['rsi'],
-                                    volatility=analysis_results['volatility_ratio'],
-                                    strategy_type='gpt_advised'
-                                )
-                                return True
-                            else:
-                                print(f"매수 주문 실패: {order}")
-                        except Exception as e:
-                            print(f"매수 주문 중 오류: {e}")
-                            return False
-                    else:
-                        print(f"최소 주문 금액({self.MIN_ORDER_AMOUNT:,} KRW)보다 작은 주문")
-                else:
-                    print(f"현재 BTC 보유 비율이 충분합니다. 추가 매수가 필요하지 않습니다.")
-                    self.log_trade(
-                        trade_type='hold',
-                        amount=0,
-                        price=current_price,
-                        confidence_score=gpt_confidence,
-                        reasoning=f"현재 BTC 보유 비율({current_BTC_ratio:.2f}%)이 목표 비율({target_BTC_ratio:.2f}%)에 근접",
-                        rsi=analysis_results['rsi'],
-                        volatility=analysis_results['volatility_ratio'],
-                        strategy_type='gpt_advised'
-                    )
-                        
-            # 매도 로직
-            elif sell_signal and trade_recommendation == '매도' and gpt_confidence >= 60:
-                if coin_balance > 0:
-                    sell_ratio = gpt_advice.get('investment_percentage', 10) / 100
-                    base_sell_amount = coin_balance * sell_ratio
-                    
-                    expected_value = base_sell_amount * current_price * (1 - self.TRADING_FEE_RATE)
-                    
-                    print(f"\n=== 매도 분석 ===")
-                    print(f"보유 BTC: {coin_balance:.8f}")
-                    print(f"매도 비율: {sell_ratio*100:.1f}%")
-                    print(f"매도 수량: {base_sell_amount:.8f}")
-                    print(f"예상 가치: {expected_value:,.0f} KRW")
-                    
-                    if expected_value >= self.MIN_ORDER_AMOUNT:
-                        try:
-                            print(f"\n매도 주문 시도:")
-                            print(f"매도 수량: {base_sell_amount:.8f} BTC")
-                            print(f"예상 가치: {expected_value:,.0f} KRW")
-                            
-                            order = self.upbit.sell_market_order(self.ticker, base_sell_amount)
-                            
-                            if order and 'uuid' in order:
-                                print(f"매도 성공! 주문 ID: {order['uuid']}")
-                                self.log_trade(
-                                    trade_type='sell',
-                                    amount=base_sell_amount,
-                                    price=current_price,
-                                    confidence_score=gpt_confidence,
-                                    reasoning=gpt_advice.get('reasoning', '매도 실행'),
-                                    rsi=analysis_results['rsi'],
-                                    volatility=analysis_results['volatility_ratio'],
-                                    strategy_type='gpt_advised'
-                                )
-                                return True
-                            else:
-                                print(f"매도 주문 실패: {order}")
-                        except Exception as e:
-                            print(f"매도 주문 중 오류: {e}")
-                            return False
-                    else:
-                        print(f"매도 금액이 최소 주문 금액보다 작음 ({expected_value:,.0f} < {self.MIN_ORDER_AMOUNT:,} KRW)")
-                else:
-                    print("매도 가능한 코인 잔액 없음")
-            else:
-                print("\n관망 상태 유지")
-                self.log_trade(
-                    trade_type='hold',
-                    amount=0,
-                    price=current_price,
-                    confidence_score=gpt_confidence,
-                    reasoning=f"GPT 추천: {trade_recommendation}, 신뢰도: {gpt_confidence}%",
-                    rsi=analysis_results['rsi'],
-                    volatility=analysis_results['volatility_ratio'],
-                    strategy_type='gpt_advised'
-                )
-                
-            return False
-                
-        except Exception as e:
-            print(f"거래 실행 중 오류 발생: {e}")
-            import traceback
-            traceback.print_exc()
-            return False
-        
-    def check_significant_market_change(self, last_state, current_state):
-        """시장 상황의 유의미한 변화 감지"""
-        if not last_state or not current_state:
-            return True
-            
-        try:
-            # 가격 변화 확인
-            price_change = abs(current_state['price'] - last_state['price']) / last_state['price']
-            
-            # RSI 변화 확인
-            rsi_change = abs(current_state['rsi'] - last_state['rsi'])
-            
-            # 변동성 변화 확인
-            volatility_change = abs(current_state['volatility'] - last_state['volatility'])
-            
-            # 볼린저 밴드 포지션 변화 (2단계 이상)
-            position_change = abs(current_state['bollinger_position_num'] - last_state.get('bollinger_position_num', 0))
-            significant_position_change = position_change >= 2
-            
-            # 시장 상황 변화 판단
-            significant_change = (
-                price_change > self.MARKET_CHANGE_THRESHOLD or  # 가격 2% 이상 변화
-                rsi_change > 10 or  # RSI 10 이상 변화
-                volatility_change > 0.1 or  # 변동성 10% 이상 변화
-                significant_position_change  # 볼린저 밴드 2단계 이상 변화
-            )
-            
-            return significant_change
-            
-        except Exception as e:
-            print(f"시장 변화 감지 중 오류: {e}")
-            return True  # 오류 발생 시 안전하게 True 반환
-
-    def consult_gpt_for_trading(self, data, analysis_results, market_changed=None, force_check=False):
-        """시장 상황에 따른 GPT 자문 요청 (이전 자문 내역 포함)"""
-        try:
-            if not market_changed and not force_check:
-                return {
-                    'trade_recommendation': '관망',
-                    'investment_percentage': 0,
-                    'confidence_score': 50,
-                    'reasoning': '시장 상황 유지 중'
-                }
-
-            try:
-                ohlcv_data = pyupbit.get_ohlcv(self.ticker, interval=self.interval, count=60)
-                if ohlcv_data is None or ohlcv_data.empty:
-                    ohlcv_data = data.tail(60).copy()
-            except Exception as e:
-                print(f"OHLCV 데이터 조회 실패: {e}")
-                ohlcv_data = data.tail(60).copy()
-
-            current_price = float(ohlcv_data['close'].iloc[-1])
-            balance = self.upbit.get_balance("KRW")
-            coin_balance = self.upbit.get_balance(self.ticker.split('-')[1])
-            total_assets = balance + (coin_balance * current_price)
-            current_BTC_ratio = (coin_balance * current_price / total_assets * 100) if total_assets > 0 else 0
-            avg_buy_price = self.upbit.get_avg_buy_price(self.ticker)
-
-            # OHLCV 데이터 포맷팅    
-            ohlcv_formatted = "최근 240시간 OHLCV 데이터:\n"
-            for index, row in ohlcv_data.iterrows():
-                ohlcv_formatted += f"""
-                시간: {index.strftime('%Y-%m-%d %H:%M')}
-                시가: {row['open']:,.0f}
-                고가: {row['high']:,.0f}
-                저가: {row['low']:,.0f}
-                종가: {row['close']:,.0f}
-                거래량: {row['volume']:,.0f}
-                -------------------"""
-            
-            # 이전 자문 내역 가져오기
-            previous_advice = self.get_gpt_advice_history(limit=3, formatted=True)
-
-            # Stoch RSI 신호 확인
-            stoch_rsi_signal = ""
-            if hasattr(self, 'last_stoch_cross_type') and self.last_stoch_cross_time:
-                # 최근 30분 이내의 크로스 신호만 전달
-                if time.time() - self.last_stoch_cross_time <= 1800:  # 30분
-                    if self.last_stoch_cross_type == 'up':
-                        stoch_rsi_signal = "최대 30분 이전에 골든크로스 발생했었음"
-                    elif self.last_stoch_cross_type == 'down':
-                        stoch_rsi_signal = "최대 30분 이전에 데드크로스 발생했었음"
-            
-            prompt = f"""BTC 시장 분석 보고서 ({force_check and '정기점검' or '시장변화'})
-    당신은 BTC 시장 정보를 제공받고 그것을 바탕으로 당신의 견해를 제공하는 BTC 단타 트레이딩 전문가입니다.
-    제공되는 각종 지표들을 해석하는 것도 중요하지만, 당신의 모든 지식을 총동원하여 OHLCV를 분석하십시오. 그리고 당신이 뉴스를 전달받았는지 확인해야하기 때문에 매 대답마다 뉴스에대한 분석도 조금이라도 적어주세요.
-    단타 거래가 아닙니다 단기간의 오르 내림림이 아닌 큰흐름을 기준으로 거래하세요. 확실할 때 들어가고 확실한 익절을 하는 것이 목표입니다!
-
-    {previous_advice}
-
-    {ohlcv_formatted}
-            
-    지표 설명: 
-    - KNN 지표
-    KNN 지표의 신호강도는 '얼마나 크게 움직일 것인가'를, KNN 지표의 신뢰도는 '얼마나 확실한가'를 나타냅니다.
-
-    신뢰도 범위 해석:
-    40-60%: 낮은 신뢰도
-    60-75%: 중간 신뢰도
-    75-85%: 높은 신뢰도
-    85-95%: 매우 높은 신뢰도
-
-    - 볼린저 밴드 포지션 (6단계 구분):
-    * extreme_upper: 상단 밴드 초과.
-    * upper_strong: 상단과 중앙 밴드 사이 상위 1/3.
-    * upper_weak: 상단과 중앙 밴드 사이 하위 2/3.
-    * lower_weak: 중앙과 하단 밴드 사이 상위 2/3.
-    * lower_strong: 중앙과 하단 밴드 사이 하위 1/3.
-    * extreme_lower: 하단 밴드 미만.
-
-    - 볼린저 밴드 추가 지표:
-    * band_width: 밴드폭(%). 변동성 수준을 나타내며, 높을수록 시장의 변동성이 큼
-        - 20% 이상: 매우 높은 변동성
-        - 10-20%: 높은 변동성
-        - 5-10%: 보통 변동성
-        - 5% 미만: 낮은 변동성
-
-    -Stoch RSI: k값도 물론 중요하지만 Stoch RSI의 특징인 k값과 d값을 모두 고려해주세요!
-        
-    현재 시장 상황:
-    - 현재가: {round(current_price / 100) * 100:,.0f}원
-    - EMA: {analysis_results['ema_ribbon_status']}
-    - Stoch RSI: K:{analysis_results['stoch_rsi_k']:.1f}, D:{analysis_results['stoch_rsi_d']:.1f} 
-          (K > 75: 과매수, K < 25: 과매도)
-          {stoch_rsi_signal}  # 최근 30분 이내 발생한 신호만 표시
-    - 모멘텀: {analysis_results['momentum']*100:.1f}%
-    - 변동성: {analysis_results['volatility_ratio']:.1f}%
-    - 볼린저밴드: {analysis_results['bollinger_position']}
-    - 볼린저 밴드폭: {analysis_results.get('band_width', 0):.2f}%
-    - 다이버전스: {analysis_results['divergence']['bearish_divergence'] and '베어리시' or ''} {analysis_results['divergence']['bullish_divergence'] and '불리시' or ''}
-
-    자산 현황:
-    - 보유KRW: {balance:.0f}원
-    - 보유BTC: {coin_balance:.8f}개 
-    - 평단가: {avg_buy_price > 0 and f"{avg_buy_price:.0f}원" or "없음"}
-    - 수익률: {avg_buy_price > 0 and f"{((current_price - avg_buy_price) / avg_buy_price * 100):.2f}%" or "없음"}
-    - BTC비중: {current_BTC_ratio:.2f}%
-
-    KNN 분석:
-    - 예측방향: {analysis_results['knn_prediction'] > 0 and '상승' or analysis_results['knn_prediction'] < 0 and '하락' or '중립'}
-    - 신뢰도: {analysis_results['knn_signal_strength']:.1f}%
-    - 신호강도: {abs(analysis_results['knn_prediction']) > 0.5 and '강' or abs(analysis_results['knn_prediction']) > 0.2 and '중' or '약'}
-
-    뉴스 요약:
-    {self.fetch_BTC_news()}
-
-    아래 JSON 형식으로 매매 판단을 응답해주세요:
-    {{
-    "trade_recommendation": "매수 또는 매도 또는 관망",
-    "investment_percentage": 0부터 100까지의 정수(관망 추천시 0),
-    "confidence_score": 0부터 100까지의 정수(KNN 신뢰도가 아닌 당신의 답변에 대한 당신이 생각하는 신뢰도를 적어주세요!),
-    "reasoning": "투자 판단의 근거"
-    }}
-
-    거래 제약:
-    - 매수시: 총자산 대비 목표 보유 BTC%를 investment_percentage에 입력 (ex: 현재 총 자산의 25%를 BTC로 보유중인데 BTC를 추가 매수하여 총자산의 45%를 BTC로 보유할려는 경우 투자 비율에 45를 입력하세요)
-    - 매도시: 보유 BTC 중 매도할 비율을 investment_percentage에 입력
-    - 관망시: 0% 입력
-    - 여유를 두고 확실한 거래를 해주세요.
-    - 제발! OHCLV를 바탕으로 프랙탈 분석도 신경쓰세요.
-    - KNN 지표는 매수할 때 최대한 낮은 가격에 매수하고 익절할 때 최대한 높은 가격에서 익절하기 위한 지표이지, 단타 거래를 위한 지표가 아닙니다."""
-
-            client = openai.OpenAI(api_key=self.openai_api_key)
-            response = client.chat.completions.create(
-                model="o3-mini-2025-01-31",
-                messages=[{
-                    "role": "user",
-                    "content": prompt
-                }],
-                response_format={
-                    "type": "json_schema",
-                    "json_schema": {
-                        "name": "trading_decision",
-                        "description": "Trading decision with recommendation and reasoning",
-                        "schema": {
-                            "type": "object",
-                            "properties": {
-                                "trade_recommendation": {
-                                    "type": "string",
-                                    "enum": ["매수", "매도", "관망"]
-                                },
-                                "investment_percentage": {
-                                    "type": "integer",
-                                    "minimum": 0,
-                                    "maximum": 100
-                                },
-                                "confidence_score": {
-                                    "type": "integer",
-                                    "minimum": 0,
-                                    "maximum": 100
-                                },
-                                "reasoning": {
-                                    "type": "string"
-                                }
-                            },
-                            "required": ["trade_recommendation", "investment_percentage", "confidence_score", "reasoning"]
-                        }
-                    }
-                },
-                reasoning_effort="high"
-            )
-
-            content = response.choices[0].message.content.strip()
-            try:
-                gpt_advice = json.loads(content)
-                current_market_state = {
-                    'price': current_price,
-                    'rsi': float(analysis_results['rsi']),
-                    'volatility': float(analysis_results['volatility_ratio']),
-                    'ema_status': str(analysis_results['ema_ribbon_status']),
-                    'momentum': float(analysis_results['momentum']),
-                    'bollinger_position': str(analysis_results['bollinger_position']),
-                    'bollinger_position_num': analysis_results.get('bollinger_position_num', 0),
-                    'stoch_rsi_k': float(analysis_results['stoch_rsi_k']),
-                    'stoch_rsi_d': float(analysis_results['stoch_rsi_d']),
-                    'knn_prediction': float(analysis_results['knn_prediction']),
-                    'knn_signal_strength': float(analysis_results['knn_signal_strength'])
-                }
-                self.log_gpt_advice(gpt_advice, current_market_state)
-                self.last_gpt_market_state = current_market_state
-                return gpt_advice
-
-            except Exception as e:
-                print(f"응답 처리 중 오류 발생: {e}")
-                return {
-                    'trade_recommendation': '관망',
-                    'investment_percentage': 0,
-                    'confidence_score': 50,
-                    'reasoning': f'처리 오류: {str(e)}'
-                }
-
-        except Exception as e:
-            print(f"GPT 자문 요청 중 오류 발생: {e}")
-            import traceback
-            traceback.print_exc()
-            return {
-                'trade_recommendation': '관망',
-                'investment_percentage': 0,
-                'confidence_score': 50,
-                'reasoning': f'시스템 오류: {str(e)}'
-            }
-            
-    def log_gpt_advice(self, advice_data, market_state):
-        """GPT 자문 결과를 데이터베이스에 저장하는 함수 개선"""
-        try:
-            # 입력 데이터 검증
-            if not isinstance(advice_data, dict):
-                print("잘못된 자문 데이터 형식")
-                return False
-
-            required_fields = ['trade_recommendation', 'investment_percentage', 
-                            'confidence_score', 'reasoning']
-            if not all(field in advice_data for field in required_fields):
-                print(f"필수 필드 누락: {[f for f in required_fields if f not in advice_data]}")
-                return False
-
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            # 현재 시간을 한국 시간대로 설정
-            korean_time = datetime.now(self.timezone)
-            timestamp = korean_time.strftime('%Y-%m-%d %H:%M:%S')
-
-            # market_state가 None이 아닌 경우에만 JSON으로 변환
-            market_state_json = None
-            if market_state is not None:
-                try:
-                    market_state_json = json.dumps(market_state, ensure_ascii=False)
-                except Exception as e:
-                    print(f"market_state JSON 변환 중 오류: {e}")
-                    market_state_json = None
-
-            # 데이터 정수 변환 및 유효성 검사
-            try:
-                confidence_score = advice_data.get('confidence_score', 0)
-                if isinstance(confidence_score, (int, float)):
-                    confidence_score = int(round(confidence_score))  # 반올림 후 정수 변환
-                else:
-                    print(f"잘못된 confidence_score 형식: {confidence_score}")
-                    confidence_score = 0
-
-                investment_percentage = advice_data.get('investment_percentage', 0)
-                if isinstance(investment_percentage, (int, float)):
-                    investment_percentage = int(round(investment_percentage))  # 반올림 후 정수 변환
-                else:
-                    print(f"잘못된 investment_percentage 형식: {investment_percentage}")
-                    investment_percentage = 0
-
-                # 값 범위 제한
-                confidence_score = max(0, min(100, confidence_score))
-                investment_percentage = max(0, min(100, investment_percentage))
-
-            except Exception as e:
-                print(f"데이터 변환 중 오류: {e}")
-                confidence_score = 0
-                investment_percentage = 0
-
-            # 데이터 삽입
-            try:
-                cursor.execute('''
-                INSERT INTO gpt_advice_log 
-                (timestamp, trade_recommendation, investment_percentage,
-                confidence_score, reasoning, market_state)
-                VALUES (?, ?, ?, ?, ?, ?)
-                ''', (
-                    timestamp,
-                    str(advice_data.get('trade_recommendation', '관망')),
-                    investment_percentage,
-                    confidence_score,
-                    str(advice_data.get('reasoning', '없음')),
-                    market_state_json
-                ))
-                
-                conn.commit()
-                print(f"GPT 자문 저장 완료 - {timestamp}")
-                
-                # 저장된 데이터 확인
-                cursor.execute('''
-                SELECT * FROM gpt_advice_log 
-                WHERE timestamp = ? 
-                ORDER BY id DESC LIMIT 1
-                ''', (timestamp,))
-                
-                saved_data = cursor.fetchone()
-                if saved_data:
-                    print("\n저장된 GPT 자문 데이터:")
-                    print(f"Timestamp: {saved_data[1]}")
-                    print(f"추천: {saved_data[2]}")
-                    print(f"투자 비율: {saved_data[3]}%")
-                    print(f"신뢰도: {saved_data[4]}%")
-                    print(f"근거: {saved_data[5]}")
-                
-                return True
-
-            except sqlite3.Error as e:
-                print(f"데이터베이스 저장 중 오류: {e}")
-                return False
-
-        except Exception as e:
-            print(f"GPT 자문 로깅 중 오류 발생: {e}")
-            import traceback
-            traceback.print_exc()
-            return False
-
-        finally:
-            if 'conn' in locals():
-                conn.close()
-            
-    def run_trading_strategy(self):
-        """수정된 트레이딩 전략 실행"""
-        try:
-            # 초기화
-            gc_counter = 0
-            last_forced_check_time = time.time()
-            
-            # 초기 뉴스 로드
-            cached_news = self.load_cached_news()
-            if cached_news:
-                self.cached_news = cached_news
-                print("\n마지막 저장된 뉴스 로드 완료")
-            else:
-                print("\n저장된 뉴스가 없습니다. 다음 정해진 시간에 업데이트될 예정입니다.")
-            
-            # 다음 뉴스 업데이트 시간 초기화
-            current_time = datetime.now(self.timezone)
-            next_news_update = self.get_next_news_update_time(current_time)
-            print(f"\n트레이딩 봇 시작 - 다음 뉴스 업데이트 예정: {next_news_update.strftime('%Y-%m-%d %H:%M')}")
-
-            while True:
-                try:
-                    current_time = datetime.now(self.timezone)
-                    
-                    # 1. 뉴스 업데이트 체크 (정해진 시간에만)
-                    if current_time >= next_news_update:
-                        fixed_hours = [0, 4, 8, 12, 16, 20]
-                        if current_time.hour in fixed_hours:
-                            print("\n=== 정해진 시간 뉴스 업데이트 시작 ===")
-                            print(f"현재 시간: {current_time.strftime('%Y-%m-%d %H:%M')}")
-                            
-                            try:
-                                updated_news = self.fetch_BTC_news()
-                                if updated_news:
-                                    self.cached_news = updated_news
-                                    print("뉴스 업데이트 완료")
-                                else:
-                                    print("뉴스 업데이트 실패 - 기존 뉴스 유지")
-                            except Exception as e:
-                                print(f"뉴스 업데이트 실패: {e}")
-                                import traceback
-                                traceback.print_exc()
-                        else:
-                            print(f"\n현재 시간({current_time.hour}시)은 뉴스 업데이트 시간이 아님")
-                        
-                        # 다음 업데이트 시간 계산 (현재 시간 기준)
-                        next_news_update = self.get_next_news_update_time(current_time)
-                        print(f"다음 뉴스 업데이트 예정: {next_news_update.strftime('%Y-%m-%d %H:%M')}")
-
-                    # 2. 시장 데이터 분석
-                    with self.market_data_lock:
-                        # 히스토리컬 데이터 가져오기
-                        data = self.get_historical_data()
-                        if data is None:
-                            print("히스토리컬 데이터를 가져오는데 실패했습니다.")
-                            time.sleep(60)
-                            continue
-                        
-                        # 기술적 분석 수행
-                        analysis_results = self.calculate_indicators(data)
-                        if analysis_results is None:
-                            print("기술적 분석 실패")
-                            time.sleep(60)
-                            continue
-
-                        # 변동성에 따른 강제 점검 간격 동적 조정
-                        volatility = analysis_results.get('volatility_ratio', 0)
-                        if volatility < 2.35:
-                            force_check_interval = 7200  # 2시간간
-                        elif volatility < 3:
-                            force_check_interval = 3600  # 1시간
-                        else:
-                            force_check_interval = 1800   # 30분
-
-                        # 3. 시장 상황 모니터링
-                        market_changed = self.monitor_market_conditions(data, analysis_results)
-                        
-                        # 강제 점검 시간 확인
-                        current_ts = time.time()
-                        time_since_last_check = current_ts - last_forced_check_time
-                        time_to_force_check = time_since_last_check >= force_check_interval
-                        
-                        # GPT 자문이 필요한지 결정
-                        should_consult_gpt = market_changed or time_to_force_check
-
-                        # 4. 거래 신호 생성 및 실행
-                        if should_consult_gpt:
-                            if market_changed:
-                                print("\n=== 시장 상황 변화 감지 - GPT 자문 요청 ===")
-                            else:
-                                print(f"\n=== 정기 점검 시작 (마지막 점검으로부터 {time_since_last_check/60:.1f}분 경과) ===")
-                            
-                            # 포트폴리오 상태 출력
-                            portfolio = self.get_portfolio_status()
-                            if portfolio:
-                                print("\n현재 포트폴리오 상태:")
-                                print(f"KRW 잔고: {portfolio['krw_balance']:,.0f}원")
-                                print(f"BTC 잔고: {portfolio['coin_balance']:.8f}")
-                                print(f"총 자산가치: {portfolio['total_value']:,.0f}원")
-                                if portfolio['avg_buy_price'] > 0:
-                                    print(f"평균 매수가: {portfolio['avg_buy_price']:,.0f}원")
-                                    print(f"현재 수익률: {portfolio['roi']:.2f}%")
-                                print(f"BTC 비중: {portfolio['coin_ratio']:.2f}%")
-                            
-                            # GPT 자문 요청 및 거래 신호 생성
-                            signals = self.generate_trading_signal(
-                                data=data,
-                                market_changed=market_changed,
-                                force_check=time_to_force_check
-                            )
-                            
-                            if signals is None:
-                                print("거래 신호 생성에 실패했습니다.")
-                                time.sleep(60)
-                                continue
-                                
-                            buy_signal, sell_signal, gpt_advice, _ = signals
-                            
-                            # 거래 실행 시도
-                            if analysis_results is not None:
-                                trade_executed = self.execute_trade(
-                                    buy_signal, 
-                                    sell_signal, 
-                                    gpt_advice, 
-                                    analysis_results
-                                )
-                                
-                                if trade_executed:
-                                    print("\n거래 실행 완료 - 포트폴리오 재확인")
-                                    updated_portfolio = self.get_portfolio_status()
-                                    if updated_portfolio:
-                                        print(f"업데이트된 KRW 잔고: {updated_portfolio['krw_balance']:,.0f}원")
-                                        print(f"업데이트된 BTC 잔고: {updated_portfolio['coin_balance']:.8f}")
-                            
-                            last_forced_check_time = current_ts  # 강제 점검 타이머 리셋
-                        else:
-                            minutes_to_next_check = (force_check_interval - time_since_last_check) / 60
-                            print(f"\n다음 강제 점검까지 {minutes_to_next_check:.1f}분 남음")
-                            print("시장 변화 없음 - 관망 상태 유지")
-                    
-                    # 5. 가비지 컬렉션 및 메모리 관리
-                    gc_counter += 1
-                    if gc_counter >= 10:
-                        gc.collect()
-                        gc_counter = 0
-                        
-                    # 6. 대기
-                    time.sleep(60)  # 1분 간격으로 체크
-                    
-                except Exception as e:
-                    print(f"Trading loop 실행 중 오류: {e}")
-                    import traceback
-                    traceback.print_exc()
-                    time.sleep(60)
-
-        except KeyboardInterrupt:
-            print("\n트레이딩 봇 종료 요청 감지")
-            print("진행 중인 작업 정리 중...")
-            # 정리 작업 수행
-            if hasattr(self, 'db_connection') and self.db_connection:
-                self.db_connection.close()
-            print("트레이딩 봇이 안전하게 종료되었습니다.")
-            
-        except Exception as e:
-            print(f"치명적인 오류 발생: {e}")
-            import traceback
-            traceback.print_exc()
-            raise  # 심각한 오류는 상위로 전파하여 봇 재시작 유도
-
-if __name__ == "__main__":
-    bot = BTCTradingBot()
-    bot.run_trading_strategy()
+import pyupbit
+import re
+import numpy as np
+import pandas as pd
+import time
+import warnings
+import openai
+import json
+import sqlite3
+import gc
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+from serpapi import GoogleSearch
+import os
+from dotenv import load_dotenv
+from indicator_cache import IndicatorCache
+from streaming_indicators import StreamingIndicators
+from candle_store import CandleStore
+from market_snapshot import AccountSnapshot, CycleSnapshot, MarketSnapshot, fetch_cycle_snapshot
+from trading_clock import SystemClock
+from knn_index import IVFKNNIndex, KNNIndex, time_decay_multiplier
+from knn_feature_store import KNNFeatureStore
+from knn_tuning import KNNTuningHarness
+from counter_trend_sweep import CounterTrendSweep
+from analysis_history import analysis_history, knn_window_history
+from gpt_response_store import GPTResponseStore, news_digest
+from gpt_consultation import ConsultationWorker, snapshot_within_tolerance
+from consultation_cache import ConsultationCache, account_key, quantize_market_state
+from speculative_consultation import SpeculativePrefetcher, trigger_proximity
+from advice_stream import ADVICE_RESPONSE_FORMAT, AdviceStreamParser
+from decision_gate import DEFAULT_TIERS, local_hold_advice, local_score, position_at_risk, select_tier
+from prompt_builder import (
+    STATIC_SYSTEM_PROMPT, PrefixGuard, candles_since, compact_lines, count_tokens, diff_market_state,
+    fit_prompt, format_ohlcv, prefix_hash
+)
+
+load_dotenv()
+warnings.filterwarnings('ignore')
+
+class BTCTradingBot:
+    #----------------
+    # 1. Initialization and Setup
+    #----------------
+    def __init__(self, ticker="KRW-BTC", interval="minute240", db_path='trading_log.db', offline=False):
+        # 먼저 timezone 설정
+        self.timezone = ZoneInfo('Asia/Seoul')
+
+        # 시각 조회 (백테스트에서는 시뮬레이션 시계로 교체)
+        self.clock = SystemClock()
+
+        self.ticker = ticker
+        self.interval = interval
+        
+        self.access_key = os.getenv('UPBIT_ACCESS_KEY')
+        self.secret_key = os.getenv('UPBIT_SECRET_KEY')
+        self.openai_api_key = os.getenv('OPENAI_API_KEY')
+        self.openai_base_url = os.getenv('OPENAI_BASE_URL')  # 없으면 기본 OpenAI 엔드포인트
+        self.serpapi_key_1 = os.getenv('SERPAPI_KEY_1')
+        self.serpapi_key_2 = os.getenv('SERPAPI_KEY_2')
+        self.current_serpapi_key = self.serpapi_key_1 
+
+        # 뉴스 검색 키워드 초기화 추가
+        self.news_keywords = [
+            "BTC Crypto news"
+        ]
+
+        self.api_call_counts = {
+            self.serpapi_key_1: 0,
+            self.serpapi_key_2: 0
+        }
+        self.last_api_reset = {
+            self.serpapi_key_1: datetime.now(self.timezone),
+            self.serpapi_key_2: datetime.now(self.timezone)
+        }
+
+        self.TRADING_FEE_RATE = 0.0005
+        self.MIN_ORDER_AMOUNT = 5000
+        
+        openai.api_key = self.openai_api_key
+        self.upbit = pyupbit.Upbit(self.access_key, self.secret_key)
+        self.price_fn = pyupbit.get_current_price
+        self.db_path = db_path
+
+        # 로컬 캔들 저장소 (마지막 저장 캔들 이후만 조회, 처음 사용할 때 생성)
+        self.USE_CANDLE_STORE = False
+        self.candle_db_path = 'candle_store.db'
+        self.candle_store = None
+
+        # 주기별 시세/계좌 스냅샷 (주문 후에만 갱신)
+        self.cycle_snapshot = None
+        
+
+        # 뉴스 캐싱 관련 변수
+        self.NEWS_UPDATE_INTERVAL = 14400  # 4시간 (초)
+        
+        # 데이터베이스 생성
+        self.create_database()
+        
+        # 초기 뉴스 로드
+        cached_news = self.load_cached_news()
+        if cached_news:
+            self.cached_news = cached_news
+            self.last_news_update = time.time()
+        elif offline:
+            # 오프라인 실행(백테스트 등)에서는 뉴스 API를 호출하지 않음
+            self.cached_news = None
+            self.last_news_update = time.time()
+        else:
+            self.cached_news = self.fetch_BTC_news()
+            self.last_news_update = time.time()
+
+        # GPT 자문 관련 변수 초기화
+        self.last_gpt_market_state = None
+        self.last_gpt_advice = None
+
+        # 역추세 매매를 위한 추가 파라미터
+        self.OVERSOLD_RSI = 25  # RSI 과매도 기준
+        self.OVERBOUGHT_RSI = 75  # RSI 과매수 기준
+        self.BOLLINGER_PERIOD = 20  # 볼린저 밴드 기간
+        self.BOLLINGER_STD = 2.2  # 볼린저 밴드 표준편차
+        self.MOMENTUM_THRESHOLD = 0.025  # 모멘텀 임계값 (2.5%)
+
+        from threading import Lock
+        self.market_data_lock = Lock()
+
+        # 임계값을 설정으로 분리
+        self.VOLATILITY_THRESHOLD = 2
+        self.CONFIDENCE_THRESHOLD = 60
+        self.MIN_TRADE_INTERVAL = 180  # 3분
+        self.SLEEP_INTERVAL = 180      # 3분
+
+        # 거래 제한 관련 새로운 변수들
+        self.last_gpt_advice = None
+        self.last_market_state = None
+        self.COOLDOWN_HOURS = 2  # 거래 후 대기 시간 (시간)
+        self.MARKET_CHANGE_THRESHOLD = 0.02  # 시장 변화 감지 임계값 (2%)
+        
+        # DB 커넥션 풀 설정
+        self.db_connection = None
+        self.init_database_connection()
+
+        # Stoch RSI 크로스 관련 변수 추가
+        self.last_stoch_cross_time = None
+        self.last_stoch_cross_type = None
+        self.STOCH_CROSS_COOLDOWN = 600  # 1시간 쿨다운
+        self.STOCH_CROSS_THRESHOLD = 2  # 크로스 발생 후 최소 2% 이상 벌어져야 다음 크로스로 인정
+        self.STOCH_RSI_DEBUG = False  # Stoch RSI 디버그 출력 여부
+
+        # 지표 계산 캐시 (캔들 스냅샷 단위)
+        self.INDICATOR_CACHE_SIZE = 256
+        self.indicator_cache = IndicatorCache(max_entries=self.INDICATOR_CACHE_SIZE)
+
+        # 증분 지표 엔진 (라이브 루프에서 바뀐 캔들만 반영)
+        self.USE_STREAMING_INDICATORS = False
+        self.streaming_indicators = StreamingIndicators(
+            bollinger_period=self.BOLLINGER_PERIOD,
+            bollinger_std=self.BOLLINGER_STD
+        )
+
+        # KNN 방향 변화 관련 변수 추가
+        self.last_knn_change_time = None
+        self.last_knn_direction = None
+        self.KNN_CHANGE_COOLDOWN = 600  # 1시간 쿨다운
+        self.KNN_SIGNAL_MIN_STRENGTH = 0.25  # 최소 신호 강도
+        self.KNN_DIRECTION_CHANGE_THRESHOLD = 0.3  # 방향 전환 최소 차이
+
+        # KNN 특징별 가중치 및 시간 가중치
+        self.KNN_FEATURE_WEIGHTS = np.array([
+            1.2,  # price_position
+            1.0,  # price_momentum
+            1.5,  # price_trend
+            1.3,  # bb_position
+            1.0,  # bb_width
+            0.8,  # volume_ratio
+            0.7,  # volume_trend
+            1.1,  # volatility
+            1.4,  # rsi
+            1.2   # ema_cross
+        ])
+        self.KNN_TIME_DECAY = 100  # 거리 * exp(i / KNN_TIME_DECAY)
+        self.KNN_TIME_WINDOW = 199  # 시간 배수를 적용하는 최근 행 수 (라이브 윈도우 크기, 그보다 오래된 행은 배수 1)
+
+        # KNN 이웃 인덱스 (KD-tree, 디스크 저장, 특징 저장소 행으로 구성)
+        self.USE_KNN_INDEX = False
+        self.knn_index_path = 'knn_index.npz'
+        self.knn_index = None
+
+        # 근사 KNN 모드 (IVF, 수년치 분봉 연구용) - 탐색 리스트 수로 재현율/속도 조절
+        self.USE_KNN_ANN = False
+        self.KNN_ANN_PROBES = 8
+        self.knn_ann_index_path = 'knn_ann_index.npz'
+
+        # KNN 증분 특징 저장소 (마감 캔들마다 한 행 추가, 누적 정규화, 메모리 맵)
+        self.USE_KNN_FEATURE_STORE = False
+        self.knn_feature_store_path = 'knn_feature_store'
+        self.knn_feature_store = None
+
+        # GPT 자문 모델 설정
+        self.GPT_MODEL = "o3-mini-2025-01-31"
+        self.GPT_REASONING_EFFORT = "high"
+
+        # GPT 응답 저장소 ('off' | 'record': 응답 기록 | 'replay': 기록된 응답 재생, 없으면 대체 모델)
+        self.GPT_RESPONSE_STORE_MODE = 'off'
+        self.GPT_PORTFOLIO_BUCKET = 10  # 저장소 키의 BTC 비중 구간 (%)
+        self.gpt_response_store_path = 'gpt_response_store.db'
+        self.gpt_stand_in = None  # replay 미스시 호출할 함수 (정규화 입력 -> 자문), 없으면 관망
+        self.gpt_response_store = None
+
+        # GPT 자문 비동기 실행 (자문 중에도 메인 루프 유지, 마감 초과시 관망)
+        self.USE_ASYNC_GPT = True
+        self.GPT_CONSULT_DEADLINE = 120  # 초
+        self.GPT_RESULT_PRICE_TOLERANCE = 0.005  # 늦게 도착한 자문 적용 허용 가격 변화율 (0.5%)
+        self.gpt_worker = ConsultationWorker(deadline=self.GPT_CONSULT_DEADLINE)
+
+        # GPT 자문 중복 제거 (양자화 상태가 TTL 안의 이전 자문과 같으면 재사용, 적중/미스 통계 확인 후 켜기)
+        self.USE_GPT_DEDUP = False
+        self.GPT_DEDUP_TTL = 1800  # 초
+        self.consultation_cache = None
+        self.last_gpt_advice_id = None
+
+        # GPT 프롬프트 크기 ('verbose' | 'csv' | 'delta', 예산 초과시 이전 자문/뉴스/OHLCV 축소)
+        self.GPT_OHLCV_FORMAT = 'csv'
+        self.GPT_PROMPT_TOKEN_BUDGET = 4000
+        self.GPT_PROMPT_MIN_OHLCV_ROWS = 20
+        self.gpt_prefix_guard = PrefixGuard()
+
+        # GPT 델타 프롬프트 ('full' | 'delta': 직전 자문 이후 변경분만 전송)
+        # 정기 점검, 델타 GPT_DELTA_FULL_EVERY회 이후, 직전 자문이 GPT_DELTA_MAX_AGE초보다 오래되면 전체 프롬프트
+        self.GPT_PROMPT_MODE = 'full'
+        self.GPT_DELTA_FULL_EVERY = 3
+        self.GPT_DELTA_MAX_AGE = 14400  # 초
+        self.gpt_delta_prompt_count = 0
+        self.last_prompt_news_digest = None
+
+        # OpenAI 클라이언트 (봇 수명 동안 재사용, 연결 유지)
+        self.GPT_REQUEST_TIMEOUT = 300  # 시도당 제한 시간 (초)
+        self.GPT_MAX_RETRIES = 2
+        self.openai_client = None
+
+        # GPT 응답 스트리밍 (비동기 자문에서 추천/비율/신뢰도가 도착하면 근거를 기다리지 않고 거래)
+        self.USE_GPT_STREAMING = False
+
+        # 단계별 자문 결정 (로컬 점수로 명확한 관망은 GPT 없이 결정, 나머지는 점수에 따라 추론 강도 선택)
+        # 정기 점검과 보유 포지션 손익이 ±GPT_GATE_POSITION_RISK_PCT% 이상인 주기는 항상 GPT (마지막 단계)
+        self.USE_DECISION_GATE = False
+        self.GPT_DECISION_TIERS = [dict(tier) for tier in DEFAULT_TIERS]
+        self.GPT_GATE_POSITION_RISK_PCT = 3.0
+
+        # 선행 GPT 자문 (트리거 근접시 미리 요청, 발동시 유효하면 바로 사용)
+        self.USE_SPECULATIVE_GPT = False
+        self.GPT_SPECULATIVE_PROXIMITY = 0.8   # 트리거 임계값의 80% 이상 도달시 시작
+        self.GPT_SPECULATIVE_MAX_AGE = 900     # 선행 자문 유효 시간 (초)
+        self.GPT_SPECULATIVE_MAX_WASTED = 5    # 24시간 동안 버려도 되는 선행 호출 수
+        self.speculative_prefetcher = SpeculativePrefetcher(
+            max_age=self.GPT_SPECULATIVE_MAX_AGE, max_wasted=self.GPT_SPECULATIVE_MAX_WASTED
+        )
+
+        # API 키 사용 정보 초기화
+        self.init_api_key_usage()
+
+    def get_next_serpapi_key(self):
+        """개선된 다음 SerpAPI 키 선택 및 사용량 추적"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            
+            korean_time = datetime.now(self.timezone)
+            current_month = korean_time.month
+            current_year = korean_time.year
+            
+            # 월별 리셋 로직
+            cursor.execute('''
+            UPDATE serpapi_usage 
+            SET usage_count = 0, last_reset_month = ?, last_reset_year = ?
+            WHERE last_reset_month != ? OR last_reset_year != ?
+            ''', (current_month, current_year, current_month, current_year))
+            
+            # 각 키의 사용량 조회
+            cursor.execute('''
+            SELECT api_key, usage_count 
+            FROM serpapi_usage 
+            WHERE usage_count < 95
+            ORDER BY usage_count ASC
+            ''')
+            
+            available_keys = cursor.fetchall()
+            
+            if not available_keys:
+                print("모든 API 키의 사용량이 한도에 도달했습니다.")
+                return None
+            
+            selected_key = available_keys[0][0]
+            
+            # 선택된 키의 사용량 증가
+            cursor.execute('''
+            UPDATE serpapi_usage 
+            SET usage_count = usage_count + 1 
+            WHERE api_key = ?
+            ''', (selected_key,))
+            
+            conn.commit()
+            conn.close()
+            
+            print(f"선택된 API 키: {selected_key}")
+            return selected_key
+            
+        except Exception as e:
+            print(f"API 키 선택 중 오류: {e}")
+            return self.current_serpapi_key
+
+    def init_database_connection(self):
+        """데이터베이스 연결 초기화"""
+        try:
+            self.db_connection = sqlite3.connect(
+                self.db_path,
+                timeout=30,
+                check_same_thread=False
+            )
+            # WAL 모드 활성화로 성능 향상
+            self.db_connection.execute('PRAGMA journal_mode=WAL')
+        except Exception as e:
+            print(f"데이터베이스 연결 실패: {e}")
+            raise
+
+    def create_database(self):
+        """데이터베이스 및 테이블 생성 함수 수정"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            
+            # 기존 코드 유지
+            
+            # news_cache 테이블 추가
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS news_cache (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                news_content TEXT NOT NULL,
+                timestamp TEXT NOT NULL
+            )
+            """)
+            
+            # trade_log 테이블 추가 (추가적으로 필요할 수 있음)
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS trade_log (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                trade_type TEXT NOT NULL,
+                amount REAL NOT NULL,
+                price REAL NOT NULL,
+                timestamp TEXT NOT NULL,
+                confidence_score INTEGER,
+                reasoning TEXT,
+                rsi REAL,
+                volatility REAL,
+                strategy_type TEXT
+            )
+            """)
+
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS gpt_advice_log (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT NOT NULL,
+                trade_recommendation TEXT NOT NULL,
+                investment_percentage INTEGER NOT NULL,
+                confidence_score INTEGER NOT NULL,
+                reasoning TEXT,
+                market_state TEXT
+            )
+            """)
+
+            # 주기별 결정 단계 기록
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS decision_tier_log (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT NOT NULL,
+                tier TEXT NOT NULL,
+                score REAL NOT NULL,
+                components TEXT,
+                market_changed INTEGER,
+                force_check INTEGER
+            )
+            """)
+
+            # GPT 호출 지연/토큰 기록
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS gpt_call_log (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT NOT NULL,
+                model TEXT,
+                wall_time_ms REAL NOT NULL,
+                prompt_tokens INTEGER,
+                completion_tokens INTEGER,
+                cached_tokens INTEGER,
+                retries INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL,
+                error TEXT
+            )
+            """)
+
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS serpapi_usage (
+                api_key TEXT PRIMARY KEY,
+                usage_count INTEGER NOT NULL,
+                last_reset_month INTEGER NOT NULL,
+                last_reset_year INTEGER NOT NULL
+            )
+            """)
+
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS news_fetch_log (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                fetch_timestamp TEXT NOT NULL,
+                news_content TEXT NOT NULL,
+                keywords TEXT NOT NULL
+            )
+            """)
+
+            conn.commit()
+            conn.close()
+            
+        except Exception as e:
+            print(f"데이터베이스 생성 중 오류: {e}")
+            import traceback
+            traceback.print_exc()
+
+    def init_api_key_usage(self):
+        """초기 API 키 사용 정보 초기화"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            
+            korean_time = datetime.now(self.timezone)
+            
+            # 각 API 키에 대한 사용 정보 초기화
+            for api_key in [self.serpapi_key_1, self.serpapi_key_2]:
+                cursor.execute('''
+                INSERT OR REPLACE INTO serpapi_usage 
+                (api_key, usage_count, last_reset_month, last_reset_year) 
+                VALUES (?, ?, ?, ?)
+                ''', (
+                    api_key, 
+                    0, 
+                    korean_time.month, 
+                    korean_time.year
+                ))
+            
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            print(f"API 키 사용 정보 초기화 중 오류: {e}")
+        
+    #----------------
+    # 2. Data Management
+    #----------------
+    def get_historical_data(self, count=200):
+        """과거 거래 데이터 가져오기 (충분한 데이터 보장)"""
+        try:
+            # RSI 계산에 필요한 최소 데이터 수 고려
+            required_count = max(count, 50)  # RSI 계산을 위해 충분한 데이터 확보
+
+            # 로컬 캔들 저장소 사용 (새 캔들만 받아오고 구간은 로컬에서 조회)
+            if getattr(self, 'USE_CANDLE_STORE', False):
+                try:
+                    candle_store = self.get_candle_store()
+                    candle_store.sync(self.ticker, self.interval, min_count=required_count)
+                    df = candle_store.get_window(self.ticker, self.interval, count=required_count)
+                    if len(df) >= required_count:
+                        return df
+                    print(f"캔들 저장소 데이터 부족 ({len(df)}/{required_count}) - 직접 조회")
+                except Exception as e:
+                    print(f"캔들 저장소 조회 중 오류: {e} - 직접 조회")
+            
+            df = pyupbit.get_ohlcv(self.ticker, interval=self.interval, count=required_count)
+            if df is None or df.empty:
+                raise ValueError("데이터를 가져올 수 없습니다.")
+            return df
+        except Exception as e:
+            print(f"Historical data 조회 중 오류: {e}")
+            return None
+        
+    def refresh_cycle_snapshot(self):
+        """시세/잔고/평단가를 한 번에 조회하여 이번 주기 스냅샷으로 저장"""
+        try:
+            self.cycle_snapshot = fetch_cycle_snapshot(self.upbit, self.ticker, price_fn=self.price_fn)
+        except Exception as e:
+            print(f"시세/계좌 스냅샷 조회 중 오류: {e}")
+            self.cycle_snapshot = None
+        return self.cycle_snapshot
+
+    def invalidate_cycle_snapshot(self):
+        """주문 체결 후 스냅샷 무효화 (다음 조회시 새로 가져옴) 및 캐시된 매수/매도 자문 삭제"""
+        self.cycle_snapshot = None
+        if self.consultation_cache is not None:
+            self.consultation_cache.invalidate_trades()
+
+    def _resolve_snapshot(self, snapshot=None):
+        """전달받은 스냅샷 우선, 없으면 새로 조회"""
+        if snapshot is not None:
+            return snapshot
+        return self.refresh_cycle_snapshot()
+
+    def get_portfolio_status(self, snapshot=None):
+        try:
+            snapshot = self._resolve_snapshot(snapshot)
+            if snapshot is None:
+                raise ValueError("시세/계좌 스냅샷 없음")
+
+            krw_balance = snapshot.krw_balance
+            coin_balance = snapshot.coin_balance
+            current_price = snapshot.current_price
+            
+            coin_value = snapshot.coin_value
+            total_value = snapshot.total_value
+            
+            avg_buy_price = snapshot.avg_buy_price
+            roi = snapshot.roi
+            coin_ratio = snapshot.coin_ratio
+            
+            print(f"\n현재 포트폴리오 상태:")
+            print(f"KRW 잔고: {krw_balance:.2f}원")
+            print(f"BTC 잔고: {coin_balance:.8f}")
+            rounded_price = round(current_price / 100) * 100
+            print(f"현재 가격: {rounded_price:,.0f}원")
+            if avg_buy_price > 0:
+                print(f"평균 매수가: {avg_buy_price:.2f}원")
+            print(f"코인 가치: {coin_value:.2f}원")
+            print(f"총 자산: {total_value:.2f}원")
+            print(f"수익률: {roi:.2f}%")
+            print(f"코인 비중: {coin_ratio:.2f}%")
+            
+            return {
+                'krw_balance': krw_balance,
+                'coin_balance': coin_balance,
+                'current_price': current_price,
+                'avg_buy_price': avg_buy_price,
+                'coin_value': coin_value,
+                'total_value': total_value,
+                'roi': roi,
+                'coin_ratio': coin_ratio
+            }
+        except Exception as e:
+            print(f"포트폴리오 상태 조회 중 오류: {e}")
+            return None
+
+    def get_next_news_update_time(self, current_time):
+        """정해진 시간 (00, 04, 08, 12, 16, 20)의 다음 업데이트 시간 계산
+        
+        Args:
+            current_time (datetime): 현재 시간
+        
+        Returns:
+            datetime: 다음 업데이트 예정 시간
+        """
+        fixed_hours = [0, 4, 8, 12, 16, 20]
+        current_hour = current_time.hour
+        
+        # 현재 시간 이후의 다음 고정 시간 찾기
+        next_hour = next((h for h in fixed_hours if h > current_hour), fixed_hours[0])
+        
+        next_update = current_time.replace(
+            hour=next_hour,
+            minute=0,
+            second=0,
+            microsecond=0
+        )
+        
+        # 다음 시간이 현재 시간보다 이전이면 다음 날로 설정
+        if next_update <= current_time:
+            next_update += timedelta(days=1)
+        
+        return next_update
+
+    def fetch_BTC_news(self, num_articles=5, max_retries=3):
+        """개선된 뉴스 수집 함수"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            
+            current_time = datetime.now(self.timezone)
+            fixed_hours = [0, 4, 8, 12, 16, 20]
+            
+            # 마지막으로 저장된 뉴스 조회
+            cursor.execute('''
+            SELECT news_content, fetch_timestamp 
+            FROM news_fetch_log 
+            ORDER BY fetch_timestamp DESC 
+            LIMIT 1
+            ''')
+            
+            last_news = cursor.fetchone()
+            
+            if last_news:
+                last_fetch_time = datetime.strptime(
+                    last_news[1], 
+                    '%Y-%m-%d %H:%M:%S'
+                ).replace(tzinfo=self.timezone)
+                
+                # 현재 시간이 정해진 시간이 아닌 경우 캐시된 뉴스 반환
+                if current_time.hour not in fixed_hours:
+                    print(f"정해진 시간이 아님 - 마지막 업데이트: {last_fetch_time}")
+                    return last_news[0]
+                
+                # 마지막 업데이트가 현재 시간대와 같은 경우 캐시된 뉴스 반환
+                if (last_fetch_time.date() == current_time.date() and 
+                    last_fetch_time.hour == current_time.hour):
+                    print(f"이미 현재 시간대의 뉴스가 있음: {last_fetch_time}")
+                    return last_news[0]
+            
+            # 여기서부터는 새로운 뉴스를 가져오는 로직
+            default_keywords = ["BTC cryptocurrency OR BTC"]
+            keywords_to_use = getattr(self, 'news_keywords', default_keywords)
+            
+            # API 키 사용량 확인 및 초기화 로직
+            cursor.execute('''
+            SELECT api_key, usage_count, last_reset_month, last_reset_year
+            FROM serpapi_usage
+            WHERE usage_count < 95
+            ORDER BY usage_count ASC
+            ''')
+            
+            available_keys = cursor.fetchall()
+            
+            if not available_keys:
+                print("모든 API 키의 사용량이 한도에 도달했습니다.")
+                return self._get_cached_news(cursor)
+                
+            all_news = []
+            api_success = False
+            retry_count = 0
+            
+            while not api_success and retry_count < max_retries:
+                try:
+                    for api_key, current_usage, last_month, last_year in available_keys:
+                        # 월간 사용량 초기화 확인
+                        if (current_time.month != last_month or 
+                            current_time.year != last_year):
+                            cursor.execute('''
+                            UPDATE serpapi_usage
+                            SET usage_count = 0,
+                                last_reset_month = ?,
+                                last_reset_year = ?
+                            WHERE api_key = ?
+                            ''', (current_time.month, current_time.year, api_key))
+                            conn.commit()
+                            current_usage = 0
+                        
+                        if current_usage >= 95:
+                            continue
+                            
+                        print(f"\nAPI 키 시도: {api_key[:8]}... (현재 사용량: {current_usage})")
+                        
+                        success_with_current_key = False
+                        for keyword in keywords_to_use:
+                            try:
+                                params = {
+                                    "engine": "google_news",
+                                    "q": keyword,
+                                    "api_key": api_key,
+                                    "num": num_articles,
+                                    "gl": "us",
+                                    "hl": "en",
+                                    "time_period": "1h"  # 최근 4시간 뉴스로 제한
+                                }
+                                
+                                search = GoogleSearch(params)
+                                results = search.get_dict()
+                                
+                                if 'error' in results:
+                                    print(f"API 오류 ({api_key[:8]}...): {results['error']}")
+                                    continue
+                                
+                                if 'news_results' in results:
+                                    news_results = results['news_results']
+                                    if news_results:  # 결과가 있는 경우만 처리
+                                        news_count = len(news_results)
+                                        print(f"뉴스 검색 성공 (키: {api_key[:8]}...): {news_count}개 기사")
+                                        all_news.extend(news_results)
+                                        success_with_current_key = True
+                                        api_success = True
+                                        
+                                        # 성공한 API 키의 사용량 증가
+                                        cursor.execute('''
+                                        UPDATE serpapi_usage 
+                                        SET usage_count = usage_count + 1 
+                                        WHERE api_key = ?
+                                        ''', (api_key,))
+                                        conn.commit()
+                                        break
+                                    
+                            except Exception as e:
+                                print(f"키워드 '{keyword}' 검색 중 오류: {e}")
+                                continue
+                        
+                        if success_with_current_key:
+                            break
+                            
+                    if not api_success:
+                        retry_count += 1
+                        if retry_count < max_retries:
+                            print(f"\n재시도 {retry_count}/{max_retries}...")
+                            time.sleep(5)  # 재시도 전 5초 대기
+                        
+                except Exception as e:
+                    print(f"API 호출 중 오류: {e}")
+                    retry_count += 1
+                    if retry_count < max_retries:
+                        time.sleep(5)
+                    continue
+                    
+            if api_success:
+                # 뉴스 처리 및 저장
+                news_summary = self._process_news(all_news)
+                
+                try:
+                    # 기존 데이터 삭제
+                    cursor.execute('DELETE FROM news_fetch_log')
+                    
+                    # 새로운 뉴스 저장
+                    cursor.execute('''
+                    INSERT INTO news_fetch_log 
+                    (fetch_timestamp, news_content, keywords) 
+                    VALUES (?, ?, ?)
+                    ''', (
+                        current_time.strftime('%Y-%m-%d %H:%M:%S'),
+                        news_summary,
+                        ','.join(keywords_to_use)
+                    ))
+                    
+                    conn.commit()
+                    print(f"\n새로운 뉴스 수집 및 저장 완료 ({len(all_news)}개 기사)")
+                    return news_summary
+                    
+                except sqlite3.Error as e:
+                    print(f"데이터베이스 저장 중 오류: {e}")
+                    return self._get_cached_news(cursor)
+            else:
+                print("\n모든 API 키 시도 실패")
+                return self._get_cached_news(cursor)
+                
+        except Exception as e:
+            print(f"뉴스 수집 중 오류: {e}")
+            import traceback
+            traceback.print_exc()
+            if 'cursor' in locals():
+                return self._get_cached_news(cursor)
+            return "뉴스를 가져올 수 없습니다."
+            
+        finally:
+            if 'conn' in locals():
+                conn.close()
+
+    def _get_cached_news(self, cursor):
+        """캐시된 뉴스 조회"""
+        cursor.execute('''
+        SELECT news_content, fetch_timestamp 
+        FROM news_fetch_log 
+        ORDER BY fetch_timestamp DESC 
+        LIMIT 1
+        ''')
+        
+        result = cursor.fetchone()
+        if result:
+            news_content, timestamp = result
+            print(f"캐시된 뉴스 반환 (최종 업데이트: {timestamp})")
+            return news_content
+        return "뉴스를 가져올 수 없습니다."
+
+    def _fetch_news_with_key(self, api_key, num_articles):
+        """특정 API 키로 뉴스 수집"""
+        news_results = []
+        for keyword in self.news_keywords:
+            params = {
+                "engine": "google_news",
+                "q": keyword,
+                "api_key": api_key,
+                "num": num_articles
+            }
+            
+            search = GoogleSearch(params)
+            results = search.get_dict()
+            
+            if 'news_results' in results:
+                news_results.extend(results['news_results'])
+            
+        return news_results
+
+    def _process_news(self, news_results):
+        """뉴스 결과 처리"""
+        # 중복 제거
+        unique_news = {article.get('title', ''): article for article in news_results}
+        sorted_news = sorted(unique_news.values(), key=lambda x: x.get('date', ''), reverse=True)
+        
+        # 뉴스 요약 생성
+        news_summary = ""
+        for idx, article in enumerate(sorted_news, 1):
+            is_important = any(keyword.lower() in article.get('title', '').lower() 
+                             for keyword in ['sec', 'regulation', 'bitcoin'])
+            prefix = "🔥 " if is_important else ""
+            news_summary += f"{prefix}{idx}. {article.get('title', '')}\n"
+            news_summary += f"   {article.get('snippet', '')}\n\n"
+        
+        return news_summary
+
+    def update_news_cache(self, news_content):
+        """개선된 뉴스 캐시 업데이트"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+
+            korean_time = datetime.now(self.timezone)
+            
+            # 현재 시간이 정해진 시간인 경우에만 업데이트
+            if korean_time.hour in [0, 4, 8, 12, 16, 20]:
+                cursor.execute('''
+                INSERT INTO news_fetch_log 
+                (fetch_timestamp, news_content, keywords) 
+                VALUES (?, ?, ?)
+                ''', (
+                    korean_time.strftime('%Y-%m-%d %H:%M:%S'),
+                    news_content,
+                    ','.join(self.news_keywords)
+                ))
+                
+                print(f"뉴스 캐시 업데이트 완료: {korean_time}")
+            else:
+                print(f"정해진 시간이 아니므로 뉴스 캐시 업데이트 건너뜀: {korean_time}")
+            
+            conn.commit()
+            
+        except sqlite3.Error as e:
+            print(f"뉴스 캐시 업데이트 중 SQLite 오류: {e}")
+        except Exception as e:
+            print(f"뉴스 캐시 업데이트 중 오류: {e}")
+        finally:
+            if 'conn' in locals():
+                conn.close()
+
+    def load_cached_news(self):
+        """개선된 캐시된 뉴스 로드"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+            SELECT news_content, fetch_timestamp 
+            FROM news_fetch_log 
+            ORDER BY fetch_timestamp DESC 
+            LIMIT 1
+            ''')
+            
+            result = cursor.fetchone()
+            
+            if result:
+                cached_news, timestamp_str = result
+                print(f"캐시된 뉴스 로드 (최종 업데이트: {timestamp_str})")
+                return cached_news
+            
+            return None
+            
+        except sqlite3.Error as e:
+            print(f"캐시된 뉴스 로드 중 SQLite 오류: {e}")
+            return None
+        except Exception as e:
+            print(f"캐시된 뉴스 로드 중 오류: {e}")
+            return None
+        finally:
+            if 'conn' in locals():
+                conn.close()
+
+    def log_trade(self, trade_type, amount, price, confidence_score, reasoning, rsi, volatility, strategy_type):
+        """거래 로깅 개선 및 디버깅 기능 추가"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+
+            korean_time = self.clock.now(self.timezone)
+            timestamp = korean_time.strftime('%Y-%m-%d %H:%M:%S')
+            
+            # 디버그 출력
+            print(f"\n=== 거래 로깅 디버그 ===")
+            print(f"시간: {timestamp}")
+            print(f"거래 유형: {trade_type}")
+            print(f"거래량: {amount}")
+            print(f"가격: {price}")
+            print(f"신뢰도: {confidence_score}")
+            
+            cursor.execute('''
+            INSERT INTO trade_log 
+            (trade_type, amount, price, timestamp, confidence_score, reasoning, rsi, volatility, strategy_type) 
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                str(trade_type),  # 문자열 타입 보장
+                float(amount),    # 실수 타입 보장
+                float(price),     # 실수 타입 보장
+                timestamp,
+                int(confidence_score) if confidence_score else 0,  # NULL 처리
+                str(reasoning) if reasoning else '',
+                float(rsi) if rsi else 0.0,
+                float(volatility) if volatility else 0.0,
+                str(strategy_type) if strategy_type else '미정'
+            ))
+            
+            conn.commit()
+            
+            # 저장 확인
+            cursor.execute('''
+            SELECT * FROM trade_log WHERE timestamp = ? ORDER BY id DESC LIMIT 1
+            ''', (timestamp,))
+            
+            result = cursor.fetchone()
+            if result:
+                print("\n✅ 거래 기록 저장 완료:")
+                print(f"ID: {result[0]}")
+                print(f"저장된 거래 유형: {result[1]}")
+                print(f"저장된 거래량: {result[2]}")
+            else:
+                print("❌ 거래 기록 확인 실패")
+                
+            return True
+
+        except Exception as e:
+            print(f"❌ 거래 로깅 오류: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            return False
+            
+        finally:
+            if 'conn' in locals():
+                conn.close()
+        
+    def get_recent_gpt_advice(self, limit=5):
+        """최근 GPT 자문 내역 조회 함수 개선"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+            SELECT 
+                timestamp,
+                trade_recommendation,
+                investment_percentage,
+                confidence_score,
+                reasoning,
+                market_state
+            FROM gpt_advice_log
+            ORDER BY timestamp DESC
+            LIMIT ?
+            ''', (limit,))
+            
+            results = cursor.fetchall()
+            
+            # 결과를 딕셔너리 리스트로 변환
+            advice_list = []
+            for row in results:
+                try:
+                    market_state = json.loads(row[5]) if row[5] else None
+                except json.JSONDecodeError:
+                    market_state = None
+                
+                advice_list.append({
+                    'timestamp': row[0],
+                    'trade_recommendation': row[1],
+                    'investment_percentage': row[2],
+                    'confidence_score': row[3],
+                    'reasoning': row[4],
+                    'market_state': market_state
+                })
+            
+            print(f"\n최근 {len(advice_list)}개의 GPT 자문 기록 조회됨")
+            for advice in advice_list:
+                print(f"시간: {advice['timestamp']}")
+                print(f"추천: {advice['trade_recommendation']}")
+                print(f"신뢰도: {advice['confidence_score']}%")
+                print("---")
+            
+            return advice_list
+                
+        except Exception as e:
+            print(f"GPT 자문 내역 조회 중 오류: {e}")
+            import traceback
+            traceback.print_exc()
+            return []
+            
+        finally:
+            if 'conn' in locals():
+                conn.close()
+    
+    def get_recent_trades(self, limit=5):
+        """최근 거래 내역 조회 개선"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            
+            # 컬럼 존재 여부 확인 없이 바로 조회
+            cursor.execute('''
+            SELECT 
+                trade_type,
+                amount,
+                price,
+                timestamp,
+                confidence_score,
+                reasoning,
+                rsi,
+                volatility,
+                strategy_type
+            FROM trade_log
+            WHERE trade_type != 'hold'
+            ORDER BY timestamp DESC
+            LIMIT ?
+            ''', (limit,))
+            
+            trades = cursor.fetchall()
+            conn.close()
+            
+            return trades
+        except Exception as e:
+            print(f"거래 내역 조회 중 오류: {e}")
+            return []
+
+    def get_recent_trades_volume(self, hours=24):
+        """최근 거래량 집계"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            
+            time_threshold = (self.clock.now(self.timezone) - timedelta(hours=hours)).strftime('%Y-%m-%d %H:%M:%S')
+            
+            cursor.execute('''
+            SELECT trade_type, SUM(amount) as total_amount
+            FROM trade_log
+            WHERE timestamp > ? AND trade_type IN ('buy', 'sell')
+            GROUP BY trade_type
+            ''', (time_threshold,))
+            
+            results = cursor.fetchall()
+            trades = {row[0]: row[1] for row in results}
+            
+            # 총 거래 비율 계산
+            portfolio = self.get_portfolio_status()
+            total_assets = portfolio['total_value']
+            total_traded = sum(trades.values())
+            
+            return {
+                'buy_volume': trades.get('buy', 0),
+                'sell_volume': trades.get('sell', 0),
+                'total_ratio': total_traded / total_assets if total_assets > 0 else 0
+            }
+            
+        except Exception as e:
+            print(f"거래량 집계 중 오류: {e}")
+            return {'buy_volume': 0, 'sell_volume': 0, 'total_ratio': 0}
+        finally:
+            conn.close()
+
+    def get_recent_trading_summary(self, days=7):
+        """최근 거래 요약"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            
+            korean_time = datetime.now(self.timezone)
+            past_date = (korean_time - timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
+            
+            cursor.execute('''
+            SELECT 
+                COUNT(CASE WHEN trade_type = 'buy' THEN 1 END) as buy_count,
+                COUNT(CASE WHEN trade_type = 'sell' THEN 1 END) as sell_count,
+                AVG(CASE WHEN trade_type != 'hold' THEN confidence_score END) as avg_confidence
+            FROM trade_log 
+            WHERE timestamp > ? AND trade_type != 'hold'
+            ''', (past_date,))
+            
+            result = cursor.fetchone()
+            buy_count, sell_count, avg_confidence = result
+            
+            return {
+                'period_days': days,
+                'buy_count': buy_count or 0,
+                'sell_count': sell_count or 0,
+                'avg_confidence': avg_confidence or 0
+            }
+        except Exception as e:
+            print(f"거래 요약 조회 중 오류: {e}")
+            return None
+        finally:
+            conn.close()
+
+    def get_gpt_advice_history(self, limit=1, formatted=False):
+        """GPT 자문 내역을 조회하는 통합 함수
+        
+        Args:
+            limit (int): 조회할 최근 자문 개수 (기본값: 1)
+            formatted (bool): 프롬프트용 포맷팅 여부 (기본값: False)
+            
+        Returns:
+            str: 자문 내역 문자열
+        """
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            
+            # 최근 자문 데이터 조회
+            cursor.execute('''
+            SELECT 
+                timestamp,
+                trade_recommendation,
+                investment_percentage,
+                confidence_score,
+                reasoning,
+                market_state
+            FROM gpt_advice_log
+            ORDER BY timestamp DESC
+            LIMIT ?
+            ''', (limit,))
+            
+            results = cursor.fetchall()
+            if not results:
+                return "자문 내역이 없습니다."
+                
+            if formatted:
+                # 프롬프트용 포맷
+                advice_history = "이전 자문 내역:\n"
+                for idx, result in enumerate(results, 1):
+                    timestamp_str, recommendation, investment, confidence, reasoning, market_state = result
+                    
+                    # 한국 시간대로 시간 변환
+                    advice_time = datetime.strptime(timestamp_str, '%Y-%m-%d %H:%M:%S')
+                    advice_time = advice_time.replace(tzinfo=self.timezone)
+                    current_time = self.clock.now(self.timezone)
+                    minutes_passed = (current_time - advice_time).total_seconds() / 60
+                    
+                    # 시장 상태 파싱
+                    market_status = ""
+                    if market_state:
+                        try:
+                            market_data = json.loads(market_state)
+                            market_status = f"""
+                            - 당시 시장 상황:
+                            * 가격: {market_data.get('price', 'N/A'):,.0f}원
+                            * RSI: {market_data.get('rsi', 'N/A'):.1f}
+                            * 변동성: {market_data.get('volatility', 'N/A'):.1f}%
+                            * EMA: {market_data.get('ema_status', 'N/A')}
+                            * 모멘텀: {market_data.get('momentum', 'N/A')*100:.1f}%
+                            * 볼린저밴드: {market_data.get('bollinger_position', 'N/A')}
+                            """
+                        except json.JSONDecodeError:
+                            market_status = "  (시장 상태 데이터 없음)"
+                    
+                    advice_history += f"""
+                    {idx}. {int(minutes_passed)}분 전 당신의 자문:
+                    - 추천: {recommendation}
+                    - 투자비율: {investment}%
+                    - 신뢰도: {confidence}%
+                    - 근거: {reasoning}
+                    {market_status}
+                    """
+                return advice_history
+            else:
+                # 일반 포맷
+                result = results[0]  # limit=1일 때의 결과
+                timestamp_str, recommendation, investment, confidence, reasoning, market_state = result
+                
+                # 한국 시간대로 시간 변환
+                advice_time = datetime.strptime(timestamp_str, '%Y-%m-%d %H:%M:%S')
+                advice_time = advice_time.replace(tzinfo=self.timezone)
+                current_time = self.clock.now(self.timezone)
+                minutes_passed = (current_time - advice_time).total_seconds() / 60
+                
+                # 시장 상태 파싱
+                if market_state:
+                    try:
+                        market_data = json.loads(market_state)
+                        market_status = f"""
+                        시장 상황:
+                        - 가격: {market_data.get('price', 'N/A'):,.0f}원
+                        - RSI: {market_data.get('rsi', 'N/A'):.1f}
+                        - 변동성: {market_data.get('volatility', 'N/A'):.1f}%
+                        - EMA 상태: {market_data.get('ema_status', 'N/A')}
+                        - 모멘텀: {market_data.get('momentum', 'N/A')*100:.1f}%
+                        - 볼린저밴드: {market_data.get('bollinger_position', 'N/A')}
+                        """
+                    except json.JSONDecodeError:
+                        market_status = "시장 상태 데이터 파싱 실패"
+                else:
+                    market_status = "시장 상태 정보 없음"
+                
+                return f"""
+                마지막 GPT 자문 (약 {minutes_passed:.0f}분 전):
+                - 추천: {recommendation}
+                - 투자비율: {investment}%
+                - 신뢰도: {confidence}%
+                - 근거: {reasoning}
+                
+                {market_status}
+                """
+                
+        except Exception as e:
+            print(f"자문 내역 조회 중 오류: {e}")
+            return "자문 내역 조회 실패"
+            
+        finally:
+            if 'conn' in locals():
+                conn.close()
+
+    #----------------
+    # 3. Technical Analysis
+    #----------------
+    def get_cached_indicator(self, name, series, params, compute_fn):
+        """지표 캐시 조회 (같은 캔들 스냅샷에서는 한 번만 계산)
+
+        Args:
+            name (str): 지표 이름
+            series: 계산 기준 시리즈 (pandas Series 또는 numpy 배열)
+            params (tuple): 지표 파라미터
+            compute_fn (callable): 캐시 미스시 호출할 계산 함수
+
+        Returns:
+            계산된 지표 (호출측에서 수정하지 말 것)
+        """
+        key = self.indicator_cache.make_key(self.ticker, self.interval, series, name, params)
+        return self.indicator_cache.get_or_compute(key, compute_fn)
+
+    def get_rsi(self, prices, periods=14):
+        """캐시된 RSI"""
+        return self.get_cached_indicator(
+            'rsi', prices, (periods,),
+            lambda: self.calculate_rsi(prices, periods)
+        )
+
+    def get_ema(self, prices, span):
+        """캐시된 EMA (adjust=False)"""
+        return self.get_cached_indicator(
+            'ema', prices, (span,),
+            lambda: prices.ewm(span=span, adjust=False).mean()
+        )
+
+    def get_rolling_mean_std(self, prices, window):
+        """캐시된 이동평균 및 이동표준편차"""
+        return self.get_cached_indicator(
+            'rolling_mean_std', prices, (window,),
+            lambda: (prices.rolling(window=window).mean(), prices.rolling(window=window).std())
+        )
+
+    def get_rolling_mean(self, values, window):
+        """캐시된 이동평균"""
+        return self.get_cached_indicator(
+            'rolling_mean', values, (window,),
+            lambda: values.rolling(window=window).mean()
+        )
+
+    def get_average_true_range(self, data, window=10):
+        """마지막 캔들 기준 TR 이동평균 (캔들 수가 window보다 적으면 NaN)"""
+        high = data['high'].to_numpy(dtype=float)
+        low = data['low'].to_numpy(dtype=float)
+        prev_close = np.append(np.nan, data['close'].to_numpy(dtype=float)[:-1])
+        true_range = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+        if len(true_range) < window:
+            return np.nan
+        return float(true_range[-window:].mean())
+
+    def get_return_volatility(self, prices, window=20):
+        """캐시된 수익률 이동표준편차"""
+        return self.get_cached_indicator(
+            'return_volatility', prices, (window,),
+            lambda: prices.pct_change().rolling(window=window).std()
+        )
+
+    def update_streaming_indicators(self, data):
+        """증분 지표 엔진에 최신 캔들 반영
+
+        Args:
+            data (pd.DataFrame): get_historical_data()가 반환한 OHLCV 데이터
+
+        Returns:
+            dict: 진행 중 캔들 기준 지표 스냅샷 (실패시 None)
+        """
+        try:
+            return self.streaming_indicators.sync(data)
+        except Exception as e:
+            print(f"증분 지표 갱신 중 오류: {e}")
+            self.streaming_indicators.reset()
+            return None
+
+    def _streaming_ema_ribbon(self, snapshot, periods=[5, 10, 20, 30, 50]):
+        """증분 스냅샷을 analyze_ema_ribbon 입력 형식(직전/현재 2행)으로 변환"""
+        ema_ribbon = pd.DataFrame([
+            {f'EMA_{period}': snapshot['ema_prev'][period] for period in periods},
+            {f'EMA_{period}': snapshot['ema'][period] for period in periods}
+        ])
+        return ema_ribbon, snapshot['ema'][200]
+
+    def calculate_ema_ribbon(self, data, periods=[5, 10, 20, 30, 50]):
+        """EMA Ribbon 계산"""
+        return pd.DataFrame({f'EMA_{period}': self.get_ema(data['close'], period) for period in periods})
+
+    def calculate_ema_200(self, data):
+        """200 기간 EMA 계산"""
+        return self.get_ema(data['close'], 200).iloc[-1]
+
+    def calculate_rsi(self, prices, periods=14):
+        """
+        Pine Script 스타일의 RSI 계산 함수
+        
+        Args:
+            prices: 가격 데이터 (pandas Series 또는 numpy 배열)
+            periods: RSI 계산 기간 (기본값: 14)
+
+        Returns:
+            RSI 값을 담은 pandas Series (numpy 배열 입력시 numpy 배열)
+        """
+        is_series = isinstance(prices, pd.Series)
+
+        def _wrap(values):
+            return pd.Series(values, index=prices.index) if is_series else values
+
+        try:
+            # 필요한 데이터 포인트 수 확인
+            if len(prices) < periods + 1:
+                print(f"RSI 계산을 위한 충분한 데이터가 없습니다. (필요: {periods + 1}, 현재: {len(prices)})")
+                return _wrap(np.full(len(prices), 50.0))  # 기본값 50 반환
+
+            values = np.asarray(prices, dtype=float)
+
+            # 가격 변화 계산 (Pine Script의 change(close)와 동일)
+            changes = np.empty_like(values)
+            changes[0] = np.nan
+            changes[1:] = values[1:] - values[:-1]
+
+            # gain = change >= 0 ? change : 0.0
+            gains = np.where(changes < 0, 0.0, changes)
+
+            # loss = change < 0 ? (-1) * change : 0.0
+            losses = np.abs(np.where(changes > 0, 0.0, changes))
+
+            # avgGain = rma(gain, 14), avgLoss = rma(loss, 14)
+            avg_gains = self._wilder_rma(gains, periods)
+            avg_losses = self._wilder_rma(losses, periods)
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                # rs = avgGain / avgLoss
+                rs = avg_gains / avg_losses
+
+                # rsi = 100 - (100 / (1 + rs))
+                rsi = 100 - (100 / (1 + rs))
+
+            # 무한값 및 NaN 처리 (NaN값은 50으로 채움)
+            rsi[~np.isfinite(rsi)] = 50.0
+
+            return _wrap(np.clip(rsi, 0, 100))  # 0-100 범위로 제한
+
+        except Exception as e:
+            print(f"RSI 계산 중 오류 발생: {str(e)}")
+            return _wrap(np.full(len(prices), 50.0))  # 오류 발생 시 기본값 50 반환
+
+    def _wilder_rma(self, values, periods, block_size=64):
+        """Pine Script rma()를 numpy로 계산 (SMA 시드 후 Wilder 평활)
+
+        rma[t] = (x[t] + (n-1) * rma[t-1]) / n 점화식을 블록 단위 누적합
+        닫힌 해로 풀어서 막대마다 도는 파이썬 루프를 없앰.
+        블록 크기는 decay^-k 항이 커지지 않도록 제한함.
+
+        Args:
+            values (np.ndarray): 입력 값 (gains 또는 losses, 0번째는 NaN)
+            periods (int): 평활 기간
+            block_size (int): 한 번에 계산할 블록 길이
+
+        Returns:
+            np.ndarray: periods 이전은 NaN, periods 위치는 SMA 시드
+        """
+        if periods <= 1:
+            # 기간 1이면 평활 없이 입력값 그대로 (decay가 0이 되어 d^-j로 나눌 수 없음)
+            return np.array(values, dtype=float)
+
+        n = len(values)
+        result = np.full(n, np.nan)
+        if n <= periods:
+            return result
+
+        # 첫 번째 평균값 (1 ~ periods 구간의 단순 평균)
+        result[periods] = np.nanmean(values[1:periods + 1])
+
+        alpha = 1.0 / periods
+        decay = 1.0 - alpha
+        powers = decay ** np.arange(1, block_size + 1)
+
+        # 블록 내에서 y_k = d^k * (y_0 + alpha * sum_{j<=k} x_j * d^-j)
+        prev = result[periods]
+        start = periods + 1
+        while start < n:
+            chunk = values[start:start + block_size]
+            p = powers[:len(chunk)]
+            segment = p * (prev + np.cumsum(alpha * chunk / p))
+            result[start:start + len(chunk)] = segment
+            prev = segment[-1]
+            start += len(chunk)
+
+        return result
+
+    def calculate_cci(self, high, low, close, periods=14):
+        """CCI 계산"""
+        tp = (high + low + close) / 3
+        tp_sma = tp.rolling(window=periods).mean()
+        mad = tp.rolling(window=periods).apply(lambda x: np.abs(x - x.mean()).mean())
+        cci = (tp - tp_sma) / (0.015 * mad)
+        return cci
+    
+    def calculate_roc(self, close, periods=14):
+        """ROC 계산"""
+        return close.pct_change(periods=periods) * 100
+
+    def normalize_volume(self, volume, window=14):
+        """거래량 정규화"""
+        try:
+            if len(volume) < window:
+                raise ValueError(f"데이터가 부족합니다. 필요: {window}, 실제: {len(volume)}")
+                
+            rolling_max = volume.rolling(window=window).max()
+            rolling_min = volume.rolling(window=window).min()
+            
+            # 분모가 0이 되는 경우 처리
+            denominator = rolling_max - rolling_min
+            denominator = denominator.replace(0, 1)  # 0을 1로 대체
+            
+            normalized = 99 * (volume - rolling_min) / denominator
+            
+            # NaN 값 처리
+            normalized = normalized.fillna(method='ffill').fillna(50)
+            
+            # 범위를 벗어난 값 클리핑
+            normalized = normalized.clip(0, 100)
+            
+            return normalized
+
+        except Exception as e:
+            print(f"거래량 정규화 중 오류 발생: {str(e)}")
+            return pd.Series(index=volume.index)  # 빈 시리즈 반환
+    
+    def calculate_bollinger_bands(self, data):
+        """볼린저 밴드 계산"""
+        # 중심선 (20일 이동평균) 및 표준편차
+        bb_middle, bb_std = self.get_rolling_mean_std(data['close'], self.BOLLINGER_PERIOD)
+        
+        # 상단/하단 밴드 (열을 한 번에 붙여 데이터프레임 복사를 한 번으로 줄임)
+        bands = pd.DataFrame({
+            'bb_middle': bb_middle,
+            'bb_upper': bb_middle + (bb_std * self.BOLLINGER_STD),
+            'bb_lower': bb_middle - (bb_std * self.BOLLINGER_STD)
+        }, index=data.index)
+        
+        return pd.concat([data, bands], axis=1)
+
+    def calculate_momentum(self, data, period=10):
+        """모멘텀 지표 계산
+        
+        Args:
+            data (pd.DataFrame): OHLCV 데이터
+            period (int): 모멘텀 계산 기간 (기본값: 10)
+            
+        Returns:
+            float: 현재 모멘텀 값 (백분율)
+        """
+        try:
+            if len(data) < period + 1:
+                print(f"모멘텀 계산을 위한 충분한 데이터가 없습니다. 필요: {period + 1}, 현재: {len(data)}")
+                return 0.0
+                
+            # 현재 가격과 n기간 전 가격
+            current_price = float(data['close'].iloc[-1])
+            past_price = float(data['close'].iloc[-period-1])
+            
+            # 모멘텀 계산 (백분율)
+            momentum = ((current_price - past_price) / past_price)
+            
+            # 디버깅 정보 출력
+            print(f"\n모멘텀 계산 디버그:")
+            print(f"현재 가격: {current_price:,.0f}")
+            print(f"과거 가격({period}기간 전): {past_price:,.0f}")
+            print(f"모멘텀: {momentum*100:.2f}%")
+            
+            return momentum
+            
+        except Exception as e:
+            print(f"모멘텀 계산 중 오류: {e}")
+            return 0.0
+
+    def calculate_stoch_rsi(self, data, period=14, smoothK=3, smoothD=3):
+        """
+        수정된 Stochastic RSI 계산 함수
+        
+        Args:
+            data (pd.Series): 가격 데이터
+            period (int): RSI 및 Stoch RSI 계산 기간 (기본값: 14)
+            smoothK (int): K 라인 스무딩 기간 (기본값: 3)
+            smoothD (int): D 라인 스무딩 기간 (기본값: 3)
+            
+        Returns:
+            tuple: (K 라인, D 라인)
+        """
+        try:
+            # 충분한 데이터가 있는지 확인
+            if len(data) < period + smoothK + smoothD:
+                print(f"Stoch RSI 계산을 위한 충분한 데이터가 없습니다. 필요: {period + smoothK + smoothD}, 현재: {len(data)}")
+                return pd.Series(50, index=data.index), pd.Series(50, index=data.index)
+
+            # 기본 RSI 계산
+            rsi = self.get_rsi(data)
+            if not isinstance(rsi, pd.Series):
+                rsi = pd.Series(rsi)
+
+            # 이전 period 기간 동안의 RSI 범위를 롤링 윈도우로 한 번에 계산
+            rsi_values = rsi.to_numpy(dtype=float)
+            high = np.full(len(rsi_values), np.nan)
+            low = np.full(len(rsi_values), np.nan)
+            windows = np.lib.stride_tricks.sliding_window_view(rsi_values, period)
+            high[period - 1:] = windows.max(axis=1)
+            low[period - 1:] = windows.min(axis=1)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                raw_k = 100 * (rsi_values - low) / (high - low)
+
+            # 분모가 0인 경우 처리 (RSI 최고값과 최저값이 같은 경우 중간값 사용)
+            raw_k = np.where(high != low, raw_k, 50.0)
+
+            # 기존과 동일하게 period 번째 막대부터 K값 산출
+            raw_k[:period] = np.nan
+
+            # K% 스무딩 및 D% 계산
+            k_line = self._rolling_nanmean(raw_k, smoothK)
+            d_line = self._rolling_nanmean(k_line, smoothD)
+
+            # NaN 값 처리 및 0-100 범위로 제한
+            stoch_values = self._forward_fill(np.column_stack([k_line, d_line]))
+            stoch_values = np.clip(np.nan_to_num(stoch_values, nan=50.0), 0, 100)
+            stoch_rsi = pd.DataFrame(stoch_values, index=data.index, columns=['K', 'D'])
+            
+            # 디버깅 정보 출력 (STOCH_RSI_DEBUG 설정시에만)
+            if getattr(self, 'STOCH_RSI_DEBUG', False):
+                self._print_stoch_rsi_debug(rsi, stoch_rsi, period, smoothK, smoothD)
+            
+            return stoch_rsi['K'], stoch_rsi['D']
+
+        except Exception as e:
+            print(f"Stoch RSI 계산 중 오류: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            return pd.Series(50, index=data.index), pd.Series(50, index=data.index)
+
+    @staticmethod
+    def _rolling_nanmean(values, window):
+        """rolling(window, min_periods=1).mean()과 같은 이동평균 (NaN 제외, 모두 NaN이면 NaN)"""
+        padded = np.concatenate([np.full(window - 1, np.nan), values])
+        windows = np.lib.stride_tricks.sliding_window_view(padded, window)
+        counts = (~np.isnan(windows)).sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(counts > 0, np.nansum(windows, axis=1) / counts, np.nan)
+
+    def _print_stoch_rsi_debug(self, rsi, stoch_rsi, period, smoothK, smoothD):
+        """Stoch RSI 디버깅 정보 출력"""
+        last_k = stoch_rsi['K'].iloc[-1]
+        last_d = stoch_rsi['D'].iloc[-1]
+        last_rsi = rsi.iloc[-1]
+        print(f"\nStoch RSI 디버그 정보:")
+        print(f"기준 RSI: {last_rsi:.2f}")
+        last_period_rsi = rsi.tail(period)
+        print(f"최근 {period}기간 RSI 범위: {last_period_rsi.min():.2f} - {last_period_rsi.max():.2f}")
+        print(f"K값: {last_k:.2f} (최근 {smoothK}기간 평균)")
+        print(f"D값: {last_d:.2f} (최근 {smoothD}기간 평균)")
+
+        if last_k <= 20:
+            print("과매도 구간 (K ≤ 20)")
+        elif last_k >= 80:
+            print("과매수 구간 (K ≥ 80)")
+
+        prev_k = stoch_rsi['K'].iloc[-2]
+        prev_d = stoch_rsi['D'].iloc[-2]
+        if prev_k < prev_d and last_k > last_d:
+            print("K선이 D선을 상향돌파 (매수신호)")
+        elif prev_k > prev_d and last_k < last_d:
+            print("K선이 D선을 하향돌파 (매도신호)")
+
+    def calculate_indicators(self, data):
+        """통합 지표 계산 및 분석 결과 포맷팅"""
+        try:
+            if data is None or len(data) == 0:
+                print("데이터가 없거나 비어있습니다.")
+                return None
+                
+            # 데이터 복사 및 유효성 확인
+            df = data.copy()
+            
+            analysis_results = {}
+
+            # 현재 가격 계산
+            try:
+                current_price = float(df['close'].iloc[-1])
+                if pd.isna(current_price):
+                    raise ValueError("현재 가격이 NaN입니다")
+                analysis_results['current_price'] = current_price
+                print(f"\nCurrent Price: {current_price}")
+            except Exception as e:
+                print(f"현재 가격 추출 중 오류: {e}")
+                return None
+
+            # 증분 지표 엔진 갱신 (사용 설정시)
+            streaming = None
+            if getattr(self, 'USE_STREAMING_INDICATORS', False):
+                streaming = self.update_streaming_indicators(df)
+
+            # KNN 예측
+            try:
+                prediction, confidence = self.predict_next_move(df)
+                analysis_results['knn_prediction'] = prediction
+                analysis_results['knn_signal_strength'] = confidence
+                print(f"KNN 예측: {prediction}, 신뢰도: {confidence}")
+            except Exception as e:
+                print(f"KNN 예측 중 오류: {e}")
+                analysis_results['knn_prediction'] = 0
+                analysis_results['knn_signal_strength'] = 0
+
+            # RSI 계산 부분 수정
+            try:
+                if streaming is not None:
+                    analysis_results['rsi'] = float(streaming['rsi'])
+                    analysis_results['stoch_rsi_k'] = float(streaming['stoch_rsi_k'])
+                    analysis_results['stoch_rsi_d'] = float(streaming['stoch_rsi_d'])
+                    print(f"RSI: {analysis_results['rsi']}, Stoch RSI K: {analysis_results['stoch_rsi_k']:.1f}, D: {analysis_results['stoch_rsi_d']:.1f} (증분)")
+                else:
+                    close_series = df['close']
+                    rsi = self.get_rsi(close_series)
+                    if rsi is not None and len(rsi) > 0:
+                        analysis_results['rsi'] = float(rsi.iloc[-1])
+                    
+                        # Stoch RSI 계산 추가
+                        stoch_k, stoch_d = self.get_cached_indicator(
+                            'stoch_rsi', close_series, (14, 3, 3),
+                            lambda: self.calculate_stoch_rsi(close_series)
+                        )
+                        analysis_results['stoch_rsi_k'] = float(stoch_k.iloc[-1])
+                        analysis_results['stoch_rsi_d'] = float(stoch_d.iloc[-1])
+                        print(f"RSI: {analysis_results['rsi']}, Stoch RSI K: {analysis_results['stoch_rsi_k']:.1f}, D: {analysis_results['stoch_rsi_d']:.1f}")
+                    else:
+                        analysis_results['rsi'] = 50.0
+                        analysis_results['stoch_rsi_k'] = 50.0
+                        analysis_results['stoch_rsi_d'] = 50.0
+                        print("RSI 계산 실패, 기본값 50.0 사용")
+            except Exception as e:
+                print(f"RSI 계산 중 오류: {e}")
+                analysis_results['rsi'] = 50.0
+                analysis_results['stoch_rsi_k'] = 50.0
+                analysis_results['stoch_rsi_d'] = 50.0
+
+            # EMA Ribbon 계산
+            try:
+                if streaming is not None:
+                    ema_ribbon, ema_200 = self._streaming_ema_ribbon(streaming)
+                else:
+                    ema_ribbon = self.calculate_ema_ribbon(df)
+                    ema_200 = self.calculate_ema_200(df)
+                ema_status = self.analyze_ema_ribbon(ema_ribbon, current_price, ema_200)
+                analysis_results['ema_ribbon_status'] = ema_status['status']
+                analysis_results['ema_ribbon_status_num'] = ema_status['status_num']
+                print(f"EMA Status: {ema_status['status']} (레벨: {ema_status['status_num']})")
+            except Exception as e:
+                print(f"EMA 계산 중 오류: {e}")
+                analysis_results['ema_ribbon_status'] = "중립"
+                analysis_results['ema_ribbon_status_num'] = 2  # 중립 상태를 2로 설정
+
+            # 볼린저 밴드 계산
+            try:
+                if streaming is not None:
+                    bb_upper = float(streaming['bb_upper'])
+                    bb_middle = float(streaming['bb_middle'])
+                    bb_lower = float(streaming['bb_lower'])
+                else:
+                    bb_df = self.calculate_bollinger_bands(df)
+                    bb_upper = float(bb_df['bb_upper'].iloc[-1])
+                    bb_middle = float(bb_df['bb_middle'].iloc[-1])
+                    bb_lower = float(bb_df['bb_lower'].iloc[-1])
+                
+                analysis_results['bb_upper'] = bb_upper
+                analysis_results['bb_middle'] = bb_middle
+                analysis_results['bb_lower'] = bb_lower
+                
+                # 상단과 중간, 중간과 하단 사이의 간격을 3등분
+                upper_third = bb_upper - ((bb_upper - bb_middle) * 0.33)
+                lower_third = bb_lower + ((bb_middle - bb_lower) * 0.33)
+                
+                # 세분화된 위치 판단
+                if current_price >= bb_upper:
+                    bollinger_position = 5  # extreme_upper
+                elif current_price >= upper_third:
+                    bollinger_position = 4  # upper_strong
+                elif current_price >= bb_middle:
+                    bollinger_position = 3  # upper_weak
+                elif current_price >= lower_third:
+                    bollinger_position = 2  # lower_weak
+                elif current_price >= bb_lower:
+                    bollinger_position = 1  # lower_strong
+                else:
+                    bollinger_position = 0  # extreme_lower
+                    
+                # 숫자를 문자열로 매핑
+                position_mapping = {
+                    5: 'extreme_upper',
+                    4: 'upper_strong',
+                    3: 'upper_weak',
+                    2: 'lower_weak',
+                    1: 'lower_strong',
+                    0: 'extreme_lower'
+                }
+                
+                # 추가적인 볼린저 밴드 정보 계산
+                band_width = ((bb_upper - bb_lower) / bb_middle) * 100  # 밴드폭
+                price_position = ((current_price - bb_lower) / (bb_upper - bb_lower)) * 100  # 상대적 위치
+                
+                # 숫자와 문자열 모두 저장
+                analysis_results['bollinger_position_num'] = bollinger_position
+                analysis_results['bollinger_position'] = position_mapping[bollinger_position]
+                analysis_results['band_width'] = band_width
+                analysis_results['band_position_percentage'] = price_position
+                
+                print(f"Bollinger Position: {bollinger_position}")
+                print(f"Band Width: {band_width:.2f}%")
+                print(f"Price Position: {price_position:.2f}%")
+                
+            except Exception as e:
+                print(f"볼린저 밴드 계산 중 오류: {e}")
+                analysis_results['bollinger_position'] = 'undefined'
+                analysis_results['bb_upper'] = current_price * 1.02
+                analysis_results['bb_middle'] = current_price
+                analysis_results['bb_lower'] = current_price * 0.98
+                analysis_results['band_width'] = 4.0
+                analysis_results['band_position_percentage'] = 50.0
+
+            # 모멘텀 계산
+            try:
+                previous_price = float(df['close'].iloc[-2])
+                momentum = (current_price - previous_price) / previous_price
+                analysis_results['momentum'] = float(momentum)
+                print(f"Momentum: {momentum}")
+            except Exception as e:
+                print(f"모멘텀 계산 중 오류: {e}")
+                analysis_results['momentum'] = 0.0
+
+            # 변동성 계산
+            try:
+                if streaming is not None:
+                    volatility_ratio = float(streaming['volatility_ratio'])
+                else:
+                    volatility_ratio = (self.get_average_true_range(df, 10) / current_price) * 100
+                analysis_results['volatility_ratio'] = float(volatility_ratio)
+                print(f"Volatility Ratio: {volatility_ratio}")
+            except Exception as e:
+                print(f"변동성 계산 중 오류: {e}")
+                analysis_results['volatility_ratio'] = 0.0
+
+            # 다이버전스 감지
+            try:
+                divergence = self.detect_divergence(df)
+                analysis_results['divergence'] = {
+                    'bearish_divergence': bool(divergence['bearish_divergence']),
+                    'bullish_divergence': bool(divergence['bullish_divergence'])
+                }
+                print(f"Divergence: {analysis_results['divergence']}")
+            except Exception as e:
+                print(f"다이버전스 감지 중 오류: {e}")
+                analysis_results['divergence'] = {
+                    'bearish_divergence': False,
+                    'bullish_divergence': False
+                }
+
+            # Counter trend 신호
+            try:
+                counter_trend_buy = (
+                    current_price <= analysis_results['bb_lower'] and
+                    analysis_results['rsi'] <= self.OVERSOLD_RSI and
+                    analysis_results['momentum'] < -self.MOMENTUM_THRESHOLD and
+                    analysis_results['divergence']['bullish_divergence'] and
+                    analysis_results['volatility_ratio'] > self.VOLATILITY_THRESHOLD
+                )
+                
+                counter_trend_sell = (
+                    current_price >= analysis_results['bb_upper'] and
+                    analysis_results['rsi'] >= self.OVERBOUGHT_RSI and
+                    analysis_results['momentum'] > self.MOMENTUM_THRESHOLD and
+                    analysis_results['divergence']['bearish_divergence'] and
+                    analysis_results['volatility_ratio'] > self.VOLATILITY_THRESHOLD
+                )
+                
+                analysis_results['counter_trend_signals'] = {
+                    'buy': bool(counter_trend_buy),
+                    'sell': bool(counter_trend_sell)
+                }
+                print(f"Counter Trend Signals - Buy: {counter_trend_buy}, Sell: {counter_trend_sell}")
+            except Exception as e:
+                print(f"Counter trend 신호 계산 중 오류: {e}")
+                analysis_results['counter_trend_signals'] = {
+                    'buy': False,
+                    'sell': False
+                }
+
+            return analysis_results
+
+        except Exception as e:
+            print(f"지표 계산 중 오류 발생: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            return None
+
+    def analyze_ema_ribbon(self, ema_ribbon, current_price, ema_200):
+        """개선된 EMA Ribbon 분석"""
+        ribbon_values = ema_ribbon.iloc[-1]
+        
+        # EMA 값들의 기울기 계산 (추세의 강도를 더 정확히 측정)
+        ema_slopes = {
+            period: (ribbon_values[f'EMA_{period}'] - ema_ribbon[f'EMA_{period}'].iloc[-2]) 
+            for period in [5, 10, 30, 50]
+        }
+        
+        short_term_values = [ribbon_values['EMA_5'], ribbon_values['EMA_10']]
+        long_term_values = [ribbon_values['EMA_30'], ribbon_values['EMA_50']]
+        
+        # 추세 강도 계산 개선
+        trend_strength = sum(1 for short, long in zip(short_term_values, long_term_values) if short > long)
+        slope_strength = sum(1 for slope in ema_slopes.values() if slope > 0)
+        
+        bullish_trend = current_price > ema_200
+        
+        # 상태 판단 로직 개선
+        if trend_strength >= 2 and slope_strength >= 3 and bullish_trend:
+            status_num = 4  # 강한 상승세
+        elif trend_strength >= 2 and bullish_trend:
+            status_num = 3  # 약한 상승세
+        elif trend_strength == 1 or bullish_trend:
+            status_num = 2  # 상승 가능성
+        elif trend_strength == 0 and slope_strength <= 1:
+            status_num = 1  # 약한 하락세
+        else:
+            status_num = 0  # 강한 하락세
+            
+        status_mapping = {
+            4: '강한 상승세',
+            3: '약한 상승세',
+            2: '상승 가능성',
+            1: '약한 하락세',
+            0: '강한 하락세'
+        }
+        
+        return {
+            'status': status_mapping[status_num],
+            'status_num': status_num
+        }
+
+    def detect_divergence(self, data):
+        """가격과 기술적 지표 간의 다이버전스 감지"""
+        # 데이터 포인트 수 증가 (15개 이상 확보)
+        df = data.tail(20).copy()  # 20개로 증가
+        
+        # 가격 고점/저점 (3개 캔들 중심 윈도우)
+        price_highs = self._centered_rolling(df['high'].to_numpy(dtype=float), np.max)
+        price_lows = self._centered_rolling(df['low'].to_numpy(dtype=float), np.min)
+        
+        # RSI 고점/저점
+        rsi_values = self.get_rsi(df['close']).to_numpy(dtype=float)
+        rsi_highs = self._centered_rolling(rsi_values, np.max)
+        rsi_lows = self._centered_rolling(rsi_values, np.min)
+        
+        # 베어리시 다이버전스 (가격은 상승, RSI는 하락)
+        bearish_div = (price_highs[-1] > price_highs[-2]) & (rsi_highs[-1] < rsi_highs[-2])
+        
+        # 불리시 다이버전스 (가격은 하락, RSI는 상승)
+        bullish_div = (price_lows[-1] < price_lows[-2]) & (rsi_lows[-1] > rsi_lows[-2])
+        
+        return {
+            'bearish_divergence': bearish_div,
+            'bullish_divergence': bullish_div
+        }
+
+    @staticmethod
+    def _centered_rolling(values, reducer, window=3):
+        """rolling(window, center=True)와 같은 중심 윈도우 집계 (양 끝은 NaN)"""
+        result = np.full(len(values), np.nan)
+        if len(values) >= window:
+            half = window // 2
+            result[half:len(values) - (window - 1 - half)] = reducer(
+                np.lib.stride_tricks.sliding_window_view(values, window), axis=1
+            )
+        return result
+
+    #----------------
+    # 4. Machine Learning
+    #----------------
+    def prepare_knn_features(self, data, normalize=True):
+        """개선된 KNN 특징 준비 함수
+        
+        Args:
+            data (pd.DataFrame): OHLCV 데이터
+            normalize (bool): False면 정규화/NaN 채우기 전 원값 특징 반환
+                (구간별 정규화는 normalize_knn_features로)
+            
+        Returns:
+            features: 준비된 특징 행렬
+            labels: 레이블 벡터
+        """
+        try:
+            if data is None or data.empty:
+                print("prepare_knn_features: 데이터가 없거나 비어있습니다")
+                return None, None
+
+            close_series = data['close']
+            close = close_series.to_numpy(dtype=float)
+            volume = data['volume'].to_numpy(dtype=float)
+
+            # 기본 지표 계산
+            sma_20, std_20 = self.get_rolling_mean_std(close_series, 20)
+            sma_20 = sma_20.to_numpy(dtype=float)
+            std_20 = std_20.to_numpy(dtype=float)
+            volume_ma = self.get_rolling_mean(data['volume'], 20).to_numpy(dtype=float)
+
+            # 볼린저 밴드
+            bb_upper = sma_20 + 2 * std_20
+            bb_lower = sma_20 - 2 * std_20
+
+            ema_5 = self.get_ema(close_series, 5).to_numpy(dtype=float)
+            ema_20 = self.get_ema(close_series, 20).to_numpy(dtype=float)
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                features = np.column_stack([
+                    # 1. 가격 모멘텀 특징들
+                    (close - sma_20) / std_20,  # price_position
+                    self._pct_change(close, 5),  # price_momentum
+                    np.where(close > sma_20, 1, -1),  # price_trend
+                    # 2. 볼린저 밴드 관련 특징
+                    (close - sma_20) / (bb_upper - bb_lower),  # bb_position
+                    (bb_upper - bb_lower) / sma_20,  # bb_width
+                    # 3. 거래량 특징들
+                    volume / volume_ma,  # volume_ratio
+                    self._pct_change(volume, 3),  # volume_trend
+                    # 4. 변동성 특징
+                    self.get_return_volatility(close_series, 20).to_numpy(dtype=float),  # volatility
+                    # 5. RSI
+                    self.get_rsi(close_series).to_numpy(dtype=float),  # rsi
+                    # 6. 이동평균 교차 신호
+                    np.where(ema_5 > ema_20, 1, -1)  # ema_cross
+                ]).astype(float)
+
+                # 다음 기간의 수익률 방향 (레이블, 마지막 행은 -1)
+                next_return = np.append(close[1:] / close[:-1] - 1, np.nan)
+            labels = np.where(next_return > 0, 1, -1)
+
+            if not normalize:
+                return features, labels
+            return self.normalize_knn_features(features), labels
+
+        except Exception as e:
+            print(f"KNN 특징 준비 중 오류: {e}")
+            import traceback
+            traceback.print_exc()
+            return None, None
+
+    @classmethod
+    def normalize_knn_features(cls, features, reference_rows=None):
+        """KNN 원값 특징 정규화 (이진 특징 제외) 후 NaN은 직전 값, 남은 값은 0으로 채움
+
+        Args:
+            features: prepare_knn_features(normalize=False)의 원값 특징 행렬
+            reference_rows: 평균/표준편차를 계산할 앞쪽 행 수 (워크포워드 학습 구간 등).
+                None이면 전체 행 기준
+
+        Returns:
+            np.ndarray: 정규화된 특징 행렬 (새 배열)
+        """
+        features = np.array(features, dtype=float)
+        reference = features if reference_rows is None else features[:reference_rows]
+
+        binary_columns = [2, 9]  # price_trend, ema_cross
+        columns = [i for i in range(features.shape[1]) if i not in binary_columns]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            selected = reference[:, columns]
+            mean = np.nanmean(selected, axis=0)
+            std = np.nanstd(selected, axis=0, ddof=1)
+            features[:, columns] = (features[:, columns] - mean) / std
+
+        # NaN 제거 (직전 값으로 채운 뒤 남은 값은 0)
+        features[~np.isfinite(features)] = np.nan
+        features = cls._forward_fill(features)
+        features[np.isnan(features)] = 0
+        return features
+
+    @staticmethod
+    def _pct_change(values, periods):
+        """pandas pct_change(periods)와 같은 변화율 (앞쪽 periods개는 NaN)"""
+        result = np.full(len(values), np.nan)
+        if len(values) > periods:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                result[periods:] = values[periods:] / values[:-periods] - 1
+        return result
+
+    @staticmethod
+    def _forward_fill(values):
+        """열별로 NaN을 직전 유효값으로 채움"""
+        valid = ~np.isnan(values)
+        positions = np.where(valid, np.arange(len(values))[:, None], 0)
+        np.maximum.accumulate(positions, axis=0, out=positions)
+        return np.take_along_axis(values, positions, axis=0)
+
+    def prepare_current_features(self, current_data):
+        """현재 시점의 특징 준비 함수
+        
+        Args:
+            current_data (pd.DataFrame): 현재 시점까지의 OHLCV 데이터
+            
+        Returns:
+            현재 시점의 특징 벡터
+        """
+        try:
+            close_series = current_data['close']
+            close = close_series.to_numpy(dtype=float)
+            volume = current_data['volume'].to_numpy(dtype=float)
+
+            # 기본 지표 계산
+            sma_20, std_20 = self.get_rolling_mean_std(close_series, 20)
+            sma_20 = sma_20.to_numpy(dtype=float)
+            std_20 = std_20.to_numpy(dtype=float)
+            volume_ma = self.get_rolling_mean(current_data['volume'], 20).to_numpy(dtype=float)
+
+            # 볼린저 밴드
+            bb_middle = sma_20
+            bb_upper = bb_middle + 2 * std_20
+            bb_lower = bb_middle - 2 * std_20
+
+            # EMA 계산
+            ema_5 = self.get_ema(close_series, 5)
+            ema_20 = self.get_ema(close_series, 20)
+
+            # 현재 특징 벡터 생성 (마지막 행 기준)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                current_features = np.array([
+                    (close[-1] - sma_20[-1]) / std_20[-1],  # price_position
+                    self._pct_change(close, 5)[-1],  # price_momentum
+                    1 if close[-1] > sma_20[-1] else -1,  # price_trend
+                    (close[-1] - bb_middle[-1]) / (bb_upper[-1] - bb_lower[-1]),  # bb_position
+                    (bb_upper[-1] - bb_lower[-1]) / bb_middle[-1],  # bb_width
+                    volume[-1] / volume_ma[-1],  # volume_ratio
+                    self._pct_change(volume, 3)[-1],  # volume_trend
+                    self.get_return_volatility(close_series, 20).iloc[-1],  # volatility
+                    self.get_rsi(close_series).iloc[-1],  # rsi
+                    1 if ema_5.iloc[-1] > ema_20.iloc[-1] else -1  # ema_cross
+                ], dtype=float).reshape(1, -1)
+
+            # 이진 특징을 제외한 정규화 (기준 통계는 데이터프레임의 i번째 열)
+            columns = [current_data[name].to_numpy(dtype=float) for name in current_data.columns]
+            columns += [sma_20, std_20, volume_ma, bb_middle, bb_upper, bb_lower]
+            binary_indices = [2, 9]  # price_trend와 ema_cross의 인덱스
+            indices = [i for i in range(current_features.shape[1]) if i not in binary_indices]
+            reference = np.column_stack([columns[i] for i in indices])
+            with np.errstate(divide='ignore', invalid='ignore'):
+                mean_vals = np.nanmean(reference, axis=0)
+                std_vals = np.nanstd(reference, axis=0, ddof=1)
+            normalized = (current_features[0, indices] - mean_vals) / np.where(std_vals != 0, std_vals, 1.0)
+            current_features[0, indices] = np.where(std_vals != 0, normalized, current_features[0, indices])
+
+            return current_features
+
+        except Exception as e:
+            print(f"현재 특징 준비 중 오류: {e}")
+            import traceback
+            traceback.print_exc()
+            return None
+
+    def get_knn_feature_store(self):
+        """KNN 특징 저장소 로드 (없으면 새로 생성)"""
+        if self.knn_feature_store is None:
+            self.knn_feature_store = KNNFeatureStore.load(self.knn_feature_store_path)
+            print(f"KNN 특징 저장소 로드 완료 ({len(self.knn_feature_store)}개 행)")
+        return self.knn_feature_store
+
+    def prepare_knn_features_from_store(self, data):
+        """특징 저장소에 마감 캔들을 반영하고 (특징, 레이블, 타임스탬프, 현재 특징) 반환
+
+        현재 특징은 진행 중 캔들(data의 마지막 행) 한 개만 미리보기로 계산함.
+        """
+        try:
+            store = self.get_knn_feature_store()
+            store.sync(data)
+            features, labels, timestamps = store.matrix()
+            last = data.iloc[-1]
+            current_features = store.current_vector(last['close'], last['volume'])
+            return features, labels, timestamps, current_features
+
+        except Exception as e:
+            print(f"KNN 특징 저장소 처리 중 오류: {e}")
+            import traceback
+            traceback.print_exc()
+            return None, None, None, None
+
+    def find_k_nearest(self, features, labels, current_point, k=16):
+        """개선된 K-최근접 이웃 찾기 함수
+        
+        Args:
+            features: 과거 데이터의 특징 행렬
+            labels: 과거 데이터의 레이블
+            current_point: 현재 시점의 특징 벡터
+            k: 이웃 개수
+            
+        Returns:
+            k_nearest_labels: k개 이웃의 레이블
+            k_nearest_distances: k개 이웃까지의 거리
+            k_nearest_weights: k개 이웃의 가중치
+        """
+        try:
+            if features is None or len(features) < k:
+                print("find_k_nearest: 충분한 데이터가 없습니다")
+                return np.array([]), np.array([]), np.array([])
+
+            # 시간 가중치가 적용된 전체 거리
+            distances = self._knn_distances(features, current_point)
+
+            # 거리에 따른 가중치 계산 (지수 감쇠, 최소 거리 기준으로 정규화하여 언더플로 방지)
+            weights = np.exp(-(distances - np.min(distances)))
+            weights = weights / np.sum(weights)  # 정규화
+            
+            # k개의 가장 가까운 이웃 찾기 (부분 선택 후 k개만 정렬)
+            candidate_indices = np.argpartition(distances, k - 1)[:k]
+            k_nearest_indices = candidate_indices[np.argsort(distances[candidate_indices], kind='stable')]
+            k_nearest_labels = labels[k_nearest_indices]
+            k_nearest_distances = distances[k_nearest_indices]
+            k_nearest_weights = weights[k_nearest_indices]
+            
+            return k_nearest_labels, k_nearest_distances, k_nearest_weights
+
+        except Exception as e:
+            print(f"K-최근접 이웃 찾기 중 오류: {e}")
+            import traceback
+            traceback.print_exc()
+            return np.array([]), np.array([]), np.array([])
+
+    def _knn_distances(self, features, current_point):
+        """모든 행까지의 최종 거리 (가중 유클리디안 거리 * 최신 KNN_TIME_WINDOW개 행 기준 시간 배수)"""
+        # 특징별 가중치
+        feature_weights = np.asarray(self.KNN_FEATURE_WEIGHTS, dtype=float)
+
+        # 가중치를 적용한 특징 행렬 (float32 연속 배열) 및 제곱 노름
+        weighted_features, squared_norms = self._weighted_feature_matrix(features, feature_weights)
+        weighted_current = np.asarray(current_point, dtype=np.float32).reshape(-1) * feature_weights.astype(np.float32)
+
+        # 유클리디안 거리 일괄 계산: ||a||² + ||b||² - 2ab
+        squared = squared_norms + np.dot(weighted_current, weighted_current) - 2 * (weighted_features @ weighted_current)
+        dist = np.sqrt(np.maximum(squared, 0)).astype(np.float64)
+
+        # 시간 가중치 적용 (라이브 윈도우에서는 distance / exp(-i/100)와 같음)
+        rows = np.arange(len(features))
+        return dist * time_decay_multiplier(rows, len(features) - 1, self.KNN_TIME_DECAY, self.KNN_TIME_WINDOW)
+
+    def _weighted_feature_matrix(self, features, feature_weights):
+        """특징 가중치를 곱한 float32 연속 행렬과 행별 제곱 노름 반환"""
+        weighted = np.ascontiguousarray(np.asarray(features, dtype=np.float32) * feature_weights.astype(np.float32))
+        squared_norms = np.einsum('ij,ij->i', weighted, weighted)
+        return weighted, squared_norms
+
+    def _knn_index_settings(self):
+        """현재 모드의 (인덱스 클래스, 저장 경로)"""
+        if getattr(self, 'USE_KNN_ANN', False):
+            return IVFKNNIndex, self.knn_ann_index_path
+        return KNNIndex, self.knn_index_path
+
+    def get_knn_index(self):
+        """KNN 이웃 인덱스 로드 (없거나 특징 가중치가 바뀌었으면 새로 생성)"""
+        index_cls, index_path = self._knn_index_settings()
+        if isinstance(self.knn_index, index_cls):
+            return self.knn_index
+
+        feature_weights = np.asarray(self.KNN_FEATURE_WEIGHTS, dtype=float)
+        if os.path.exists(index_path):
+            try:
+                index = index_cls.load(index_path)
+                if np.array_equal(index.feature_weights, feature_weights):
+                    self.knn_index = index
+                    print(f"KNN 인덱스 로드 완료 ({len(index)}개 행)")
+                    return self.knn_index
+                print("KNN 특징 가중치 변경 - 인덱스 재구축")
+            except Exception as e:
+                print(f"KNN 인덱스 로드 중 오류: {e}")
+
+        return self._create_knn_index()
+
+    def _create_knn_index(self):
+        """현재 모드의 빈 KNN 인덱스 생성"""
+        index_cls, _ = self._knn_index_settings()
+        feature_weights = np.asarray(self.KNN_FEATURE_WEIGHTS, dtype=float)
+        if index_cls is IVFKNNIndex:
+            self.knn_index = IVFKNNIndex(feature_weights, n_probe=self.KNN_ANN_PROBES)
+        else:
+            self.knn_index = KNNIndex(feature_weights)
+        return self.knn_index
+
+    def query_knn_index(self, features, labels, timestamps, current_features, k=16):
+        """KNN 인덱스에 특징 저장소의 새 행을 추가한 뒤 최근접 이웃 조회
+
+        인덱스 행은 모두 특징 저장소(레이블이 확정된 마감 캔들, 고정된 누적
+        정규화 기준)에서 가져옴. 사이클마다 200개 윈도우로 따로 정규화한 행을
+        쌓으면 정규화 기준이 섞이므로 윈도우 특징은 사용하지 않고, 저장소의
+        정규화 기준이 갱신되면 인덱스를 처음부터 다시 구축함.
+
+        Returns:
+            tuple: find_k_nearest와 같은 (레이블, 거리, 가중치)
+        """
+        try:
+            index = self.get_knn_index()
+            _, index_path = self._knn_index_settings()
+            version = self.get_knn_feature_store().normalization_version
+
+            if len(index) > 0 and index.normalization_version != version:
+                print("KNN 특징 정규화 기준 변경 - 인덱스 재구축")
+                index = self._create_knn_index()
+
+            last_ts = index.last_timestamp
+            new_rows = np.arange(len(features)) if last_ts is None else np.nonzero(timestamps > last_ts)[0]
+            if len(new_rows) > 0:
+                if len(index) == 0:
+                    index.build(features[new_rows], labels[new_rows], timestamps[new_rows])
+                else:
+                    index.append(features[new_rows], labels[new_rows], timestamps[new_rows])
+                index.normalization_version = version
+                index.save(index_path)
+
+            if isinstance(index, IVFKNNIndex):
+                k_nearest_labels, distances, weights, _ = index.query(
+                    current_features, k, time_decay=self.KNN_TIME_DECAY, window=self.KNN_TIME_WINDOW,
+                    n_probe=self.KNN_ANN_PROBES
+                )
+            else:
+                k_nearest_labels, distances, weights, _ = index.query(
+                    current_features, k, time_decay=self.KNN_TIME_DECAY, window=self.KNN_TIME_WINDOW
+                )
+            return k_nearest_labels, distances, weights
+
+        except Exception as e:
+            print(f"KNN 인덱스 조회 중 오류: {e}")
+            import traceback
+            traceback.print_exc()
+            return np.array([]), np.array([]), np.array([])
+
+    def evaluate_knn_ann_recall(self, data, k=16, holdout_ratio=0.1, probe_values=(1, 2, 4, 8, 16, 32),
+                                max_queries=500):
+        """근사 KNN 재현율/속도 리포트 (홀드아웃 구간 기준)
+
+        앞부분으로 IVF 인덱스를 만들고, 뒷부분 holdout_ratio 구간의 각 행을
+        질의점으로 하여 find_k_nearest와 같은 정확 탐색 결과와 비교함.
+
+        Returns:
+            list: n_probe별 {'n_probe', 'recall', 'ann_ms', 'exact_ms'} 딕셔너리
+        """
+        try:
+            features, labels = self.prepare_knn_features(data)
+            if features is None or labels is None:
+                return []
+
+            split = int(len(features) * (1 - holdout_ratio))
+            if split < k or split >= len(features):
+                print("ANN 재현율 평가: 충분한 데이터가 없습니다")
+                return []
+
+            train_features, train_labels = features[:split], labels[:split]
+            queries = features[split:]
+            if len(queries) > max_queries:
+                queries = queries[np.linspace(0, len(queries) - 1, max_queries).astype(int)]
+
+            index = IVFKNNIndex(np.asarray(self.KNN_FEATURE_WEIGHTS, dtype=float))
+            index.build(train_features, train_labels, np.arange(split))
+
+            # 정확 탐색 기준 이웃
+            start = time.time()
+            exact_rows = []
+            for query in queries:
+                distances = self._knn_distances(train_features, query)
+                exact_rows.append(set(np.argpartition(distances, k - 1)[:k].tolist()))
+            exact_ms = (time.time() - start) * 1000 / len(queries)
+
+            report = []
+            print(f"\n=== 근사 KNN 재현율 (학습 {split}개, 질의 {len(queries)}개, 리스트 {len(index.centroids)}개, k={k}) ===")
+            for n_probe in probe_values:
+                start = time.time()
+                hits = 0
+                for query, expected in zip(queries, exact_rows):
+                    _, _, _, rows = index.query(
+                        query, k, time_decay=self.KNN_TIME_DECAY, window=self.KNN_TIME_WINDOW, n_probe=n_probe
+                    )
+                    hits += len(expected.intersection(rows.tolist()))
+                ann_ms = (time.time() - start) * 1000 / len(queries)
+                recall = hits / (k * len(queries))
+                report.append({'n_probe': n_probe, 'recall': recall, 'ann_ms': ann_ms, 'exact_ms': exact_ms})
+                print(f"n_probe {n_probe:>4}: 재현율 {recall:.3f}, 질의당 {ann_ms:.2f}ms (정확 탐색 {exact_ms:.2f}ms)")
+
+            return report
+
+        except Exception as e:
+            print(f"ANN 재현율 평가 중 오류: {e}")
+            import traceback
+            traceback.print_exc()
+            return []
+
+    def calculate_adaptive_k(self, data_size, volatility):
+        """데이터 크기와 변동성에 따른 적응형 K값 계산"""
+        try:
+            # 기본 K값 설정
+            base_k = 16
+            
+            # 데이터 크기에 따른 조정
+            size_factor = np.clip(data_size / 100, 0.5, 2.0)
+            
+            # 변동성에 따른 조정 (변동성이 높을수록 더 적은 이웃 사용)
+            volatility_factor = np.clip(1 - volatility, 0.5, 1.5)
+            
+            # 최종 K값 계산
+            adjusted_k = int(base_k * size_factor * volatility_factor)
+            
+            # K값 범위 제한
+            final_k = np.clip(adjusted_k, 8, 32)
+            
+            print(f"적응형 K값 계산:")
+            print(f"데이터 크기: {data_size}, 크기 팩터: {size_factor:.2f}")
+            print(f"변동성: {volatility:.2f}, 변동성 팩터: {volatility_factor:.2f}")
+            print(f"조정된 K값: {final_k}")
+            
+            return final_k
+            
+        except Exception as e:
+            print(f"적응형 K값 계산 중 오류: {e}")
+            return 16  # 오류 발생시 기본값 반환
+
+    def predict_next_move(self, data):
+        """개선된 다음 움직임 예측 함수"""
+        try:
+            # KNN 인덱스는 정규화 기준이 고정된 특징 저장소 행으로만 구성
+            use_index = getattr(self, 'USE_KNN_INDEX', False) or getattr(self, 'USE_KNN_ANN', False)
+            use_store = getattr(self, 'USE_KNN_FEATURE_STORE', False) or use_index
+            if use_store:
+                # 특징 저장소: 마감 캔들 행 추가 + 진행 중 캔들 한 행 미리보기
+                features, labels, timestamps, current_features = self.prepare_knn_features_from_store(data)
+                if features is None or current_features is None:
+                    return 0, 0
+            else:
+                # 특징과 레이블 준비
+                features, labels = self.prepare_knn_features(data)
+                if features is None or labels is None:
+                    return 0, 0
+
+                # 현재 특징 준비
+                current_data = data.tail(50).copy()
+                current_features = self.prepare_current_features(current_data)
+                if current_features is None:
+                    return 0, 0
+                    
+            # 적응형 k값 계산
+            k = self.calculate_adaptive_k(
+                data_size=len(features),
+                volatility=data['close'].pct_change().std()
+            )
+                    
+            # 최근접 이웃 찾기
+            if use_index:
+                k_nearest_labels, distances, weights = self.query_knn_index(
+                    features, labels, timestamps, current_features, k=k
+                )
+            elif use_store:
+                # 저장소 행은 모두 레이블이 확정된 마감 캔들
+                k_nearest_labels, distances, weights = self.find_k_nearest(
+                    features, labels, current_features, k=k
+                )
+            else:
+                k_nearest_labels, distances, weights = self.find_k_nearest(
+                    features[:-1], 
+                    labels[:-1], 
+                    current_features,
+                    k=k
+                )
+            
+            if len(k_nearest_labels) == 0:
+                return 0, 0
+            
+            # 가중 투표로 예측 (신호 강도 조절)
+            weighted_sum = np.sum(k_nearest_labels * weights)
+            
+            # 신호 강도 조절을 위한 시그모이드 함수 적용 (더 엄격하게)
+            signal_strength = 2 / (1 + np.exp(-1.5 * weighted_sum)) - 1  # 기울기 증가로 더 강한 신호 요구
+            
+            # 더 세분화된 신호 강도 구간 분류 (임계값 상향)
+            if abs(signal_strength) < 0.25:  # 중립 구간 확대
+                prediction = 0  # 중립
+            elif abs(signal_strength) < 0.4:  # 약한 신호 구간 확대
+                prediction = np.sign(signal_strength) * 0.25  # 매우 약한 신호
+            elif abs(signal_strength) < 0.6:
+                prediction = np.sign(signal_strength) * 0.5  # 약한 신호
+            elif abs(signal_strength) < 0.8:
+                prediction = np.sign(signal_strength) * 0.75  # 중강도 신호
+            else:
+                prediction = np.sign(signal_strength) * 0.8  # 강한 신호 (최대치 제한)
+            
+            # 1. 방향 일치도 계산 (35% 비중으로 하향)
+            direction_agreement = np.mean(k_nearest_labels == np.sign(prediction))
+            strong_signal = np.mean(abs(weighted_sum) > 0.6)  # 강한 신호 기준 상향
+            direction_confidence = (direction_agreement * 0.7 + strong_signal * 0.3) * 35
+            
+            # 2. 거리 기반 신뢰도 (35% 비중)
+            closest_neighbors = distances[:int(len(distances) * 0.3)]  # 상위 30%로 축소
+            max_distance = np.percentile(distances, 90)  # 90 퍼센타일로 강화
+            distance_confidence = (1 - (np.mean(closest_neighbors) / max_distance)) * 35
+            
+            # 3. 가중치 분포 (15% 비중)
+            top_weights = weights[:int(len(weights) * 0.25)]  # 상위 25%로 축소
+            weight_concentration = min((np.mean(top_weights) / np.mean(weights)) * 15, 15)
+            
+            # 4. 신호 강도 기반 신뢰도 (15% 비중)
+            signal_base = abs(signal_strength)
+            signal_boost = min(np.exp(signal_base) / (np.e * 1.5), 1.0)  # 부스트 감소
+            signal_confidence = signal_boost * 15
+            
+            # 최종 신뢰도 계산 및 스케일링
+            base_confidence = (
+                direction_confidence +
+                distance_confidence +
+                weight_concentration +
+                signal_confidence
+            )
+            
+            # 초기 신뢰도에 대한 비선형 스케일링 적용 (더 엄격하게)
+            scaled_confidence = 25 + (base_confidence * 1.1)  # 기본 스케일 하향
+            
+            # 변동성 기반 신뢰도 조정 (더 민감하게)
+            recent_volatility = self.get_return_volatility(data['close'], 20).iloc[-1]
+            volatility_factor = np.clip(1 - (recent_volatility * 5), 0.8, 1.05)  # 변동성 영향 강화
+            confidence = scaled_confidence * volatility_factor
+            
+            # 연속성 보너스 조정 (감소)
+            if hasattr(self, 'last_prediction') and self.last_prediction is not None:
+                if np.sign(prediction) == np.sign(self.last_prediction):
+                    confidence = confidence * 1.05  # 5% 부스트로 감소
+            self.last_prediction = prediction
+            
+            # 신뢰도 범위 제한 (더 엄격하게)
+            confidence = np.clip(confidence, 30, 95) 
+            
+            # 신호 강도에 따른 신뢰도 조정 (더 엄격하게)
+            if abs(signal_strength) < 0.3:  # 매우 약한 신호 임계값 상향
+                confidence = confidence * 0.65
+            elif abs(signal_strength) < 0.45:  # 약한 신호 임계값 상향
+                confidence = confidence * 0.8
+            elif abs(signal_strength) > 0.7:  # 강한 신호 임계값 상향
+                confidence = min(confidence * 1.1, 95)  # 최대 95로 제한
+            
+            # 디버깅 정보 출력
+            print(f"\nKNN 예측 세부 정보:")
+            print(f"신호 강도: {signal_strength:.3f}")
+            print(f"예측값: {prediction:.3f}")
+            print(f"방향 일치도: {direction_confidence:.1f}/35")
+            print(f"거리 기반 신뢰도: {distance_confidence:.1f}/35")
+            print(f"가중치 분포: {weight_concentration:.1f}/15")
+            print(f"신호 강도 신뢰도: {signal_confidence:.1f}/15")
+            print(f"기본 신뢰도: {base_confidence:.1f}")
+            print(f"스케일링 후 신뢰도: {scaled_confidence:.1f}")
+            print(f"변동성 팩터: {volatility_factor:.2f}")
+            print(f"최종 신뢰도: {confidence:.1f}%")
+            
+            return prediction, confidence
+
+        except Exception as e:
+            print(f"다음 움직임 예측 중 오류: {e}")
+            import traceback
+            traceback.print_exc()
+            return 0, 0
+        
+    def predict_next_move_batch(self, features, labels, query_features, history_end, k=16,
+                                volatility=None, window=None, last_prediction=None, memory_budget_mb=256):
+        """여러 질의 시점의 KNN 예측을 한 번에 계산 (백테스트/가정 분석용)
+
+        predict_next_move와 같은 이웃 탐색, 가중 투표, 시그모이드 신호 강도,
+        4개 항목 신뢰도를 배열 연산으로 계산하며, 메모리 예산에 맞춰 질의를
+        청크 단위로 나눔. self.last_prediction은 바꾸지 않음.
+
+        Args:
+            features: 과거 특징 행렬 (시간순)
+            labels: 과거 레이블
+            query_features: (N, 특징 수) 질의 행렬
+            history_end: 질의별로 볼 수 있는 과거 행 수 (features[:history_end])
+            k: 이웃 개수 (정수 또는 질의별 배열)
+            volatility: 질의별 최근 수익률 변동성 (변동성 팩터용, 없으면 0)
+            window: 질의별로 직전 window개 행만 사용 (라이브의 캔들 윈도우와 같은
+                시간 가중치 기준). None이면 history_end 이전 전체 사용
+            last_prediction: 첫 질의의 연속성 보너스 기준 예측값
+            memory_budget_mb: 청크 계산의 최대 임시 메모리 예산
+
+        Returns:
+            tuple: (N개 예측값, N개 신뢰도)
+        """
+        try:
+            feature_weights = np.asarray(self.KNN_FEATURE_WEIGHTS, dtype=float)
+            weighted_features, squared_norms = self._weighted_feature_matrix(features, feature_weights)
+            labels = np.asarray(labels, dtype=float)
+            queries = np.ascontiguousarray(
+                np.asarray(query_features, dtype=np.float32).reshape(-1, len(feature_weights)) * feature_weights.astype(np.float32)
+            )
+            n_queries = len(queries)
+            history_end = np.minimum(np.broadcast_to(np.asarray(history_end, dtype=np.int64), (n_queries,)), len(weighted_features))
+            k = np.broadcast_to(np.asarray(k, dtype=np.int64), (n_queries,))
+            volatility = np.zeros(n_queries) if volatility is None else np.asarray(volatility, dtype=float)
+
+            k_max = int(k.max()) if n_queries else 0
+            columns = window if window else len(weighted_features)
+
+            # 청크 크기는 (질의 x 행) 원소당 실제 사용량 기준: float64 거리/시간 배수/가중치와
+            # int64 부분 정렬 결과 등 동시에 살아 있는 8바이트 임시 배열 최대 7개, 유효 여부 1바이트.
+            # 윈도우 경로는 행 번호(int64)와 (윈도우 x 특징) float32 차이 텐서, 제곱 거리가 추가됨
+            element_bytes = 7 * 8 + 1
+            if window:
+                element_bytes += 8 + 4 * (len(feature_weights) + 1)
+            chunk_size = max(1, int(memory_budget_mb * 1024 * 1024 // (max(columns, 1) * element_bytes)))
+
+            k_nearest_labels = np.zeros((n_queries, k_max))
+            k_nearest_distances = np.full((n_queries, k_max), np.inf)
+            k_nearest_weights = np.zeros((n_queries, k_max))
+            found = np.zeros(n_queries, dtype=bool)
+
+            for start in range(0, n_queries, chunk_size):
+                stop = min(start + chunk_size, n_queries)
+                q = queries[start:stop]
+                end = history_end[start:stop]
+
+                if window:
+                    # 질의별 직전 window개 행 (시간 가중치는 윈도우 시작 기준)
+                    first = np.maximum(end - window, 0)
+                    rows = first[:, None] + np.arange(window)
+                    valid = rows < end[:, None]
+                    rows = np.minimum(rows, len(weighted_features) - 1)
+                    diff = weighted_features[rows]
+                    diff -= q[:, None, :]
+                    squared = np.einsum('ijk,ijk->ij', diff, diff)
+                    del diff
+                    decay_window = window
+                else:
+                    rows = np.broadcast_to(np.arange(len(weighted_features)), (stop - start, len(weighted_features)))
+                    valid = rows < end[:, None]
+                    squared = squared_norms[None, :] + np.einsum('ij,ij->i', q, q)[:, None] - 2 * (q @ weighted_features.T)
+                    decay_window = self.KNN_TIME_WINDOW
+
+                # 시간 가중치 적용 (질의별로 볼 수 있는 최신 행 기준, _knn_distances와 같음) 및 볼 수 없는 행 제외
+                distances = np.sqrt(np.maximum(squared, 0), dtype=np.float64)
+                del squared
+                distances *= time_decay_multiplier(rows, end[:, None] - 1, self.KNN_TIME_DECAY, decay_window)
+                distances[~valid] = np.inf
+
+                chunk_k = k[start:stop]
+                enough = valid.sum(axis=1) >= chunk_k
+                if not enough.any():
+                    continue
+
+                # 최소 거리 기준 지수 가중치 (볼 수 있는 행 전체로 정규화)
+                min_distances = distances.min(axis=1, keepdims=True)
+                weights = np.exp(-(distances - np.where(np.isfinite(min_distances), min_distances, 0)))
+                weights = weights / np.maximum(weights.sum(axis=1, keepdims=True), np.finfo(float).tiny)
+
+                candidates = np.argpartition(distances, k_max - 1, axis=1)[:, :k_max]
+                order = np.argsort(np.take_along_axis(distances, candidates, axis=1), axis=1, kind='stable')
+                nearest = np.take_along_axis(candidates, order, axis=1)
+
+                k_nearest_labels[start:stop] = labels[np.take_along_axis(rows, nearest, axis=1)]
+                k_nearest_distances[start:stop] = np.take_along_axis(distances, nearest, axis=1)
+                k_nearest_weights[start:stop] = np.take_along_axis(weights, nearest, axis=1)
+                found[start:stop] = enough
+
+            predictions, confidences = self._score_knn_batch(
+                k_nearest_labels, k_nearest_distances, k_nearest_weights, k, volatility, last_prediction
+            )
+            predictions[~found] = 0
+            confidences[~found] = 0
+            return predictions, confidences
+
+        except Exception as e:
+            print(f"KNN 일괄 예측 중 오류: {e}")
+            import traceback
+            traceback.print_exc()
+            return np.zeros(len(query_features)), np.zeros(len(query_features))
+
+    def _score_knn_batch(self, k_nearest_labels, distances, weights, k, volatility, last_prediction=None):
+        """predict_next_move의 투표/신뢰도 계산을 질의별 배열로 수행 (k열 이후는 무시)"""
+        predictions, confidences, strength = self._score_knn_batch_base(
+            k_nearest_labels, distances, weights, k, volatility
+        )
+
+        # 연속성 보너스 기준: 직전 질의 예측
+        previous = np.empty(len(predictions))
+        previous[1:] = predictions[:-1]
+        previous[:1] = np.nan if last_prediction is None else last_prediction
+        return predictions, self._finish_knn_confidences(predictions, confidences, strength, previous)
+
+    @staticmethod
+    def _finish_knn_confidences(predictions, confidences, strength, previous):
+        """연속성 보너스, 범위 제한, 신호 강도 조정 (predict_next_move 후반부와 같음)
+
+        Args:
+            previous: 질의별 직전 예측값 (없으면 NaN)
+        """
+        # 연속성 보너스: 직전 예측과 방향이 같으면 5% 부스트
+        confidences = np.where(np.sign(predictions) == np.sign(previous), confidences * 1.05, confidences)
+
+        confidences = np.clip(confidences, 30, 95)
+        return np.select(
+            [strength < 0.3, strength < 0.45, strength > 0.7],
+            [confidences * 0.65, confidences * 0.8, np.minimum(confidences * 1.1, 95)],
+            confidences
+        )
+
+    def _score_knn_batch_base(self, k_nearest_labels, distances, weights, k, volatility):
+        """질의별 (예측값, 연속성 보너스 전 신뢰도, |신호 강도|)"""
+        k_max = k_nearest_labels.shape[1]
+        columns = np.arange(k_max)
+        in_k = columns < k[:, None]
+
+        # 가중 투표 및 시그모이드 신호 강도
+        weighted_sum = np.sum(np.where(in_k, k_nearest_labels * weights, 0), axis=1)
+        signal_strength = 2 / (1 + np.exp(-1.5 * weighted_sum)) - 1
+        strength = np.abs(signal_strength)
+        direction = np.sign(signal_strength)
+        predictions = np.select(
+            [strength < 0.25, strength < 0.4, strength < 0.6, strength < 0.8],
+            [0 * direction, direction * 0.25, direction * 0.5, direction * 0.75],
+            direction * 0.8
+        )
+
+        # 1. 방향 일치도
+        direction_agreement = np.sum(in_k & (k_nearest_labels == np.sign(predictions)[:, None]), axis=1) / k
+        strong_signal = (np.abs(weighted_sum) > 0.6).astype(float)
+        direction_confidence = (direction_agreement * 0.7 + strong_signal * 0.3) * 35
+
+        # 2. 거리 기반 신뢰도 (상위 30% 평균 / 90 퍼센타일, 선형 보간)
+        closest_count = (k * 0.3).astype(int)
+        closest_mask = columns < closest_count[:, None]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            closest_mean = np.sum(np.where(closest_mask, distances, 0), axis=1) / closest_count
+        position = 0.9 * (k - 1)
+        lower = np.floor(position).astype(int)
+        upper = np.minimum(lower + 1, k - 1)
+        lower_value = np.take_along_axis(distances, lower[:, None], axis=1)[:, 0]
+        upper_value = np.take_along_axis(distances, upper[:, None], axis=1)[:, 0]
+        max_distance = lower_value + (position - lower) * (upper_value - lower_value)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            distance_confidence = (1 - closest_mean / max_distance) * 35
+
+        # 3. 가중치 분포 (상위 25% 평균 / 전체 평균)
+        top_count = (k * 0.25).astype(int)
+        top_mask = columns < top_count[:, None]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            top_mean = np.sum(np.where(top_mask, weights, 0), axis=1) / top_count
+            weight_mean = np.sum(np.where(in_k, weights, 0), axis=1) / k
+            weight_concentration = np.minimum(top_mean / weight_mean * 15, 15)
+
+        # 4. 신호 강도 기반 신뢰도
+        signal_confidence = np.minimum(np.exp(strength) / (np.e * 1.5), 1.0) * 15
+
+        base_confidence = direction_confidence + distance_confidence + weight_concentration + signal_confidence
+        scaled_confidence = 25 + (base_confidence * 1.1)
+        volatility_factor = np.clip(1 - (np.asarray(volatility, dtype=float) * 5), 0.8, 1.05)
+        confidences = scaled_confidence * volatility_factor
+        return predictions, confidences, strength
+
+    def score_knn_history(self, data, window=199, min_history=100, memory_budget_mb=256):
+        """과거 구간 전체의 캔들별 KNN 예측/신뢰도 (특징 행렬은 한 번만 계산)
+
+        각 시점 t는 라이브와 같이 직전 window개 행(features[t-window:t])만 이웃
+        후보로 사용함. 특징 정규화는 구간 전체 기준이라 200개 윈도우 기준인
+        라이브 값과 약간 다를 수 있음.
+
+        Returns:
+            pd.DataFrame: 시점별 prediction, confidence, k
+        """
+        try:
+            features, labels = self.prepare_knn_features(data)
+            if features is None or labels is None:
+                return pd.DataFrame(columns=['prediction', 'confidence', 'k'])
+
+            positions = np.arange(min_history, len(features))
+            returns = data['close'].pct_change()
+
+            # calculate_adaptive_k와 같은 규칙 (라이브 윈도우 기준 데이터 크기/변동성)
+            window_volatility = returns.rolling(window + 1, min_periods=2).std().to_numpy()[positions]
+            size_factor = np.clip(np.minimum(positions + 1, window + 1) / 100, 0.5, 2.0)
+            volatility_factor = np.clip(1 - np.nan_to_num(window_volatility), 0.5, 1.5)
+            k = np.clip((16 * size_factor * volatility_factor).astype(int), 8, 32)
+
+            recent_volatility = self.get_return_volatility(data['close'], 20).to_numpy()[positions]
+
+            predictions, confidences = self.predict_next_move_batch(
+                features, labels, features[positions], positions, k=k,
+                volatility=np.nan_to_num(recent_volatility), window=window,
+                memory_budget_mb=memory_budget_mb
+            )
+            return pd.DataFrame(
+                {'prediction': predictions, 'confidence': confidences, 'k': k},
+                index=data.index[positions]
+            )
+
+        except Exception as e:
+            print(f"KNN 과거 구간 예측 중 오류: {e}")
+            import traceback
+            traceback.print_exc()
+            return pd.DataFrame(columns=['prediction', 'confidence', 'k'])
+
+    def calculate_analysis_history(self, data, window=200, divergence_lag=0, include_knn=False):
+        """캔들별 calculate_indicators 분석 결과 표 (analysis_history.analysis_history 참고)
+
+        Args:
+            data (pd.DataFrame): OHLCV 데이터 (전체 구간)
+            window (int): 캔들마다 라이브가 보는 캔들 수 (get_historical_data 기본값)
+            divergence_lag (int): 다이버전스 판단 위치 (0이면 라이브와 동일)
+            include_knn (bool): knn_prediction/knn_signal_strength 열 추가 (캔들마다 predict_next_move를
+                한 번씩 차례로 호출한 값, window=None이면 score_knn_history)
+
+        Returns:
+            pd.DataFrame: 캔들별 분석 결과 (실패시 빈 DataFrame)
+        """
+        try:
+            history = analysis_history(self, data, window=window, divergence_lag=divergence_lag)
+            if include_knn and window is None:
+                knn = self.score_knn_history(data)
+                history['knn_prediction'] = knn['prediction'].reindex(history.index).fillna(0)
+                history['knn_signal_strength'] = knn['confidence'].reindex(history.index).fillna(0)
+            elif include_knn:
+                # 연속성 보너스 기준은 직전 캔들의 예측
+                knn = knn_window_history(self, data, window=window)
+                predictions = knn['knn_prediction'].to_numpy()
+                previous = np.concatenate([[np.nan], predictions[:-1]])
+                confidences = self._finish_knn_confidences(
+                    predictions, knn['knn_base_confidence'].to_numpy(), knn['knn_signal'].to_numpy(), previous
+                )
+                history['knn_prediction'] = np.nan_to_num(predictions)
+                history['knn_signal_strength'] = np.nan_to_num(confidences)
+            return history
+
+        except Exception as e:
+            print(f"과거 분석 결과 계산 중 오류: {e}")
+            import traceback
+            traceback.print_exc()
+            return pd.DataFrame()
+
+    def tune_knn_parameters(self, configs, start=None, end=None, **harness_options):
+        """캔들 저장소의 과거 캔들로 KNN 파라미터 워크포워드 튜닝
+
+        Args:
+            configs: knn_tuning.parameter_grid로 만든 조합 목록
+            start, end: 사용할 캔들 구간 (datetime, 없으면 저장된 전체)
+            harness_options: KNNTuningHarness 옵션 (train_size, test_size, workers 등)
+
+        Returns:
+            pd.DataFrame: 조합별 적중률/커버리지/보정 오차
+        """
+        try:
+            data = self.get_candle_store().get_range(self.ticker, self.interval, start=start, end=end)
+            print(f"KNN 튜닝 데이터: {len(data)}개 캔들")
+            harness = KNNTuningHarness(self, data, **harness_options)
+            return harness.run(configs)
+
+        except Exception as e:
+            print(f"KNN 파라미터 튜닝 중 오류: {e}")
+            import traceback
+            traceback.print_exc()
+            return pd.DataFrame()
+
+    def sweep_counter_trend_parameters(self, grid, start=None, end=None, divergence_lag=1, memory_budget_mb=64):
+        """캔들 저장소의 과거 캔들로 역추세 신호 파라미터 격자 평가
+
+        Args:
+            grid: 파라미터명(OVERSOLD_RSI, OVERBOUGHT_RSI, BOLLINGER_STD,
+                MOMENTUM_THRESHOLD, VOLATILITY_THRESHOLD) -> 후보 값 목록
+            start, end: 사용할 캔들 구간 (datetime, 없으면 저장된 전체)
+            divergence_lag: 다이버전스 판단 위치 (analysis_history.rolling_divergence 참고)
+            memory_budget_mb: 한 번에 평가할 조합 행렬의 메모리 상한
+
+        Returns:
+            pd.DataFrame: 조합별 수익률/거래 수/승률 (수익률 내림차순)
+        """
+        try:
+            data = self.get_candle_store().get_range(self.ticker, self.interval, start=start, end=end)
+            print(f"역추세 파라미터 스윕 데이터: {len(data)}개 캔들")
+            sweep = CounterTrendSweep(self, data, divergence_lag=divergence_lag)
+            return sweep.sweep(grid, memory_budget_mb=memory_budget_mb)
+
+        except Exception as e:
+            print(f"역추세 파라미터 스윕 중 오류: {e}")
+            import traceback
+            traceback.print_exc()
+            return pd.DataFrame()
+
+    #----------------
+    # 5. Trading Logic
+    #----------------
+    def generate_trading_signal(self, data, market_changed=False, force_check=False, snapshot=None):
+            """향상된 트레이딩 신호 생성"""
+            default_gpt_advice = {
+                'trade_recommendation': '관망',
+                'investment_percentage': 0,
+                'confidence_score': 0,
+                'reasoning': '기본값'
+            }
+            
+            default_response = (False, False, default_gpt_advice, None)
+
+            try:
+                if data is None:
+                    print("❌ 데이터 없음")
+                    return default_response
+
+                snapshot = self._resolve_snapshot(snapshot)
+                if snapshot is None:
+                    print("❌ 현재 가격 조회 실패")
+                    return default_response
+                current_price = snapshot.current_price
+                print(f"현재 가격: {current_price:,} KRW")
+
+                try:
+                    balance = snapshot.krw_balance
+                    coin_balance = snapshot.coin_balance
+                    net_balance = balance * (1 - self.TRADING_FEE_RATE)
+                    expected_sell_value = coin_balance * current_price * (1 - self.TRADING_FEE_RATE)
+                    print(f"KRW 잔고: {balance:,} 원")
+                    print(f"BTC 잔고: {coin_balance:.8f}")
+
+                    # 최소 주문금액 체크
+                    if net_balance < self.MIN_ORDER_AMOUNT and expected_sell_value < self.MIN_ORDER_AMOUNT:
+                        print(f"❌ 최소 주문금액({self.MIN_ORDER_AMOUNT:,}원) 미달")
+                        return default_response
+
+                except Exception as e:
+                    print(f"❌ 기본 정보 조회 실패: {e}")
+                    return default_response
+
+                analysis_results = self.calculate_indicators(data)
+                if analysis_results is None:
+                    print("❌ 기술적 분석 실패")
+                    return default_response
+
+                analysis_results['current_price'] = current_price
+                print(f"\n기술적 분석 - RSI: {analysis_results['rsi']:.2f}, 변동성: {analysis_results['volatility_ratio']:.2f}%")
+
+                try:
+                    gpt_advice = self.consult_gpt_for_trading(data, analysis_results, market_changed, force_check, snapshot=snapshot)
+                    if gpt_advice is None:
+                        print("❌ GPT 자문 실패")
+                        gpt_advice = default_gpt_advice.copy()
+                    print(f"\nGPT 자문: {gpt_advice.get('trade_recommendation')}, 신뢰도: {gpt_advice.get('confidence_score')}%")
+                except Exception as e:
+                    print(f"❌ GPT 자문 처리 실패: {e}")
+                    gpt_advice = default_gpt_advice.copy()
+
+                buy_signal, sell_signal = self.signals_from_advice(gpt_advice, snapshot)
+                return buy_signal, sell_signal, gpt_advice, analysis_results
+
+            except Exception as e:
+                print(f"❌ 거래 신호 생성 중 오류: {e}")
+                import traceback
+                traceback.print_exc()
+                return default_response
+
+    def signals_from_advice(self, gpt_advice, snapshot):
+        """GPT 자문과 스냅샷 잔고로 매수/매도 신호 결정 (최소 주문금액 확인)"""
+        net_balance = snapshot.krw_balance * (1 - self.TRADING_FEE_RATE)
+        expected_sell_value = snapshot.coin_balance * snapshot.current_price * (1 - self.TRADING_FEE_RATE)
+
+        buy_signal = (gpt_advice['trade_recommendation'] == '매수' and net_balance >= self.MIN_ORDER_AMOUNT)
+        sell_signal = (gpt_advice['trade_recommendation'] == '매도' and expected_sell_value >= self.MIN_ORDER_AMOUNT)
+
+        print(f"\n최종 신호 - 매수: {buy_signal}, 매도: {sell_signal}")
+        if not buy_signal and gpt_advice['trade_recommendation'] == '매수':
+            print(f"매수 신호 무시: 최소 주문금액 미달 (필요: {self.MIN_ORDER_AMOUNT:,}원, 가능: {net_balance:,.0f}원)")
+        if not sell_signal and gpt_advice['trade_recommendation'] == '매도':
+            print(f"매도 신호 무시: 최소 주문금액 미달 (필요: {self.MIN_ORDER_AMOUNT:,}원, 가능: {expected_sell_value:,.0f}원)")
+
+        return buy_signal, sell_signal
+
+    def start_gpt_consultation(self, data, analysis_results, market_changed=False, force_check=False, snapshot=None):
+        """GPT 자문을 작업 스레드에서 시작 (결과는 apply_gpt_consultation_result에서 적용)
+
+        Returns:
+            bool: 새 자문 요청 여부 (이전 자문이 진행 중이거나 최소 주문금액 미달이면 False)
+        """
+        try:
+            if self.gpt_worker.busy():
+                print("이전 GPT 자문 진행 중 - 새 자문 요청 생략")
+                return False
+
+            snapshot = self._resolve_snapshot(snapshot)
+            if snapshot is None:
+                print("❌ 현재 가격 조회 실패")
+                return False
+
+            net_balance = snapshot.krw_balance * (1 - self.TRADING_FEE_RATE)
+            expected_sell_value = snapshot.coin_balance * snapshot.current_price * (1 - self.TRADING_FEE_RATE)
+            if net_balance < self.MIN_ORDER_AMOUNT and expected_sell_value < self.MIN_ORDER_AMOUNT:
+                print(f"❌ 최소 주문금액({self.MIN_ORDER_AMOUNT:,}원) 미달")
+                return False
+
+            analysis_results = dict(analysis_results, current_price=snapshot.current_price)
+            self.gpt_worker.deadline = self.GPT_CONSULT_DEADLINE
+            on_decision = self.gpt_worker.report_early if getattr(self, 'USE_GPT_STREAMING', False) else None
+            self.gpt_worker.submit(
+                lambda: self.consult_gpt_for_trading(
+                    data, analysis_results, market_changed, force_check, snapshot=snapshot, on_decision=on_decision
+                ),
+                snapshot, analysis_results, now=self.clock.time()
+            )
+            print(f"GPT 자문 요청 (마감: {self.GPT_CONSULT_DEADLINE}초)")
+            return True
+
+        except Exception as e:
+            print(f"GPT 자문 요청 중 오류: {e}")
+            return False
+
+    def apply_gpt_consultation_result(self):
+        """도착한 GPT 자문 적용 (요청 당시 스냅샷이 허용 범위 안일 때만)
+
+        마감이 지나면 기본 자문(관망)으로 처리하고, 이후 결과가 도착해도
+        같은 허용 범위 확인을 거쳐 적용함. 스트리밍 자문은 매매 판단이 먼저
+        도착하면 그 판단으로 바로 거래하고, 전체 자문 도착시에는 다시 거래하지 않음.
+
+        Returns:
+            bool: 거래 실행 여부
+        """
+        try:
+            status, pending = self.gpt_worker.poll(self.clock.time())
+            if status == 'expired':
+                print(f"\n⏱ GPT 자문 마감 초과 ({self.GPT_CONSULT_DEADLINE}초) - 관망 유지, 결과 도착시 재검토")
+                return False
+            if status not in ('done', 'early'):
+                return False
+
+            elapsed = self.clock.time() - pending.submitted_at
+            if status == 'early':
+                gpt_advice = pending.early_advice
+                print(f"\nGPT 매매 판단 선도착 ({elapsed:.0f}초, 근거 수신 중): {gpt_advice['trade_recommendation']}, 신뢰도: {gpt_advice['confidence_score']}%")
+            else:
+                try:
+                    gpt_advice = pending.future.result()
+                except Exception as e:
+                    print(f"❌ GPT 자문 처리 실패: {e}")
+                    return False
+                if gpt_advice is None:
+                    print("❌ GPT 자문 실패")
+                    return False
+                print(f"\nGPT 자문 도착 ({elapsed:.0f}초): {gpt_advice.get('trade_recommendation')}, 신뢰도: {gpt_advice.get('confidence_score')}%")
+                if pending.early_applied:
+                    print("선도착 매매 판단으로 이미 처리함 - 전체 자문은 기록만")
+                    return False
+
+            snapshot = self.refresh_cycle_snapshot()
+            if not snapshot_within_tolerance(pending.snapshot, snapshot, self.GPT_RESULT_PRICE_TOLERANCE):
+                if snapshot is not None:
+                    change = (snapshot.current_price / pending.snapshot.current_price - 1) * 100
+                    print(f"자문 기준 시세/잔고가 허용 범위를 벗어남 (가격 변화: {change:+.2f}%) - 자문 폐기")
+                return False
+
+            buy_signal, sell_signal = self.signals_from_advice(gpt_advice, snapshot)
+            trade_executed = self.execute_trade(
+                buy_signal, sell_signal, gpt_advice, pending.analysis_results, snapshot=snapshot
+            )
+            if trade_executed:
+                print("\n거래 실행 완료 - 포트폴리오 재확인")
+                updated_portfolio = self.get_portfolio_status(self.refresh_cycle_snapshot())
+                if updated_portfolio:
+                    print(f"업데이트된 KRW 잔고: {updated_portfolio['krw_balance']:,.0f}원")
+                    print(f"업데이트된 BTC 잔고: {updated_portfolio['coin_balance']:.8f}")
+            return trade_executed
+
+        except Exception as e:
+            print(f"GPT 자문 적용 중 오류: {e}")
+            import traceback
+            traceback.print_exc()
+            return False
+
+    def is_significant_level_change(self, current_level, base_level, indicator_type='ema'):
+        """의미있는 레벨 변화인지 확인"""
+        # 2단계 이상 차이
+        if abs(current_level - base_level) >= 2:
+            return True
+            
+        # 특정 임계값을 넘어가는 경우
+        if indicator_type == 'ema':
+            significant_boundaries = {
+                2: [0, 4],  # 레벨 2에서 0이나 4로 갈 때
+                3: [0, 4]   # 레벨 3에서 0이나 4로 갈 때
+            }
+        else:  # bollinger
+            significant_boundaries = {
+                2: [0, 4, 5],  # 레벨 2에서 0, 4, 5로 갈 때
+                3: [0, 5]      # 레벨 3에서 0이나 5로 갈 때
+            }
+        
+        if base_level in significant_boundaries:
+            return current_level in significant_boundaries[base_level]
+            
+        return False
+
+    def monitor_knn_changes(self, current_knn, last_knn, current_time):
+        """KNN 예측 방향 변화 감지 함수"""
+        try:
+            knn_direction_change = False
+            
+            # 현재 방향 결정
+            if abs(current_knn) < self.KNN_SIGNAL_MIN_STRENGTH:
+                current_direction = 'neutral'
+            else:
+                current_direction = 'up' if current_knn > 0 else 'down'
+                
+            # 이전 방향 확인
+            if self.last_knn_direction is None:
+                self.last_knn_direction = current_direction
+                return False
+                
+            # 방향 전환 감지
+            if current_direction != self.last_knn_direction and current_direction != 'neutral':
+                # 쿨다운 확인
+                if (self.last_knn_change_time is None or 
+                    current_time - self.last_knn_change_time >= self.KNN_CHANGE_COOLDOWN):
+                    
+                    # 충분한 강도 차이 확인
+                    if abs(current_knn - last_knn) >= self.KNN_DIRECTION_CHANGE_THRESHOLD:
+                        knn_direction_change = True
+                        self.last_knn_change_time = current_time
+                        self.last_knn_direction = current_direction
+                        
+                        print("\nKNN 예측 방향 변화 감지:")
+                        print(f"- 이전 예측: {last_knn:+.2f}")
+                        print(f"- 현재 예측: {current_knn:+.2f}")
+                        print(f"- 새로운 예측: {current_direction} ")
+                        print(f"- 신호 강도 변화: {abs(current_knn - last_knn):.2f}")
+                else:
+                    cooldown_remaining = (self.KNN_CHANGE_COOLDOWN - 
+                                        (current_time - self.last_knn_change_time)) / 60
+                    print(f"\nKNN 방향 전환 쿨다운 중... (남은 시간: {cooldown_remaining:.1f}분)")
+                    
+            return knn_direction_change
+            
+        except Exception as e:
+            print(f"KNN 변화 감지 중 오류: {e}")
+            return False
+
+    def monitor_market_conditions(self, data, analysis_results):
+        """시장 상황 모니터링 및 유의미한 변화 감지"""
+        try:
+            # 1. 데이터 유효성 검사
+            if data is None or analysis_results is None:
+                print("데이터 또는 분석 결과가 없습니다.")
+                return True
+                    
+            if data.empty or 'close' not in data.columns:
+                print("가격 데이터가 유효하지 않습니다.")
+                return True
+
+            # 2. 필수 키 확인
+            required_keys = [
+                'rsi', 'volatility_ratio', 'ema_ribbon_status', 
+                'ema_ribbon_status_num', 'momentum', 'bollinger_position', 
+                'bollinger_position_num', 'stoch_rsi_k', 'stoch_rsi_d',
+                'knn_prediction'
+            ]
+                
+            if not all(key in analysis_results for key in required_keys):
+                missing_keys = [key for key in required_keys if key not in analysis_results]
+                print(f"분석 결과에 필요한 키가 없습니다: {missing_keys}")
+                return True
+
+            # 3. 현재 상태 데이터 구성
+            try:
+                current_state = {
+                    'price': float(data['close'].iloc[-1]),
+                    'rsi': float(analysis_results['rsi']),
+                    'volatility': float(analysis_results['volatility_ratio']),
+                    'ema_status': str(analysis_results['ema_ribbon_status']),
+                    'ema_ribbon_status_num': int(analysis_results['ema_ribbon_status_num']),
+                    'ema_base_num': int(analysis_results['ema_ribbon_status_num']),
+                    'momentum': float(analysis_results['momentum']),
+                    'bollinger_position': str(analysis_results['bollinger_position']),
+                    'bollinger_position_num': int(analysis_results['bollinger_position_num']),
+                    'bollinger_base_num': int(analysis_results['bollinger_position_num']),
+                    'ema_direction': 'neutral',
+                    'bb_direction': 'neutral',
+                    'ema_change_start_time': self.clock.time(),
+                    'bb_change_start_time': self.clock.time(),
+                    'stoch_rsi_k': float(analysis_results['stoch_rsi_k']),
+                    'stoch_rsi_d': float(analysis_results['stoch_rsi_d']),
+                    'knn_prediction': float(analysis_results['knn_prediction'])
+                }
+            except (ValueError, TypeError) as e:
+                print(f"데이터 변환 중 오류: {e}")
+                return True
+
+            # 4. 이전 상태 확인
+            if not hasattr(self, 'last_gpt_market_state') or self.last_gpt_market_state is None:
+                print("마지막 GPT 자문 시점의 시장 상태 정보 없음")
+                return True
+
+            current_time = self.clock.time()
+
+            # 5. Stoch RSI 변화 감지
+            last_k = self.last_gpt_market_state.get('stoch_rsi_k', 50)
+            last_d = self.last_gpt_market_state.get('stoch_rsi_d', 50)
+            current_k = current_state['stoch_rsi_k']
+            current_d = current_state['stoch_rsi_d']
+
+            # K와 D의 차이 계산
+            current_diff = current_k - current_d
+            last_diff = last_k - last_d
+
+            # 크로스 감지 로직
+            stoch_cross_up = False
+            stoch_cross_down = False
+            
+            if last_diff < 0 and current_diff > 0:  # 상향돌파 가능성
+                if abs(current_diff) >= self.STOCH_CROSS_THRESHOLD:  # 최소 차이 확인
+                    if (self.last_stoch_cross_time is None or 
+                        current_time - self.last_stoch_cross_time >= self.STOCH_CROSS_COOLDOWN or
+                        self.last_stoch_cross_type == 'down'):  # 다른 방향 크로스는 즉시 허용
+                        stoch_cross_up = True
+                        self.last_stoch_cross_time = current_time
+                        self.last_stoch_cross_type = 'up'
+                    else:
+                        cooldown_remaining = (self.STOCH_CROSS_COOLDOWN - 
+                                            (current_time - self.last_stoch_cross_time)) / 60
+                        if cooldown_remaining > 0:
+                            print(f"Stoch RSI 상향돌파 쿨다운 중... (남은 시간: {cooldown_remaining:.1f}분)")
+            
+            elif last_diff > 0 and current_diff < 0:  # 하향돌파 가능성
+                if abs(current_diff) >= self.STOCH_CROSS_THRESHOLD:  # 최소 차이 확인
+                    if (self.last_stoch_cross_time is None or 
+                        current_time - self.last_stoch_cross_time >= self.STOCH_CROSS_COOLDOWN or
+                        self.last_stoch_cross_type == 'up'):  # 다른 방향 크로스는 즉시 허용
+                        stoch_cross_down = True
+                        self.last_stoch_cross_time = current_time
+                        self.last_stoch_cross_type = 'down'
+                    else:
+                        cooldown_remaining = (self.STOCH_CROSS_COOLDOWN - 
+                                            (current_time - self.last_stoch_cross_time)) / 60
+                        if cooldown_remaining > 0:
+                            print(f"Stoch RSI 하향돌파 쿨다운 중... (남은 시간: {cooldown_remaining:.1f}분)")
+
+            # 과매수/과매도 구간 진입 감지
+            stoch_oversold = current_k <= 20 and last_k > 20
+            stoch_overbought = current_k >= 80 and last_k < 80
+
+            significant_stoch_change = (
+                stoch_cross_up or 
+                stoch_cross_down or 
+                stoch_oversold or 
+                stoch_overbought or
+                abs(current_k - last_k) > 15  # K값이 15 이상 급격히 변화
+            )
+
+            # 6. KNN 예측 방향 변화 감지
+            last_knn = self.last_gpt_market_state.get('knn_prediction', 0)
+            current_knn = current_state['knn_prediction']
+            
+            knn_direction_change = self.monitor_knn_changes(
+                current_knn=current_knn,
+                last_knn=last_knn,
+                current_time=current_time
+            )
+
+            # 7. 기존 지표들의 변화 감지
+            price_change = abs(current_state['price'] - self.last_gpt_market_state['price']) / self.last_gpt_market_state['price']
+            significant_price_change = price_change > 0.005
+            
+            rsi_change = abs(current_state['rsi'] - self.last_gpt_market_state['rsi'])
+            significant_rsi_change = rsi_change > 5
+            
+            volatility_change = abs(current_state['volatility'] - self.last_gpt_market_state['volatility'])
+            significant_volatility_change = volatility_change > 0.1
+
+            # 8. EMA 변화 감지
+            current_ema_num = current_state['ema_ribbon_status_num']
+            base_ema_num = self.last_gpt_market_state.get('ema_base_num', current_ema_num)
+            last_ema_num = self.last_gpt_market_state.get('ema_ribbon_status_num', current_ema_num)
+            
+            if current_ema_num > last_ema_num:
+                current_ema_direction = 'up'
+            elif current_ema_num < last_ema_num:
+                current_ema_direction = 'down'
+            else:
+                current_ema_direction = self.last_gpt_market_state.get('ema_direction', 'neutral')
+
+            last_ema_direction = self.last_gpt_market_state.get('ema_direction', 'neutral')
+            last_ema_change_time = self.last_gpt_market_state.get('ema_change_start_time', current_time)
+
+            ema_significant_change = (
+                current_ema_direction != last_ema_direction and
+                abs(current_ema_num - base_ema_num) >= 2
+            )
+
+            # 9. 볼린저 밴드 변화 감지
+            current_bb_num = current_state['bollinger_position_num']
+            base_bb_num = self.last_gpt_market_state.get('bollinger_base_num', current_bb_num)
+            last_bb_num = self.last_gpt_market_state.get('bollinger_position_num', current_bb_num)
+
+            if current_bb_num > last_bb_num:
+                current_bb_direction = 'up'
+            elif current_bb_num < last_bb_num:
+                current_bb_direction = 'down'
+            else:
+                current_bb_direction = self.last_gpt_market_state.get('bb_direction', 'neutral')
+
+            bb_significant_change = (
+                current_bb_direction != self.last_gpt_market_state.get('bb_direction', 'neutral') and
+                abs(current_bb_num - base_bb_num) >= 2
+            )
+
+            # 10. 모멘텀 방향 변화 감지
+            MOMENTUM_THRESHOLD = 0.01
+            momentum_direction_change = (
+                (current_state['momentum'] > MOMENTUM_THRESHOLD and 
+                self.last_gpt_market_state['momentum'] < -MOMENTUM_THRESHOLD) or
+                (current_state['momentum'] < -MOMENTUM_THRESHOLD and 
+                self.last_gpt_market_state['momentum'] > MOMENTUM_THRESHOLD)
+            )
+
+            # 11. 변화 상태 통합 및 출력
+            significant_change = (
+                significant_price_change or
+                significant_rsi_change or
+                significant_volatility_change or
+                ema_significant_change or
+                momentum_direction_change or
+                bb_significant_change or
+                significant_stoch_change or
+                knn_direction_change
+            )
+
+            if significant_change:
+                print("\n유의미한 변화 감지:")
+
+                # Stoch RSI 변화 출력
+                if significant_stoch_change:
+                    print("\nStoch RSI 변화:")
+                    if stoch_cross_up:
+                        print(f"- 골든크로스 발생 (K-D: {current_diff:.1f}%)")
+                    if stoch_cross_down:
+                        print(f"- 데드크로스 발생 (K-D: {current_diff:.1f}%)")
+                    if stoch_oversold:
+                        print("- 과매도 구간 진입")
+                    if stoch_overbought:
+                        print("- 과매수 구간 진입")
+                    print(f"- K값 변화: {last_k:.1f} → {current_k:.1f}")
+                    print(f"- K-D 차이: {current_diff:.1f}%")
+
+                # KNN 변화 출력
+                if knn_direction_change:
+                    print("\nKNN 변화:")
+                    print(f"- 이전 예측: {last_knn:+.2f}")
+                    print(f"- 현재 예측: {current_knn:+.2f}")
+                    print(f"- 신호 강도 변화: {abs(current_knn - last_knn):.2f}")
+
+                # 가격 및 기술적 지표 변화 출력
+                changes = {
+                    '가격 변화': f"{price_change*100:.3f}%" if significant_price_change else None,
+                    'RSI 변화': f"{rsi_change:.2f}" if significant_rsi_change else None,
+                    '변동성 변화': f"{volatility_change:.3f}" if significant_volatility_change else None,
+                    'EMA 상태 변화': "감지됨" if ema_significant_change else None,
+                    '모멘텀 방향 변화': "감지됨" if momentum_direction_change else None,
+                    '볼린저 밴드 변화': "감지됨" if bb_significant_change else None
+                }
+                
+                for key, value in changes.items():
+                    if value:
+                        print(f"- {key}: {value}")
+
+            return significant_change
+
+        except Exception as e:
+            print(f"시장 상황 모니터링 중 오류: {e}")
+            import traceback
+            traceback.print_exc()
+            return True
+
+    def _print_market_changes(self, current_state, current_diff, stoch_cross_up, 
+                            stoch_cross_down, stoch_oversold, stoch_overbought,
+                            current_k, last_k, current_knn, last_knn,
+                            price_change, rsi_change, volatility_change,
+                            ema_significant_change, momentum_direction_change,
+                            bb_significant_change):
+        """변화 상태 출력 함수"""
+        
+        # Stoch RSI 변화 출력
+        if stoch_cross_up or stoch_cross_down or stoch_oversold or stoch_overbought:
+            print("\nStoch RSI 유의미한 변화 감지:")
+            if stoch_cross_up:
+                print(f"- 골든크로스 발생 (K-D: {current_diff:.1f}%)")
+            if stoch_cross_down:
+                print(f"- 데드크로스 발생 (K-D: {current_diff:.1f}%)")
+            if stoch_oversold:
+                print("- 과매도 구간 진입")
+            if stoch_overbought:
+                print("- 과매수 구간 진입")
+            print(f"- K값 변화: {last_k:.1f} → {current_k:.1f}")
+            print(f"- K-D 차이: {current_diff:.1f}%")
+
+        # KNN 변화 출력
+        if current_knn != last_knn:
+            print("\nKNN 예측 방향 변화 감지:")
+            print(f"- 이전 예측: {last_knn:+.2f}")
+            print(f"- 현재 예측: {current_knn:+.2f}")
+            direction = "상승" if current_knn > 0 else "하락"
+            strength = "강" if abs(current_knn) > 0.5 else "중" if abs(current_knn) > 0.2 else "약"
+            print(f"- 새로운 예측: {direction} ({strength}한 신호)")
+
+        # 종합 변화 출력
+        print("\n유의미한 변화 감지:")
+        changes = {
+            '가격 변화': f"{price_change*100:.3f}%" if price_change > 0.005 else None,
+            'RSI 변화': f"{rsi_change:.2f}" if rsi_change > 5 else None,
+            '변동성 변화': f"{volatility_change:.3f}" if volatility_change > 0.1 else None,
+            'EMA 상태 변화': "감지됨" if ema_significant_change else None,
+            '모멘텀 방향 변화': "감지됨" if momentum_direction_change else None,
+            '볼린저 밴드 변화': "감지됨" if bb_significant_change else None
+        }
+        
+        for key, value in changes.items():
+            if value:
+                print(f"- {key}: {value}")
+
+    def execute_trade(self, buy_signal, sell_signal, gpt_advice, analysis_results, snapshot=None):
+        """거래 실행 로직"""
+        try:
+            if analysis_results is None:
+                print("분석 결과가 없습니다.")
+                return False
+
+            # GPT 자문 확인
+            gpt_confidence = gpt_advice.get('confidence_score', 0)
+            trade_recommendation = gpt_advice.get('trade_recommendation', '관망')
+
+            print(f"\n=== 거래 실행 검토 ===")
+            print(f"GPT 추천: {trade_recommendation}, 신뢰도: {gpt_confidence}%")
+
+            snapshot = self._resolve_snapshot(snapshot)
+            if snapshot is None:
+                print("현재 가격을 가져올 수 없습니다.")
+                return False
+
+            current_price = snapshot.current_price
+            balance = snapshot.krw_balance
+            coin_balance = snapshot.coin_balance
+
+            # 매수 로직
+            if buy_signal and trade_recommendation == '매수' and gpt_confidence >= 60:
+                # 총자산 계산
+                total_assets = balance + (coin_balance * current_price)
+                
+                # 현재 BTC 보유 비율 계산
+                current_BTC_ratio = (coin_balance * current_price) / total_assets * 100 if total_assets > 0 else 0
+                
+                # GPT가 제안한 목표 BTC 보유 비율
+                target_BTC_ratio = gpt_advice.get('investment_percentage', 10)
+                
+                # 목표 비율과 현재 비율 차이 계산
+                ratio_difference = target_BTC_ratio - current_BTC_ratio
+                
+                print(f"\n=== 매수 분석 ===")
+                print(f"총자산: {total_assets:,.0f} KRW")
+                print(f"현재 BTC 비율: {current_BTC_ratio:.2f}%")
+                print(f"목표 BTC 비율: {target_BTC_ratio:.2f}%")
+                print(f"비율 차이: {ratio_difference:.2f}%")
+
+                if ratio_difference > 1:  # 1% 이상 차이가 날 때만 매수
+                    # 추가로 필요한 BTC 가치 계산
+                    additional_BTC_value = total_assets * (ratio_difference / 100)
+                    buy_amount = min(additional_BTC_value * 0.9995, balance * 0.9995)
+
+                    if buy_amount >= self.MIN_ORDER_AMOUNT:
+                        try:
+                            print(f"\n매수 주문 시도:")
+                            print(f"주문 금액: {buy_amount:,.0f} KRW")
+                            
+                            order = self.upbit.buy_market_order(self.ticker, buy_amount)
+                            
+                            if order and 'uuid' in order:
+                                print(f"매수 성공! 주문 ID: {order['uuid']}")
+                                self.invalidate_cycle_snapshot()
+                                self.log_trade(
+                                    trade_type='buy',
+                                    amount=buy_amount,
+                                    price=current_price,
+                                    confidence_score=gpt_confidence,
+                                    reasoning=gpt_advice.get('reasoning', '매수 실행'),
+                                    rsi=analysis_results['rsi'],
+                                    volatility=analysis_results['volatility_ratio'],
+                                    strategy_type='gpt_advised'
+                                )
+                                return True
+                            else:
+                                print(f"매수 주문 실패: {order}")
+                        except Exception as e:
+                            print(f"매수 주문 중 오류: {e}")
+                            return False
+                    else:
+                        print(f"최소 주문 금액({self.MIN_ORDER_AMOUNT:,} KRW)보다 작은 주문")
+                else:
+                    print(f"현재 BTC 보유 비율이 충분합니다. 추가 매수가 필요하지 않습니다.")
+                    self.log_trade(
+                        trade_type='hold',
+                        amount=0,
+                        price=current_price,
+                        confidence_score=gpt_confidence,
+                        reasoning=f"현재 BTC 보유 비율({current_BTC_ratio:.2f}%)이 목표 비율({target_BTC_ratio:.2f}%)에 근접",
+                        rsi=analysis_results['rsi'],
+                        volatility=analysis_results['volatility_ratio'],
+                        strategy_type='gpt_advised'
+                    )
+                        
+            # 매도 로직
+            elif sell_signal and trade_recommendation == '매도' and gpt_confidence >= 60:
+                if coin_balance > 0:
+                    sell_ratio = gpt_advice.get('investment_percentage', 10) / 100
+                    base_sell_amount = coin_balance * sell_ratio
+                    
+                    expected_value = base_sell_amount * current_price * (1 - self.TRADING_FEE_RATE)
+                    
+                    print(f"\n=== 매도 분석 ===")
+                    print(f"보유 BTC: {coin_balance:.8f}")
+                    print(f"매도 비율: {sell_ratio*100:.1f}%")
+                    print(f"매도 수량: {base_sell_amount:.8f}")
+                    print(f"예상 가치: {expected_value:,.0f} KRW")
+                    
+                    if expected_value >= self.MIN_ORDER_AMOUNT:
+                        try:
+                            print(f"\n매도 주문 시도:")
+                            print(f"매도 수량: {base_sell_amount:.8f} BTC")
+                            print(f"예상 가치: {expected_value:,.0f} KRW")
+                            
+                            order = self.upbit.sell_market_order(self.ticker, base_sell_amount)
+                            
+                            if order and 'uuid' in order:
+                                print(f"매도 성공! 주문 ID: {order['uuid']}")
+                                self.invalidate_cycle_snapshot()
+                                self.log_trade(
+                                    trade_type='sell',
+                                    amount=base_sell_amount,
+                                    price=current_price,
+                                    confidence_score=gpt_confidence,
+                                    reasoning=gpt_advice.get('reasoning', '매도 실행'),
+                                    rsi=analysis_results['rsi'],
+                                    volatility=analysis_results['volatility_ratio'],
+                                    strategy_type='gpt_advised'
+                                )
+                                return True
+                            else:
+                                print(f"매도 주문 실패: {order}")
+                        except Exception as e:
+                            print(f"매도 주문 중 오류: {e}")
+                            return False
+                    else:
+                        print(f"매도 금액이 최소 주문 금액보다 작음 ({expected_value:,.0f} < {self.MIN_ORDER_AMOUNT:,} KRW)")
+                else:
+                    print("매도 가능한 코인 잔액 없음")
+            else:
+                print("\n관망 상태 유지")
+                self.log_trade(
+                    trade_type='hold',
+                    amount=0,
+                    price=current_price,
+                    confidence_score=gpt_confidence,
+                    reasoning=f"GPT 추천: {trade_recommendation}, 신뢰도: {gpt_confidence}%",
+                    rsi=analysis_results['rsi'],
+                    volatility=analysis_results['volatility_ratio'],
+                    strategy_type='gpt_advised'
+                )
+                
+            return False
+                
+        except Exception as e:
+            print(f"거래 실행 중 오류 발생: {e}")
+            import traceback
+            traceback.print_exc()
+            return False
+        
+    def check_significant_market_change(self, last_state, current_state):
+        """시장 상황의 유의미한 변화 감지"""
+        if not last_state or not current_state:
+            return True
+            
+        try:
+            # 가격 변화 확인
+            price_change = abs(current_state['price'] - last_state['price']) / last_state['price']
+            
+            # RSI 변화 확인
+            rsi_change = abs(current_state['rsi'] - last_state['rsi'])
+            
+            # 변동성 변화 확인
+            volatility_change = abs(current_state['volatility'] - last_state['volatility'])
+            
+            # 볼린저 밴드 포지션 변화 (2단계 이상)
+            position_change = abs(current_state['bollinger_position_num'] - last_state.get('bollinger_position_num', 0))
+            significant_position_change = position_change >= 2
+            
+            # 시장 상황 변화 판단
+            significant_change = (
+                price_change > self.MARKET_CHANGE_THRESHOLD or  # 가격 2% 이상 변화
+                rsi_change > 10 or  # RSI 10 이상 변화
+                volatility_change > 0.1 or  # 변동성 10% 이상 변화
+                significant_position_change  # 볼린저 밴드 2단계 이상 변화
+            )
+            
+            return significant_change
+            
+        except Exception as e:
+            print(f"시장 변화 감지 중 오류: {e}")
+            return True  # 오류 발생 시 안전하게 True 반환
+
+    def consult_gpt_for_trading(self, data, analysis_results, market_changed=None, force_check=False, snapshot=None,
+                                on_decision=None):
+        """시장 상황에 따른 GPT 자문 요청 (이전 자문 내역 포함)"""
+        try:
+            if not market_changed and not force_check:
+                return {
+                    'trade_recommendation': '관망',
+                    'investment_percentage': 0,
+                    'confidence_score': 50,
+                    'reasoning': '시장 상황 유지 중'
+                }
+
+            snapshot = self._resolve_snapshot(snapshot)
+            if snapshot is None:
+                raise ValueError("시세/계좌 스냅샷 조회 실패")
+
+            # 명확한 관망은 로컬 점수로 결정하고, 나머지는 단계별 추론 강도로 GPT 호출
+            reasoning_effort = self.GPT_REASONING_EFFORT
+            if getattr(self, 'USE_DECISION_GATE', False):
+                tier, local_advice = self.run_decision_gate(analysis_results, snapshot, market_changed, force_check)
+                if local_advice is not None:
+                    self.last_gpt_market_state = self.build_market_state(analysis_results, snapshot.current_price)
+                    return local_advice
+                reasoning_effort = tier['reasoning_effort']
+
+            # 트리거 전에 미리 받아 둔 선행 자문이 아직 유효하면 사용
+            cache = self.get_consultation_cache()
+            state = None
+            if cache is not None or getattr(self, 'USE_SPECULATIVE_GPT', False):
+                state = quantize_market_state(analysis_results, snapshot.coin_ratio, self.KNN_SIGNAL_MIN_STRENGTH)
+            if getattr(self, 'USE_SPECULATIVE_GPT', False):
+                speculative_advice, prompt_state = self.take_speculative_advice(snapshot, state)
+                if speculative_advice is not None:
+                    self.record_gpt_advice(speculative_advice, analysis_results, snapshot.current_price, snapshot)
+                    self.apply_prompt_state(prompt_state)
+                    if cache is not None:
+                        cache.put(state, self.last_gpt_advice_id, now=self.clock.time(),
+                                  recommendation=speculative_advice.get('trade_recommendation'),
+                                  account=account_key(snapshot))
+                    return speculative_advice
+
+            # 최근 같은 양자화 상태에서 받은 자문이 있으면 재사용
+            if cache is not None:
+                # 매수/매도 자문은 계좌 상태가 그대로일 때만 재사용 (주문 반복 방지)
+                cached_advice = cache.get(state, now=self.clock.time(), account=account_key(snapshot))
+                stats = cache.stats()
+                if cached_advice is not None:
+                    print(f"동일 시장 상태 {state} - 이전 자문 재사용 (적중 {stats['hits']}/{stats['hits'] + stats['misses']})")
+                    self.last_gpt_market_state = self.build_market_state(analysis_results, snapshot.current_price)
+                    return cached_advice
+                print(f"새 시장 상태 {state} - GPT 자문 요청 (적중 {stats['hits']}/{stats['hits'] + stats['misses']})")
+
+            try:
+                gpt_advice, current_price, prompt_state = self.request_model_advice(
+                    data, analysis_results, snapshot, force_check, reasoning_effort, on_decision=on_decision
+                )
+                self.record_gpt_advice(gpt_advice, analysis_results, current_price, snapshot)
+                self.apply_prompt_state(prompt_state)
+                if cache is not None:
+                    cache.put(state, self.last_gpt_advice_id, now=self.clock.time(),
+                              recommendation=gpt_advice.get('trade_recommendation'), account=account_key(snapshot))
+                return gpt_advice
+
+            except ValueError as e:
+                print(f"응답 처리 중 오류 발생: {e}")
+                return {
+                    'trade_recommendation': '관망',
+                    'investment_percentage': 0,
+                    'confidence_score': 50,
+                    'reasoning': f'처리 오류: {str(e)}'
+                }
+
+        except Exception as e:
+            print(f"GPT 자문 요청 중 오류 발생: {e}")
+            import traceback
+            traceback.print_exc()
+            return {
+                'trade_recommendation': '관망',
+                'investment_percentage': 0,
+                'confidence_score': 50,
+                'reasoning': f'시스템 오류: {str(e)}'
+            }
+            
+    def request_model_advice(self, data, analysis_results, snapshot, force_check=False, reasoning_effort=None,
+                             on_decision=None):
+        """OHLCV/뉴스를 모아 GPT(또는 응답 저장소)에 자문 요청 (기록/캐시 갱신 없음)
+
+        on_decision은 스트리밍 중 매매 판단이 먼저 도착하면 호출됨 (USE_GPT_STREAMING).
+        델타 프롬프트 횟수/보낸 뉴스 지문도 바꾸지 않고 prompt_state로 돌려주며,
+        자문을 실제로 사용할 때 apply_prompt_state로 반영함 (버려진 선행 자문 제외).
+
+        Returns:
+            tuple: (자문 dict, 자문 기준 현재가, prompt_state - 모델을 호출하지 않았으면 None)
+        """
+        try:
+            if getattr(self, 'USE_CANDLE_STORE', False):
+                # get_historical_data()에서 이번 주기에 이미 동기화됨
+                ohlcv_data = self.get_candle_store().get_window(self.ticker, self.interval, count=60)
+            else:
+                ohlcv_data = pyupbit.get_ohlcv(self.ticker, interval=self.interval, count=60)
+            if ohlcv_data is None or ohlcv_data.empty:
+                ohlcv_data = data.tail(60).copy()
+        except Exception as e:
+            print(f"OHLCV 데이터 조회 실패: {e}")
+            ohlcv_data = data.tail(60).copy()
+
+        current_price = float(ohlcv_data['close'].iloc[-1])
+
+        store = self.get_gpt_response_store()
+        replaying = store is not None and store.mode == 'replay'
+        now = self.clock.now(self.timezone)
+
+        # 재생 모드에서는 뉴스를 새로 받지 않고 기록 당시의 뉴스 지문 사용
+        news = None if replaying else self.fetch_BTC_news()
+        news_key = store.news_digest_at(now) if replaying else news_digest(news)
+
+        prompt_state = None
+
+        def request_advice():
+            nonlocal prompt_state
+            baseline = self.select_gpt_prompt_baseline(force_check)
+            messages = self.build_gpt_messages(
+                ohlcv_data, analysis_results, current_price, snapshot, news, force_check, baseline=baseline
+            )
+            gpt_advice = json.loads(self.request_gpt_advice(
+                messages, reasoning_effort=reasoning_effort, on_decision=on_decision
+            ))
+            prompt_state = {'delta': baseline is not None, 'news_digest': news_digest(news)}
+            return gpt_advice
+
+        if store is not None:
+            inputs = self.build_gpt_inputs(analysis_results, current_price, snapshot, news_key)
+            gpt_advice, source = store.consult(inputs, request_advice, model=self.GPT_MODEL, recorded_at=now)
+            print(f"GPT 자문 출처: {source}")
+        else:
+            gpt_advice = request_advice()
+        return gpt_advice, current_price, prompt_state
+
+    def apply_prompt_state(self, prompt_state):
+        """사용한 자문의 프롬프트 상태 반영 (델타 프롬프트 연속 횟수, 마지막으로 보낸 뉴스 지문)"""
+        if prompt_state is None:
+            return
+        self.gpt_delta_prompt_count = self.gpt_delta_prompt_count + 1 if prompt_state['delta'] else 0
+        self.last_prompt_news_digest = prompt_state['news_digest']
+
+    def build_gpt_messages(self, ohlcv_data, analysis_results, current_price, snapshot, news, force_check=False,
+                           baseline=None):
+        """GPT 자문 메시지 생성 (고정 시스템 메시지 + 주기별 사용자 메시지)
+
+        시스템 메시지(prompt_builder.STATIC_SYSTEM_PROMPT)는 매 주기 같은 바이트로
+        유지해 제공자측 프롬프트 캐시를 적중시키고, 주기마다 접두부 해시를 확인함.
+        OHLCV는 GPT_OHLCV_FORMAT('verbose' | 'csv' | 'delta') 형식으로 넣고,
+        GPT_PROMPT_TOKEN_BUDGET을 넘으면 이전 자문 → 뉴스 → OHLCV 순으로 줄임.
+        baseline(get_last_gpt_advice_record 결과)이 있으면 그 자문 이후의
+        변경분만 담은 델타 사용자 메시지를 만듦 (build_delta_prompt).
+        """
+        balance = snapshot.krw_balance
+        coin_balance = snapshot.coin_balance
+        total_assets = balance + (coin_balance * current_price)
+        current_BTC_ratio = (coin_balance * current_price / total_assets * 100) if total_assets > 0 else 0
+        avg_buy_price = snapshot.avg_buy_price
+        fmt = getattr(self, 'GPT_OHLCV_FORMAT', 'verbose')
+
+        # 이전 자문 내역 (축소 단계마다 다시 조회하지 않도록 개수별로 보관)
+        advice_history = {}
+
+        def get_previous_advice(limit):
+            if limit not in advice_history:
+                advice_history[limit] = self.get_gpt_advice_history(limit=limit, formatted=True) if limit > 0 else ""
+            return advice_history[limit]
+
+        # Stoch RSI 신호 확인
+        stoch_rsi_signal = ""
+        if hasattr(self, 'last_stoch_cross_type') and self.last_stoch_cross_time:
+            # 최근 30분 이내의 크로스 신호만 전달
+            if self.clock.time() - self.last_stoch_cross_time <= 1800:  # 30분
+                if self.last_stoch_cross_type == 'up':
+                    stoch_rsi_signal = "최대 30분 이전에 골든크로스 발생했었음"
+                elif self.last_stoch_cross_type == 'down':
+                    stoch_rsi_signal = "최대 30분 이전에 데드크로스 발생했었음"
+
+        if baseline is not None:
+            prompt = self.build_delta_prompt(
+                baseline, ohlcv_data, analysis_results, current_price, snapshot, news, stoch_rsi_signal
+            )
+            messages = [
+                {"role": "system", "content": STATIC_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ]
+            self.gpt_prefix_guard.check(messages)
+            print(f"프롬프트 토큰: 고정 {count_tokens(STATIC_SYSTEM_PROMPT)} + 델타 {count_tokens(prompt)} (직전 자문 {baseline['minutes_passed']:.0f}분 전 기준)")
+            return messages
+
+        def render(ohlcv_rows, advice_limit, news):
+            ohlcv_formatted = format_ohlcv(ohlcv_data.tail(ohlcv_rows), fmt)
+            previous_advice = get_previous_advice(advice_limit)
+            prompt = f"""BTC 시장 분석 보고서 ({force_check and '정기점검' or '시장변화'})
+
+    {previous_advice}
+
+    {ohlcv_formatted}
+
+    현재 시장 상황:
+    - 현재가: {round(current_price / 100) * 100:,.0f}원
+    - EMA: {analysis_results['ema_ribbon_status']}
+    - Stoch RSI: K:{analysis_results['stoch_rsi_k']:.1f}, D:{analysis_results['stoch_rsi_d']:.1f} {stoch_rsi_signal}
+    - 모멘텀: {analysis_results['momentum']*100:.1f}%
+    - 변동성: {analysis_results['volatility_ratio']:.1f}%
+    - 볼린저밴드: {analysis_results['bollinger_position']}
+    - 볼린저 밴드폭: {analysis_results.get('band_width', 0):.2f}%
+    - 다이버전스: {analysis_results['divergence']['bearish_divergence'] and '베어리시' or ''} {analysis_results['divergence']['bullish_divergence'] and '불리시' or ''}
+
+    자산 현황:
+    - 보유KRW: {balance:.0f}원
+    - 보유BTC: {coin_balance:.8f}개 
+    - 평단가: {avg_buy_price > 0 and f"{avg_buy_price:.0f}원" or "없음"}
+    - 수익률: {avg_buy_price > 0 and f"{((current_price - avg_buy_price) / avg_buy_price * 100):.2f}%" or "없음"}
+    - BTC비중: {current_BTC_ratio:.2f}%
+
+    KNN 분석:
+    - 예측방향: {analysis_results['knn_prediction'] > 0 and '상승' or analysis_results['knn_prediction'] < 0 and '하락' or '중립'}
+    - 신뢰도: {analysis_results['knn_signal_strength']:.1f}%
+    - 신호강도: {abs(analysis_results['knn_prediction']) > 0.5 and '강' or abs(analysis_results['knn_prediction']) > 0.2 and '중' or '약'}
+
+    뉴스 요약:
+    {news}
+
+    위 정보를 바탕으로 지정된 JSON 형식으로 매매 판단을 응답해주세요."""
+            return prompt if fmt == 'verbose' else compact_lines(prompt)
+
+        budget = getattr(self, 'GPT_PROMPT_TOKEN_BUDGET', None)
+        if budget is not None:
+            budget -= count_tokens(STATIC_SYSTEM_PROMPT)
+        prompt, tokens, plan = fit_prompt(
+            render, budget, len(ohlcv_data), 3, news,
+            min_ohlcv_rows=getattr(self, 'GPT_PROMPT_MIN_OHLCV_ROWS', 20)
+        )
+        messages = [
+            {"role": "system", "content": STATIC_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+        self.gpt_prefix_guard.check(messages)
+        print(f"프롬프트 토큰: 고정 {count_tokens(STATIC_SYSTEM_PROMPT)} + 가변 {tokens} (OHLCV {plan['ohlcv_rows']}개, 이전 자문 {plan['advice_limit']}개, 뉴스 {plan['news_chars']}자)")
+        return messages
+
+    def select_gpt_prompt_baseline(self, force_check=False):
+        """델타 프롬프트 기준이 될 직전 자문 (전체 프롬프트를 보낼 차례면 None)
+
+        GPT_PROMPT_MODE가 'delta'가 아니거나, 정기 점검이거나, 델타를
+        GPT_DELTA_FULL_EVERY회 연속 보냈거나, 직전 자문이 GPT_DELTA_MAX_AGE초보다
+        오래되었거나 잔고가 없는 예전 형식이면 None.
+        """
+        if getattr(self, 'GPT_PROMPT_MODE', 'full') != 'delta' or force_check:
+            return None
+        if self.gpt_delta_prompt_count >= self.GPT_DELTA_FULL_EVERY:
+            return None
+        baseline = self.get_last_gpt_advice_record()
+        if baseline is None or 'krw_balance' not in (baseline['market_state'] or {}):
+            return None
+        if baseline['minutes_passed'] * 60 > self.GPT_DELTA_MAX_AGE:
+            return None
+        return baseline
+
+    def get_last_gpt_advice_record(self):
+        """gpt_advice_log의 마지막 자문 (자문, 당시 시장 상태, 시각, 경과 분)"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            try:
+                row = conn.execute('''
+                SELECT timestamp, trade_recommendation, investment_percentage,
+                       confidence_score, reasoning, market_state
+                FROM gpt_advice_log
+                ORDER BY timestamp DESC, id DESC
+                LIMIT 1
+                ''').fetchone()
+            finally:
+                conn.close()
+            if row is None:
+                return None
+
+            advice_time = datetime.strptime(row[0], '%Y-%m-%d %H:%M:%S').replace(tzinfo=self.timezone)
+            return {
+                'timestamp': advice_time,
+                'minutes_passed': (self.clock.now(self.timezone) - advice_time).total_seconds() / 60,
+                'advice': {
+                    'trade_recommendation': row[1],
+                    'investment_percentage': row[2],
+                    'confidence_score': row[3],
+                    'reasoning': row[4]
+                },
+                'market_state': json.loads(row[5]) if row[5] else None
+            }
+
+        except Exception as e:
+            print(f"마지막 자문 조회 중 오류: {e}")
+            return None
+
+    def build_delta_prompt(self, baseline, ohlcv_data, analysis_results, current_price, snapshot, news,
+                           stoch_rsi_signal=""):
+        """직전 자문 이후 변경분만 담은 사용자 메시지
+
+        바뀐 지표는 '이전 → 현재', 그대로인 지표는 한 줄로 묶고, 직전 자문
+        시점에 형성 중이던 캔들부터의 OHLCV, 잔고 변화, 마지막으로 보낸 뉴스와
+        다를 때만 뉴스를 넣음.
+        """
+        base = baseline['market_state']
+        advice = baseline['advice']
+        current = self.build_market_state(analysis_results, current_price, snapshot)
+        changed, unchanged = diff_market_state(base, current)
+
+        since = baseline['timestamp'].replace(tzinfo=None)
+        fmt = getattr(self, 'GPT_OHLCV_FORMAT', 'csv')
+        candles = format_ohlcv(candles_since(ohlcv_data, since), 'csv' if fmt == 'verbose' else fmt)
+
+        total_assets = snapshot.krw_balance + snapshot.coin_balance * current_price
+        btc_ratio = snapshot.coin_balance * current_price / total_assets * 100 if total_assets > 0 else 0
+        avg_buy_price = snapshot.avg_buy_price
+        position = [
+            f"- {label}: {fmt_value(base[key])} → {fmt_value(current[key])}"
+            for label, key, fmt_value in (
+                ('보유KRW', 'krw_balance', lambda v: f"{v:.0f}원"),
+                ('보유BTC', 'coin_balance', lambda v: f"{v:.8f}개"),
+                ('평단가', 'avg_buy_price', lambda v: f"{v:.0f}원" if v > 0 else "없음")
+            )
+            if fmt_value(base[key]) != fmt_value(current[key])
+        ]
+        if not position:
+            position = ["- 직전 자문 이후 잔고 변화 없음"]
+        position.append(f"- 수익률: {avg_buy_price > 0 and f'{(current_price - avg_buy_price) / avg_buy_price * 100:.2f}%' or '없음'}")
+        position.append(f"- BTC비중: {btc_ratio:.2f}%")
+
+        divergence = analysis_results['divergence']
+        divergence_text = ' '.join(name for name, flag in (
+            ('베어리시', divergence['bearish_divergence']), ('불리시', divergence['bullish_divergence'])
+        ) if flag)
+        if news and news_digest(news) == self.last_prompt_news_digest:
+            news = "직전 자문 이후 새 뉴스 없음"
+
+        lines = [
+            "BTC 시장 분석 보고서 (시장변화, 직전 자문 이후 변경분)",
+            "",
+            f"직전 자문 ({baseline['minutes_passed']:.0f}분 전, 당시 가격 {round(base['price'] / 100) * 100:,.0f}원):",
+            f"- 추천: {advice['trade_recommendation']}, 투자비율: {advice['investment_percentage']}%, 신뢰도: {advice['confidence_score']}%",
+            f"- 근거: {advice['reasoning']}",
+            "",
+            "직전 자문 이후 변화:",
+            f"- 현재가: {round(current_price / 100) * 100:,.0f}원 ({(current_price / base['price'] - 1) * 100:+.2f}%)",
+            *[f"- {line}" for line in changed],
+            f"- 변화 없음: {', '.join(unchanged) if unchanged else '없음'}",
+            f"- Stoch RSI 신호: {stoch_rsi_signal or '없음'}",
+            f"- 다이버전스: {divergence_text or '없음'}",
+            "",
+            candles,
+            "",
+            "자산 현황:",
+            *position,
+            "",
+            "뉴스 요약:",
+            str(news),
+            "",
+            "위 정보를 바탕으로 지정된 JSON 형식으로 매매 판단을 응답해주세요."
+        ]
+        return '\n'.join(lines)
+
+    def verify_gpt_prompt_prefix(self, data, cycles=5):
+        """최근 cycles개 캔들 시점의 메시지를 만들어 고정 접두부 해시가 모두 같은지 확인 (API 호출 없음)
+
+        Returns:
+            dict: prefix_hash, stable, cycles
+        """
+        try:
+            hashes = set()
+            for i in range(cycles):
+                window = data.iloc[:len(data) - i] if i > 0 else data
+                analysis_results = self.calculate_indicators(window)
+                if analysis_results is None:
+                    continue
+                price = float(window['close'].iloc[-1])
+                now = time.time()
+                snapshot = CycleSnapshot(
+                    market=MarketSnapshot(ticker=self.ticker, current_price=price, fetched_at=now),
+                    account=AccountSnapshot(krw_balance=1_000_000.0 * (i + 1), coin_balance=0.001 * i,
+                                            avg_buy_price=price * 0.99 if i else 0.0, fetched_at=now)
+                )
+                messages = self.build_gpt_messages(
+                    window.tail(60), analysis_results, price, snapshot,
+                    news=f"뉴스 {i}" if i % 2 else None, force_check=bool(i % 2)
+                )
+                hashes.add(prefix_hash(messages))
+
+            stable = len(hashes) == 1
+            print(f"프롬프트 고정 접두부 확인: {'일정' if stable else '변경됨'} ({len(hashes)}개 해시, {cycles}개 주기)")
+            return {'prefix_hash': next(iter(hashes)) if stable else None, 'stable': stable, 'cycles': cycles}
+
+        except Exception as e:
+            print(f"프롬프트 접두부 확인 중 오류: {e}")
+            import traceback
+            traceback.print_exc()
+            return {'prefix_hash': None, 'stable': False, 'cycles': 0}
+
+    def get_openai_client(self):
+        """봇 수명 동안 재사용하는 OpenAI 클라이언트 (HTTP 연결 유지, 재시도는 SDK가 처리)
+
+        시도당 제한 시간은 GPT_REQUEST_TIMEOUT. 자문 마감(GPT_CONSULT_DEADLINE)은
+        HTTP 호출을 끊지 않고, 늦게 도착한 결과는 apply_gpt_consultation_result의
+        스냅샷 허용 범위 확인으로 처리함.
+        """
+        if self.openai_client is None:
+            self.openai_client = openai.OpenAI(
+                api_key=self.openai_api_key,
+                base_url=self.openai_base_url,
+                timeout=self.GPT_REQUEST_TIMEOUT,
+                max_retries=self.GPT_MAX_RETRIES
+            )
+        return self.openai_client
+
+    def request_gpt_advice(self, messages, reasoning_effort=None, on_decision=None):
+        """GPT 모델 호출 (응답 본문 JSON 문자열 반환, 호출마다 gpt_call_log에 지연/토큰 기록)
+
+        USE_GPT_STREAMING이면 stream_gpt_advice로 받으며 매매 판단이 먼저
+        도착했을 때 on_decision(조기 자문)을 호출함.
+        """
+        if getattr(self, 'USE_GPT_STREAMING', False):
+            return self.stream_gpt_advice(messages, reasoning_effort, on_decision)
+
+        client = self.get_openai_client()
+        started = time.perf_counter()
+        try:
+            raw_response = client.chat.completions.with_raw_response.create(
+                model=self.GPT_MODEL,
+                messages=messages,
+                response_format=ADVICE_RESPONSE_FORMAT,
+                reasoning_effort=reasoning_effort or self.GPT_REASONING_EFFORT
+            )
+            response = raw_response.parse()
+        except Exception as e:
+            request = getattr(e, 'request', None)
+            retries = int(request.headers.get('x-stainless-retry-count', 0)) if request is not None else 0
+            self.log_gpt_call(time.perf_counter() - started, retries=retries, status='error', error=str(e))
+            raise
+
+        usage = response.usage
+        details = getattr(usage, 'prompt_tokens_details', None) if usage else None
+        self.log_gpt_call(
+            time.perf_counter() - started,
+            prompt_tokens=usage.prompt_tokens if usage else None,
+            completion_tokens=usage.completion_tokens if usage else None,
+            cached_tokens=getattr(details, 'cached_tokens', None) if details else None,
+            retries=int(raw_response.http_request.headers.get('x-stainless-retry-count', 0))
+        )
+        return response.choices[0].message.content.strip()
+
+    def stream_gpt_advice(self, messages, reasoning_effort=None, on_decision=None):
+        """GPT 응답을 스트리밍으로 받으며 증분 파싱
+
+        추천/투자비율/신뢰도가 모두 도착하면 reasoning을 기다리지 않고
+        on_decision(조기 자문)을 호출하고, 전체 본문은 끝까지 받아 반환함.
+        """
+        client = self.get_openai_client()
+        parser = AdviceStreamParser()
+        started = time.perf_counter()
+        usage = None
+        retries = 0
+        try:
+            raw_response = client.chat.completions.with_raw_response.create(
+                model=self.GPT_MODEL,
+                messages=messages,
+                response_format=ADVICE_RESPONSE_FORMAT,
+                reasoning_effort=reasoning_effort or self.GPT_REASONING_EFFORT,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            retries = int(raw_response.http_request.headers.get('x-stainless-retry-count', 0))
+            for chunk in raw_response.parse():
+                if chunk.usage is not None:
+                    usage = chunk.usage
+                if not chunk.choices or not chunk.choices[0].delta.content:
+                    continue
+                decision = parser.feed(chunk.choices[0].delta.content)
+                if decision is not None:
+                    print(f"매매 판단 선도착 ({(time.perf_counter() - started) * 1000:.0f}ms): "
+                          f"{decision['trade_recommendation']} {decision['investment_percentage']}%, "
+                          f"신뢰도 {decision['confidence_score']}%")
+                    if on_decision is not None:
+                        on_decision(decision)
+        except Exception as e:
+            request = getattr(e, 'request', None)
+            if request is not None:
+                retries = int(request.headers.get('x-stainless-retry-count', 0))
+            self.log_gpt_call(time.perf_counter() - started, retries=retries, status='error', error=str(e))
+            raise
+
+        details = getattr(usage, 'prompt_tokens_details', None) if usage else None
+        self.log_gpt_call(
+            time.perf_counter() - started,
+            prompt_tokens=usage.prompt_tokens if usage else None,
+            completion_tokens=usage.completion_tokens if usage else None,
+            cached_tokens=getattr(details, 'cached_tokens', None) if details else None,
+            retries=retries
+        )
+        return parser.text.strip()
+
+    def log_gpt_call(self, wall_time, prompt_tokens=None, completion_tokens=None, cached_tokens=None,
+                     retries=0, status='ok', error=None):
+        """GPT 호출 한 번의 소요 시간/토큰/재시도 횟수를 gpt_call_log에 저장"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            try:
+                conn.execute('''
+                INSERT INTO gpt_call_log
+                (timestamp, model, wall_time_ms, prompt_tokens, completion_tokens,
+                cached_tokens, retries, status, error)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (
+                    self.clock.now(self.timezone).strftime('%Y-%m-%d %H:%M:%S'),
+                    self.GPT_MODEL,
+                    wall_time * 1000,
+                    prompt_tokens,
+                    completion_tokens,
+                    cached_tokens,
+                    retries,
+                    status,
+                    error
+                ))
+                conn.commit()
+            finally:
+                conn.close()
+            print(f"GPT 호출: {wall_time:.1f}초, 토큰 {prompt_tokens}/{completion_tokens} (캐시 {cached_tokens}), 재시도 {retries}회, {status}")
+        except Exception as e:
+            print(f"GPT 호출 기록 중 오류: {e}")
+
+    def get_gpt_latency_stats(self, days=7):
+        """최근 days일 GPT 호출 지연 백분위 및 토큰 통계
+
+        Returns:
+            dict: calls, errors, p50/p90/p99_ms, avg_prompt/completion_tokens,
+                cached_ratio, retries (호출 기록이 없으면 calls=0만)
+        """
+        try:
+            since = (self.clock.now(self.timezone) - timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
+            conn = sqlite3.connect(self.db_path)
+            try:
+                rows = conn.execute('''
+                SELECT wall_time_ms, prompt_tokens, completion_tokens, cached_tokens, retries, status
+                FROM gpt_call_log WHERE timestamp >= ?
+                ''', (since,)).fetchall()
+            finally:
+                conn.close()
+
+            if not rows:
+                return {'calls': 0}
+            calls = pd.DataFrame(rows, columns=['wall_time_ms', 'prompt_tokens', 'completion_tokens',
+                                                'cached_tokens', 'retries', 'status'])
+            ok = calls[calls['status'] == 'ok']
+            wall = ok['wall_time_ms'].to_numpy(dtype=float)
+            prompt_tokens = ok['prompt_tokens'].fillna(0).sum()
+            return {
+                'calls': len(calls),
+                'errors': int((calls['status'] != 'ok').sum()),
+                'p50_ms': float(np.percentile(wall, 50)) if len(wall) else None,
+                'p90_ms': float(np.percentile(wall, 90)) if len(wall) else None,
+                'p99_ms': float(np.percentile(wall, 99)) if len(wall) else None,
+                'avg_prompt_tokens': float(ok['prompt_tokens'].mean()) if len(ok) else None,
+                'avg_completion_tokens': float(ok['completion_tokens'].mean()) if len(ok) else None,
+                'cached_ratio': float(ok['cached_tokens'].fillna(0).sum() / prompt_tokens) if prompt_tokens else 0.0,
+                'retries': int(calls['retries'].sum())
+            }
+
+        except Exception as e:
+            print(f"GPT 호출 통계 조회 중 오류: {e}")
+            return {'calls': 0}
+
+    def run_decision_gate(self, analysis_results, snapshot, market_changed=False, force_check=False):
+        """로컬 점수로 이번 주기를 결정할 단계 선택 및 decision_tier_log 기록
+
+        정기 점검(force_check)은 로컬 관망으로 끝내지 않고 첫 GPT 단계 이상으로 올림.
+
+        Returns:
+            tuple: (단계 dict, 로컬 단계면 관망 자문 아니면 None)
+        """
+        tier, score, components = self.score_decision_tier(analysis_results, snapshot)
+        if force_check and tier['reasoning_effort'] is None:
+            tier = next((t for t in self.GPT_DECISION_TIERS if t['reasoning_effort'] is not None), tier)
+        self.log_decision_tier(tier['name'], score, components, market_changed, force_check)
+        print(f"결정 단계: {tier['name']} (로컬 점수 {score:+.2f})")
+        if tier['reasoning_effort'] is None:
+            return tier, local_hold_advice(score, components)
+        return tier, None
+
+    def score_decision_tier(self, analysis_results, snapshot):
+        """로컬 점수와 선택된 단계 (기록 없음)
+
+        구성 요소의 position_roi(보유분 평가 손익 %)는 점수에 더하지 않고
+        고위험 포지션 판단에만 사용함.
+
+        Returns:
+            tuple: (단계 dict, 점수, 구성 요소 dict)
+        """
+        stoch_cross = None
+        if self.last_stoch_cross_time and self.clock.time() - self.last_stoch_cross_time <= 1800:
+            stoch_cross = self.last_stoch_cross_type
+
+        score, components = local_score(analysis_results, stoch_cross)
+        can_buy = snapshot.krw_balance * (1 - self.TRADING_FEE_RATE) >= self.MIN_ORDER_AMOUNT
+        can_sell = snapshot.coin_balance * snapshot.current_price * (1 - self.TRADING_FEE_RATE) >= self.MIN_ORDER_AMOUNT
+        high_stakes = position_at_risk(snapshot.roi, can_sell, self.GPT_GATE_POSITION_RISK_PCT)
+        tier = select_tier(score, components, can_buy, can_sell, self.GPT_DECISION_TIERS, high_stakes=high_stakes)
+        if can_sell:
+            components = dict(components, position_roi=float(snapshot.roi))
+        return tier, score, components
+
+    def start_speculative_consultation(self, data, analysis_results):
+        """트리거 발동이 가까우면 GPT 자문을 미리 시작 (USE_SPECULATIVE_GPT)
+
+        마지막 자문 기준 상태 대비 트리거 근접도가 GPT_SPECULATIVE_PROXIMITY 이상일 때,
+        진행 중인 자문이 없고 낭비 상한 전이면 기록/캐시 갱신 없이 자문만 받아 둠.
+        로컬 단계(관망)로 결정될 상태면 시작하지 않음.
+
+        Returns:
+            bool: 선행 자문 시작 여부
+        """
+        try:
+            prefetcher = self.speculative_prefetcher
+            now = self.clock.time()
+            if prefetcher.expire(now):
+                print(f"선행 GPT 자문 만료 ({self.GPT_SPECULATIVE_MAX_AGE}초, 트리거 미발동) - 폐기")
+            if self.last_gpt_market_state is None:
+                return False
+
+            price = float(data['close'].iloc[-1])
+            proximity, nearest, _ = trigger_proximity(self.last_gpt_market_state, analysis_results, price)
+            if proximity < self.GPT_SPECULATIVE_PROXIMITY:
+                return False
+            if prefetcher.busy() or (getattr(self, 'USE_ASYNC_GPT', False) and self.gpt_worker.busy()):
+                return False
+            prefetcher.max_age = self.GPT_SPECULATIVE_MAX_AGE
+            prefetcher.max_wasted = self.GPT_SPECULATIVE_MAX_WASTED
+            if not prefetcher.can_start(now):
+                print(f"선행 GPT 자문 생략: 24시간 낭비 상한({self.GPT_SPECULATIVE_MAX_WASTED}회) 도달")
+                return False
+
+            snapshot = self.refresh_cycle_snapshot()
+            if snapshot is None:
+                return False
+
+            reasoning_effort = self.GPT_REASONING_EFFORT
+            if getattr(self, 'USE_DECISION_GATE', False):
+                tier, _, _ = self.score_decision_tier(analysis_results, snapshot)
+                if tier['reasoning_effort'] is None:
+                    return False
+                reasoning_effort = tier['reasoning_effort']
+
+            state = quantize_market_state(analysis_results, snapshot.coin_ratio, self.KNN_SIGNAL_MIN_STRENGTH)
+            analysis_results = dict(analysis_results, current_price=snapshot.current_price)
+
+            def consult():
+                # 프롬프트 상태는 선행 자문을 실제로 사용할 때 반영 (take_speculative_advice)
+                advice, _, prompt_state = self.request_model_advice(data, analysis_results, snapshot, False, reasoning_effort)
+                return advice, prompt_state
+
+            started = prefetcher.start(consult, snapshot, analysis_results, state, now=now)
+            if started:
+                print(f"트리거 근접 ({nearest} {proximity:.0%}) - 선행 GPT 자문 시작")
+            return started
+
+        except Exception as e:
+            print(f"선행 GPT 자문 시작 중 오류: {e}")
+            return False
+
+    def take_speculative_advice(self, snapshot, state):
+        """트리거 발동시 선행 자문 사용 (요청 당시 스냅샷/양자화 상태와 다르거나 오래되면 폐기)
+
+        Returns:
+            tuple: (자문, prompt_state) - 사용할 선행 자문이 없으면 (None, None)
+        """
+        result, reason = self.speculative_prefetcher.take(
+            snapshot, state,
+            price_tolerance=self.GPT_RESULT_PRICE_TOLERANCE,
+            timeout=self.GPT_CONSULT_DEADLINE,
+            now=self.clock.time()
+        )
+        stats = self.speculative_prefetcher.stats()
+        if reason == 'used':
+            print(f"선행 GPT 자문 사용 (사용 {stats['used']}/{stats['started']}, 낭비 {stats['wasted']})")
+        elif reason != 'none':
+            print(f"선행 GPT 자문 폐기: {reason} (사용 {stats['used']}/{stats['started']}, 낭비 {stats['wasted']})")
+        return result if result is not None else (None, None)
+
+    def log_decision_tier(self, tier, score, components, market_changed=False, force_check=False):
+        try:
+            conn = sqlite3.connect(self.db_path)
+            try:
+                conn.execute('''
+                INSERT INTO decision_tier_log
+                (timestamp, tier, score, components, market_changed, force_check)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ''', (
+                    self.clock.now(self.timezone).strftime('%Y-%m-%d %H:%M:%S'),
+                    tier,
+                    float(score),
+                    json.dumps(components),
+                    int(bool(market_changed)),
+                    int(bool(force_check))
+                ))
+                conn.commit()
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f"결정 단계 기록 중 오류: {e}")
+
+    def get_decision_tier_stats(self, days=1):
+        """최근 days일 단계별 결정 횟수와 GPT 호출 없이 끝난 비율"""
+        try:
+            since = (self.clock.now(self.timezone) - timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
+            conn = sqlite3.connect(self.db_path)
+            try:
+                rows = conn.execute('''
+                SELECT tier, COUNT(*) FROM decision_tier_log
+                WHERE timestamp >= ? GROUP BY tier
+                ''', (since,)).fetchall()
+            finally:
+                conn.close()
+
+            counts = dict(rows)
+            total = sum(counts.values())
+            local_tiers = {tier['name'] for tier in self.GPT_DECISION_TIERS if tier['reasoning_effort'] is None}
+            avoided = sum(count for tier, count in counts.items() if tier in local_tiers)
+            return {
+                'cycles': total,
+                'tiers': counts,
+                'avoided_calls': avoided,
+                'avoided_ratio': avoided / total if total > 0 else 0.0
+            }
+
+        except Exception as e:
+            print(f"결정 단계 통계 조회 중 오류: {e}")
+            return {'cycles': 0, 'tiers': {}, 'avoided_calls': 0, 'avoided_ratio': 0.0}
+
+    def get_candle_store(self):
+        """로컬 캔들 저장소 (처음 사용할 때 candle_db_path에 생성)"""
+        if self.candle_store is None or self.candle_store.db_path != self.candle_db_path:
+            self.candle_store = CandleStore(self.candle_db_path, timezone=self.timezone)
+        return self.candle_store
+
+    def get_consultation_cache(self):
+        """GPT 자문 중복 제거 캐시 (USE_GPT_DEDUP가 꺼져 있으면 None)"""
+        if not getattr(self, 'USE_GPT_DEDUP', False):
+            return None
+        if self.consultation_cache is None or self.consultation_cache.db_path != self.db_path:
+            self.consultation_cache = ConsultationCache(self.db_path, ttl=self.GPT_DEDUP_TTL)
+        self.consultation_cache.ttl = self.GPT_DEDUP_TTL
+        return self.consultation_cache
+
+    def get_gpt_response_store(self):
+        """GPT 응답 저장소 (GPT_RESPONSE_STORE_MODE가 'off'면 None)"""
+        mode = getattr(self, 'GPT_RESPONSE_STORE_MODE', 'off')
+        if mode == 'off':
+            return None
+        if self.gpt_response_store is None or self.gpt_response_store.mode != mode:
+            self.gpt_response_store = GPTResponseStore(
+                self.gpt_response_store_path, mode=mode, stand_in=self.gpt_stand_in
+            )
+        return self.gpt_response_store
+
+    def build_gpt_inputs(self, analysis_results, current_price, snapshot, news_key):
+        """GPT 응답 저장소 키용 정규화 입력
+
+        시장 상태는 프롬프트에 표시되는 정밀도로 반올림하고, 계좌는 BTC 비중
+        구간(GPT_PORTFOLIO_BUCKET %)과 보유 여부, 수익률(1% 단위)만 사용함.
+        """
+        coin_value = snapshot.coin_balance * current_price
+        total_assets = snapshot.krw_balance + coin_value
+        btc_ratio = coin_value / total_assets * 100 if total_assets > 0 else 0
+        avg_buy_price = snapshot.avg_buy_price
+        knn_prediction = float(analysis_results['knn_prediction'])
+
+        return {
+            'model': self.GPT_MODEL,
+            'ticker': self.ticker,
+            'interval': self.interval,
+            'market': {
+                'price': round(current_price / 100) * 100,
+                'ema_status': str(analysis_results['ema_ribbon_status']),
+                'stoch_rsi_k': round(float(analysis_results['stoch_rsi_k']), 1),
+                'stoch_rsi_d': round(float(analysis_results['stoch_rsi_d']), 1),
+                'momentum': round(float(analysis_results['momentum']) * 100, 1),
+                'volatility': round(float(analysis_results['volatility_ratio']), 1),
+                'bollinger_position': str(analysis_results['bollinger_position']),
+                'band_width': round(float(analysis_results.get('band_width', 0)), 2),
+                'bearish_divergence': bool(analysis_results['divergence']['bearish_divergence']),
+                'bullish_divergence': bool(analysis_results['divergence']['bullish_divergence']),
+                'knn_direction': int(np.sign(knn_prediction)),
+                'knn_confidence': round(float(analysis_results['knn_signal_strength']), 1),
+                'knn_strength': abs(knn_prediction) > 0.5 and '강' or abs(knn_prediction) > 0.2 and '중' or '약'
+            },
+            'portfolio': {
+                'btc_ratio_bucket': int(btc_ratio // self.GPT_PORTFOLIO_BUCKET),
+                'has_position': bool(avg_buy_price > 0),
+                'profit_pct': round((current_price - avg_buy_price) / avg_buy_price * 100) if avg_buy_price > 0 else None
+            },
+            'news': news_key
+        }
+
+    def build_market_state(self, analysis_results, current_price, snapshot=None):
+        """GPT 자문 시점의 시장 상태 (다음 변화 감지와 델타 프롬프트의 기준)"""
+        market_state = {
+            'price': current_price,
+            'rsi': float(analysis_results['rsi']),
+            'volatility': float(analysis_results['volatility_ratio']),
+            'ema_status': str(analysis_results['ema_ribbon_status']),
+            'momentum': float(analysis_results['momentum']),
+            'bollinger_position': str(analysis_results['bollinger_position']),
+            'bollinger_position_num': analysis_results.get('bollinger_position_num', 0),
+            'stoch_rsi_k': float(analysis_results['stoch_rsi_k']),
+            'stoch_rsi_d': float(analysis_results['stoch_rsi_d']),
+            'knn_prediction': float(analysis_results['knn_prediction']),
+            'knn_signal_strength': float(analysis_results['knn_signal_strength']),
+            'band_width': float(analysis_results.get('band_width', 0))
+        }
+        if snapshot is not None:
+            market_state.update({
+                'krw_balance': float(snapshot.krw_balance),
+                'coin_balance': float(snapshot.coin_balance),
+                'avg_buy_price': float(snapshot.avg_buy_price)
+            })
+        return market_state
+
+    def record_gpt_advice(self, gpt_advice, analysis_results, current_price, snapshot=None):
+        """자문 결과 기록 및 변화 감지 기준 상태 갱신"""
+        current_market_state = self.build_market_state(analysis_results, current_price, snapshot)
+        self.log_gpt_advice(gpt_advice, current_market_state)
+        self.last_gpt_market_state = current_market_state
+        return current_market_state
+
+    def log_gpt_advice(self, advice_data, market_state):
+        """GPT 자문 결과를 데이터베이스에 저장하는 함수 개선"""
+        try:
+            # 입력 데이터 검증
+            if not isinstance(advice_data, dict):
+                print("잘못된 자문 데이터 형식")
+                return False
+
+            required_fields = ['trade_recommendation', 'investment_percentage', 
+                            'confidence_score', 'reasoning']
+            if not all(field in advice_data for field in required_fields):
+                print(f"필수 필드 누락: {[f for f in required_fields if f not in advice_data]}")
+                return False
+
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+
+            # 현재 시간을 한국 시간대로 설정
+            korean_time = self.clock.now(self.timezone)
+            timestamp = korean_time.strftime('%Y-%m-%d %H:%M:%S')
+
+            # market_state가 None이 아닌 경우에만 JSON으로 변환
+            market_state_json = None
+            if market_state is not None:
+                try:
+                    market_state_json = json.dumps(market_state, ensure_ascii=False)
+                except Exception as e:
+                    print(f"market_state JSON 변환 중 오류: {e}")
+                    market_state_json = None
+
+            # 데이터 정수 변환 및 유효성 검사
+            try:
+                confidence_score = advice_data.get('confidence_score', 0)
+                if isinstance(confidence_score, (int, float)):
+                    confidence_score = int(round(confidence_score))  # 반올림 후 정수 변환
+                else:
+                    print(f"잘못된 confidence_score 형식: {confidence_score}")
+                    confidence_score = 0
+
+                investment_percentage = advice_data.get('investment_percentage', 0)
+                if isinstance(investment_percentage, (int, float)):
+                    investment_percentage = int(round(investment_percentage))  # 반올림 후 정수 변환
+                else:
+                    print(f"잘못된 investment_percentage 형식: {investment_percentage}")
+                    investment_percentage = 0
+
+                # 값 범위 제한
+                confidence_score = max(0, min(100, confidence_score))
+                investment_percentage = max(0, min(100, investment_percentage))
+
+            except Exception as e:
+                print(f"데이터 변환 중 오류: {e}")
+                confidence_score = 0
+                investment_percentage = 0
+
+            # 데이터 삽입
+            try:
+                cursor.execute('''
+                INSERT INTO gpt_advice_log 
+                (timestamp, trade_recommendation, investment_percentage,
+                confidence_score, reasoning, market_state)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ''', (
+                    timestamp,
+                    str(advice_data.get('trade_recommendation', '관망')),
+                    investment_percentage,
+                    confidence_score,
+                    str(advice_data.get('reasoning', '없음')),
+                    market_state_json
+                ))
+                
+                conn.commit()
+                self.last_gpt_advice_id = cursor.lastrowid
+                print(f"GPT 자문 저장 완료 - {timestamp}")
+                
+                # 저장된 데이터 확인
+                cursor.execute('''
+                SELECT * FROM gpt_advice_log 
+                WHERE timestamp = ? 
+                ORDER BY id DESC LIMIT 1
+                ''', (timestamp,))
+                
+                saved_data = cursor.fetchone()
+                if saved_data:
+                    print("\n저장된 GPT 자문 데이터:")
+                    print(f"Timestamp: {saved_data[1]}")
+                    print(f"추천: {saved_data[2]}")
+                    print(f"투자 비율: {saved_data[3]}%")
+                    print(f"신뢰도: {saved_data[4]}%")
+                    print(f"근거: {saved_data[5]}")
+                
+                return True
+
+            except sqlite3.Error as e:
+                print(f"데이터베이스 저장 중 오류: {e}")
+                return False
+
+        except Exception as e:
+            print(f"GPT 자문 로깅 중 오류 발생: {e}")
+            import traceback
+            traceback.print_exc()
+            return False
+
+        finally:
+            if 'conn' in locals():
+                conn.close()
+            
+    def get_force_check_interval(self, analysis_results):
+        """변동성에 따른 강제 점검 간격 (초)"""
+        volatility = analysis_results.get('volatility_ratio', 0)
+        if volatility < 2.35:
+            return 7200  # 2시간
+        elif volatility < 3:
+            return 3600  # 1시간
+        return 1800   # 30분
+
+    def run_trading_strategy(self):
+        """수정된 트레이딩 전략 실행"""
+        try:
+            # 초기화
+            gc_counter = 0
+            last_forced_check_time = time.time()
+            
+            # 초기 뉴스 로드
+            cached_news = self.load_cached_news()
+            if cached_news:
+                self.cached_news = cached_news
+                print("\n마지막 저장된 뉴스 로드 완료")
+            else:
+                print("\n저장된 뉴스가 없습니다. 다음 정해진 시간에 업데이트될 예정입니다.")
+            
+            # 다음 뉴스 업데이트 시간 초기화
+            current_time = datetime.now(self.timezone)
+            next_news_update = self.get_next_news_update_time(current_time)
+            print(f"\n트레이딩 봇 시작 - 다음 뉴스 업데이트 예정: {next_news_update.strftime('%Y-%m-%d %H:%M')}")
+
+            while True:
+                try:
+                    current_time = datetime.now(self.timezone)
+                    
+                    # 1. 뉴스 업데이트 체크 (정해진 시간에만)
+                    if current_time >= next_news_update:
+                        fixed_hours = [0, 4, 8, 12, 16, 20]
+                        if current_time.hour in fixed_hours:
+                            print("\n=== 정해진 시간 뉴스 업데이트 시작 ===")
+                            print(f"현재 시간: {current_time.strftime('%Y-%m-%d %H:%M')}")
+                            
+                            try:
+                                updated_news = self.fetch_BTC_news()
+                                if updated_news:
+                                    self.cached_news = updated_news
+                                    print("뉴스 업데이트 완료")
+                                else:
+                                    print("뉴스 업데이트 실패 - 기존 뉴스 유지")
+                            except Exception as e:
+                                print(f"뉴스 업데이트 실패: {e}")
+                                import traceback
+                                traceback.print_exc()
+                        else:
+                            print(f"\n현재 시간({current_time.hour}시)은 뉴스 업데이트 시간이 아님")
+                        
+                        # 다음 업데이트 시간 계산 (현재 시간 기준)
+                        next_news_update = self.get_next_news_update_time(current_time)
+                        print(f"다음 뉴스 업데이트 예정: {next_news_update.strftime('%Y-%m-%d %H:%M')}")
+
+                    # 2. 시장 데이터 분석
+                    with self.market_data_lock:
+                        # 작업 스레드에서 도착한 GPT 자문 적용
+                        if getattr(self, 'USE_ASYNC_GPT', False):
+                            self.apply_gpt_consultation_result()
+
+                        # 히스토리컬 데이터 가져오기
+                        data = self.get_historical_data()
+                        if data is None:
+                            print("히스토리컬 데이터를 가져오는데 실패했습니다.")
+                            time.sleep(60)
+                            continue
+                        
+                        # 기술적 분석 수행
+                        analysis_results = self.calculate_indicators(data)
+                        if analysis_results is None:
+                            print("기술적 분석 실패")
+                            time.sleep(60)
+                            continue
+
+                        # 변동성에 따른 강제 점검 간격 동적 조정
+                        force_check_interval = self.get_force_check_interval(analysis_results)
+
+                        # 3. 시장 상황 모니터링
+                        market_changed = self.monitor_market_conditions(data, analysis_results)
+                        
+                        # 강제 점검 시간 확인
+                        current_ts = time.time()
+                        time_since_last_check = current_ts - last_forced_check_time
+                        time_to_force_check = time_since_last_check >= force_check_interval
+                        
+                        # GPT 자문이 필요한지 결정
+                        should_consult_gpt = market_changed or time_to_force_check
+
+                        # 4. 거래 신호 생성 및 실행
+                        if should_consult_gpt:
+                            if market_changed:
+                                print("\n=== 시장 상황 변화 감지 - GPT 자문 요청 ===")
+                            else:
+                                print(f"\n=== 정기 점검 시작 (마지막 점검으로부터 {time_since_last_check/60:.1f}분 경과) ===")
+                            
+                            # 이번 주기 시세/계좌 스냅샷 (모든 단계가 공유)
+                            snapshot = self.refresh_cycle_snapshot()
+
+                            # 포트폴리오 상태 출력
+                            portfolio = self.get_portfolio_status(snapshot)
+                            if portfolio:
+                                print("\n현재 포트폴리오 상태:")
+                                print(f"KRW 잔고: {portfolio['krw_balance']:,.0f}원")
+                                print(f"BTC 잔고: {portfolio['coin_balance']:.8f}")
+                                print(f"총 자산가치: {portfolio['total_value']:,.0f}원")
+                                if portfolio['avg_buy_price'] > 0:
+                                    print(f"평균 매수가: {portfolio['avg_buy_price']:,.0f}원")
+                                    print(f"현재 수익률: {portfolio['roi']:.2f}%")
+                                print(f"BTC 비중: {portfolio['coin_ratio']:.2f}%")
+                            
+                            consulted = True
+                            if getattr(self, 'USE_ASYNC_GPT', False):
+                                # 작업 스레드에서 자문 요청 (루프는 계속 진행, 결과는 도착한 주기에 적용)
+                                # 이전 자문이 진행 중이라 요청하지 못했으면 강제 점검 타이머를 유지해 다음 주기에 다시 시도
+                                consulted = self.start_gpt_consultation(
+                                    data,
+                                    analysis_results,
+                                    market_changed=market_changed,
+                                    force_check=time_to_force_check,
+                                    snapshot=snapshot
+                                )
+                            else:
+                                # GPT 자문 요청 및 거래 신호 생성
+                                signals = self.generate_trading_signal(
+                                    data=data,
+                                    market_changed=market_changed,
+                                    force_check=time_to_force_check,
+                                    snapshot=snapshot
+                                )
+                            
+                                if signals is None:
+                                    print("거래 신호 생성에 실패했습니다.")
+                                    time.sleep(60)
+                                    continue
+                                
+                                buy_signal, sell_signal, gpt_advice, _ = signals
+                            
+                                # 거래 실행 시도
+                                if analysis_results is not None:
+                                    trade_executed = self.execute_trade(
+                                        buy_signal, 
+                                        sell_signal, 
+                                        gpt_advice, 
+                                        analysis_results,
+                                        snapshot=snapshot
+                                    )
+                                
+                                    if trade_executed:
+                                        print("\n거래 실행 완료 - 포트폴리오 재확인")
+                                        updated_portfolio = self.get_portfolio_status(self.refresh_cycle_snapshot())
+                                        if updated_portfolio:
+                                            print(f"업데이트된 KRW 잔고: {updated_portfolio['krw_balance']:,.0f}원")
+                                            print(f"업데이트된 BTC 잔고: {updated_portfolio['coin_balance']:.8f}")
+                            
+                            if consulted:
+                                last_forced_check_time = current_ts  # 강제 점검 타이머 리셋
+                        else:
+                            minutes_to_next_check = (force_check_interval - time_since_last_check) / 60
+                            print(f"\n다음 강제 점검까지 {minutes_to_next_check:.1f}분 남음")
+                            print("시장 변화 없음 - 관망 상태 유지")
+
+                            # 트리거에 가까우면 다음 자문을 미리 요청
+                            if getattr(self, 'USE_SPECULATIVE_GPT', False):
+                                self.start_speculative_consultation(data, analysis_results)
+                    
+                    # 5. 가비지 컬렉션 및 메모리 관리
+                    gc_counter += 1
+                    if gc_counter >= 10:
+                        gc.collect()
+                        gc_counter = 0
+                        
+                    # 6. 대기 (진행 중인 GPT 자문이 도착하면 바로 다음 주기 진행)
+                    if getattr(self, 'USE_ASYNC_GPT', False):
+                        self.gpt_worker.wait(60)
+                    else:
+                        time.sleep(60)  # 1분 간격으로 체크
+                    
+                except Exception as e:
+                    print(f"Trading loop 실행 중 오류: {e}")
+                    import traceback
+                    traceback.print_exc()
+                    time.sleep(60)
+
+        except KeyboardInterrupt:
+            print("\n트레이딩 봇 종료 요청 감지")
+            print("진행 중인 작업 정리 중...")
+            self.gpt_worker.shutdown()
+            self.speculative_prefetcher.shutdown()
+            # 정리 작업 수행
+            if hasattr(self, 'db_connection') and self.db_connection:
+                self.db_connection.close()
+            print("트레이딩 봇이 안전하게 종료되었습니다.")
+            
+        except Exception as e:
+            print(f"치명적인 오류 발생: {e}")
+            import traceback
+            traceback.print_exc()
+            raise  # 심각한 오류는 상위로 전파하여 봇 재시작 유도
+
+if __name__ == "__main__":
+    bot = BTCTradingBot()
+    bot.run_trading_strategy()
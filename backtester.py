@@ -0,0 +1,382 @@
+import contextlib
+import json
+import os
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from analysis_history import analysis_results_from_row, knn_window_history
+from candle_store import INTERVAL_DURATIONS
+from trading_clock import SimulatedClock
+
+
+class SimulatedUpbit:
+    """백테스트용 Upbit 계좌 (pyupbit.Upbit의 잔고/시장가 주문 인터페이스)
+
+    시장가 주문은 현재 설정된 가격에 즉시 체결됨. 매수는 주문 금액에 수수료를
+    더해 KRW에서 차감하고, 매도는 체결 금액에서 수수료를 뺀 만큼 KRW에 더함.
+    """
+
+    def __init__(self, initial_krw=1_000_000, fee_rate=0.0005, min_order_amount=5000, slippage=0.0):
+        self.krw_balance = float(initial_krw)
+        self.coin_balance = 0.0
+        self.avg_buy_price = 0.0
+        self.fee_rate = fee_rate
+        self.min_order_amount = min_order_amount
+        self.slippage = slippage
+        self.price = None
+        self.orders = []
+
+    def set_price(self, price):
+        self.price = float(price)
+
+    def get_current_price(self, ticker):
+        return self.price
+
+    def get_balance(self, ticker="KRW"):
+        return self.krw_balance if ticker == "KRW" else self.coin_balance
+
+    def get_avg_buy_price(self, ticker):
+        return self.avg_buy_price
+
+    def _order(self, side, volume, price, funds):
+        order = {'uuid': str(uuid.uuid4()), 'side': side, 'volume': volume, 'price': price, 'funds': funds}
+        self.orders.append(order)
+        return order
+
+    def buy_market_order(self, ticker, price):
+        """price(KRW) 만큼 시장가 매수"""
+        if price < self.min_order_amount:
+            return {'error': {'name': 'under_min_total_market_ask', 'message': '최소주문금액 이상으로 주문해주세요'}}
+        cost = price * (1 + self.fee_rate)
+        if cost > self.krw_balance:
+            return {'error': {'name': 'insufficient_funds_bid', 'message': '주문가능한 금액(KRW)이 부족합니다.'}}
+
+        fill_price = self.price * (1 + self.slippage)
+        volume = price / fill_price
+        total_cost = self.avg_buy_price * self.coin_balance + price
+        self.coin_balance += volume
+        self.avg_buy_price = total_cost / self.coin_balance
+        self.krw_balance -= cost
+        return self._order('bid', volume, fill_price, price)
+
+    def sell_market_order(self, ticker, volume):
+        """volume(코인 수량) 만큼 시장가 매도"""
+        volume = min(float(volume), self.coin_balance)
+        fill_price = self.price * (1 - self.slippage)
+        funds = volume * fill_price
+        if funds < self.min_order_amount:
+            return {'error': {'name': 'under_min_total_market_bid', 'message': '최소주문금액 이상으로 주문해주세요'}}
+
+        self.coin_balance -= volume
+        if self.coin_balance <= 1e-12:
+            self.coin_balance = 0.0
+            self.avg_buy_price = 0.0
+        self.krw_balance += funds * (1 - self.fee_rate)
+        return self._order('ask', volume, fill_price, funds)
+
+    def total_value(self):
+        return self.krw_balance + self.coin_balance * self.price
+
+
+def rule_based_advisor(bot, data, analysis_results, snapshot):
+    """GPT 대신 쓰는 규칙 기반 자문 (오프라인 백테스트 기본값)
+
+    역추세 신호를 우선하고, 없으면 KNN 예측 방향과 신뢰도로 판단함.
+    """
+    signals = analysis_results.get('counter_trend_signals', {})
+    knn_prediction = analysis_results.get('knn_prediction', 0)
+    knn_confidence = analysis_results.get('knn_signal_strength', 0)
+
+    if signals.get('buy'):
+        return {'trade_recommendation': '매수', 'investment_percentage': 80, 'confidence_score': 75,
+                'reasoning': '역추세 매수 신호'}
+    if signals.get('sell'):
+        return {'trade_recommendation': '매도', 'investment_percentage': 100, 'confidence_score': 75,
+                'reasoning': '역추세 매도 신호'}
+    if knn_prediction >= 0.5 and knn_confidence >= 60:
+        return {'trade_recommendation': '매수', 'investment_percentage': 50, 'confidence_score': int(knn_confidence),
+                'reasoning': f'KNN 상승 예측 ({knn_prediction:+.2f})'}
+    if knn_prediction <= -0.5 and knn_confidence >= 60:
+        return {'trade_recommendation': '매도', 'investment_percentage': 50, 'confidence_score': int(knn_confidence),
+                'reasoning': f'KNN 하락 예측 ({knn_prediction:+.2f})'}
+    return {'trade_recommendation': '관망', 'investment_percentage': 0, 'confidence_score': 50,
+            'reasoning': '뚜렷한 신호 없음'}
+
+
+def stored_gpt_advisor(store, fallback=rule_based_advisor, ohlcv_rows=60):
+    """GPT 응답 저장소를 쓰는 자문
+
+    replay: 라이브와 같은 정규화 입력으로 저장된 응답을 찾고, 없으면 fallback 사용.
+    record: 최근 ohlcv_rows개 캔들로 프롬프트를 만들어 실제 모델을 호출하고 저장
+    (한 번 기록한 백테스트 구간은 이후 replay로 모델 호출 없이 재현 가능).
+    과거 시점의 뉴스는 없으므로 기록시 뉴스 없이 호출하고, 재생시에는 운영에서
+    기록된 그 시점의 뉴스 지문을 키에 사용함.
+    """
+    def advisor(bot, data, analysis_results, snapshot):
+        now = bot.clock.now(bot.timezone)
+        current_price = snapshot.current_price
+        news_key = store.news_digest_at(now) if store.mode == 'replay' else None
+        inputs = bot.build_gpt_inputs(analysis_results, current_price, snapshot, news_key)
+
+        def call_model():
+            messages = bot.build_gpt_messages(data.tail(ohlcv_rows), analysis_results, current_price, snapshot, None)
+            return json.loads(bot.request_gpt_advice(messages))
+
+        advice, _ = store.consult(
+            inputs, call_model, model=bot.GPT_MODEL, recorded_at=now,
+            stand_in=lambda _: fallback(bot, data, analysis_results, snapshot)
+        )
+        return advice
+
+    return advisor
+
+
+# run() 동안 Backtester가 바꾸는 봇 인스턴스 속성 (끝나면 원래 값으로 복원)
+PATCHED_BOT_ATTRIBUTES = (
+    'db_path', 'upbit', 'price_fn', 'clock', 'consult_gpt_for_trading', 'calculate_indicators',
+    'cycle_snapshot', 'last_gpt_market_state', 'last_prediction', 'last_stoch_cross_time',
+    'last_stoch_cross_type', 'last_knn_change_time', 'last_knn_direction',
+    'USE_KNN_INDEX', 'USE_KNN_ANN', 'USE_KNN_FEATURE_STORE'
+)
+_MISSING = object()
+
+
+class Backtester:
+    """저장된 캔들을 실제 전략 코드에 재생하는 이벤트 기반 백테스터
+
+    각 캔들 마감 시점마다 라이브 루프와 같은 순서로
+    calculate_indicators → monitor_market_conditions → (자문 필요시)
+    generate_trading_signal → execute_trade를 호출함. 시각은 시뮬레이션 시계,
+    잔고/주문은 SimulatedUpbit이 담당하고, 거래 기록은 별도 DB의 trade_log/
+    gpt_advice_log 테이블에 저장됨.
+
+    GPT 자문은 advisor(bot, data, analysis_results, snapshot) 함수로 대체함.
+
+    precompute=True(기본값)면 calculate_indicators를 캔들마다 호출하지 않고,
+    실행 전에 calculate_analysis_history와 knn_window_history로 전체 구간의 분석
+    결과와 KNN 예측을 한 번에 계산해 캔들별로 돌려줌. 값은 라이브 윈도우 기준과
+    같고, KNN 연속성 보너스는 라이브처럼 호출 시점의 bot.last_prediction으로
+    적용함. calculate_indicators/predict_next_move 자체를 바꾼 경우의 회귀
+    확인은 precompute=False로 실행.
+
+    db_path에 파일이 이미 있으면 지우지 않고 FileExistsError를 냄 (overwrite=True면 덮어씀).
+
+    전달한 봇은 run() 동안에만 백테스트용으로 바뀌고 (PATCHED_BOT_ATTRIBUTES:
+    DB 경로, upbit, 시세 함수, 시계, GPT 자문/지표 계산 함수, 라이브 상태, KNN
+    저장소 플래그), 끝나면 예외가 나도 원래 값으로 복원됨. 지표 캐시와 스트리밍
+    지표 상태는 시작/종료시 비워지므로 다음 라이브 호출에서 다시 계산함.
+    """
+
+    def __init__(self, bot, candles, db_path='backtest_log.db', initial_krw=1_000_000,
+                 advisor=None, window=200, slippage=0.0, quiet=True, precompute=True, overwrite=False):
+        self.bot = bot
+        self.candles = candles
+        self.db_path = db_path
+        self.window = window
+        self.quiet = quiet
+        self.precompute = precompute
+        self.overwrite = overwrite
+        self._analysis_rows = None
+        self._knn_rows = None
+        self._position = None
+        self.advisor = advisor or rule_based_advisor
+        self.initial_krw = initial_krw
+        self.duration = INTERVAL_DURATIONS.get(bot.interval, pd.Timedelta(0))
+
+        self.upbit = SimulatedUpbit(
+            initial_krw=initial_krw,
+            fee_rate=bot.TRADING_FEE_RATE,
+            min_order_amount=bot.MIN_ORDER_AMOUNT,
+            slippage=slippage
+        )
+        self.clock = SimulatedClock()
+        self.consultations = 0
+        self.local_decisions = 0
+        self._saved_bot_attributes = None
+
+        if os.path.exists(self.db_path):
+            if not self.overwrite:
+                raise FileExistsError(f"백테스트 DB가 이미 있습니다: {self.db_path} (덮어쓰려면 overwrite=True)")
+            os.remove(self.db_path)
+
+    def _prepare_bot(self):
+        """봇을 백테스트용으로 바꿈 (바꾸기 전 값은 _restore_bot에서 복원)"""
+        bot = self.bot
+        self._saved_bot_attributes = {name: vars(bot).get(name, _MISSING) for name in PATCHED_BOT_ATTRIBUTES}
+        bot.db_path = self.db_path
+        bot.create_database()
+
+        bot.upbit = self.upbit
+        bot.price_fn = self.upbit.get_current_price
+        bot.clock = self.clock
+        bot.consult_gpt_for_trading = self._consult
+        if self.precompute:
+            bot.calculate_indicators = self._precomputed_indicators
+        else:
+            vars(bot).pop('calculate_indicators', None)
+
+        # 라이브 상태 초기화 및 디스크에 남는 KNN 저장소 비활성화
+        bot.cycle_snapshot = None
+        bot.last_gpt_market_state = None
+        bot.last_prediction = None
+        bot.last_stoch_cross_time = None
+        bot.last_stoch_cross_type = None
+        bot.last_knn_change_time = None
+        bot.last_knn_direction = None
+        bot.USE_KNN_INDEX = False
+        bot.USE_KNN_ANN = False
+        bot.USE_KNN_FEATURE_STORE = False
+        bot.streaming_indicators.reset()
+        bot.indicator_cache.clear()
+
+    def _restore_bot(self):
+        """_prepare_bot에서 바꾼 봇 속성 복원 (원래 클래스 메서드였던 함수는 인스턴스에서 제거)"""
+        bot = self.bot
+        for name, value in self._saved_bot_attributes.items():
+            if value is _MISSING:
+                vars(bot).pop(name, None)
+            else:
+                setattr(bot, name, value)
+        self._saved_bot_attributes = None
+        bot.streaming_indicators.reset()
+        bot.indicator_cache.clear()
+
+    def _precompute_analysis(self, last):
+        """캔들별 분석 결과(calculate_indicators 형식 dict 목록)와 연속성 보너스 전 KNN 예측을 미리 계산"""
+        candles = self.candles.iloc[:last]
+        history = self.bot.calculate_analysis_history(candles, window=self.window)
+        if len(history) != last:
+            raise ValueError("백테스트용 분석 결과를 계산할 수 없습니다")
+        self._analysis_rows = history.to_dict('records')
+        knn = knn_window_history(self.bot, candles, window=self.window)
+        self._knn_rows = knn[['knn_prediction', 'knn_base_confidence', 'knn_signal']].to_numpy()
+
+    def _precomputed_indicators(self, data):
+        """calculate_indicators 대체 (현재 캔들의 미리 계산한 분석 결과 사본)"""
+        if data is None or len(data) == 0:
+            return None
+        results = analysis_results_from_row(self._analysis_rows[self._position])
+
+        # predict_next_move처럼 직전 호출의 예측으로 연속성 보너스를 주고 last_prediction 갱신
+        prediction, base_confidence, signal = self._knn_rows[self._position]
+        if np.isnan(prediction):
+            return results
+        previous = np.nan if self.bot.last_prediction is None else self.bot.last_prediction
+        confidence = self.bot._finish_knn_confidences(
+            np.array([prediction]), np.array([base_confidence]), np.array([signal]), np.array([previous])
+        )[0]
+        self.bot.last_prediction = prediction
+        results['knn_prediction'] = float(prediction)
+        results['knn_signal_strength'] = float(confidence)
+        return results
+
+    def _consult(self, data, analysis_results, market_changed=None, force_check=False, snapshot=None):
+        """consult_gpt_for_trading 대체 (자문 기록 및 기준 상태 갱신은 라이브와 동일)"""
+        snapshot = self.bot._resolve_snapshot(snapshot)
+        if getattr(self.bot, 'USE_DECISION_GATE', False):
+            _, local_advice = self.bot.run_decision_gate(analysis_results, snapshot, market_changed, force_check)
+            if local_advice is not None:
+                self.bot.last_gpt_market_state = self.bot.build_market_state(analysis_results, snapshot.current_price)
+                self.local_decisions += 1
+                return local_advice
+        advice = self.advisor(self.bot, data, analysis_results, snapshot)
+        self.bot.record_gpt_advice(advice, analysis_results, snapshot.current_price, snapshot)
+        self.consultations += 1
+        return advice
+
+    def _step(self, data, state):
+        """캔들 한 개 마감 시점의 라이브 루프 한 주기"""
+        bot = self.bot
+        analysis_results = bot.calculate_indicators(data)
+        if analysis_results is None:
+            return
+
+        force_check_interval = bot.get_force_check_interval(analysis_results)
+        market_changed = bot.monitor_market_conditions(data, analysis_results)
+
+        current_ts = self.clock.time()
+        if state['last_forced_check_time'] is None:
+            state['last_forced_check_time'] = current_ts
+        time_to_force_check = current_ts - state['last_forced_check_time'] >= force_check_interval
+
+        if not (market_changed or time_to_force_check):
+            return
+
+        snapshot = bot.refresh_cycle_snapshot()
+        signals = bot.generate_trading_signal(
+            data=data,
+            market_changed=market_changed,
+            force_check=time_to_force_check,
+            snapshot=snapshot
+        )
+        if signals is not None:
+            buy_signal, sell_signal, gpt_advice, _ = signals
+            bot.execute_trade(buy_signal, sell_signal, gpt_advice, analysis_results, snapshot=snapshot)
+        state['last_forced_check_time'] = current_ts
+
+    def run(self, start=None, end=None):
+        """백테스트 실행
+
+        Args:
+            start, end: 거래를 시작/종료할 캔들 시각 (지표용 이전 window개 캔들은 자동 포함)
+
+        Returns:
+            dict: 수익률/최대 낙폭/주문 수 요약과 자산 곡선(equity)
+        """
+        candles = self.candles
+        index = candles.index
+        first = max(self.window - 1, 0)
+        if start is not None:
+            first = max(first, int(index.searchsorted(pd.Timestamp(start))))
+        last = len(candles) if end is None else int(index.searchsorted(pd.Timestamp(end), side='right'))
+
+        closes = candles['close'].to_numpy(dtype=float)
+        equity = np.empty(max(last - first, 0))
+        state = {'last_forced_check_time': None}
+
+        self._prepare_bot()
+        try:
+            if self.precompute:
+                with open(os.devnull, 'w') as devnull, \
+                        (contextlib.redirect_stdout(devnull) if self.quiet else contextlib.nullcontext()):
+                    self._precompute_analysis(last)
+
+            with open(os.devnull, 'w') as devnull, \
+                    (contextlib.redirect_stdout(devnull) if self.quiet else contextlib.nullcontext()):
+                for position, i in enumerate(range(first, last)):
+                    data = candles.iloc[max(i - self.window + 1, 0):i + 1]
+
+                    # 캔들 마감 시각 기준으로 판단 (마지막 캔들은 확정된 값)
+                    self.clock.set((index[i] + self.duration).to_pydatetime().replace(tzinfo=self.bot.timezone))
+                    self.upbit.set_price(closes[i])
+                    self.bot.cycle_snapshot = None
+                    self._position = i
+
+                    self._step(data, state)
+                    equity[position] = self.upbit.total_value()
+        finally:
+            self._restore_bot()
+
+        return self.summary(equity, index[first:last], closes[first:last])
+
+    def summary(self, equity, timestamps, closes):
+        if len(equity) == 0:
+            return {'equity': pd.Series(dtype=float)}
+
+        equity_curve = pd.Series(equity, index=timestamps)
+        peak = np.maximum.accumulate(equity)
+        start_value = float(self.initial_krw)
+        return {
+            'start_value': start_value,
+            'final_value': float(equity[-1]),
+            'total_return': float(equity[-1] / start_value - 1) * 100,
+            'buy_and_hold_return': float(closes[-1] / closes[0] - 1) * 100,
+            'max_drawdown': float(((equity - peak) / peak).min()) * 100,
+            'orders': len(self.upbit.orders),
+            'consultations': self.consultations,
+            'local_decisions': self.local_decisions,
+            'bars': len(equity),
+            'equity': equity_curve
+        }
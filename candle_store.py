@@ -0,0 +1,224 @@
+import math
+import sqlite3
+from datetime import datetime, timedelta
+from threading import Lock
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+import pyupbit
+
+
+INTERVAL_DURATIONS = {
+    'minute1': timedelta(minutes=1),
+    'minute3': timedelta(minutes=3),
+    'minute5': timedelta(minutes=5),
+    'minute10': timedelta(minutes=10),
+    'minute15': timedelta(minutes=15),
+    'minute30': timedelta(minutes=30),
+    'minute60': timedelta(minutes=60),
+    'minute240': timedelta(minutes=240),
+    'day': timedelta(days=1),
+    'week': timedelta(weeks=1),
+    'month': timedelta(days=31)
+}
+
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume', 'value']
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class CandleStore:
+    """티커/인터벌별 OHLCV 캔들 로컬 저장소 (SQLite)
+
+    마지막으로 저장된 캔들 이후만 거래소에서 받아오고, 임의 길이의
+    구간은 로컬에서 읽어 반환함. 마지막 캔들은 진행 중일 수 있으므로
+    동기화 때마다 함께 다시 받아 덮어씀.
+    """
+
+    def __init__(self, db_path='candle_store.db', fetch_fn=None, timezone=None):
+        self.db_path = db_path
+        self.fetch_fn = fetch_fn or pyupbit.get_ohlcv
+        self.timezone = timezone or ZoneInfo('Asia/Seoul')
+        self._lock = Lock()
+        self.connection = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.create_table()
+
+    def create_table(self):
+        self.connection.execute("""
+        CREATE TABLE IF NOT EXISTS ohlcv_candles (
+            ticker TEXT NOT NULL,
+            interval TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            open REAL NOT NULL,
+            high REAL NOT NULL,
+            low REAL NOT NULL,
+            close REAL NOT NULL,
+            volume REAL NOT NULL,
+            value REAL,
+            PRIMARY KEY (ticker, interval, timestamp)
+        )
+        """)
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+    def _now(self):
+        # pyupbit는 한국 시간 기준 naive 시각을 인덱스로 반환함
+        return datetime.now(self.timezone).replace(tzinfo=None)
+
+    def count(self, ticker, interval):
+        with self._lock:
+            row = self.connection.execute(
+                'SELECT COUNT(*) FROM ohlcv_candles WHERE ticker = ? AND interval = ?',
+                (ticker, interval)
+            ).fetchone()
+        return row[0]
+
+    def last_timestamp(self, ticker, interval):
+        with self._lock:
+            row = self.connection.execute(
+                'SELECT MAX(timestamp) FROM ohlcv_candles WHERE ticker = ? AND interval = ?',
+                (ticker, interval)
+            ).fetchone()
+        return datetime.strptime(row[0], TIMESTAMP_FORMAT) if row and row[0] else None
+
+    def first_timestamp(self, ticker, interval):
+        with self._lock:
+            row = self.connection.execute(
+                'SELECT MIN(timestamp) FROM ohlcv_candles WHERE ticker = ? AND interval = ?',
+                (ticker, interval)
+            ).fetchone()
+        return datetime.strptime(row[0], TIMESTAMP_FORMAT) if row and row[0] else None
+
+    def upsert(self, ticker, interval, df):
+        """캔들 저장 (같은 시각의 캔들은 덮어씀)"""
+        if df is None or df.empty:
+            return 0
+
+        frame = df.copy()
+        if 'value' not in frame.columns:
+            frame['value'] = None
+
+        rows = [
+            (ticker, interval, timestamp.strftime(TIMESTAMP_FORMAT),
+             float(row[0]), float(row[1]), float(row[2]), float(row[3]), float(row[4]),
+             None if pd.isna(row[5]) else float(row[5]))
+            for timestamp, row in zip(frame.index, frame[OHLCV_COLUMNS].itertuples(index=False))
+        ]
+
+        with self._lock:
+            self.connection.executemany('''
+            INSERT OR REPLACE INTO ohlcv_candles
+            (ticker, interval, timestamp, open, high, low, close, volume, value)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+            self.connection.commit()
+        return len(rows)
+
+    def sync(self, ticker, interval, min_count=200):
+        """마지막 저장 캔들 이후의 캔들만 받아 저장
+
+        Args:
+            ticker (str): 티커 (예: KRW-BTC)
+            interval (str): pyupbit 인터벌 (예: minute240)
+            min_count (int): 로컬에 최소한 확보할 캔들 수
+
+        Returns:
+            int: 새로 받아 저장한 캔들 수
+        """
+        last_ts = self.last_timestamp(ticker, interval)
+
+        if last_ts is None or self.count(ticker, interval) < min_count:
+            fetch_count = min_count
+        else:
+            duration = INTERVAL_DURATIONS.get(interval)
+            if duration is None:
+                fetch_count = min_count
+            else:
+                # 진행 중이던 마지막 캔들도 다시 받아 최종값으로 갱신
+                missing = math.floor((self._now() - last_ts) / duration)
+                fetch_count = max(missing, 0) + 1
+
+        df = self.fetch_fn(ticker, interval=interval, count=fetch_count)
+        if df is None or df.empty:
+            raise ValueError(f"캔들 데이터를 가져올 수 없습니다: {ticker} {interval}")
+
+        return self.upsert(ticker, interval, df)
+
+    def backfill(self, ticker, interval, start, batch_size=200):
+        """start 시각까지 과거 캔들을 거슬러 올라가며 저장 (백테스트용)
+
+        Returns:
+            int: 저장한 캔들 수
+        """
+        saved = 0
+        to = self.first_timestamp(ticker, interval) or self._now()
+
+        while to > start:
+            df = self.fetch_fn(ticker, interval=interval, count=batch_size, to=to.strftime(TIMESTAMP_FORMAT))
+            if df is None or df.empty:
+                break
+
+            df = df[df.index < to]
+            if df.empty:
+                break
+
+            saved += self.upsert(ticker, interval, df[df.index >= start])
+            to = df.index[0].to_pydatetime()
+            print(f"캔들 백필 진행: {ticker} {interval} {to.strftime(TIMESTAMP_FORMAT)}까지 ({saved}개)")
+
+        return saved
+
+    def get_window(self, ticker, interval, count=200, end=None):
+        """최근 count개(또는 end 시각 이전 count개) 캔들 조회
+
+        Returns:
+            pd.DataFrame: pyupbit.get_ohlcv와 같은 컬럼/인덱스 형식
+        """
+        query = '''
+        SELECT timestamp, open, high, low, close, volume, value
+        FROM ohlcv_candles
+        WHERE ticker = ? AND interval = ?
+        '''
+        params = [ticker, interval]
+        if end is not None:
+            query += ' AND timestamp <= ?'
+            params.append(end.strftime(TIMESTAMP_FORMAT))
+        query += ' ORDER BY timestamp DESC LIMIT ?'
+        params.append(count)
+
+        with self._lock:
+            rows = self.connection.execute(query, params).fetchall()
+
+        return self._to_frame(rows[::-1])
+
+    def get_range(self, ticker, interval, start=None, end=None):
+        """기간 내 전체 캔들 조회 (백테스트용)"""
+        query = '''
+        SELECT timestamp, open, high, low, close, volume, value
+        FROM ohlcv_candles
+        WHERE ticker = ? AND interval = ?
+        '''
+        params = [ticker, interval]
+        if start is not None:
+            query += ' AND timestamp >= ?'
+            params.append(start.strftime(TIMESTAMP_FORMAT))
+        if end is not None:
+            query += ' AND timestamp <= ?'
+            params.append(end.strftime(TIMESTAMP_FORMAT))
+        query += ' ORDER BY timestamp ASC'
+
+        with self._lock:
+            rows = self.connection.execute(query, params).fetchall()
+
+        return self._to_frame(rows)
+
+    @staticmethod
+    def _to_frame(rows):
+        if not rows:
+            return pd.DataFrame(columns=OHLCV_COLUMNS)
+        df = pd.DataFrame(rows, columns=['timestamp'] + OHLCV_COLUMNS)
+        df.index = pd.to_datetime(df.pop('timestamp'), format=TIMESTAMP_FORMAT)
+        df.index.name = None
+        return df
@@ -0,0 +1,128 @@
+import sqlite3
+import time
+from threading import Lock
+
+
+# 양자화 구간 크기
+RSI_BUCKET = 10          # RSI 10포인트 단위
+STOCH_BUCKET = 20        # Stoch RSI K/D 20포인트 단위
+POSITION_BUCKET = 20     # BTC 보유 비중 20% 단위
+
+
+def quantize_market_state(analysis_results, coin_ratio, knn_min_strength=0.25):
+    """GPT 자문 중복 판단용 양자화 상태
+
+    RSI 구간, 볼린저 레벨(0~5), EMA 레벨(0~4), Stoch K/D 구간, KNN 방향
+    (-1/0/1, knn_min_strength 미만이면 중립), 보유 비중 구간으로 구성.
+    """
+    knn_prediction = float(analysis_results.get('knn_prediction', 0))
+    knn_direction = 0 if abs(knn_prediction) < knn_min_strength else (1 if knn_prediction > 0 else -1)
+    return (
+        int(min(float(analysis_results['rsi']), 99.999) // RSI_BUCKET),
+        int(analysis_results.get('bollinger_position_num', 0)),
+        int(analysis_results.get('ema_ribbon_status_num', 2)),
+        int(min(float(analysis_results['stoch_rsi_k']), 99.999) // STOCH_BUCKET),
+        int(min(float(analysis_results['stoch_rsi_d']), 99.999) // STOCH_BUCKET),
+        knn_direction,
+        int(min(float(coin_ratio), 99.999) // POSITION_BUCKET)
+    )
+
+
+def account_key(snapshot):
+    """자문 재사용 판단용 계좌 상태 (BTC 보유 수량, KRW 잔고 원 단위)"""
+    if snapshot is None:
+        return None
+    return (round(float(snapshot.coin_balance), 8), round(float(snapshot.krw_balance)))
+
+
+class ConsultationCache:
+    """양자화 시장 상태 -> 최근 GPT 자문(gpt_advice_log 행) 캐시
+
+    같은 상태로 TTL 안에 다시 자문이 필요해지면 GPT를 호출하지 않고
+    gpt_advice_log에 저장된 이전 자문을 그대로 재사용함. 매수/매도 자문은
+    다시 실행하면 같은 주문이 반복되므로, 기록 당시와 계좌 상태가 같을 때만
+    재사용하고 주문이 체결되면 invalidate_trades로 버림 (관망은 항상 재사용).
+    """
+
+    def __init__(self, db_path, ttl=1800):
+        self.db_path = db_path
+        self.ttl = ttl
+        self._entries = {}  # 상태 -> (gpt_advice_log id, 기록 시각, 추천, 계좌 상태)
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, state, now=None, account=None):
+        """TTL 안의 같은 상태 자문 (없으면 None, 조회시 적중/미스 집계)
+
+        매수/매도 자문은 account(account_key)가 기록 당시와 같을 때만 돌려줌.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._entries.get(state)
+            if entry is not None and (now - entry[1] > self.ttl or (entry[2] != '관망' and entry[3] != account)):
+                del self._entries[state]
+                entry = None
+
+        advice = self._load_advice(entry[0]) if entry is not None else None
+        with self._lock:
+            if advice is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return advice
+
+    def put(self, state, advice_id, now=None, recommendation=None, account=None):
+        """자문 기록 (recommendation: 자문의 매매 추천, account: 기록 당시 account_key)"""
+        if advice_id is None:
+            return
+        now = time.time() if now is None else now
+        with self._lock:
+            self._entries[state] = (advice_id, now, recommendation, account)
+            # 만료된 항목 정리
+            expired = [key for key, entry in self._entries.items() if now - entry[1] > self.ttl]
+            for key in expired:
+                del self._entries[key]
+
+    def invalidate_trades(self):
+        """주문 체결 후 매수/매도 자문 항목 삭제 (관망 자문은 유지)"""
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry[2] != '관망']:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _load_advice(self, advice_id):
+        try:
+            conn = sqlite3.connect(self.db_path)
+            try:
+                row = conn.execute('''
+                SELECT trade_recommendation, investment_percentage, confidence_score, reasoning
+                FROM gpt_advice_log WHERE id = ?
+                ''', (advice_id,)).fetchone()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"캐시 자문 조회 중 오류: {e}")
+            return None
+
+        if row is None:
+            return None
+        return {
+            'trade_recommendation': row[0],
+            'investment_percentage': row[1],
+            'confidence_score': row[2],
+            'reasoning': row[3]
+        }
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total > 0 else 0.0
+            }
@@ -0,0 +1,198 @@
+import numpy as np
+import pandas as pd
+
+
+SWEEP_PARAMETERS = ['OVERSOLD_RSI', 'OVERBOUGHT_RSI', 'BOLLINGER_STD', 'MOMENTUM_THRESHOLD', 'VOLATILITY_THRESHOLD']
+
+
+class CounterTrendSweep:
+    """calculate_indicators의 역추세 매수/매도 규칙을 전 구간에 한 번에 적용하는 벡터 백테스터
+
+    파라미터와 무관한 값(종가, 20일 이동평균/표준편차, RSI, 모멘텀, ATR 변동성,
+    다이버전스)은 생성시 한 번만 계산하고, 다이버전스가 있는 캔들만 후보로
+    압축해 둠. 파라미터 조합 평가는 후보 배열에 대한 비교와 누적 연산뿐이므로
+    여러 조합을 (후보 수, 조합 수) 행렬로 한 번에 평가할 수 있음.
+
+    체결 규칙: 매수 신호에 전액 매수, 매도 신호에 전량 매도 (신호 캔들 종가,
+    TRADING_FEE_RATE 적용). 보유 중 매수 신호와 미보유 중 매도 신호는 무시하고,
+    마지막 보유분은 마지막 종가로 평가함. 지표 값은 bot.calculate_analysis_history
+    (캔들마다 최근 window개 캔들 기준)에서 가져오므로 라이브가 보는 RSI와 같음.
+    """
+
+    def __init__(self, bot, data, divergence_lag=1, fee_rate=None, window=200):
+        self.bot = bot
+        self.index = data.index
+        self.fee_rate = bot.TRADING_FEE_RATE if fee_rate is None else fee_rate
+
+        history = bot.calculate_analysis_history(data, window=window, divergence_lag=divergence_lag)
+        if len(history) != len(data):
+            raise ValueError("역추세 스윕용 분석 결과를 계산할 수 없습니다")
+
+        close = history['current_price'].to_numpy(dtype=float)
+        middle = history['bb_middle'].to_numpy(dtype=float)
+        # 밴드폭 배수는 스윕 파라미터이므로 표준편차로 되돌림
+        std = (history['bb_upper'].to_numpy(dtype=float) - middle) / bot.BOLLINGER_STD
+        rsi = history['rsi'].to_numpy(dtype=float)
+        momentum = history['momentum'].to_numpy(dtype=float)
+        volatility_ratio = history['volatility_ratio'].to_numpy(dtype=float)
+        bullish = history['bullish_divergence'].to_numpy(dtype=bool)
+        bearish = history['bearish_divergence'].to_numpy(dtype=bool)
+
+        self.columns = {
+            'close': close, 'bb_middle': middle, 'bb_std': std, 'rsi': rsi,
+            'momentum': momentum, 'volatility_ratio': volatility_ratio,
+            'bullish_divergence': bullish, 'bearish_divergence': bearish
+        }
+
+        # 다이버전스가 없는 캔들은 어떤 파라미터에서도 신호가 없으므로 제외하고,
+        # 조건을 "파라미터 <= 캔들별 임계값" 형태로 바꿔 조합당 비교 한 번씩만 수행
+        self.candidates = np.nonzero(bullish | bearish)[0]
+        self._log_close = np.log(close[self.candidates])
+        self._final_log_close = np.log(close[-1]) if len(close) else 0.0
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            band_distance = (middle - close) / std
+        # 표준편차가 0이면 밴드폭과 무관하게 중심선과의 비교로 결정됨
+        flat = std == 0
+        lower_k = np.where(flat, np.where(close <= middle, np.inf, -np.inf), band_distance)
+        upper_k = np.where(flat, np.where(close >= middle, np.inf, -np.inf), -band_distance)
+
+        buy_rows = np.nonzero(bullish[self.candidates])[0]
+        sell_rows = np.nonzero(bearish[self.candidates])[0]
+        buy_bars = self.candidates[buy_rows]
+        sell_bars = self.candidates[sell_rows]
+        # 누적 연산이 조합 방향으로 연속되도록 (후보 수 x 1) 열 벡터로 저장
+        self._buy = {
+            'rows': buy_rows,
+            'BOLLINGER_STD': lower_k[buy_bars, None],  # k <= (중심선 - 종가) / 표준편차
+            'OVERSOLD_RSI': rsi[buy_bars, None],  # RSI <= 과매도 기준
+            'MOMENTUM_THRESHOLD': -momentum[buy_bars, None],  # 모멘텀 < -임계값
+            'VOLATILITY_THRESHOLD': volatility_ratio[buy_bars, None]  # 변동성 > 임계값
+        }
+        self._sell = {
+            'rows': sell_rows,
+            'BOLLINGER_STD': upper_k[sell_bars, None],
+            'OVERBOUGHT_RSI': rsi[sell_bars, None],
+            'MOMENTUM_THRESHOLD': momentum[sell_bars, None],
+            'VOLATILITY_THRESHOLD': volatility_ratio[sell_bars, None]
+        }
+
+    def _params(self, params):
+        """조합 딕셔너리를 행 벡터로 변환 (없는 값은 봇 설정값)"""
+        columns = {}
+        for name in SWEEP_PARAMETERS:
+            value = params.get(name, getattr(self.bot, name))
+            columns[name] = np.atleast_1d(np.asarray(value, dtype=float))[None, :]
+        return columns
+
+    @staticmethod
+    def _side_signal(params, side, rsi_name, rsi_is_upper):
+        """한쪽(매수/매도) 후보 캔들의 신호 행렬 (후보 수 x 조합 수)"""
+        rsi_condition = (params[rsi_name] <= side[rsi_name]) if rsi_is_upper else (params[rsi_name] >= side[rsi_name])
+        with np.errstate(invalid='ignore'):
+            return (
+                (params['BOLLINGER_STD'] <= side['BOLLINGER_STD']) &
+                rsi_condition &
+                (params['MOMENTUM_THRESHOLD'] < side['MOMENTUM_THRESHOLD']) &
+                (params['VOLATILITY_THRESHOLD'] < side['VOLATILITY_THRESHOLD'])
+            )
+
+    def _signals(self, params):
+        buy = self._side_signal(params, self._buy, 'OVERSOLD_RSI', rsi_is_upper=False)
+        sell = self._side_signal(params, self._sell, 'OVERBOUGHT_RSI', rsi_is_upper=True)
+        return buy, sell
+
+    def signals(self, **params):
+        """전체 캔들의 역추세 신호 (buy/sell 열의 DataFrame)"""
+        buy, sell = self._signals(self._params(params))
+        result = pd.DataFrame(False, index=self.index, columns=['buy', 'sell'])
+        result.iloc[self.candidates[self._buy['rows']], 0] = buy[:, 0]
+        result.iloc[self.candidates[self._sell['rows']], 1] = sell[:, 0]
+        return result
+
+    def evaluate_batch(self, params):
+        """여러 조합을 한 번에 평가
+
+        Args:
+            params: 파라미터명 -> 값 배열 (길이가 같은 배열 또는 스칼라)
+
+        Returns:
+            dict: total_return(%), trades, win_rate 배열
+        """
+        columns = self._params(params)
+        combos = max(value.shape[1] for value in columns.values())
+        m = len(self.candidates)
+        if m == 0:
+            return {'total_return': np.zeros(combos), 'trades': np.zeros(combos, dtype=int),
+                    'win_rate': np.full(combos, np.nan)}
+
+        buy, sell = self._signals(columns)
+
+        # 마지막 신호를 앞으로 채워 보유 여부 계산 (코드 = 위치*2 + 매수 여부)
+        # 후보 수 x 조합 수 행렬에서 행(시간) 방향으로 누적 (신호 없음은 -2로 미보유)
+        positions = np.arange(m, dtype=np.int32)[:, None]
+        buy_rows, sell_rows = self._buy['rows'], self._sell['rows']
+        code = np.full((m, combos), -2, dtype=np.int32)
+        code[sell_rows] = np.where(sell, positions[sell_rows] * 2, -2)
+        code[buy_rows] = np.where(buy, positions[buy_rows] * 2 + 1, code[buy_rows])
+        np.maximum.accumulate(code, axis=0, out=code)
+        holding = (code & 1).astype(bool)
+
+        previous = np.zeros_like(holding)
+        previous[1:] = holding[:-1]
+        entries = holding & ~previous
+        exits = previous & ~holding
+
+        # 청산 시점마다 직전 진입 가격과 비교한 거래별 로그 수익률
+        log_close = self._log_close[:, None]
+        entry_log = np.where(entries, log_close, 0.0)
+        entry_at = np.where(entries, positions, 0)
+        np.maximum.accumulate(entry_at, axis=0, out=entry_at)
+        entry_log = np.take_along_axis(entry_log, entry_at, axis=0)
+        fee_log = np.log1p(-self.fee_rate)
+        closed = np.where(exits, log_close - entry_log + 2 * fee_log, 0.0)
+
+        still_holding = holding[-1]
+        open_trade = np.where(still_holding, self._final_log_close - entry_log[-1] + fee_log, 0.0)
+
+        trades = entries.sum(axis=0)
+        wins = (closed > 0).sum(axis=0) + (open_trade > 0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            win_rate = np.where(trades > 0, wins / trades, np.nan)
+        return {
+            'total_return': np.expm1(closed.sum(axis=0) + open_trade) * 100,
+            'trades': trades,
+            'win_rate': win_rate
+        }
+
+    def evaluate(self, **params):
+        """한 조합 평가 (없는 파라미터는 봇 설정값)"""
+        result = self.evaluate_batch(params)
+        return {name: value[0].item() for name, value in result.items()}
+
+    def sweep(self, grid, memory_budget_mb=64):
+        """파라미터 격자 전체 평가
+
+        Args:
+            grid: 파라미터명 -> 후보 값 목록 (없는 파라미터는 봇 설정값 고정)
+            memory_budget_mb: 한 번에 평가할 (조합 수 x 후보 수) 행렬의 메모리 상한
+
+        Returns:
+            pd.DataFrame: 조합별 결과 (수익률 내림차순)
+        """
+        names = [name for name in SWEEP_PARAMETERS if name in grid]
+        mesh = np.meshgrid(*(np.asarray(grid[name], dtype=float) for name in names), indexing='ij')
+        combos = pd.DataFrame({name: values.ravel() for name, values in zip(names, mesh)})
+
+        # 조합당 (후보 수) 크기의 float64/int32 배열 약 6개 사용
+        batch = max(1, int(memory_budget_mb * 1024 * 1024 // (max(len(self.candidates), 1) * 8 * 6)))
+        results = {'total_return': [], 'trades': [], 'win_rate': []}
+        for start in range(0, len(combos), batch):
+            chunk = combos.iloc[start:start + batch]
+            evaluated = self.evaluate_batch({name: chunk[name].to_numpy() for name in names})
+            for name in results:
+                results[name].append(evaluated[name])
+
+        for name, values in results.items():
+            combos[name] = np.concatenate(values) if values else np.empty(0)
+        return combos.sort_values('total_return', ascending=False, ignore_index=True)
@@ -0,0 +1,69 @@
+# 기본값은 로컬 관망 / GPT(기존과 같은 high) 두 단계. 추론 강도를 낮춘 단계는 필요할 때 추가
+# (예: {'name': 'gpt_low', 'min_score': 0.3, 'reasoning_effort': 'low'}를 gpt_high 앞에 두고 gpt_high는 0.8)
+DEFAULT_TIERS = (
+    {'name': 'local', 'min_score': 0.0, 'reasoning_effort': None},
+    {'name': 'gpt_high', 'min_score': 0.3, 'reasoning_effort': 'high'},
+)
+
+# 볼린저 포지션별 점수 (하단 이탈은 매수, 상단 돌파는 매도 방향)
+BOLLINGER_SCORES = {
+    'extreme_lower': 0.5,
+    'lower_strong': 0.25,
+    'upper_strong': -0.25,
+    'extreme_upper': -0.5
+}
+
+
+def local_score(analysis_results, stoch_cross=None):
+    """analysis_results로 계산한 방향 점수 (+: 매수, -: 매도)
+
+    KNN 예측 x 신뢰도, 역추세 신호(±1), 최근 Stoch RSI 크로스(±0.5),
+    볼린저 극단 위치(±0.25~0.5)의 합.
+
+    Returns:
+        tuple: (점수, 구성 요소 dict)
+    """
+    counter_trend = analysis_results.get('counter_trend_signals', {})
+    components = {
+        'knn': float(analysis_results.get('knn_prediction', 0)) * float(analysis_results.get('knn_signal_strength', 0)) / 100,
+        'counter_trend': (1.0 if counter_trend.get('buy') else 0.0) - (1.0 if counter_trend.get('sell') else 0.0),
+        'stoch_cross': {'up': 0.5, 'down': -0.5}.get(stoch_cross, 0.0),
+        'bollinger': BOLLINGER_SCORES.get(str(analysis_results.get('bollinger_position')), 0.0)
+    }
+    return sum(components.values()), components
+
+
+def position_at_risk(roi, can_sell, max_abs_roi=3.0):
+    """보유 포지션의 평가 손익이 ±max_abs_roi(%) 이상인지 (매도 가능한 보유분이 있을 때만)"""
+    return bool(can_sell) and abs(float(roi)) >= max_abs_roi
+
+
+def select_tier(score, components, can_buy, can_sell, tiers=DEFAULT_TIERS, high_stakes=False):
+    """점수로 결정 단계 선택
+
+    high_stakes(보유 포지션 손익 위험 등)면 점수와 무관하게 마지막 단계.
+    점수 방향으로 실제 주문이 불가능하면(매수 여력/보유 코인 없음) 첫 단계(로컬 관망).
+    아니면 |점수| 이상의 min_score를 가진 마지막 단계.
+    """
+    if high_stakes:
+        return tiers[-1]
+    actionable = (score > 0 and can_buy) or (score < 0 and can_sell)
+    if not actionable:
+        return tiers[0]
+
+    selected = tiers[0]
+    for tier in tiers:
+        if abs(score) >= tier['min_score']:
+            selected = tier
+    return selected
+
+
+def local_hold_advice(score, components):
+    """로컬 단계에서 결정한 관망 자문"""
+    detail = ', '.join(f"{name} {value:+.2f}" for name, value in components.items() if value)
+    return {
+        'trade_recommendation': '관망',
+        'investment_percentage': 0,
+        'confidence_score': 50,
+        'reasoning': f"로컬 판단: 뚜렷한 신호 없음 (점수 {score:+.2f}{', ' + detail if detail else ''})"
+    }
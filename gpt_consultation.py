@@ -0,0 +1,111 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from threading import Event
+
+
+@dataclass
+class PendingConsultation:
+    """진행 중인 GPT 자문 (요청 당시 스냅샷/분석 결과와 함께 보관)"""
+    future: object
+    snapshot: object
+    analysis_results: dict
+    submitted_at: float
+    deadline: float
+    expired: bool = False
+    early_advice: dict = None   # 스트리밍 중 먼저 도착한 매매 판단
+    early_applied: bool = False
+
+
+def snapshot_within_tolerance(base, current, price_tolerance=0.005):
+    """자문 요청 당시 스냅샷 대비 현재 스냅샷이 허용 범위 안인지
+
+    가격 변화율이 price_tolerance 이하이고 그 사이 보유 수량/KRW 잔고가
+    바뀌지 않았을 때만 True (다른 주문이 체결되었으면 자문의 전제가 달라짐).
+    """
+    if base is None or current is None or not base.current_price:
+        return False
+    price_change = abs(current.current_price / base.current_price - 1)
+    coin_unchanged = abs(current.coin_balance - base.coin_balance) <= 1e-8
+    krw_unchanged = abs(current.krw_balance - base.krw_balance) <= max(1.0, base.krw_balance * 0.001)
+    return price_change <= price_tolerance and coin_unchanged and krw_unchanged
+
+
+class ConsultationWorker:
+    """GPT 자문을 작업 스레드에서 실행 (한 번에 하나만 진행)
+
+    메인 루프는 submit 후 바로 다음 주기로 넘어가고, 매 주기 poll로 결과나
+    마감 초과 여부를 확인함. 마감이 지나도 요청은 취소하지 않고 결과가 오면
+    'done'으로 한 번 더 돌려줌 (적용 여부는 호출측에서 스냅샷으로 판단).
+    스트리밍 자문은 report_early로 매매 판단을 먼저 알리면 poll이 'early'를 돌려줌.
+    """
+
+    def __init__(self, deadline=120):
+        self.deadline = deadline
+        self.pending = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='gpt-consult')
+        self._wake = Event()
+
+    def busy(self):
+        return self.pending is not None
+
+    def submit(self, consult, snapshot, analysis_results, now=None):
+        """consult()를 작업 스레드에서 실행 (이미 진행 중이면 None)"""
+        if self.pending is not None:
+            return None
+        now = time.time() if now is None else now
+        self._wake.clear()
+        pending = PendingConsultation(
+            future=None,
+            snapshot=snapshot,
+            analysis_results=analysis_results,
+            submitted_at=now,
+            deadline=now + self.deadline
+        )
+        # report_early가 pending을 찾을 수 있도록 작업 시작 전에 등록
+        self.pending = pending
+        pending.future = self._executor.submit(consult)
+        pending.future.add_done_callback(lambda _: self._wake.set())
+        return pending
+
+    def report_early(self, advice):
+        """작업 스레드에서 스트리밍 중 도착한 매매 판단 전달"""
+        pending = self.pending
+        if pending is not None and pending.early_advice is None:
+            pending.early_advice = advice
+            self._wake.set()
+
+    def poll(self, now=None):
+        """완료/마감 초과 확인
+
+        Returns:
+            tuple: (상태, PendingConsultation) - 상태는 'done'(결과 도착),
+                'early'(스트리밍 매매 판단 도착, 한 번만), 'expired'(이번에 마감 초과),
+                None(진행 중이거나 요청 없음)
+        """
+        pending = self.pending
+        if pending is None:
+            return None, None
+        if pending.future.done():
+            self.pending = None
+            return 'done', pending
+        if pending.early_advice is not None and not pending.early_applied:
+            pending.early_applied = True
+            return 'early', pending
+        now = time.time() if now is None else now
+        if not pending.expired and now >= pending.deadline:
+            pending.expired = True
+            return 'expired', pending
+        return None, pending
+
+    def wait(self, timeout):
+        """진행 중인 자문이 끝나거나 매매 판단이 먼저 도착하거나 timeout이 지날 때까지 대기"""
+        if self.pending is None:
+            time.sleep(timeout)
+            return False
+        woke = self._wake.wait(timeout)
+        self._wake.clear()
+        return woke
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
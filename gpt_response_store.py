@@ -0,0 +1,161 @@
+import hashlib
+import json
+import sqlite3
+from datetime import datetime
+from threading import Lock
+
+
+STORE_MODES = ('off', 'record', 'replay')
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def news_digest(news):
+    """뉴스 요약 텍스트의 짧은 지문 (뉴스가 없으면 None)"""
+    if not news:
+        return None
+    return hashlib.sha1(str(news).strip().encode('utf-8')).hexdigest()[:16]
+
+
+def hold_stand_in(inputs):
+    """기본 대체 모델: 기록이 없으면 관망"""
+    return {
+        'trade_recommendation': '관망',
+        'investment_percentage': 0,
+        'confidence_score': 50,
+        'reasoning': '기록된 자문 없음 (대체 모델)'
+    }
+
+
+class GPTResponseStore:
+    """GPT 자문 응답 저장소 (정규화된 프롬프트 입력 지문 -> 응답, SQLite)
+
+    record: 모델을 호출하고 응답을 입력 지문과 함께 저장 (운영)
+    replay: 저장된 응답을 돌려주고, 없으면 대체 모델(stand_in) 호출 (백테스트)
+    off: 저장소를 쓰지 않고 모델만 호출
+
+    입력 지문은 프롬프트에 표시되는 정밀도로 반올림한 시장 상태, 보유 비중
+    구간, 뉴스 요약 지문으로 만들므로 같은 프롬프트 입력이면 같은 키가 됨.
+    """
+
+    def __init__(self, db_path='gpt_response_store.db', mode='record', stand_in=None):
+        if mode not in STORE_MODES:
+            raise ValueError(f"지원하지 않는 저장소 모드: {mode} ({', '.join(STORE_MODES)})")
+        self.db_path = db_path
+        self.mode = mode
+        self.stand_in = stand_in or hold_stand_in
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+        self.connection = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.create_table()
+
+    def create_table(self):
+        self.connection.execute("""
+        CREATE TABLE IF NOT EXISTS gpt_responses (
+            input_key TEXT PRIMARY KEY,
+            inputs TEXT NOT NULL,
+            advice TEXT NOT NULL,
+            model TEXT,
+            news_digest TEXT,
+            recorded_at TEXT NOT NULL,
+            hit_count INTEGER NOT NULL DEFAULT 0
+        )
+        """)
+        self.connection.execute(
+            'CREATE INDEX IF NOT EXISTS idx_gpt_responses_recorded_at ON gpt_responses (recorded_at)'
+        )
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+    @staticmethod
+    def input_key(inputs):
+        """정규화된 입력의 SHA-256 지문"""
+        payload = json.dumps(inputs, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, inputs):
+        """저장된 응답 조회 (없으면 None)"""
+        key = self.input_key(inputs)
+        with self._lock:
+            row = self.connection.execute(
+                'SELECT advice FROM gpt_responses WHERE input_key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self.connection.execute(
+                'UPDATE gpt_responses SET hit_count = hit_count + 1 WHERE input_key = ?', (key,)
+            )
+            self.connection.commit()
+        return json.loads(row[0])
+
+    def put(self, inputs, advice, model=None, recorded_at=None):
+        """응답 저장 (같은 입력이면 최신 응답으로 덮어씀)"""
+        recorded_at = recorded_at or datetime.now()
+        with self._lock:
+            self.connection.execute('''
+            INSERT OR REPLACE INTO gpt_responses
+            (input_key, inputs, advice, model, news_digest, recorded_at, hit_count)
+            VALUES (?, ?, ?, ?, ?, ?, 0)
+            ''', (
+                self.input_key(inputs),
+                json.dumps(inputs, sort_keys=True, ensure_ascii=False),
+                json.dumps(advice, ensure_ascii=False),
+                model,
+                inputs.get('news'),
+                recorded_at.strftime(TIMESTAMP_FORMAT)
+            ))
+            self.connection.commit()
+            self.recorded += 1
+
+    def news_digest_at(self, timestamp):
+        """timestamp 시점에 운영에서 쓰던 뉴스 지문 (재생시 키 재구성용)"""
+        with self._lock:
+            row = self.connection.execute('''
+            SELECT news_digest FROM gpt_responses
+            WHERE recorded_at <= ?
+            ORDER BY recorded_at DESC LIMIT 1
+            ''', (timestamp.strftime(TIMESTAMP_FORMAT),)).fetchone()
+        return row[0] if row else None
+
+    def consult(self, inputs, call_model, model=None, recorded_at=None, stand_in=None):
+        """모드에 따라 저장된 응답 또는 모델/대체 모델 응답 반환
+
+        Args:
+            inputs: 정규화된 프롬프트 입력 (BTCTradingBot.build_gpt_inputs)
+            call_model: 인자 없이 호출하면 자문 딕셔너리를 반환하는 함수
+            model: 저장할 모델 이름
+            recorded_at: 기록 시각 (없으면 현재 시각)
+            stand_in: 이번 호출에만 쓸 대체 모델 (없으면 저장소 기본값)
+
+        Returns:
+            tuple: (자문 딕셔너리, 출처 'model' | 'replay' | 'stand_in')
+        """
+        if self.mode == 'replay':
+            advice = self.get(inputs)
+            if advice is not None:
+                self.hits += 1
+                return advice, 'replay'
+            self.misses += 1
+            return (stand_in or self.stand_in)(inputs), 'stand_in'
+
+        advice = call_model()
+        if self.mode == 'record':
+            self.put(inputs, advice, model=model, recorded_at=recorded_at)
+        return advice, 'model'
+
+    def stats(self):
+        with self._lock:
+            stored = self.connection.execute('SELECT COUNT(*) FROM gpt_responses').fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            'mode': self.mode,
+            'stored': stored,
+            'recorded': self.recorded,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total > 0 else 0.0
+        }
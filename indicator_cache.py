@@ -0,0 +1,80 @@
+from collections import OrderedDict
+from threading import Lock
+
+import numpy as np
+import pandas as pd
+
+
+class IndicatorCache:
+    """캔들 스냅샷 단위 지표 계산 결과 캐시 (LRU)
+
+    키는 (티커, 인터벌, 마지막 캔들 시각, 시리즈 지문, 지표명, 파라미터)로 구성됨.
+    진행 중인 캔들은 시각이 같아도 종가가 계속 바뀌므로 마지막 값과
+    체크섬을 지문에 포함시켜 오래된 값을 돌려주지 않도록 함.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def fingerprint(series):
+        """시리즈(또는 배열)의 스냅샷 지문 생성
+
+        Returns:
+            tuple: (마지막 캔들 시각, 첫 캔들 시각, 길이, 마지막 값, 합계)
+        """
+        if isinstance(series, pd.Series):
+            values = series.to_numpy(dtype=float)
+            # Timestamp 객체 생성 비용을 피하려고 원시 인덱스 값을 사용
+            index_values = series.index.values
+            first_ts = index_values[0] if len(series) else None
+            last_ts = index_values[-1] if len(series) else None
+        else:
+            values = np.asarray(series, dtype=float)
+            first_ts = last_ts = None
+
+        if len(values) == 0:
+            return (None, None, 0, None, None)
+
+        return (last_ts, first_ts, len(values), float(values[-1]), float(np.nansum(values)))
+
+    def make_key(self, ticker, interval, series, name, params=()):
+        fingerprint = self.fingerprint(series)
+        return (ticker, interval, fingerprint[0]) + fingerprint[1:] + (name, tuple(params))
+
+    def get_or_compute(self, key, compute_fn):
+        """캐시에 있으면 반환, 없으면 계산 후 저장"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+        value = compute_fn()
+
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total > 0 else 0.0
+            }
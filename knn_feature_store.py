@@ -0,0 +1,347 @@
+import math
+import os
+import pickle
+from collections import deque
+
+import numpy as np
+
+from streaming_indicators import _EMA, _RollingMean, _RollingMeanStd, _WilderRSI
+
+
+FEATURE_NAMES = [
+    'price_position', 'price_momentum', 'price_trend', 'bb_position', 'bb_width',
+    'volume_ratio', 'volume_trend', 'volatility', 'rsi', 'ema_cross'
+]
+BINARY_COLUMNS = (2, 9)  # price_trend, ema_cross
+STORE_VERSION = 2
+
+
+def _ratio(numerator, denominator):
+    if denominator == 0 or math.isnan(denominator) or math.isnan(numerator):
+        return math.nan
+    return numerator / denominator
+
+
+class _Welford:
+    """열별 평균/분산 누적 (NaN 값은 건너뜀)"""
+
+    def __init__(self, columns):
+        self.count = np.zeros(columns, dtype=np.int64)
+        self.mean = np.zeros(columns)
+        self.m2 = np.zeros(columns)
+
+    def push(self, row):
+        valid = np.isfinite(row)
+        self.count[valid] += 1
+        delta = row[valid] - self.mean[valid]
+        self.mean[valid] += delta / self.count[valid]
+        self.m2[valid] += delta * (row[valid] - self.mean[valid])
+
+    @property
+    def std(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.sqrt(self.m2 / (self.count - 1))
+
+
+class KNNFeatureStore:
+    """마감 캔들마다 KNN 특징 한 행을 추가하는 증분 특징 저장소
+
+    prepare_knn_features와 같은 10개 특징을 증분 지표로 계산해 메모리 맵
+    행렬(.npy)에 원값으로 쌓고, 정규화 통계(평균/표준편차)는 Welford 방식으로
+    누적함. 현재 진행 중 캔들의 질의 벡터도 같은 상태에 한 번 더 적용한
+    미리보기 값으로 만들므로 과거 행과 정규화 기준이 같음.
+
+    정규화는 윈도우가 아닌 저장소 전체 이력 기준이며, 행마다 기준이 달라지지
+    않도록 고정해 두고 누적 통계가 renormalize_tolerance(표준편차 대비)
+    이상 벗어날 때만 갱신함. 갱신할 때마다 normalization_version이 바뀌므로
+    정규화 행을 보관하는 쪽(KNN 인덱스)은 이 값으로 재구축 여부를 판단함.
+    """
+
+    def __init__(self, path='knn_feature_store', initial_capacity=4096, renormalize_tolerance=0.05):
+        self.path = path
+        self.initial_capacity = initial_capacity
+        self.renormalize_tolerance = renormalize_tolerance
+        os.makedirs(self.path, exist_ok=True)
+        self.reset()
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def reset(self):
+        """빈 저장소로 초기화 (기존 파일 덮어씀)"""
+        self.count = 0
+        self.stats = _Welford(len(FEATURE_NAMES))
+        self.bollinger = _RollingMeanStd(20)
+        self.volume_ma = _RollingMean(20)
+        self.return_std = _RollingMeanStd(20)
+        self.rsi = _WilderRSI(14)
+        self.ema_5 = _EMA(5)
+        self.ema_20 = _EMA(20)
+        self.recent_closes = deque(maxlen=5)
+        self.recent_volumes = deque(maxlen=3)
+        self.norm_mean = None
+        self.norm_scale = None
+        self.normalization_version = 0
+        self._reset_matrix_cache()
+        self._allocate(self.initial_capacity)
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def last_timestamp(self):
+        return int(self.timestamps[self.count - 1]) if self.count else None
+
+    #----------------
+    # 메모리 맵 행렬
+    #----------------
+    def _allocate(self, capacity, keep=0):
+        """용량 capacity의 메모리 맵 파일 생성 (앞쪽 keep개 행 복사)"""
+        arrays = {
+            'features': ((capacity, len(FEATURE_NAMES)), np.float64),
+            'timestamps': ((capacity,), np.int64),
+            'closes': ((capacity,), np.float64)
+        }
+        for name, (shape, dtype) in arrays.items():
+            tmp_path = self._file(f"{name}.tmp.npy")
+            mapped = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=dtype, shape=shape)
+            if keep:
+                mapped[:keep] = getattr(self, name)[:keep]
+            mapped.flush()
+            del mapped
+            os.replace(tmp_path, self._file(f"{name}.npy"))
+            setattr(self, name, np.load(self._file(f"{name}.npy"), mmap_mode='r+'))
+
+    def _ensure_capacity(self, rows):
+        capacity = len(self.timestamps)
+        if self.count + rows <= capacity:
+            return
+        while capacity < self.count + rows:
+            capacity *= 2
+        self._allocate(capacity, keep=self.count)
+
+    #----------------
+    # 특징 계산
+    #----------------
+    def _raw_row(self, close, volume, commit):
+        """원값 특징 한 행 (commit=False면 상태를 바꾸지 않는 미리보기)"""
+        prev_close = self.recent_closes[-1] if self.recent_closes else None
+        step = (lambda indicator, x: indicator.push(x)) if commit else (lambda indicator, x: indicator.preview(x))
+
+        sma, std = step(self.bollinger, close)
+        volume_ma = step(self.volume_ma, volume)
+        if prev_close is not None:
+            _, volatility = step(self.return_std, close / prev_close - 1)
+        else:
+            volatility = math.nan
+        rsi = step(self.rsi, close)
+        ema_5 = step(self.ema_5, close)
+        ema_20 = step(self.ema_20, close)
+
+        row = np.array([
+            _ratio(close - sma, std),  # price_position
+            _ratio(close, self.recent_closes[0]) - 1 if len(self.recent_closes) == 5 else math.nan,  # price_momentum
+            1 if close > sma else -1,  # price_trend
+            _ratio(close - sma, 4 * std),  # bb_position
+            _ratio(4 * std, sma),  # bb_width
+            _ratio(volume, volume_ma),  # volume_ratio
+            _ratio(volume, self.recent_volumes[0]) - 1 if len(self.recent_volumes) == 3 else math.nan,  # volume_trend
+            volatility,  # volatility
+            rsi,  # rsi
+            1 if ema_5 > ema_20 else -1  # ema_cross
+        ], dtype=float)
+
+        if commit:
+            self.recent_closes.append(close)
+            self.recent_volumes.append(volume)
+        return row
+
+    def _current_normalization(self):
+        """누적 통계 기준 (평균, 표준편차) - 이진 특징은 정규화하지 않음"""
+        mean = self.stats.mean.copy()
+        std = self.stats.std
+        scale = np.where(np.isfinite(std) & (std > 0), std, 1.0)
+        mean[list(BINARY_COLUMNS)] = 0.0
+        scale[list(BINARY_COLUMNS)] = 1.0
+        return mean, scale
+
+    def refresh_normalization(self):
+        """누적 통계가 고정된 정규화 기준에서 허용 범위 이상 벗어났으면 기준 갱신
+
+        Returns:
+            bool: 기준을 갱신했으면 True
+        """
+        mean, scale = self._current_normalization()
+        if self.norm_mean is not None:
+            drift = np.maximum(
+                np.abs(mean - self.norm_mean) / self.norm_scale,
+                np.abs(scale / self.norm_scale - 1)
+            )
+            if drift.max() < self.renormalize_tolerance:
+                return False
+        self.norm_mean = mean
+        self.norm_scale = scale
+        self.normalization_version += 1
+        return True
+
+    def _normalize(self, rows):
+        if self.norm_mean is None:
+            self.refresh_normalization()
+        normalized = (rows - self.norm_mean) / self.norm_scale
+        return np.where(np.isfinite(normalized), normalized, 0.0)
+
+    #----------------
+    # 추가 및 동기화
+    #----------------
+    def append(self, timestamp, close, volume):
+        """마감된 캔들 한 개 추가"""
+        self._ensure_capacity(1)
+        row = self._raw_row(float(close), float(volume), commit=True)
+        self.features[self.count] = row
+        self.timestamps[self.count] = timestamp
+        self.closes[self.count] = close
+        self.stats.push(row)
+        self.count += 1
+
+    def sync(self, data):
+        """OHLCV 데이터에서 아직 저장하지 않은 마감 캔들을 추가 (마지막 행은 진행 중 캔들)
+
+        Returns:
+            int: 추가한 행 수
+        """
+        if data is None or len(data) < 2:
+            return 0
+
+        closed = data.iloc[:-1]
+        timestamps = closed.index.values.astype('datetime64[ns]').astype(np.int64)
+        last_ts = self.last_timestamp
+        new_rows = np.arange(len(closed)) if last_ts is None else np.nonzero(timestamps > last_ts)[0]
+        if len(new_rows) == 0:
+            return 0
+
+        if last_ts is not None and new_rows[0] == 0:
+            print("KNN 특징 저장소: 저장된 마지막 캔들이 데이터 구간에 없음 (중간 캔들이 빠졌을 수 있음)")
+
+        closes = closed['close'].to_numpy(dtype=float)
+        volumes = closed['volume'].to_numpy(dtype=float)
+        for i in new_rows:
+            self.append(timestamps[i], closes[i], volumes[i])
+        self.refresh_normalization()
+        self.save()
+        return len(new_rows)
+
+    #----------------
+    # 조회
+    #----------------
+    def _reset_matrix_cache(self):
+        self._cached_features = np.empty((0, len(FEATURE_NAMES)))
+        self._cached_labels = np.empty(0)
+        self._cached_rows = 0
+        self._cached_version = None
+
+    def _update_matrix_cache(self, rows):
+        """정규화 행렬 캐시를 rows개 행까지 갱신 (기준이 바뀌었을 때만 전체 재정규화)"""
+        if self._cached_version != self.normalization_version or rows < self._cached_rows:
+            self._cached_rows = 0
+            self._cached_version = self.normalization_version
+        if rows == self._cached_rows:
+            return
+
+        capacity = len(self._cached_features)
+        if rows > capacity:
+            capacity = max(rows, capacity * 2, 1024)
+            features = np.empty((capacity, len(FEATURE_NAMES)))
+            labels = np.empty(capacity)
+            features[:self._cached_rows] = self._cached_features[:self._cached_rows]
+            labels[:self._cached_rows] = self._cached_labels[:self._cached_rows]
+            self._cached_features = features
+            self._cached_labels = labels
+
+        start = self._cached_rows
+        self._cached_features[start:rows] = self._normalize(np.asarray(self.features[start:rows]))
+        closes = np.asarray(self.closes[start:rows + 1])
+        self._cached_labels[start:rows] = np.where(closes[1:] > closes[:-1], 1, -1)
+        self._cached_rows = rows
+
+    def matrix(self):
+        """레이블이 확정된 행의 정규화 특징 행렬과 레이블
+
+        i번째 행의 레이블은 i+1번째 캔들 종가 방향이므로 마지막 저장 행은 제외.
+        정규화 행렬은 캐시해 두고 새 행만 정규화하며, 반환 배열은 캐시의
+        읽기 전용 뷰임.
+
+        Returns:
+            tuple: (특징 행렬, 레이블, 타임스탬프)
+        """
+        rows = max(self.count - 1, 0)
+        if self.norm_mean is None:
+            self.refresh_normalization()
+        self._update_matrix_cache(rows)
+
+        features = self._cached_features[:rows]
+        labels = self._cached_labels[:rows]
+        features.flags.writeable = False
+        labels.flags.writeable = False
+        return features, labels, np.asarray(self.timestamps[:rows])
+
+    def current_vector(self, close, volume):
+        """진행 중 캔들의 정규화 질의 벡터 (상태는 바뀌지 않음)"""
+        row = self._raw_row(float(close), float(volume), commit=False)
+        return self._normalize(row.reshape(1, -1))
+
+    #----------------
+    # 저장/로드
+    #----------------
+    def save(self):
+        for name in ('features', 'timestamps', 'closes'):
+            getattr(self, name).flush()
+
+        state = {
+            'version': STORE_VERSION,
+            'count': self.count,
+            'stats': self.stats,
+            'bollinger': self.bollinger,
+            'volume_ma': self.volume_ma,
+            'return_std': self.return_std,
+            'rsi': self.rsi,
+            'ema_5': self.ema_5,
+            'ema_20': self.ema_20,
+            'recent_closes': self.recent_closes,
+            'recent_volumes': self.recent_volumes,
+            'norm_mean': self.norm_mean,
+            'norm_scale': self.norm_scale,
+            'normalization_version': self.normalization_version
+        }
+        tmp_path = self._file('state.tmp.pkl')
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(state, f)
+        os.replace(tmp_path, self._file('state.pkl'))
+
+    @classmethod
+    def load(cls, path='knn_feature_store', initial_capacity=4096, renormalize_tolerance=0.05):
+        """저장된 저장소 열기 (없거나 형식이 다르면 빈 저장소)"""
+        store = cls.__new__(cls)
+        store.path = path
+        store.initial_capacity = initial_capacity
+        store.renormalize_tolerance = renormalize_tolerance
+
+        state_path = os.path.join(path, 'state.pkl')
+        if not os.path.exists(state_path):
+            os.makedirs(path, exist_ok=True)
+            store.reset()
+            return store
+
+        with open(state_path, 'rb') as f:
+            state = pickle.load(f)
+        if state.get('version') != STORE_VERSION:
+            print("KNN 특징 저장소 형식 변경 - 새로 생성")
+            store.reset()
+            return store
+
+        for name, value in state.items():
+            if name != 'version':
+                setattr(store, name, value)
+        store._reset_matrix_cache()
+        for name in ('features', 'timestamps', 'closes'):
+            setattr(store, name, np.load(store._file(f"{name}.npy"), mmap_mode='r+'))
+        return store
@@ -0,0 +1,435 @@
+import heapq
+import os
+
+import numpy as np
+
+
+def time_decay_multiplier(rows, newest, time_decay=100, window=199):
+    """행 위치별 시간 배수 exp(j / time_decay), j는 최근 window개 구간 안의 위치
+
+    구간은 가장 최근 행(newest)에서 거꾸로 잡으므로 window개 행만 있는 라이브
+    윈도우에서는 exp(i / time_decay)와 같고, 그보다 오래된 행은 모두 j=0(배수 1)로
+    취급하여 이력이 길어져도 배수가 커지거나 넘치지 않음.
+    """
+    positions = np.asarray(rows) - (newest - window + 1)
+    return np.exp(np.clip(positions, 0, window - 1) / time_decay)
+
+
+class KNNIndex:
+    """가중 특징 공간 KD-tree 이웃 인덱스 (디스크 저장/증분 추가 지원)
+
+    find_k_nearest와 같은 거리 정의를 사용함:
+    최종 거리 = 가중 유클리디안 거리 * time_decay_multiplier(i), i는 인덱스 내 행 위치(0이 가장 오래된 행).
+    시간 배수가 1 이상이므로 원거리 기준으로 넉넉히 후보를 가져온 뒤 재정렬하고,
+    k번째 최종 거리가 가져온 후보의 최대 원거리보다 작으면 정확한 결과임이 보장됨.
+
+    새 행은 버퍼에 쌓였다가 트리 크기 대비 rebuild_ratio를 넘으면 트리를 다시 만듦.
+    normalization_version은 행을 정규화한 특징 저장소 기준의 버전이며, 기준이
+    바뀌면 서로 다른 정규화가 섞이지 않도록 인덱스를 다시 구축해야 함.
+    """
+
+    def __init__(self, feature_weights, leaf_size=32, rebuild_ratio=0.1):
+        self.feature_weights = np.asarray(feature_weights, dtype=float)
+        self.leaf_size = leaf_size
+        self.rebuild_ratio = rebuild_ratio
+        self.points = np.empty((0, len(self.feature_weights)))
+        self.labels = np.empty(0)
+        self.timestamps = np.empty(0, dtype=np.int64)
+        self.normalization_version = -1
+        self._reset_tree()
+
+    def __len__(self):
+        return len(self.points)
+
+    def _reset_tree(self):
+        self.tree_size = 0
+        self.perm = np.empty(0, dtype=np.int64)
+        self.node_start = np.empty(0, dtype=np.int64)
+        self.node_end = np.empty(0, dtype=np.int64)
+        self.node_left = np.empty(0, dtype=np.int64)
+        self.node_right = np.empty(0, dtype=np.int64)
+        self.node_lo = np.empty((0, len(self.feature_weights)))
+        self.node_hi = np.empty((0, len(self.feature_weights)))
+
+    @property
+    def last_timestamp(self):
+        return int(self.timestamps[-1]) if len(self.timestamps) else None
+
+    #----------------
+    # 구축 및 추가
+    #----------------
+    def build(self, features, labels, timestamps):
+        """전체 데이터로 인덱스 구축"""
+        self.points = np.asarray(features, dtype=float) * self.feature_weights
+        self.labels = np.asarray(labels, dtype=float)
+        self.timestamps = np.asarray(timestamps, dtype=np.int64)
+        self._build_tree()
+
+    def append(self, features, labels, timestamps):
+        """마감된 캔들의 레이블 확정 행 추가"""
+        features = np.asarray(features, dtype=float).reshape(-1, len(self.feature_weights))
+        if len(features) == 0:
+            return
+        self.points = np.vstack([self.points, features * self.feature_weights])
+        self.labels = np.concatenate([self.labels, np.asarray(labels, dtype=float)])
+        self.timestamps = np.concatenate([self.timestamps, np.asarray(timestamps, dtype=np.int64)])
+
+        if len(self.points) - self.tree_size > max(self.leaf_size, self.tree_size * self.rebuild_ratio):
+            self._build_tree()
+
+    def _build_tree(self):
+        n = len(self.points)
+        self._reset_tree()
+        self.tree_size = n
+        if n == 0:
+            return
+
+        points = self.points
+        perm = np.arange(n)
+        starts, ends, lefts, rights, los, his = [], [], [], [], [], []
+
+        stack = [(0, n, -1, 0)]
+        while stack:
+            start, end, parent, side = stack.pop()
+            node = len(starts)
+            block = points[perm[start:end]]
+            lo = block.min(axis=0)
+            hi = block.max(axis=0)
+            starts.append(start)
+            ends.append(end)
+            lefts.append(-1)
+            rights.append(-1)
+            los.append(lo)
+            his.append(hi)
+            if parent >= 0:
+                (lefts if side == 0 else rights)[parent] = node
+
+            size = end - start
+            if size <= self.leaf_size:
+                continue
+            dim = int(np.argmax(hi - lo))
+            if hi[dim] == lo[dim]:
+                continue
+
+            mid = size // 2
+            order = np.argpartition(block[:, dim], mid)
+            perm[start:end] = perm[start:end][order]
+            stack.append((start + mid, end, node, 1))
+            stack.append((start, start + mid, node, 0))
+
+        self.perm = perm
+        self.node_start = np.array(starts, dtype=np.int64)
+        self.node_end = np.array(ends, dtype=np.int64)
+        self.node_left = np.array(lefts, dtype=np.int64)
+        self.node_right = np.array(rights, dtype=np.int64)
+        self.node_lo = np.array(los)
+        self.node_hi = np.array(his)
+
+    #----------------
+    # 조회
+    #----------------
+    @staticmethod
+    def _merge(best_d, best_i, d, i, m):
+        d = np.concatenate([best_d, d])
+        i = np.concatenate([best_i, i])
+        if len(d) > m:
+            keep = np.argpartition(d, m - 1)[:m]
+            d, i = d[keep], i[keep]
+        return d, i
+
+    def _box_distance(self, node, query):
+        gap = np.maximum(self.node_lo[node] - query, 0) + np.maximum(query - self.node_hi[node], 0)
+        return float(np.dot(gap, gap))
+
+    def _query_raw(self, query, m):
+        """원거리(시간 배수 미적용) 기준 m개 최근접 행 (제곱 거리, 행 번호)"""
+        best_d = np.empty(0)
+        best_i = np.empty(0, dtype=np.int64)
+
+        # 트리에 아직 반영되지 않은 버퍼 행은 직접 계산
+        if len(self.points) > self.tree_size:
+            rows = np.arange(self.tree_size, len(self.points))
+            diff = self.points[rows] - query
+            best_d, best_i = self._merge(best_d, best_i, np.einsum('ij,ij->i', diff, diff), rows, m)
+
+        if self.tree_size == 0:
+            return best_d, best_i
+
+        heap = [(self._box_distance(0, query), 0)]
+        while heap:
+            bound, node = heapq.heappop(heap)
+            if len(best_d) >= m and bound > best_d.max():
+                break
+
+            left = self.node_left[node]
+            if left < 0:
+                rows = self.perm[self.node_start[node]:self.node_end[node]]
+                diff = self.points[rows] - query
+                best_d, best_i = self._merge(best_d, best_i, np.einsum('ij,ij->i', diff, diff), rows, m)
+                continue
+
+            for child in (left, self.node_right[node]):
+                if child >= 0:
+                    heapq.heappush(heap, (self._box_distance(child, query), child))
+
+        return best_d, best_i
+
+    def query(self, current_point, k, time_decay=100, window=199, overfetch=4, tolerance=1e-6, max_candidates=4096):
+        """시간 가중 최종 거리 기준 k개 이웃 조회
+
+        가중치는 find_k_nearest처럼 exp(-거리)를 정규화한 값이며, 정규화 합은
+        가져온 후보에서 계산함. 나머지 행의 기여 상한이 tolerance 이하가 될
+        때까지(또는 max_candidates까지) 후보를 늘림.
+
+        Returns:
+            tuple: (k개 레이블, k개 최종 거리, k개 가중치, k개 행 번호)
+        """
+        n = len(self.points)
+        if n < k:
+            return np.array([]), np.array([]), np.array([]), np.array([], dtype=np.int64)
+
+        query = np.asarray(current_point, dtype=float).reshape(-1) * self.feature_weights
+        m = min(n, max(k * overfetch, k))
+
+        while True:
+            squared, rows = self._query_raw(query, m)
+            raw = np.sqrt(squared)
+            final = raw * time_decay_multiplier(rows, n - 1, time_decay, window)
+
+            order = np.argsort(final, kind='stable')
+            top = order[:k]
+            kth = final[top[-1]]
+            fetched_max = raw.max()
+
+            # 가져오지 않은 행의 최종 거리는 fetched_max 이상
+            exact = m >= n or kth <= fetched_max
+            d_min = final[order[0]]
+            weights = np.exp(-(final - d_min))
+            total = weights.sum()
+            tail = (n - m) * np.exp(-(fetched_max - d_min)) if m < n else 0.0
+            converged = tail <= tolerance * total
+
+            if exact and (converged or m >= max_candidates):
+                break
+            m = min(n, m * 2)
+
+        return self.labels[rows[top]], final[top], weights[top] / total, rows[top]
+
+    #----------------
+    # 저장/로드
+    #----------------
+    def save(self, path):
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(
+            tmp_path,
+            feature_weights=self.feature_weights,
+            leaf_size=self.leaf_size,
+            rebuild_ratio=self.rebuild_ratio,
+            points=self.points,
+            labels=self.labels,
+            timestamps=self.timestamps,
+            normalization_version=self.normalization_version,
+            tree_size=self.tree_size,
+            perm=self.perm,
+            node_start=self.node_start,
+            node_end=self.node_end,
+            node_left=self.node_left,
+            node_right=self.node_right,
+            node_lo=self.node_lo,
+            node_hi=self.node_hi
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as stored:
+            index = cls(stored['feature_weights'], int(stored['leaf_size']), float(stored['rebuild_ratio']))
+            index.points = stored['points']
+            index.labels = stored['labels']
+            index.timestamps = stored['timestamps']
+            if 'normalization_version' in stored:
+                index.normalization_version = int(stored['normalization_version'])
+            index.tree_size = int(stored['tree_size'])
+            index.perm = stored['perm']
+            index.node_start = stored['node_start']
+            index.node_end = stored['node_end']
+            index.node_left = stored['node_left']
+            index.node_right = stored['node_right']
+            index.node_lo = stored['node_lo']
+            index.node_hi = stored['node_hi']
+        return index
+
+
+class IVFKNNIndex:
+    """근사 최근접 이웃 인덱스 (k-means 조대 양자화기 + 역 리스트, IVF)
+
+    수년치 분봉처럼 수백만 행에서 정확 탐색이 느릴 때 사용하는 연구용 모드.
+    조회시 질의점에 가까운 n_probe개 리스트의 행만 비교하므로 n_probe가
+    재현율/속도 조절 손잡이가 됨 (n_probe == n_lists이면 정확 탐색).
+    점은 float32로 보관하여 메모리를 제한함.
+
+    거리 정의와 반환 형식은 KNNIndex와 같고, 가중치 정규화 합은 비교한
+    후보 행에서만 계산함.
+    """
+
+    def __init__(self, feature_weights, n_lists=None, n_probe=8, train_iterations=10,
+                 train_sample_size=65536, chunk_size=65536, seed=0):
+        self.feature_weights = np.asarray(feature_weights, dtype=float)
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.train_iterations = train_iterations
+        self.train_sample_size = train_sample_size
+        self.chunk_size = chunk_size
+        self.seed = seed
+        self.points = np.empty((0, len(self.feature_weights)), dtype=np.float32)
+        self.labels = np.empty(0)
+        self.timestamps = np.empty(0, dtype=np.int64)
+        self.normalization_version = -1
+        self.centroids = np.empty((0, len(self.feature_weights)), dtype=np.float32)
+        self.assignments = np.empty(0, dtype=np.int64)
+        self.list_rows = np.empty(0, dtype=np.int64)
+        self.list_offsets = np.zeros(1, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.points)
+
+    @property
+    def last_timestamp(self):
+        return int(self.timestamps[-1]) if len(self.timestamps) else None
+
+    #----------------
+    # 구축 및 추가
+    #----------------
+    def _nearest_centroid(self, points):
+        """행별 가장 가까운 중심점 (메모리 제한을 위해 청크 단위 계산)"""
+        centroid_norms = np.einsum('ij,ij->i', self.centroids, self.centroids)
+        result = np.empty(len(points), dtype=np.int64)
+        for start in range(0, len(points), self.chunk_size):
+            block = points[start:start + self.chunk_size]
+            scores = centroid_norms - 2 * (block @ self.centroids.T)
+            result[start:start + len(block)] = np.argmin(scores, axis=1)
+        return result
+
+    def _train(self):
+        rng = np.random.default_rng(self.seed)
+        n = len(self.points)
+        n_lists = self.n_lists or int(np.clip(4 * np.sqrt(n), 1, 65536))
+        n_lists = min(n_lists, n)
+
+        sample_size = min(n, max(self.train_sample_size, n_lists * 32))
+        sample = self.points[rng.choice(n, sample_size, replace=False)]
+        self.centroids = sample[rng.choice(sample_size, n_lists, replace=False)].copy()
+
+        for _ in range(self.train_iterations):
+            assigned = self._nearest_centroid(sample)
+            counts = np.bincount(assigned, minlength=n_lists)
+            sums = np.zeros_like(self.centroids, dtype=np.float64)
+            np.add.at(sums, assigned, sample)
+            filled = counts > 0
+            self.centroids[filled] = (sums[filled] / counts[filled, None]).astype(np.float32)
+            # 빈 리스트는 임의의 표본점으로 다시 시작
+            empty = np.nonzero(~filled)[0]
+            if len(empty) > 0:
+                self.centroids[empty] = sample[rng.choice(sample_size, len(empty), replace=False)]
+
+    def _rebuild_lists(self):
+        order = np.argsort(self.assignments, kind='stable')
+        self.list_rows = order
+        counts = np.bincount(self.assignments, minlength=len(self.centroids))
+        self.list_offsets = np.concatenate([[0], np.cumsum(counts)])
+
+    def build(self, features, labels, timestamps):
+        """전체 데이터로 중심점 학습 후 역 리스트 구축"""
+        self.points = np.ascontiguousarray(np.asarray(features, dtype=np.float32) * self.feature_weights.astype(np.float32))
+        self.labels = np.asarray(labels, dtype=float)
+        self.timestamps = np.asarray(timestamps, dtype=np.int64)
+        if len(self.points) == 0:
+            return
+        self._train()
+        self.assignments = self._nearest_centroid(self.points)
+        self._rebuild_lists()
+
+    def append(self, features, labels, timestamps):
+        """새 행은 기존 중심점에 배정 (중심점 재학습은 build로)"""
+        features = np.asarray(features, dtype=np.float32).reshape(-1, len(self.feature_weights))
+        if len(features) == 0:
+            return
+        if len(self.centroids) == 0:
+            self.build(features, labels, timestamps)
+            return
+        weighted = features * self.feature_weights.astype(np.float32)
+        self.points = np.ascontiguousarray(np.vstack([self.points, weighted]))
+        self.labels = np.concatenate([self.labels, np.asarray(labels, dtype=float)])
+        self.timestamps = np.concatenate([self.timestamps, np.asarray(timestamps, dtype=np.int64)])
+        self.assignments = np.concatenate([self.assignments, self._nearest_centroid(weighted)])
+        self._rebuild_lists()
+
+    #----------------
+    # 조회
+    #----------------
+    def candidate_rows(self, query, n_probe=None):
+        """질의점에 가까운 n_probe개 리스트의 행 번호"""
+        n_probe = min(n_probe or self.n_probe, len(self.centroids))
+        diff = self.centroids - query
+        centroid_distances = np.einsum('ij,ij->i', diff, diff)
+        probes = np.argpartition(centroid_distances, n_probe - 1)[:n_probe]
+        return np.concatenate([
+            self.list_rows[self.list_offsets[probe]:self.list_offsets[probe + 1]] for probe in probes
+        ])
+
+    def query(self, current_point, k, time_decay=100, window=199, n_probe=None):
+        """근사 k개 이웃 조회 (시간 배수는 후보가 아닌 인덱스 전체의 최신 행 기준)
+
+        Returns:
+            tuple: (k개 레이블, k개 최종 거리, k개 가중치, k개 행 번호)
+        """
+        empty = (np.array([]), np.array([]), np.array([]), np.array([], dtype=np.int64))
+        if len(self.points) < k:
+            return empty
+
+        query = (np.asarray(current_point, dtype=np.float32).reshape(-1) * self.feature_weights.astype(np.float32))
+        rows = self.candidate_rows(query, n_probe)
+        if len(rows) < k:
+            return empty
+
+        diff = self.points[rows] - query
+        raw = np.sqrt(np.einsum('ij,ij->i', diff, diff)).astype(np.float64)
+        final = raw * time_decay_multiplier(rows, len(self.points) - 1, time_decay, window)
+
+        candidates = np.argpartition(final, k - 1)[:k]
+        top = candidates[np.argsort(final[candidates], kind='stable')]
+
+        weights = np.exp(-(final - final[top[0]]))
+        return self.labels[rows[top]], final[top], weights[top] / weights.sum(), rows[top]
+
+    #----------------
+    # 저장/로드
+    #----------------
+    def save(self, path):
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(
+            tmp_path,
+            feature_weights=self.feature_weights,
+            n_probe=self.n_probe,
+            points=self.points,
+            labels=self.labels,
+            timestamps=self.timestamps,
+            normalization_version=self.normalization_version,
+            centroids=self.centroids,
+            assignments=self.assignments
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as stored:
+            index = cls(stored['feature_weights'], n_lists=len(stored['centroids']), n_probe=int(stored['n_probe']))
+            index.points = stored['points']
+            index.labels = stored['labels']
+            index.timestamps = stored['timestamps']
+            if 'normalization_version' in stored:
+                index.normalization_version = int(stored['normalization_version'])
+            index.centroids = stored['centroids']
+            index.assignments = stored['assignments']
+        index._rebuild_lists()
+        return index
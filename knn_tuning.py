@@ -0,0 +1,263 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import product
+
+import numpy as np
+import pandas as pd
+
+
+CONFIDENCE_BINS = [0, 40, 50, 60, 70, 80, 101]
+
+# 워커 프로세스 전역 (초기화시 읽기 전용 메모리 맵으로 로드)
+_worker_state = {}
+
+
+def parameter_grid(feature_weight_sets, time_decays, k_settings):
+    """파라미터 조합 목록 생성
+
+    Args:
+        feature_weight_sets: 특징 가중치 벡터 목록
+        time_decays: KNN_TIME_DECAY 후보 목록
+        k_settings: (base_k, k_min, k_max) 튜플 목록
+
+    Returns:
+        list: 조합별 파라미터 딕셔너리
+    """
+    grid = []
+    for weights, time_decay, (base_k, k_min, k_max) in product(feature_weight_sets, time_decays, k_settings):
+        grid.append({
+            'feature_weights': [float(w) for w in weights],
+            'time_decay': float(time_decay),
+            'base_k': int(base_k),
+            'k_min': int(k_min),
+            'k_max': int(k_max)
+        })
+    return grid
+
+
+def walk_forward_folds(n_rows, train_size, test_size, step=None):
+    """롤링 학습/검증 구간 목록 [(train_start, train_end, test_end), ...]"""
+    step = step or test_size
+    folds = []
+    train_start = 0
+    while train_start + train_size + test_size <= n_rows:
+        train_end = train_start + train_size
+        folds.append((train_start, train_end, train_end + test_size))
+        train_start += step
+    return folds
+
+
+def config_key(params, dataset_key):
+    payload = json.dumps({'dataset': dataset_key, 'params': params}, sort_keys=True)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def calibration_table(confidences, hits):
+    """신뢰도 구간별 적중률 및 기대 보정 오차(ECE)"""
+    table = []
+    ece = 0.0
+    total = len(confidences)
+    for low, high in zip(CONFIDENCE_BINS[:-1], CONFIDENCE_BINS[1:]):
+        mask = (confidences >= low) & (confidences < high)
+        count = int(mask.sum())
+        if count == 0:
+            continue
+        mean_confidence = float(confidences[mask].mean())
+        hit_rate = float(hits[mask].mean())
+        ece += count / total * abs(hit_rate - mean_confidence / 100)
+        table.append({
+            'bin': f"{low}-{min(high, 100)}",
+            'count': count,
+            'mean_confidence': mean_confidence,
+            'hit_rate': hit_rate
+        })
+    return table, ece
+
+
+def _init_worker(work_dir, bot_cls):
+    _worker_state['features'] = np.load(os.path.join(work_dir, 'features.npy'), mmap_mode='r')
+    _worker_state['labels'] = np.load(os.path.join(work_dir, 'labels.npy'), mmap_mode='r')
+    _worker_state['volatility'] = np.load(os.path.join(work_dir, 'volatility.npy'), mmap_mode='r')
+    _worker_state['bot_cls'] = bot_cls
+
+
+def _evaluate_config(params, folds, memory_budget_mb, window=199):
+    """한 파라미터 조합의 워크포워드 평가 (워커 프로세스에서 실행)
+
+    폴드마다 학습 구간 행만으로 정규화 통계를 계산해 검증 구간에도 그대로
+    적용하고, 검증 시점 t는 라이브처럼 직전 window개 행만 이웃 후보로 사용함.
+    """
+    features = _worker_state['features']
+    labels = _worker_state['labels']
+    volatility = _worker_state['volatility']
+
+    # API/DB 연결 없이 KNN 계산 메서드만 사용
+    bot_cls = _worker_state['bot_cls']
+    bot = bot_cls.__new__(bot_cls)
+    bot.KNN_FEATURE_WEIGHTS = np.asarray(params['feature_weights'], dtype=float)
+    bot.KNN_TIME_DECAY = params['time_decay']
+    bot.KNN_TIME_WINDOW = window
+
+    predictions, confidences, actuals = [], [], []
+    for train_start, train_end, test_end in folds:
+        train_size = train_end - train_start
+        fold_features = bot_cls.normalize_knn_features(features[train_start:test_end], reference_rows=train_size)
+        fold_labels = np.asarray(labels[train_start:test_end])
+        test_volatility = np.nan_to_num(np.asarray(volatility[train_end:test_end]))
+        positions = np.arange(train_size, test_end - train_start)
+
+        # calculate_adaptive_k와 같은 규칙 (라이브 윈도우 기준 데이터 크기, 경계값만 파라미터화)
+        size_factor = np.clip(min(train_size, window + 1) / 100, 0.5, 2.0)
+        volatility_factor = np.clip(1 - test_volatility, 0.5, 1.5)
+        k = np.clip((params['base_k'] * size_factor * volatility_factor).astype(int), params['k_min'], params['k_max'])
+
+        fold_predictions, fold_confidences = bot.predict_next_move_batch(
+            fold_features, fold_labels, fold_features[positions], positions,
+            k=k, volatility=test_volatility, window=window, memory_budget_mb=memory_budget_mb
+        )
+        predictions.append(fold_predictions)
+        confidences.append(fold_confidences)
+        actuals.append(np.asarray(labels[train_end:test_end]))
+
+    predictions = np.concatenate(predictions)
+    confidences = np.concatenate(confidences)
+    actuals = np.concatenate(actuals)
+
+    active = predictions != 0
+    hits = (np.sign(predictions[active]) == actuals[active]).astype(float)
+    table, ece = calibration_table(confidences[active], hits)
+    return {
+        'hit_rate': float(hits.mean()) if len(hits) else None,
+        'coverage': float(active.mean()) if len(active) else 0.0,
+        'n_predictions': int(active.sum()),
+        'ece': float(ece) if len(hits) else None,
+        'calibration': table
+    }
+
+
+class KNNTuningHarness:
+    """KNN 특징 가중치/시간 가중치/k 경계 워크포워드 튜닝
+
+    특징 행렬은 한 번만 계산해 작업 디렉터리에 .npy로 저장하고, 워커 프로세스는
+    읽기 전용 메모리 맵으로 공유함. 조합별 결과는 SQLite에 저장되므로 중단 후
+    다시 실행하면 끝난 조합은 건너뜀.
+
+    저장하는 특징은 정규화 전 원값이며, 정규화는 폴드마다 학습 구간 통계로만
+    하므로 검증 구간 정보가 학습 특징에 섞이지 않음. window는 라이브의 이웃
+    후보 수(200개 캔들 중 마감된 199개)와 같게 둠.
+    """
+
+    def __init__(self, bot, data, work_dir='knn_tuning', db_path='knn_tuning.db',
+                 train_size=1000, test_size=250, step=None, workers=None, memory_budget_mb=128, window=199):
+        self.bot_cls = type(bot)
+        self.work_dir = work_dir
+        self.db_path = db_path
+        self.workers = workers
+        self.memory_budget_mb = memory_budget_mb
+        self.window = window
+        os.makedirs(self.work_dir, exist_ok=True)
+
+        features, labels = bot.prepare_knn_features(data, normalize=False)
+        if features is None or labels is None:
+            raise ValueError("튜닝용 특징을 준비할 수 없습니다")
+
+        # 마지막 행은 레이블(다음 캔들 방향)이 없으므로 제외
+        features = np.ascontiguousarray(features[:-1], dtype=float)
+        labels = np.asarray(labels[:-1], dtype=float)
+        volatility = bot.get_return_volatility(data['close'], 20).to_numpy(dtype=float)[:-1]
+
+        np.save(os.path.join(self.work_dir, 'features.npy'), features)
+        np.save(os.path.join(self.work_dir, 'labels.npy'), labels)
+        np.save(os.path.join(self.work_dir, 'volatility.npy'), volatility)
+
+        self.folds = walk_forward_folds(len(features), train_size, test_size, step)
+        if not self.folds:
+            raise ValueError(f"데이터가 부족합니다: {len(features)}개 행 (학습 {train_size} + 검증 {test_size} 필요)")
+
+        digest = hashlib.sha1(features.tobytes())
+        digest.update(labels.tobytes())
+        digest.update(json.dumps({'folds': self.folds, 'window': self.window}).encode())
+        self.dataset_key = digest.hexdigest()
+
+        self.create_table()
+
+    def create_table(self):
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS knn_tuning_results (
+                config_key TEXT PRIMARY KEY,
+                dataset_key TEXT NOT NULL,
+                params TEXT NOT NULL,
+                hit_rate REAL,
+                coverage REAL,
+                n_predictions INTEGER,
+                ece REAL,
+                calibration TEXT,
+                elapsed REAL,
+                timestamp TEXT NOT NULL
+            )
+            """)
+
+    def _finished_keys(self):
+        with sqlite3.connect(self.db_path) as conn:
+            rows = conn.execute(
+                'SELECT config_key FROM knn_tuning_results WHERE dataset_key = ?',
+                (self.dataset_key,)
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def _save_result(self, key, params, result, elapsed):
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute('''
+            INSERT OR REPLACE INTO knn_tuning_results
+            (config_key, dataset_key, params, hit_rate, coverage, n_predictions, ece, calibration, elapsed, timestamp)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                key, self.dataset_key, json.dumps(params, sort_keys=True),
+                result['hit_rate'], result['coverage'], result['n_predictions'], result['ece'],
+                json.dumps(result['calibration'], ensure_ascii=False), elapsed,
+                time.strftime('%Y-%m-%d %H:%M:%S')
+            ))
+
+    def run(self, configs):
+        """아직 평가하지 않은 조합만 프로세스 풀에서 평가
+
+        Returns:
+            pd.DataFrame: 이 데이터셋의 전체 결과 (적중률 내림차순)
+        """
+        finished = self._finished_keys()
+        pending = [(config_key(params, self.dataset_key), params) for params in configs]
+        pending = [(key, params) for key, params in pending if key not in finished]
+        print(f"KNN 튜닝: 전체 {len(configs)}개 조합, 완료 {len(configs) - len(pending)}개, "
+              f"남은 {len(pending)}개 (폴드 {len(self.folds)}개)")
+
+        if pending:
+            started = time.time()
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                     initargs=(self.work_dir, self.bot_cls)) as executor:
+                futures = {
+                    executor.submit(_evaluate_config, params, self.folds, self.memory_budget_mb, self.window): (key, params, time.time())
+                    for key, params in pending
+                }
+                for done, future in enumerate(as_completed(futures), 1):
+                    key, params, submitted = futures[future]
+                    try:
+                        self._save_result(key, params, future.result(), time.time() - submitted)
+                    except Exception as e:
+                        print(f"KNN 튜닝 조합 평가 중 오류: {e}")
+                    if done % 50 == 0 or done == len(pending):
+                        print(f"KNN 튜닝 진행: {done}/{len(pending)} ({time.time() - started:.0f}초)")
+
+        return self.results()
+
+    def results(self):
+        with sqlite3.connect(self.db_path) as conn:
+            df = pd.read_sql_query(
+                'SELECT * FROM knn_tuning_results WHERE dataset_key = ? ORDER BY hit_rate DESC',
+                conn, params=(self.dataset_key,)
+            )
+        return df
@@ -0,0 +1,91 @@
+import time
+from dataclasses import dataclass
+
+import pyupbit
+
+
+@dataclass(frozen=True)
+class MarketSnapshot:
+    """한 주기 동안 공유하는 시세 정보"""
+    ticker: str
+    current_price: float
+    fetched_at: float
+
+
+@dataclass(frozen=True)
+class AccountSnapshot:
+    """한 주기 동안 공유하는 계좌 정보"""
+    krw_balance: float
+    coin_balance: float
+    avg_buy_price: float
+    fetched_at: float
+
+
+@dataclass(frozen=True)
+class CycleSnapshot:
+    """시세 + 계좌 스냅샷 (주문 전까지 모든 단계가 같은 값을 사용)"""
+    market: MarketSnapshot
+    account: AccountSnapshot
+
+    @property
+    def current_price(self):
+        return self.market.current_price
+
+    @property
+    def krw_balance(self):
+        return self.account.krw_balance
+
+    @property
+    def coin_balance(self):
+        return self.account.coin_balance
+
+    @property
+    def avg_buy_price(self):
+        return self.account.avg_buy_price
+
+    @property
+    def coin_value(self):
+        return self.coin_balance * self.current_price if self.coin_balance and self.current_price else 0
+
+    @property
+    def total_value(self):
+        return self.krw_balance + self.coin_value
+
+    @property
+    def coin_ratio(self):
+        return (self.coin_value / self.total_value * 100) if self.total_value > 0 else 0
+
+    @property
+    def roi(self):
+        if self.avg_buy_price and self.coin_balance:
+            return (self.current_price - self.avg_buy_price) / self.avg_buy_price * 100
+        return 0
+
+
+def fetch_market_snapshot(ticker, price_fn=None):
+    current_price = (price_fn or pyupbit.get_current_price)(ticker)
+    if current_price is None:
+        raise ValueError("현재 가격 조회 실패")
+    return MarketSnapshot(ticker=ticker, current_price=float(current_price), fetched_at=time.time())
+
+
+def fetch_account_snapshot(upbit, ticker):
+    krw_balance = upbit.get_balance("KRW")
+    coin_balance = upbit.get_balance(ticker.split('-')[1])
+    avg_buy_price = upbit.get_avg_buy_price(ticker)
+    if krw_balance is None or coin_balance is None:
+        raise ValueError("잔고 조회 실패")
+    return AccountSnapshot(
+        krw_balance=float(krw_balance),
+        coin_balance=float(coin_balance),
+        avg_buy_price=float(avg_buy_price or 0),
+        fetched_at=time.time()
+    )
+
+
+def fetch_cycle_snapshot(upbit, ticker, price_fn=None):
+    """시세와 계좌 정보를 한 번에 조회"""
+    return CycleSnapshot(
+        market=fetch_market_snapshot(ticker, price_fn),
+        account=fetch_account_snapshot(upbit, ticker)
+    )
@@ -0,0 +1,266 @@
+import hashlib
+import math
+import re
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+
+OHLCV_FORMATS = ('verbose', 'csv', 'delta')
+
+# tiktoken이 없을 때 쓰는 근사 분할 (영문 단어 / 숫자 / 한글 등 비ASCII / 기호 / 공백)
+_TOKEN_PATTERN = re.compile(r"[A-Za-z]+|\d+|[^\x00-\x7f]+|[^\sA-Za-z\d\x80-\uffff]+|\s+")
+_encoding = None
+
+
+# 매 주기 같은 바이트로 유지되는 시스템 메시지 (페르소나, 지표 설명, 응답 형식, 거래 제약).
+# 주기마다 바뀌는 값은 넣지 말 것 - 접두부가 같아야 제공자측 프롬프트 캐시가 적중함.
+STATIC_SYSTEM_PROMPT = """당신은 BTC 시장 정보를 제공받고 그것을 바탕으로 당신의 견해를 제공하는 BTC 단타 트레이딩 전문가입니다.
+제공되는 각종 지표들을 해석하는 것도 중요하지만, 당신의 모든 지식을 총동원하여 OHLCV를 분석하십시오. 그리고 당신이 뉴스를 전달받았는지 확인해야하기 때문에 매 대답마다 뉴스에대한 분석도 조금이라도 적어주세요.
+단타 거래가 아닙니다 단기간의 오르 내림림이 아닌 큰흐름을 기준으로 거래하세요. 확실할 때 들어가고 확실한 익절을 하는 것이 목표입니다!
+
+지표 설명:
+- KNN 지표
+KNN 지표의 신호강도는 '얼마나 크게 움직일 것인가'를, KNN 지표의 신뢰도는 '얼마나 확실한가'를 나타냅니다.
+
+신뢰도 범위 해석:
+40-60%: 낮은 신뢰도
+60-75%: 중간 신뢰도
+75-85%: 높은 신뢰도
+85-95%: 매우 높은 신뢰도
+
+- 볼린저 밴드 포지션 (6단계 구분):
+* extreme_upper: 상단 밴드 초과.
+* upper_strong: 상단과 중앙 밴드 사이 상위 1/3.
+* upper_weak: 상단과 중앙 밴드 사이 하위 2/3.
+* lower_weak: 중앙과 하단 밴드 사이 상위 2/3.
+* lower_strong: 중앙과 하단 밴드 사이 하위 1/3.
+* extreme_lower: 하단 밴드 미만.
+
+- 볼린저 밴드 추가 지표:
+* band_width: 밴드폭(%). 변동성 수준을 나타내며, 높을수록 시장의 변동성이 큼
+- 20% 이상: 매우 높은 변동성
+- 10-20%: 높은 변동성
+- 5-10%: 보통 변동성
+- 5% 미만: 낮은 변동성
+
+-Stoch RSI: k값도 물론 중요하지만 Stoch RSI의 특징인 k값과 d값을 모두 고려해주세요! (K > 75: 과매수, K < 25: 과매도)
+
+아래 JSON 형식으로 매매 판단을 응답해주세요:
+{
+"trade_recommendation": "매수 또는 매도 또는 관망",
+"investment_percentage": 0부터 100까지의 정수(관망 추천시 0),
+"confidence_score": 0부터 100까지의 정수(KNN 신뢰도가 아닌 당신의 답변에 대한 당신이 생각하는 신뢰도를 적어주세요!),
+"reasoning": "투자 판단의 근거"
+}
+
+거래 제약:
+- 매수시: 총자산 대비 목표 보유 BTC%를 investment_percentage에 입력 (ex: 현재 총 자산의 25%를 BTC로 보유중인데 BTC를 추가 매수하여 총자산의 45%를 BTC로 보유할려는 경우 투자 비율에 45를 입력하세요)
+- 매도시: 보유 BTC 중 매도할 비율을 investment_percentage에 입력
+- 관망시: 0% 입력
+- 여유를 두고 확실한 거래를 해주세요.
+- 제발! OHCLV를 바탕으로 프랙탈 분석도 신경쓰세요.
+- KNN 지표는 매수할 때 최대한 낮은 가격에 매수하고 익절할 때 최대한 높은 가격에서 익절하기 위한 지표이지, 단타 거래를 위한 지표가 아닙니다.
+
+매 요청의 사용자 메시지로 이전 자문 내역, OHLCV, 현재 시장 상황, 자산 현황, KNN 분석, 뉴스 요약이 주어집니다."""
+
+
+def count_tokens(text, encoding_name='o200k_base'):
+    """프롬프트 토큰 수 (tiktoken이 있으면 정확한 값, 없으면 보수적 근사치)"""
+    global _encoding
+    if tiktoken is not None:
+        if _encoding is None:
+            _encoding = tiktoken.get_encoding(encoding_name)
+        return len(_encoding.encode(text))
+
+    tokens = 0
+    for piece in _TOKEN_PATTERN.findall(text):
+        if piece[0].isascii() and piece[0].isalpha():
+            tokens += math.ceil(len(piece) / 4)
+        elif piece[0].isdigit():
+            tokens += math.ceil(len(piece) / 3)
+        elif not piece[0].isascii():
+            tokens += len(piece)
+        else:
+            tokens += 1
+    return tokens
+
+
+def prefix_hash(messages):
+    """고정 접두부(사용자 메시지 앞의 시스템 메시지들)의 SHA-256"""
+    prefix = []
+    for message in messages:
+        if message['role'] == 'user':
+            break
+        prefix.append(f"{message['role']}\n{message['content']}")
+    return hashlib.sha256('\n\n'.join(prefix).encode('utf-8')).hexdigest()
+
+
+class PrefixGuard:
+    """주기마다 만든 메시지의 접두부 해시가 처음과 같은지 확인 (API 호출 없이)"""
+
+    def __init__(self):
+        self.expected = None
+        self.checks = 0
+        self.changes = 0
+
+    def check(self, messages):
+        """접두부가 처음 기록한 해시와 같으면 True (다르면 경고 후 새 해시 기준)"""
+        digest = prefix_hash(messages)
+        self.checks += 1
+        if self.expected is None:
+            self.expected = digest
+            return True
+        if digest != self.expected:
+            self.changes += 1
+            print(f"⚠️ 프롬프트 고정 접두부 변경 감지 ({self.expected[:12]} -> {digest[:12]}) - 프롬프트 캐시 미적중")
+            self.expected = digest
+            return False
+        return True
+
+
+def compact_lines(text):
+    """줄 앞뒤 공백과 연속 빈 줄 제거"""
+    lines = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line or (lines and lines[-1]):
+            lines.append(line)
+    return '\n'.join(lines).strip()
+
+
+def format_ohlcv(ohlcv_data, fmt='csv'):
+    """OHLCV를 프롬프트용 텍스트로 변환
+
+    verbose: 캔들마다 7줄 (기존 형식)
+    csv: 캔들마다 한 줄 (시각,시가,고가,저가,종가,거래량)
+    delta: 첫 캔들만 절대값, 이후는 직전 종가 대비 bp(0.01%) 변화
+    """
+    if fmt == 'verbose':
+        ohlcv_formatted = "최근 240시간 OHLCV 데이터:\n"
+        for index, row in ohlcv_data.iterrows():
+            ohlcv_formatted += f"""
+                시간: {index.strftime('%Y-%m-%d %H:%M')}
+                시가: {row['open']:,.0f}
+                고가: {row['high']:,.0f}
+                저가: {row['low']:,.0f}
+                종가: {row['close']:,.0f}
+                거래량: {row['volume']:,.0f}
+                -------------------"""
+        return ohlcv_formatted
+
+    times = ohlcv_data.index
+    opens = ohlcv_data['open'].to_numpy(dtype=float)
+    highs = ohlcv_data['high'].to_numpy(dtype=float)
+    lows = ohlcv_data['low'].to_numpy(dtype=float)
+    closes = ohlcv_data['close'].to_numpy(dtype=float)
+    volumes = ohlcv_data['volume'].to_numpy(dtype=float)
+
+    if fmt == 'csv':
+        lines = [f"최근 {len(ohlcv_data)}개 캔들 OHLCV (KRW, 시간순):", "time,open,high,low,close,volume"]
+        for i in range(len(ohlcv_data)):
+            lines.append(
+                f"{times[i].strftime('%m-%d %H:%M')},{opens[i]:.0f},{highs[i]:.0f},"
+                f"{lows[i]:.0f},{closes[i]:.0f},{volumes[i]:.1f}"
+            )
+        return '\n'.join(lines)
+
+    if fmt == 'delta':
+        if len(ohlcv_data) == 0:
+            return "OHLCV 데이터 없음"
+        lines = [
+            f"최근 {len(ohlcv_data)}개 캔들 OHLCV (시간순, {times[0].strftime('%Y-%m-%d %H:%M')} 시작):",
+            f"첫 캔들: open={opens[0]:.0f},high={highs[0]:.0f},low={lows[0]:.0f},close={closes[0]:.0f},volume={volumes[0]:.1f}",
+            "이후 캔들: 직전 종가 대비 open,high,low,close 변화(bp, 1bp=0.01%),volume"
+        ]
+        for i in range(1, len(ohlcv_data)):
+            base = closes[i - 1]
+            lines.append(
+                f"{(opens[i] / base - 1) * 1e4:+.0f},{(highs[i] / base - 1) * 1e4:+.0f},"
+                f"{(lows[i] / base - 1) * 1e4:+.0f},{(closes[i] / base - 1) * 1e4:+.0f},{volumes[i]:.1f}"
+            )
+        lines.append(f"마지막 종가: {closes[-1]:.0f}")
+        return '\n'.join(lines)
+
+    raise ValueError(f"지원하지 않는 OHLCV 형식: {fmt} ({', '.join(OHLCV_FORMATS)})")
+
+
+# 델타 프롬프트에서 비교하는 시장 상태 항목 (이름, market_state 키, 표시 형식)
+STATE_FIELDS = (
+    ('RSI', 'rsi', lambda v: f"{v:.1f}"),
+    ('Stoch RSI K', 'stoch_rsi_k', lambda v: f"{v:.1f}"),
+    ('Stoch RSI D', 'stoch_rsi_d', lambda v: f"{v:.1f}"),
+    ('EMA', 'ema_status', str),
+    ('모멘텀', 'momentum', lambda v: f"{v * 100:.1f}%"),
+    ('변동성', 'volatility', lambda v: f"{v:.1f}%"),
+    ('볼린저밴드', 'bollinger_position', str),
+    ('볼린저 밴드폭', 'band_width', lambda v: f"{v:.2f}%"),
+    ('KNN 예측', 'knn_prediction', lambda v: f"{v:+.2f}"),
+    ('KNN 신뢰도', 'knn_signal_strength', lambda v: f"{v:.1f}%"),
+)
+
+
+def diff_market_state(base, current, fields=STATE_FIELDS):
+    """표시 형식 기준으로 바뀐 항목과 그대로인 항목 구분
+
+    Returns:
+        tuple: (["이름: 이전 → 현재", ...], ["이름 값", ...])
+    """
+    changed, unchanged = [], []
+    for label, key, fmt in fields:
+        if current.get(key) is None:
+            continue
+        value = fmt(current[key])
+        previous = fmt(base[key]) if base.get(key) is not None else None
+        if previous is None:
+            changed.append(f"{label}: {value}")
+        elif previous != value:
+            changed.append(f"{label}: {previous} → {value}")
+        else:
+            unchanged.append(f"{label} {value}")
+    return changed, unchanged
+
+
+def candles_since(ohlcv_data, since):
+    """since 시점에 형성 중이던 캔들부터 마지막 캔들까지 (없으면 마지막 캔들)"""
+    if len(ohlcv_data) >= 2:
+        interval = ohlcv_data.index[-1] - ohlcv_data.index[-2]
+        rows = ohlcv_data[ohlcv_data.index > since - interval]
+        if len(rows) > 0:
+            return rows
+    return ohlcv_data.tail(1)
+
+
+def fit_prompt(render, budget, ohlcv_rows, advice_limit, news, min_ohlcv_rows=20, min_news_chars=200):
+    """render(ohlcv_rows, advice_limit, news) 결과를 토큰 예산에 맞게 축소 (budget: render 결과에 허용할 토큰 수)
+
+    예산을 넘으면 이전 자문(1개까지) → 뉴스(절반씩, min_news_chars까지) →
+    OHLCV(오래된 캔들부터 3/4씩, min_ohlcv_rows까지) → 남은 이전 자문 순으로 줄임.
+    budget이 None이면 축소하지 않음.
+
+    Returns:
+        tuple: (프롬프트, 토큰 수, 최종 설정 dict)
+    """
+    full_news = news or ''
+    news, news_chars = full_news, len(full_news)
+    prompt = render(ohlcv_rows, advice_limit, news)
+    tokens = count_tokens(prompt)
+
+    while budget is not None and tokens > budget:
+        if advice_limit > 1:
+            advice_limit -= 1
+        elif news_chars > min_news_chars:
+            news_chars = max(min_news_chars, news_chars // 2)
+            news = full_news[:news_chars].rstrip() + ' …'
+        elif ohlcv_rows > min_ohlcv_rows:
+            ohlcv_rows = max(min_ohlcv_rows, ohlcv_rows * 3 // 4)
+        elif advice_limit > 0:
+            advice_limit -= 1
+        else:
+            break
+        prompt = render(ohlcv_rows, advice_limit, news)
+        tokens = count_tokens(prompt)
+
+    return prompt, tokens, {'ohlcv_rows': ohlcv_rows, 'advice_limit': advice_limit, 'news_chars': news_chars}
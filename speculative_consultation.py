@@ -0,0 +1,162 @@
+import time
+from collections import deque
+from concurrent.futures import wait
+
+from gpt_consultation import ConsultationWorker, snapshot_within_tolerance
+
+
+# monitor_market_conditions의 트리거 임계값
+PRICE_TRIGGER = 0.005      # 가격 변화율 0.5%
+RSI_TRIGGER = 5            # RSI 5포인트
+VOLATILITY_TRIGGER = 0.1   # 변동성 비율 0.1
+STOCH_K_TRIGGER = 15       # Stoch K 15포인트
+STOCH_OVERSOLD = 20
+STOCH_OVERBOUGHT = 80
+
+
+def trigger_proximity(last_state, analysis_results, price):
+    """마지막 자문 기준 상태 대비 각 트리거까지의 근접도 (1 이상이면 발동 수준)
+
+    가격/RSI/변동성/Stoch K 변화는 임계값 대비 비율, 과매도/과매수 진입은
+    기준 K에서 20/80 경계까지 이동한 비율, K/D 크로스는 기준 K-D 차이가
+    좁혀진 비율. EMA/볼린저 레벨 트리거는 기준 레벨이 자문 상태에 기록되지
+    않아 발동하지 않으므로 제외.
+
+    Returns:
+        tuple: (최대 근접도, 가장 가까운 트리거 이름, 트리거별 근접도 dict)
+    """
+    k = float(analysis_results['stoch_rsi_k'])
+    d = float(analysis_results['stoch_rsi_d'])
+    last_k = float(last_state.get('stoch_rsi_k', 50))
+    last_d = float(last_state.get('stoch_rsi_d', 50))
+
+    proximity = {
+        'price': abs(price / last_state['price'] - 1) / PRICE_TRIGGER if last_state.get('price') else 0.0,
+        'rsi': abs(float(analysis_results['rsi']) - last_state['rsi']) / RSI_TRIGGER,
+        'volatility': abs(float(analysis_results['volatility_ratio']) - last_state['volatility']) / VOLATILITY_TRIGGER,
+        'stoch_k': abs(k - last_k) / STOCH_K_TRIGGER
+    }
+    if last_k > STOCH_OVERSOLD:
+        proximity['stoch_oversold'] = (last_k - k) / (last_k - STOCH_OVERSOLD)
+    if last_k < STOCH_OVERBOUGHT:
+        proximity['stoch_overbought'] = (k - last_k) / (STOCH_OVERBOUGHT - last_k)
+    last_diff = last_k - last_d
+    if abs(last_diff) >= 1:
+        proximity['stoch_cross'] = 1 - (k - d) / last_diff
+
+    proximity = {name: max(0.0, value) for name, value in proximity.items()}
+    nearest = max(proximity, key=proximity.get)
+    return proximity[nearest], nearest, proximity
+
+
+class SpeculativePrefetcher:
+    """트리거 근접시 미리 시작한 GPT 자문 (한 번에 하나)
+
+    트리거가 발동했을 때 요청 당시 스냅샷이 허용 범위 안이고 양자화 상태가
+    같으며 max_age 안이면 그 자문을 바로 사용하고, 아니면 버림.
+    트리거 없이 max_age가 지나거나 검증에 실패해 버려진 호출은 낭비로 집계하고,
+    window초 안의 낭비가 max_wasted에 이르면 새 선행 자문을 시작하지 않음.
+    """
+
+    def __init__(self, max_age=900, max_wasted=5, window=86400):
+        self.max_age = max_age
+        self.max_wasted = max_wasted
+        self.window = window
+        self.worker = ConsultationWorker(deadline=max_age)
+        self.state = None
+        self.started = 0
+        self.used = 0
+        self.wasted = 0
+        self._wasted_at = deque()
+
+    def busy(self):
+        return self.worker.busy()
+
+    def can_start(self, now=None):
+        """진행 중인 선행 자문이 없고 낭비 상한에 이르지 않았으면 True"""
+        now = time.time() if now is None else now
+        while self._wasted_at and now - self._wasted_at[0] > self.window:
+            self._wasted_at.popleft()
+        return not self.busy() and len(self._wasted_at) < self.max_wasted
+
+    def start(self, consult, snapshot, analysis_results, state, now=None):
+        """consult()를 작업 스레드에서 시작 (시작하지 못하면 False)"""
+        now = time.time() if now is None else now
+        if not self.can_start(now):
+            return False
+        self.worker.deadline = self.max_age
+        self.worker.submit(consult, snapshot, analysis_results, now)
+        self.state = state
+        self.started += 1
+        return True
+
+    def expire(self, now=None):
+        """max_age가 지난 선행 자문을 버림 (버렸으면 True)"""
+        now = time.time() if now is None else now
+        pending = self.worker.pending
+        if pending is None or now - pending.submitted_at <= self.max_age:
+            return False
+        self._discard(now)
+        return True
+
+    def take(self, snapshot, state, price_tolerance=0.005, timeout=None, now=None):
+        """트리거 발동시 선행 자문 사용
+
+        아직 진행 중이면 timeout초(기본: 남은 유효 시간)까지 기다림.
+
+        Returns:
+            tuple: (자문 또는 None, 사유) - 사유는 'used', 'none'(선행 자문 없음),
+                'stale'(시간/시세/상태 불일치), 'timeout', 'failed'
+        """
+        now = time.time() if now is None else now
+        pending = self.worker.pending
+        if pending is None:
+            return None, 'none'
+
+        remaining = pending.submitted_at + self.max_age - now
+        if (remaining < 0 or state != self.state or
+                not snapshot_within_tolerance(pending.snapshot, snapshot, price_tolerance)):
+            self._discard(now)
+            return None, 'stale'
+
+        if not pending.future.done():
+            timeout = remaining if timeout is None else min(timeout, remaining)
+            wait([pending.future], timeout=max(0.0, timeout))
+            if not pending.future.done():
+                self._discard(now)
+                return None, 'timeout'
+
+        self.worker.pending = None
+        self.state = None
+        try:
+            advice = pending.future.result()
+        except Exception as e:
+            print(f"선행 GPT 자문 실패: {e}")
+            advice = None
+        if advice is None:
+            self._record_waste(now)
+            return None, 'failed'
+        self.used += 1
+        return advice, 'used'
+
+    def _discard(self, now):
+        # 진행 중인 요청은 취소하지 않고 결과만 버림
+        self.worker.pending = None
+        self.state = None
+        self._record_waste(now)
+
+    def _record_waste(self, now):
+        self.wasted += 1
+        self._wasted_at.append(now)
+
+    def stats(self):
+        return {
+            'started': self.started,
+            'used': self.used,
+            'wasted': self.wasted,
+            'in_flight': self.busy(),
+            'hit_rate': self.used / self.started if self.started > 0 else 0.0
+        }
+
+    def shutdown(self):
+        self.worker.shutdown()
@@ -0,0 +1,346 @@
+import math
+from collections import deque
+
+import numpy as np
+
+
+class _EMA:
+    """adjust=False EMA (pandas ewm과 동일한 점화식)"""
+
+    def __init__(self, span):
+        self.alpha = 2 / (span + 1)
+        self.value = None
+
+    def preview(self, x):
+        if self.value is None:
+            return x
+        return self.value + self.alpha * (x - self.value)
+
+    def push(self, x):
+        self.value = self.preview(x)
+        return self.value
+
+
+class _RollingMean:
+    """고정 길이 이동평균 (누적합 유지)"""
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.total = 0.0
+
+    def _next(self, x):
+        total = self.total + x
+        count = len(self.values) + 1
+        if count > self.window:
+            total -= self.values[0]
+            count = self.window
+        return total, count
+
+    def preview(self, x):
+        total, count = self._next(x)
+        return total / count if count == self.window else math.nan
+
+    def push(self, x):
+        result = self.preview(x)
+        self.total, _ = self._next(x)
+        self.values.append(x)
+        if len(self.values) > self.window:
+            self.values.popleft()
+        return result
+
+
+class _RollingMeanStd:
+    """고정 길이 이동평균/표본표준편차 (첫 값 기준 편차의 합과 제곱합 유지)
+
+    가격 단위가 크기 때문에 기준값을 빼서 누적하고, window 횟수마다
+    윈도우 내용으로 합계를 다시 계산해 누적 오차를 제거함.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.shift = None
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.pushes = 0
+
+    def _next(self, x):
+        shift = x if self.shift is None else self.shift
+        d = x - shift
+        total = self.total + d
+        total_sq = self.total_sq + d * d
+        count = len(self.values) + 1
+        if count > self.window:
+            old = self.values[0] - shift
+            total -= old
+            total_sq -= old * old
+            count = self.window
+        return shift, total, total_sq, count
+
+    def preview(self, x):
+        shift, total, total_sq, count = self._next(x)
+        if count < self.window:
+            return math.nan, math.nan
+        mean = total / count
+        variance = max((total_sq - total * mean) / (count - 1), 0.0)
+        return shift + mean, math.sqrt(variance)
+
+    def push(self, x):
+        result = self.preview(x)
+        self.shift, self.total, self.total_sq, _ = self._next(x)
+        self.values.append(x)
+        if len(self.values) > self.window:
+            self.values.popleft()
+
+        self.pushes += 1
+        if self.pushes % self.window == 0:
+            deviations = [v - self.shift for v in self.values]
+            self.total = math.fsum(deviations)
+            self.total_sq = math.fsum(d * d for d in deviations)
+        return result
+
+
+class _WilderRSI:
+    """Pine Script 스타일 RSI (BTCTradingBot.calculate_rsi와 동일한 시드/평활)"""
+
+    def __init__(self, periods):
+        self.periods = periods
+        self.prev_close = None
+        self.changes = 0
+        self.seed_gain = 0.0
+        self.seed_loss = 0.0
+        self.avg_gain = None
+        self.avg_loss = None
+
+    def _next(self, close):
+        if self.prev_close is None:
+            return 0, 0.0, 0.0, None, None
+
+        change = close - self.prev_close
+        gain = change if change > 0 else 0.0
+        loss = -change if change < 0 else 0.0
+        changes = self.changes + 1
+
+        if changes < self.periods:
+            return changes, self.seed_gain + gain, self.seed_loss + loss, None, None
+        if changes == self.periods:
+            return (changes, 0.0, 0.0,
+                    (self.seed_gain + gain) / self.periods,
+                    (self.seed_loss + loss) / self.periods)
+        avg_gain = (gain + (self.periods - 1) * self.avg_gain) / self.periods
+        avg_loss = (loss + (self.periods - 1) * self.avg_loss) / self.periods
+        return changes, 0.0, 0.0, avg_gain, avg_loss
+
+    @staticmethod
+    def _rsi(avg_gain, avg_loss):
+        if avg_gain is None:
+            return 50.0
+        if avg_loss == 0:
+            return 100.0 if avg_gain > 0 else 50.0
+        rs = avg_gain / avg_loss
+        rsi = 100 - (100 / (1 + rs))
+        return min(max(rsi, 0.0), 100.0)
+
+    def preview(self, close):
+        _, _, _, avg_gain, avg_loss = self._next(close)
+        return self._rsi(avg_gain, avg_loss)
+
+    def push(self, close):
+        self.changes, self.seed_gain, self.seed_loss, self.avg_gain, self.avg_loss = self._next(close)
+        self.prev_close = close
+        return self._rsi(self.avg_gain, self.avg_loss)
+
+
+class _StochRSI:
+    """RSI 입력을 받는 Stochastic RSI (calculate_stoch_rsi와 동일한 K/D 규칙)"""
+
+    def __init__(self, period, smoothK, smoothD):
+        self.period = period
+        self.rsi_window = deque(maxlen=period)
+        self.raw_k = deque(maxlen=smoothK)
+        self.k_values = deque(maxlen=smoothD)
+        self.bars = 0
+
+    @staticmethod
+    def _nanmean(values):
+        valid = [v for v in values if not math.isnan(v)]
+        return sum(valid) / len(valid) if valid else math.nan
+
+    def _next(self, rsi):
+        window = list(self.rsi_window)[-(self.period - 1):] + [rsi] if self.period > 1 else [rsi]
+        if self.bars >= self.period:
+            high = max(window)
+            low = min(window)
+            raw = 50.0 if high == low else 100 * (rsi - low) / (high - low)
+        else:
+            raw = math.nan
+
+        raw_k = list(self.raw_k)[1:] if len(self.raw_k) == self.raw_k.maxlen else list(self.raw_k)
+        k = self._nanmean(raw_k + [raw])
+        k_values = list(self.k_values)[1:] if len(self.k_values) == self.k_values.maxlen else list(self.k_values)
+        d = self._nanmean(k_values + [k])
+        return raw, k, d
+
+    @staticmethod
+    def _output(k, d):
+        k = 50.0 if math.isnan(k) else min(max(k, 0.0), 100.0)
+        d = 50.0 if math.isnan(d) else min(max(d, 0.0), 100.0)
+        return k, d
+
+    def preview(self, rsi):
+        _, k, d = self._next(rsi)
+        return self._output(k, d)
+
+    def push(self, rsi):
+        raw, k, d = self._next(rsi)
+        self.rsi_window.append(rsi)
+        self.raw_k.append(raw)
+        self.k_values.append(k)
+        self.bars += 1
+        return self._output(k, d)
+
+
+class StreamingIndicators:
+    """라이브 루프용 증분 지표 엔진
+
+    확정된 캔들까지의 상태만 보관하고, 진행 중인 캔들은 그 상태에 한 번
+    더 적용한 미리보기 값으로 계산함. 캔들이 마감되면 상태를 한 칸
+    전진시키므로 매 주기 비용이 지표 개수만큼의 산술 연산으로 끝남.
+
+    RSI, Stoch RSI, 볼린저, 변동성(TR 이동평균)은 같은 구간에 대한 일괄
+    계산과 같은 값을 냄. EMA-200처럼 기억이 긴 지표는 시드 이후 이력이
+    길어질수록 200개 캔들만으로 다시 계산한 값보다 정확해짐.
+    """
+
+    def __init__(self, ema_periods=(5, 10, 20, 30, 50, 200), rsi_period=14,
+                 stoch_period=14, smoothK=3, smoothD=3,
+                 bollinger_period=20, bollinger_std=2.2, atr_period=10):
+        self.ema_periods = tuple(ema_periods)
+        self.rsi_period = rsi_period
+        self.stoch_params = (stoch_period, smoothK, smoothD)
+        self.bollinger_period = bollinger_period
+        self.bollinger_std = bollinger_std
+        self.atr_period = atr_period
+        self.reset()
+
+    def reset(self):
+        self.emas = {period: _EMA(period) for period in self.ema_periods}
+        self.rsi = _WilderRSI(self.rsi_period)
+        self.stoch = _StochRSI(*self.stoch_params)
+        self.bollinger = _RollingMeanStd(self.bollinger_period)
+        self.atr = _RollingMean(self.atr_period)
+        self.last_closed_close = None
+        self.current_bar = None
+        self.current_timestamp = None
+        self.closed_bars = 0
+
+    @property
+    def is_seeded(self):
+        return self.current_bar is not None
+
+    def _true_range(self, high, low):
+        if self.last_closed_close is None:
+            return high - low
+        return max(high - low, abs(high - self.last_closed_close), abs(low - self.last_closed_close))
+
+    def _commit(self, bar):
+        """진행 중이던 캔들을 확정하고 상태를 전진"""
+        for ema in self.emas.values():
+            ema.push(bar['close'])
+        rsi = self.rsi.push(bar['close'])
+        self.stoch.push(rsi)
+        self.bollinger.push(bar['close'])
+        self.atr.push(self._true_range(bar['high'], bar['low']))
+        self.last_closed_close = bar['close']
+        self.closed_bars += 1
+
+    def seed(self, data):
+        """OHLCV 데이터로 상태 초기화 (마지막 행은 진행 중 캔들로 취급)"""
+        self.reset()
+        if data is None or len(data) == 0:
+            return None
+
+        columns = [data[name].to_numpy(dtype=float) for name in ('open', 'high', 'low', 'close', 'volume')]
+        for i, timestamp in enumerate(data.index):
+            bar = dict(zip(('open', 'high', 'low', 'close', 'volume'), (col[i] for col in columns)))
+            if self.current_bar is not None:
+                self._commit(self.current_bar)
+            self.current_bar = bar
+            self.current_timestamp = timestamp
+        return self.snapshot()
+
+    def update(self, timestamp, open_price, high, low, close, volume=0.0):
+        """캔들 한 개 반영
+
+        같은 시각이면 진행 중 캔들을 갱신하고, 더 늦은 시각이면 이전
+        캔들을 확정한 뒤 새 캔들을 진행 중으로 둠.
+        """
+        bar = {'open': float(open_price), 'high': float(high), 'low': float(low),
+               'close': float(close), 'volume': float(volume)}
+
+        if self.current_bar is not None and timestamp < self.current_timestamp:
+            raise ValueError(f"과거 캔들은 반영할 수 없습니다: {timestamp} < {self.current_timestamp}")
+
+        if self.current_bar is not None and timestamp > self.current_timestamp:
+            self._commit(self.current_bar)
+
+        self.current_bar = bar
+        self.current_timestamp = timestamp
+        return self.snapshot()
+
+    def sync(self, data):
+        """새로 받은 OHLCV에서 바뀐 캔들만 반영
+
+        처음 호출되거나 진행 중 캔들이 데이터에 없으면(장시간 중단 등)
+        전체를 다시 시드함.
+        """
+        if data is None or len(data) == 0:
+            return None
+        if not self.is_seeded or self.current_timestamp not in data.index:
+            return self.seed(data)
+
+        recent = data.loc[data.index >= self.current_timestamp]
+        for timestamp, row in zip(recent.index, recent[['open', 'high', 'low', 'close', 'volume']].to_numpy(dtype=float)):
+            self.update(timestamp, *row)
+        return self.snapshot()
+
+    def snapshot(self):
+        """진행 중 캔들 기준 지표 값"""
+        if self.current_bar is None:
+            return None
+
+        bar = self.current_bar
+        close = bar['close']
+
+        ema = {period: ema.preview(close) for period, ema in self.emas.items()}
+        ema_prev = {period: (ema.value if ema.value is not None else close) for period, ema in self.emas.items()}
+
+        rsi = self.rsi.preview(close)
+        stoch_k, stoch_d = self.stoch.preview(rsi)
+
+        bb_middle, bb_std = self.bollinger.preview(close)
+        bb_upper = bb_middle + bb_std * self.bollinger_std
+        bb_lower = bb_middle - bb_std * self.bollinger_std
+
+        atr = self.atr.preview(self._true_range(bar['high'], bar['low']))
+
+        prev_close = self.last_closed_close
+        momentum = (close - prev_close) / prev_close if prev_close else 0.0
+
+        return {
+            'timestamp': self.current_timestamp,
+            'close': close,
+            'prev_close': prev_close,
+            'rsi': rsi,
+            'stoch_rsi_k': stoch_k,
+            'stoch_rsi_d': stoch_d,
+            'ema': ema,
+            'ema_prev': ema_prev,
+            'bb_middle': bb_middle,
+            'bb_upper': bb_upper,
+            'bb_lower': bb_lower,
+            'atr': atr,
+            'volatility_ratio': atr / close * 100 if close and not np.isnan(atr) else math.nan,
+            'momentum': momentum
+        }
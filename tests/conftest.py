@@ -0,0 +1,33 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_ohlcv(n, seed=0, freq='4h', start='2024-01-01'):
+    """로그 정규 랜덤워크 OHLCV (테스트용)"""
+    rng = np.random.default_rng(seed)
+    close = 1e8 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    open_ = np.r_[close[0], close[:-1]]
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.005, n))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.005, n))
+    volume = rng.uniform(10, 100, n)
+    index = pd.date_range(start, periods=n, freq=freq)
+    return pd.DataFrame({'open': open_, 'high': high, 'low': low, 'close': close,
+                         'volume': volume, 'value': volume * close}, index=index)
+
+
+@pytest.fixture
+def bot(tmp_path, monkeypatch, capsys):
+    """네트워크 없이 만든 봇 (DB/캔들 저장소 등은 임시 디렉터리에 생성)"""
+    monkeypatch.chdir(tmp_path)
+    import autotrade
+    instance = autotrade.BTCTradingBot(db_path=str(tmp_path / 'trading_log.db'), offline=True)
+    capsys.readouterr()
+    yield instance
+    instance.gpt_worker.shutdown()
+    instance.speculative_prefetcher.shutdown()
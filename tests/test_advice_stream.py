@@ -0,0 +1,39 @@
+import json
+
+from advice_stream import EARLY_REASONING, AdviceStreamParser
+
+RESPONSE = json.dumps({
+    'trade_recommendation': '매도',
+    'investment_percentage': 35,
+    'confidence_score': 72,
+    'reasoning': '과매수 구간에서 "데드크로스" 발생, 비중 축소'
+}, ensure_ascii=False)
+
+
+def test_decision_arrives_before_reasoning():
+    parser = AdviceStreamParser()
+    reasoning_start = RESPONSE.index('"reasoning"')
+    decisions = [(i, parser.feed(char)) for i, char in enumerate(RESPONSE)]
+    early = [(i, decision) for i, decision in decisions if decision is not None]
+
+    assert len(early) == 1
+    position, decision = early[0]
+    assert position < reasoning_start
+    assert decision == {'trade_recommendation': '매도', 'investment_percentage': 35,
+                        'confidence_score': 72, 'reasoning': EARLY_REASONING}
+    assert parser.text == RESPONSE
+
+
+def test_numbers_wait_for_delimiter():
+    parser = AdviceStreamParser()
+    assert parser.feed('{"trade_recommendation": "매수", "investment_percentage": 4') is None
+    assert parser.feed('0, "confidence_score": 8') is None
+    assert 'confidence_score' not in parser.fields
+    assert parser.fields['investment_percentage'] == 40
+    assert parser.feed('5}')['confidence_score'] == 85
+
+
+def test_escaped_recommendation_is_decoded():
+    parser = AdviceStreamParser()
+    text = '{"trade_recommendation": "\\uad00\\ub9dd", "investment_percentage": 0, "confidence_score": 50,'
+    assert parser.feed(text)['trade_recommendation'] == '관망'
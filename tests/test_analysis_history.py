@@ -0,0 +1,29 @@
+import contextlib
+import io
+
+import pytest
+
+from analysis_history import analysis_results_from_row
+from conftest import make_ohlcv
+
+
+def test_analysis_history_matches_calculate_indicators(bot):
+    data = make_ohlcv(300, seed=11)
+    history = bot.calculate_analysis_history(data, window=200)
+    assert len(history) == len(data)
+
+    for t in range(199, 300, 9):
+        window = data.iloc[t - 199:t + 1]
+        bot.indicator_cache.clear()
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = bot.calculate_indicators(window)
+        actual = analysis_results_from_row(history.iloc[t].to_dict())
+        assert set(actual) == set(expected)
+
+        for name, value in expected.items():
+            if name in ('knn_prediction', 'knn_signal_strength'):
+                continue
+            if isinstance(value, float):
+                assert actual[name] == pytest.approx(value, rel=1e-6, abs=1e-6), (t, name)
+            else:
+                assert actual[name] == value, (t, name)
@@ -0,0 +1,71 @@
+import contextlib
+import io
+
+import numpy as np
+import pytest
+
+from analysis_history import knn_window_history
+from backtester import Backtester
+from conftest import make_ohlcv
+
+
+def test_knn_window_history_matches_predict_next_move(bot):
+    data = make_ohlcv(320, seed=7)
+    history = knn_window_history(bot, data, window=200)
+    assert history['knn_prediction'].iloc[:199].isna().all()
+
+    for t in range(199, 320, 7):
+        bot.last_prediction = None
+        with contextlib.redirect_stdout(io.StringIO()):
+            prediction, confidence = bot.predict_next_move(data.iloc[t - 199:t + 1])
+        row = history.iloc[t]
+        expected = bot._finish_knn_confidences(
+            np.array([row['knn_prediction']]), np.array([row['knn_base_confidence']]),
+            np.array([row['knn_signal']]), np.array([np.nan])
+        )[0]
+        assert row['knn_prediction'] == prediction
+        assert expected == pytest.approx(confidence, rel=1e-5)
+
+
+def test_backtester_refuses_existing_db(bot, tmp_path):
+    db_path = tmp_path / 'backtest.db'
+    db_path.write_text('keep')
+    with pytest.raises(FileExistsError):
+        Backtester(bot, make_ohlcv(210), db_path=str(db_path))
+    assert db_path.read_text() == 'keep'
+
+    result = Backtester(bot, make_ohlcv(210), db_path=str(db_path), overwrite=True).run()
+    assert result['bars'] == 11
+
+
+def test_precompute_matches_per_bar_indicators(bot, tmp_path):
+    data = make_ohlcv(260, seed=3)
+    exact = Backtester(bot, data, db_path=str(tmp_path / 'exact.db'), precompute=False).run()
+    fast = Backtester(bot, data, db_path=str(tmp_path / 'fast.db')).run()
+
+    assert fast['orders'] == exact['orders']
+    assert fast['consultations'] == exact['consultations']
+    np.testing.assert_allclose(fast['equity'].to_numpy(), exact['equity'].to_numpy())
+
+
+def test_run_restores_the_bot(bot, tmp_path):
+    original = {name: vars(bot).get(name) for name in ('db_path', 'upbit', 'price_fn', 'clock', 'USE_KNN_INDEX')}
+    bot.last_prediction = 0.25
+    backtester = Backtester(bot, make_ohlcv(230), db_path=str(tmp_path / 'backtest.db'))
+    assert bot.db_path == original['db_path']  # 생성만으로는 바뀌지 않음
+
+    backtester.run()
+    assert {name: vars(bot).get(name) for name in original} == original
+    assert bot.last_prediction == 0.25
+    assert 'consult_gpt_for_trading' not in vars(bot)
+    assert 'calculate_indicators' not in vars(bot)
+
+    # 실행 중 예외가 나도 복원
+    def fail(analysis_results):
+        raise RuntimeError('중단')
+
+    bot.get_force_check_interval = fail
+    with pytest.raises(RuntimeError):
+        Backtester(bot, make_ohlcv(230), db_path=str(tmp_path / 'failed.db')).run()
+    assert {name: vars(bot).get(name) for name in original} == original
+    assert 'calculate_indicators' not in vars(bot)
@@ -0,0 +1,53 @@
+from datetime import timedelta
+
+import pandas as pd
+
+from candle_store import CandleStore
+from conftest import make_ohlcv
+
+
+class FakeExchange:
+    """now 시각까지의 캔들만 돌려주는 get_ohlcv 대체 (마지막 캔들은 진행 중 값)"""
+
+    def __init__(self, candles):
+        self.candles = candles
+        self.now = None
+        self.requests = []
+
+    def get_ohlcv(self, ticker, interval='minute240', count=200, to=None):
+        self.requests.append(count)
+        visible = self.candles[self.candles.index <= self.now].tail(count).copy()
+        visible.iloc[-1, visible.columns.get_loc('close')] *= 0.99
+        return visible
+
+
+def test_sync_fetches_only_new_candles(tmp_path):
+    candles = make_ohlcv(300, seed=5)
+    exchange = FakeExchange(candles)
+    store = CandleStore(str(tmp_path / 'candles.db'), fetch_fn=exchange.get_ohlcv)
+    store._now = lambda: exchange.now + timedelta(minutes=30)
+
+    exchange.now = candles.index[249]
+    assert store.sync('KRW-BTC', 'minute240', min_count=200) == 200
+    assert store.count('KRW-BTC', 'minute240') == 200
+
+    # 3개 캔들 뒤: 새 캔들 3개와 진행 중이던 마지막 캔들만 다시 받음
+    exchange.now = candles.index[252]
+    assert store.sync('KRW-BTC', 'minute240', min_count=200) == 4
+    assert exchange.requests == [200, 4]
+
+    window = store.get_window('KRW-BTC', 'minute240', count=100)
+    expected = candles.iloc[153:253].copy()
+    expected.iloc[-1, expected.columns.get_loc('close')] *= 0.99
+    pd.testing.assert_frame_equal(window, expected, check_freq=False)
+    store.close()
+
+
+def test_bot_creates_candle_store_only_on_use(bot, tmp_path):
+    assert bot.USE_CANDLE_STORE is False
+    assert bot.candle_store is None
+    assert not (tmp_path / 'candle_store.db').exists()
+
+    store = bot.get_candle_store()
+    assert (tmp_path / 'candle_store.db').exists()
+    assert bot.get_candle_store() is store
@@ -0,0 +1,60 @@
+import sqlite3
+
+from consultation_cache import ConsultationCache
+
+
+def make_cache(tmp_path, ttl=100):
+    db_path = str(tmp_path / 'advice.db')
+    conn = sqlite3.connect(db_path)
+    conn.execute('''
+    CREATE TABLE gpt_advice_log (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT, trade_recommendation TEXT,
+        investment_percentage INTEGER, confidence_score INTEGER, reasoning TEXT, market_state TEXT
+    )''')
+    conn.executemany(
+        'INSERT INTO gpt_advice_log (timestamp, trade_recommendation, investment_percentage, confidence_score, reasoning) '
+        'VALUES (?, ?, ?, ?, ?)',
+        [('t', '관망', 0, 50, 'hold'), ('t', '매수', 30, 80, 'buy')]
+    )
+    conn.commit()
+    conn.close()
+    return ConsultationCache(db_path, ttl=ttl)
+
+
+def test_entries_expire_after_ttl(tmp_path):
+    cache = make_cache(tmp_path, ttl=100)
+    state = (5, 2, 2, 2, 2, 0, 0)
+    cache.put(state, 1, now=1000, recommendation='관망')
+
+    assert cache.get(state, now=1100)['reasoning'] == 'hold'
+    assert cache.get(state, now=1101) is None
+    assert cache.get(state, now=1050) is None  # 만료된 항목은 삭제됨
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 2
+
+
+def test_trade_advice_reused_only_for_same_account(tmp_path):
+    cache = make_cache(tmp_path)
+    hold, buy = (1,), (2,)
+    cache.put(hold, 1, now=0, recommendation='관망', account=(0.0, 1_000_000))
+    cache.put(buy, 2, now=0, recommendation='매수', account=(0.0, 1_000_000))
+
+    assert cache.get(buy, now=1, account=(0.0, 1_000_000))['trade_recommendation'] == '매수'
+    assert cache.get(hold, now=1, account=(0.01, 500_000)) is not None
+    assert cache.get(buy, now=1, account=(0.01, 500_000)) is None
+    assert cache.get(buy, now=1, account=(0.0, 1_000_000)) is None
+
+
+def test_invalidate_trades_keeps_hold_advice(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put((1,), 1, now=0, recommendation='관망')
+    cache.put((2,), 2, now=0, recommendation='매수', account=(0.0, 1_000_000))
+    cache.invalidate_trades()
+
+    assert cache.get((1,), now=1) is not None
+    assert cache.get((2,), now=1, account=(0.0, 1_000_000)) is None
+
+
+def test_dedup_is_off_by_default(bot):
+    assert bot.USE_GPT_DEDUP is False
+    assert bot.get_consultation_cache() is None
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis_history import rolling_divergence
+from conftest import make_ohlcv
+from counter_trend_sweep import CounterTrendSweep
+
+
+LOOSE = {'OVERSOLD_RSI': 45, 'OVERBOUGHT_RSI': 55, 'BOLLINGER_STD': 0.5,
+         'MOMENTUM_THRESHOLD': 0, 'VOLATILITY_THRESHOLD': 0}
+
+
+def naive_fills(close, signals, fee_rate):
+    """캔들을 하나씩 보며 전액 매수/전량 매도 (마지막 보유분은 마지막 종가로 평가)"""
+    equity = 1.0
+    entry = None
+    trades = wins = 0
+    for price, buy, sell in zip(close, signals['buy'], signals['sell']):
+        if buy:
+            if entry is None:
+                entry = price
+                trades += 1
+        elif sell and entry is not None:
+            ratio = price / entry * (1 - fee_rate) ** 2
+            equity *= ratio
+            wins += ratio > 1
+            entry = None
+    if entry is not None:
+        ratio = close[-1] / entry * (1 - fee_rate)
+        equity *= ratio
+        wins += ratio > 1
+    return {'total_return': (equity - 1) * 100, 'trades': trades,
+            'win_rate': wins / trades if trades else np.nan}
+
+
+@pytest.mark.parametrize('seed', [3, 7])
+def test_evaluate_matches_naive_fill_loop(bot, seed):
+    data = make_ohlcv(600, seed=seed)
+    sweep = CounterTrendSweep(bot, data)
+
+    for params in (LOOSE, dict(LOOSE, BOLLINGER_STD=1.0, OVERSOLD_RSI=40), {}):
+        signals = sweep.signals(**params)
+        expected = naive_fills(data['close'].to_numpy(), signals, bot.TRADING_FEE_RATE)
+        actual = sweep.evaluate(**params)
+        assert actual['trades'] == expected['trades']
+        assert actual['total_return'] == pytest.approx(expected['total_return'], rel=1e-9, abs=1e-9)
+        if expected['trades']:
+            assert actual['win_rate'] == pytest.approx(expected['win_rate'])
+        else:
+            assert np.isnan(actual['win_rate'])
+
+    assert sweep.evaluate(**LOOSE)['trades'] > 0
+
+
+def test_sweep_uses_live_window_indicators(bot):
+    data = make_ohlcv(400, seed=5)
+    sweep = CounterTrendSweep(bot, data)
+    history = bot.calculate_analysis_history(data, window=200, divergence_lag=1)
+
+    np.testing.assert_allclose(sweep.columns['rsi'], history['rsi'].to_numpy())
+    np.testing.assert_array_equal(sweep.columns['bullish_divergence'], history['bullish_divergence'].to_numpy())
+
+    # 봇 설정값 그대로의 신호는 calculate_analysis_history의 역추세 신호와 같음
+    signals = sweep.signals()
+    np.testing.assert_array_equal(signals['buy'].to_numpy(), history['counter_trend_buy'].to_numpy())
+    np.testing.assert_array_equal(signals['sell'].to_numpy(), history['counter_trend_sell'].to_numpy())
+
+
+def test_rolling_divergence_matches_detect_divergence_window(bot):
+    data = make_ohlcv(120, seed=9)
+    high, low, close = (data[name].to_numpy() for name in ('high', 'low', 'close'))
+    bullish, bearish = rolling_divergence(bot, high, low, close, lag=1)
+
+    for t in range(19, 120):
+        window = data.iloc[t - 19:t + 1]
+        rsi = pd.Series(bot.calculate_rsi(window['close'].to_numpy()), index=window.index)
+        rsi_highs = rsi.rolling(3, center=True).max()
+        rsi_lows = rsi.rolling(3, center=True).min()
+        price_highs = window['high'].rolling(3, center=True).max()
+        price_lows = window['low'].rolling(3, center=True).min()
+        assert bearish[t] == bool(price_highs.iloc[-2] > price_highs.iloc[-3] and rsi_highs.iloc[-2] < rsi_highs.iloc[-3])
+        assert bullish[t] == bool(price_lows.iloc[-2] < price_lows.iloc[-3] and rsi_lows.iloc[-2] > rsi_lows.iloc[-3])
@@ -0,0 +1,46 @@
+from market_snapshot import AccountSnapshot, CycleSnapshot, MarketSnapshot
+
+QUIET_ANALYSIS = {
+    'knn_prediction': 0, 'knn_signal_strength': 0,
+    'counter_trend_signals': {'buy': False, 'sell': False},
+    'bollinger_position': 'middle'
+}
+
+
+def make_snapshot(krw_balance, coin_balance, avg_buy_price, price=100_000_000.0):
+    return CycleSnapshot(
+        market=MarketSnapshot(ticker='KRW-BTC', current_price=price, fetched_at=0),
+        account=AccountSnapshot(krw_balance=krw_balance, coin_balance=coin_balance,
+                                avg_buy_price=avg_buy_price, fetched_at=0)
+    )
+
+
+def test_gate_is_off_by_default(bot):
+    assert bot.USE_DECISION_GATE is False
+
+
+def test_quiet_state_is_local_unless_forced(bot):
+    snapshot = make_snapshot(1_000_000, 0, 0)
+    tier, advice = bot.run_decision_gate(QUIET_ANALYSIS, snapshot)
+    assert tier['reasoning_effort'] is None
+    assert advice['trade_recommendation'] == '관망'
+
+    tier, advice = bot.run_decision_gate(QUIET_ANALYSIS, snapshot, force_check=True)
+    assert tier['reasoning_effort'] == 'high'
+    assert advice is None
+
+
+def test_losing_position_escalates_to_last_tier(bot):
+    bot.GPT_DECISION_TIERS = [
+        {'name': 'local', 'min_score': 0.0, 'reasoning_effort': None},
+        {'name': 'gpt_low', 'min_score': 0.3, 'reasoning_effort': 'low'},
+        {'name': 'gpt_high', 'min_score': 0.8, 'reasoning_effort': 'high'},
+    ]
+    # 평가 손익 -5%
+    tier, _, components = bot.score_decision_tier(QUIET_ANALYSIS, make_snapshot(0, 0.01, 105_263_157.9))
+    assert tier['name'] == 'gpt_high'
+    assert round(components['position_roi']) == -5
+
+    # 평가 손익 +1%는 고위험이 아님
+    tier, _, _ = bot.score_decision_tier(QUIET_ANALYSIS, make_snapshot(0, 0.01, 99_009_901.0))
+    assert tier['name'] == 'local'
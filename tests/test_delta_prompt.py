@@ -0,0 +1,111 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+import autotrade
+from analysis_history import analysis_results_from_row
+from backtester import SimulatedUpbit
+from conftest import make_ohlcv
+from gpt_response_store import news_digest
+from market_snapshot import fetch_cycle_snapshot
+from trading_clock import SimulatedClock
+
+ADVICE = {'trade_recommendation': '관망', 'investment_percentage': 0, 'confidence_score': 60, 'reasoning': '직전 근거'}
+NEWS = '비트코인 현물 ETF 순유입 지속'
+DELTA_HEADER = 'BTC 시장 분석 보고서 (시장변화, 직전 자문 이후 변경분)'
+
+
+@pytest.fixture
+def delta_bot(bot, monkeypatch):
+    """델타 프롬프트 모드 봇과 직전 자문 한 건 (네트워크 없음)"""
+    data = make_ohlcv(300, seed=6, start='2024-02-10')
+    results = analysis_results_from_row(bot.calculate_analysis_history(data).iloc[-1].to_dict())
+    upbit = SimulatedUpbit(initial_krw=1_000_000)
+    upbit.set_price(float(data['close'].iloc[-1]))
+    bot.upbit = upbit
+    bot.clock = SimulatedClock(datetime(2024, 3, 1, 12, 0, tzinfo=bot.timezone))
+    bot.GPT_PROMPT_MODE = 'delta'
+
+    sent = []
+
+    def request_gpt_advice(messages, **kwargs):
+        sent.append(messages[-1]['content'])
+        return json.dumps(ADVICE)
+
+    monkeypatch.setattr(autotrade.pyupbit, 'get_ohlcv', lambda *args, **kwargs: None)
+    monkeypatch.setattr(bot, 'fetch_BTC_news', lambda: NEWS)
+    monkeypatch.setattr(bot, 'request_gpt_advice', request_gpt_advice)
+
+    snapshot = fetch_cycle_snapshot(upbit, bot.ticker, price_fn=upbit.get_current_price)
+    bot.record_gpt_advice(ADVICE, results, snapshot.current_price, snapshot)
+    bot.clock.set(bot.clock.current + timedelta(hours=1))
+    return bot, data, results, snapshot, sent
+
+
+def test_delta_baseline_is_the_last_advice(delta_bot):
+    bot, _, _, snapshot, _ = delta_bot
+    baseline = bot.select_gpt_prompt_baseline()
+    assert baseline['advice']['reasoning'] == '직전 근거'
+    assert baseline['minutes_passed'] == pytest.approx(60)
+    assert baseline['market_state']['krw_balance'] == snapshot.krw_balance
+
+
+def test_full_prompt_on_force_check(delta_bot):
+    bot = delta_bot[0]
+    assert bot.select_gpt_prompt_baseline(force_check=True) is None
+
+
+def test_full_prompt_after_full_every_deltas(delta_bot):
+    bot = delta_bot[0]
+    bot.gpt_delta_prompt_count = bot.GPT_DELTA_FULL_EVERY - 1
+    assert bot.select_gpt_prompt_baseline() is not None
+    bot.gpt_delta_prompt_count = bot.GPT_DELTA_FULL_EVERY
+    assert bot.select_gpt_prompt_baseline() is None
+
+
+def test_full_prompt_when_last_advice_is_too_old(delta_bot):
+    bot = delta_bot[0]
+    bot.clock.set(bot.clock.current + timedelta(seconds=bot.GPT_DELTA_MAX_AGE))
+    assert bot.select_gpt_prompt_baseline() is None
+
+
+def test_full_prompt_when_baseline_has_no_balances(delta_bot):
+    bot, _, results, snapshot, _ = delta_bot
+    bot.record_gpt_advice(ADVICE, results, snapshot.current_price)
+    assert bot.select_gpt_prompt_baseline() is None
+
+
+def test_full_prompt_unless_delta_mode(delta_bot):
+    bot = delta_bot[0]
+    bot.GPT_PROMPT_MODE = 'full'
+    assert bot.select_gpt_prompt_baseline() is None
+
+
+def test_unchanged_news_is_suppressed_after_apply_prompt_state(delta_bot):
+    bot, data, results, snapshot, sent = delta_bot
+
+    # 아직 보낸 뉴스가 없으므로 델타에도 뉴스 본문 포함
+    _, _, prompt_state = bot.request_model_advice(data, results, snapshot)
+    assert sent[-1].startswith(DELTA_HEADER)
+    assert NEWS in sent[-1]
+    assert prompt_state == {'delta': True, 'news_digest': news_digest(NEWS)}
+
+    # 사용하지 않은 자문의 상태는 반영되지 않아 뉴스가 다시 들어감
+    bot.request_model_advice(data, results, snapshot)
+    assert NEWS in sent[-1]
+
+    bot.apply_prompt_state(prompt_state)
+    assert bot.gpt_delta_prompt_count == 1
+    _, _, prompt_state = bot.request_model_advice(data, results, snapshot)
+    assert NEWS not in sent[-1]
+    assert '직전 자문 이후 새 뉴스 없음' in sent[-1]
+
+    # 전체 프롬프트를 쓰면 델타 연속 횟수 초기화
+    bot.apply_prompt_state(prompt_state)
+    assert bot.gpt_delta_prompt_count == 2
+    bot.request_model_advice(data, results, snapshot, force_check=True)
+    assert not sent[-1].startswith(DELTA_HEADER)
+    assert NEWS in sent[-1]
+    bot.apply_prompt_state({'delta': False, 'news_digest': news_digest(NEWS)})
+    assert bot.gpt_delta_prompt_count == 0
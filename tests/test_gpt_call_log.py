@@ -0,0 +1,75 @@
+import json
+import sqlite3
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """chat.completions 대체 서버 (첫 요청은 503으로 SDK 재시도 유도)"""
+
+    requests = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self.requests.append((self.path, self.headers.get('x-stainless-retry-count'), json.loads(body)))
+        if len(self.requests) == 1:
+            self._send(503, {'error': {'message': 'busy'}}, {'retry-after-ms': '10'})
+            return
+        advice = {'trade_recommendation': '관망', 'investment_percentage': 0, 'confidence_score': 60, 'reasoning': 'ok'}
+        self._send(200, {
+            'id': 'chatcmpl-test', 'object': 'chat.completion', 'created': 0, 'model': 'stand-in',
+            'choices': [{'index': 0, 'finish_reason': 'stop',
+                         'message': {'role': 'assistant', 'content': json.dumps(advice, ensure_ascii=False)}}],
+            'usage': {'prompt_tokens': 120, 'completion_tokens': 30, 'total_tokens': 150,
+                      'prompt_tokens_details': {'cached_tokens': 64}}
+        })
+
+    def _send(self, status, payload, headers=None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stand_in():
+    StandInHandler.requests = []
+    server = HTTPServer(('127.0.0.1', 0), StandInHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}/v1'
+    server.shutdown()
+    server.server_close()
+
+
+def test_gpt_call_log_records_latency_tokens_and_retries(bot, stand_in):
+    bot.openai_api_key = 'test'
+    bot.openai_base_url = stand_in
+    bot.USE_GPT_STREAMING = False
+
+    content = bot.request_gpt_advice([{'role': 'user', 'content': 'test'}])
+    assert json.loads(content)['trade_recommendation'] == '관망'
+    assert [retry for _, retry, _ in StandInHandler.requests] == ['0', '1']
+    assert StandInHandler.requests[-1][0] == '/v1/chat/completions'
+
+    # 같은 클라이언트를 재사용
+    assert bot.get_openai_client()._client is bot.openai_client._client
+
+    conn = sqlite3.connect(bot.db_path)
+    rows = conn.execute(
+        'SELECT wall_time_ms, prompt_tokens, completion_tokens, cached_tokens, retries, status FROM gpt_call_log'
+    ).fetchall()
+    conn.close()
+    assert len(rows) == 1
+    wall_time_ms, prompt_tokens, completion_tokens, cached_tokens, retries, status = rows[0]
+    assert wall_time_ms > 0
+    assert (prompt_tokens, completion_tokens, cached_tokens, retries, status) == (120, 30, 64, 1, 'ok')
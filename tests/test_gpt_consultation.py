@@ -0,0 +1,103 @@
+import threading
+
+import pytest
+
+from backtester import SimulatedUpbit
+from gpt_consultation import ConsultationWorker
+from market_snapshot import fetch_cycle_snapshot
+
+ADVICE = {'trade_recommendation': '매수', 'investment_percentage': 30, 'confidence_score': 80, 'reasoning': 'test'}
+
+
+@pytest.fixture
+def worker():
+    instance = ConsultationWorker(deadline=60)
+    yield instance
+    instance.shutdown()
+
+
+def test_poll_reports_done_once(worker):
+    pending = worker.submit(lambda: ADVICE, snapshot=None, analysis_results={}, now=0)
+    pending.future.result(timeout=5)
+
+    status, polled = worker.poll(now=1)
+    assert status == 'done'
+    assert polled.future.result() == ADVICE
+    assert worker.poll(now=2) == (None, None)
+    assert not worker.busy()
+
+
+def test_poll_reports_early_decision_then_done(worker):
+    release = threading.Event()
+
+    def consult():
+        worker.report_early(dict(ADVICE, reasoning='early'))
+        release.wait(5)
+        return ADVICE
+
+    pending = worker.submit(consult, snapshot=None, analysis_results={}, now=0)
+    assert worker.wait(5)
+    status, _ = worker.poll(now=1)
+    assert status == 'early'
+    assert pending.early_advice['reasoning'] == 'early'
+    assert worker.poll(now=2) == (None, pending)  # 선도착 판단은 한 번만
+
+    release.set()
+    pending.future.result(timeout=5)
+    assert worker.poll(now=3)[0] == 'done'
+
+
+def test_poll_expires_once_and_still_delivers_late_result(worker):
+    release = threading.Event()
+    pending = worker.submit(lambda: release.wait(5) and ADVICE, snapshot=None, analysis_results={}, now=0)
+
+    assert worker.poll(now=59) == (None, pending)
+    assert worker.poll(now=60)[0] == 'expired'
+    assert worker.poll(now=61) == (None, pending)
+
+    release.set()
+    pending.future.result(timeout=5)
+    status, polled = worker.poll(now=200)
+    assert status == 'done'
+    assert polled.expired
+
+
+def run_consultation(bot, upbit, change):
+    """자문 제출 후 change(upbit)로 시세/잔고를 바꾸고 결과 적용 (execute_trade 호출 목록 반환)"""
+    executed = []
+    bot.execute_trade = lambda buy, sell, advice, analysis, snapshot=None: executed.append((buy, sell, advice)) or True
+    snapshot = fetch_cycle_snapshot(upbit, bot.ticker, price_fn=upbit.get_current_price)
+    pending = bot.gpt_worker.submit(lambda: ADVICE, snapshot, {'current_price': snapshot.current_price},
+                                    now=bot.clock.time())
+    pending.future.result(timeout=5)
+    change(upbit)
+    return bot.apply_gpt_consultation_result(), executed
+
+
+@pytest.fixture
+def simulated(bot):
+    upbit = SimulatedUpbit(initial_krw=1_000_000)
+    upbit.set_price(100_000_000)
+    bot.upbit = upbit
+    bot.price_fn = upbit.get_current_price
+    return upbit
+
+
+def test_result_within_tolerance_is_applied(bot, simulated):
+    applied, executed = run_consultation(bot, simulated, lambda upbit: upbit.set_price(100_200_000))
+    assert applied
+    assert len(executed) == 1
+    assert executed[0][2] == ADVICE
+
+
+def test_result_is_rejected_after_price_move(bot, simulated):
+    applied, executed = run_consultation(bot, simulated, lambda upbit: upbit.set_price(101_000_000))
+    assert not applied
+    assert executed == []
+
+
+def test_result_is_rejected_after_balance_change(bot, simulated):
+    applied, executed = run_consultation(bot, simulated, lambda upbit: upbit.buy_market_order(bot.ticker, 100_000))
+    assert not applied
+    assert executed == []
+
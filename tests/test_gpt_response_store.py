@@ -0,0 +1,113 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+import autotrade
+from analysis_history import analysis_results_from_row
+from backtester import SimulatedUpbit, stored_gpt_advisor
+from conftest import make_ohlcv
+from gpt_response_store import GPTResponseStore, news_digest
+from market_snapshot import fetch_cycle_snapshot
+from trading_clock import SimulatedClock
+
+ADVICE = {'trade_recommendation': '매수', 'investment_percentage': 30, 'confidence_score': 80, 'reasoning': 'recorded'}
+NEWS = '비트코인 현물 ETF 순유입 지속'
+RECORDED_AT = datetime(2024, 3, 1, 12, 0)
+
+
+@pytest.fixture
+def market(bot, monkeypatch):
+    """시뮬레이션 시세/잔고, 분석 결과, 모델 호출 기록 (네트워크 없음)"""
+    data = make_ohlcv(300, seed=4)
+    results = analysis_results_from_row(bot.calculate_analysis_history(data).iloc[-1].to_dict())
+    upbit = SimulatedUpbit(initial_krw=1_000_000)
+    upbit.set_price(float(data['close'].iloc[-1]))
+    bot.upbit = upbit
+    bot.clock = SimulatedClock(RECORDED_AT)
+
+    calls = []
+
+    def request_gpt_advice(messages, **kwargs):
+        calls.append(messages)
+        return json.dumps(ADVICE)
+
+    monkeypatch.setattr(autotrade.pyupbit, 'get_ohlcv', lambda *args, **kwargs: None)
+    monkeypatch.setattr(bot, 'fetch_BTC_news', lambda: NEWS)
+    monkeypatch.setattr(bot, 'request_gpt_advice', request_gpt_advice)
+    return data, results, upbit, calls
+
+
+def snapshot_of(bot, upbit):
+    return fetch_cycle_snapshot(upbit, bot.ticker, price_fn=upbit.get_current_price)
+
+
+def test_record_then_replay_through_request_model_advice(bot, market, monkeypatch, capsys):
+    data, results, upbit, calls = market
+    snapshot = snapshot_of(bot, upbit)
+
+    bot.GPT_RESPONSE_STORE_MODE = 'record'
+    advice, price, prompt_state = bot.request_model_advice(data, results, snapshot)
+    assert advice == ADVICE
+    assert len(calls) == 1
+    assert prompt_state['news_digest'] == news_digest(NEWS)
+
+    store = bot.get_gpt_response_store()
+    expected_key = GPTResponseStore.input_key(bot.build_gpt_inputs(results, price, snapshot, news_digest(NEWS)))
+    assert [row[0] for row in store.connection.execute('SELECT input_key FROM gpt_responses')] == [expected_key]
+
+    # 재생: 모델/뉴스 조회 없이 기록 당시 뉴스 지문으로 같은 키를 재구성
+    bot.GPT_RESPONSE_STORE_MODE = 'replay'
+    monkeypatch.setattr(bot, 'fetch_BTC_news', lambda: pytest.fail('재생 중 뉴스 조회'))
+    bot.clock.set(RECORDED_AT + timedelta(hours=1))
+    capsys.readouterr()
+    advice, _, prompt_state = bot.request_model_advice(data, results, snapshot)
+    assert advice == ADVICE
+    assert prompt_state is None
+    assert len(calls) == 1
+    assert 'GPT 자문 출처: replay' in capsys.readouterr().out
+    assert bot.get_gpt_response_store().stats()['hits'] == 1
+
+    # 기록 이전 시각에는 뉴스 지문이 없어 키가 달라지고 대체 모델(관망) 사용
+    bot.clock.set(RECORDED_AT - timedelta(hours=1))
+    advice, _, _ = bot.request_model_advice(data, results, snapshot)
+    assert advice['trade_recommendation'] == '관망'
+    assert 'GPT 자문 출처: stand_in' in capsys.readouterr().out
+    assert len(calls) == 1
+
+
+def test_stored_gpt_advisor_record_then_replay(bot, market, tmp_path):
+    data, results, upbit, calls = market
+    snapshot = snapshot_of(bot, upbit)
+    path = str(tmp_path / 'responses.db')
+
+    recorder = GPTResponseStore(path, mode='record')
+    assert stored_gpt_advisor(recorder)(bot, data, results, snapshot) == ADVICE
+    assert len(calls) == 1
+    recorder.close()
+
+    replayer = GPTResponseStore(path, mode='replay')
+    fallback_advice = {'trade_recommendation': '매도', 'investment_percentage': 100, 'confidence_score': 60,
+                       'reasoning': 'fallback'}
+    advisor = stored_gpt_advisor(replayer, fallback=lambda *args: fallback_advice)
+    assert advisor(bot, data, results, snapshot) == ADVICE
+    assert len(calls) == 1
+
+    # 잔고가 바뀌면 (BTC 비중 구간이 달라져) 저장된 응답이 없으므로 fallback
+    upbit.buy_market_order(bot.ticker, 500_000)
+    assert advisor(bot, data, results, snapshot_of(bot, upbit)) == fallback_advice
+    assert replayer.stats()['hits'] == 1
+    assert replayer.stats()['misses'] == 1
+    replayer.close()
+
+
+def test_news_digest_at_returns_latest_recorded_news(tmp_path):
+    store = GPTResponseStore(str(tmp_path / 'responses.db'), mode='record')
+    store.put({'news': news_digest('첫 뉴스')}, ADVICE, recorded_at=RECORDED_AT)
+    store.put({'news': news_digest('둘째 뉴스')}, ADVICE, recorded_at=RECORDED_AT + timedelta(hours=4))
+
+    assert store.news_digest_at(RECORDED_AT - timedelta(seconds=1)) is None
+    assert store.news_digest_at(RECORDED_AT) == news_digest('첫 뉴스')
+    assert store.news_digest_at(RECORDED_AT + timedelta(hours=3)) == news_digest('첫 뉴스')
+    assert store.news_digest_at(RECORDED_AT + timedelta(hours=5)) == news_digest('둘째 뉴스')
+    store.close()
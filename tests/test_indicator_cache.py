@@ -0,0 +1,83 @@
+import pytest
+
+from conftest import make_ohlcv
+from indicator_cache import IndicatorCache
+
+
+def counting(value):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return value
+    return compute, calls
+
+
+def test_same_snapshot_is_computed_once():
+    cache = IndicatorCache()
+    close = make_ohlcv(50)['close']
+    compute, calls = counting(object())
+
+    key = cache.make_key('KRW-BTC', 'minute60', close, 'rsi', (14,))
+    first = cache.get_or_compute(key, compute)
+    # 같은 캔들을 새로 조회한 복사본도 같은 키
+    again = cache.get_or_compute(cache.make_key('KRW-BTC', 'minute60', close.copy(), 'rsi', (14,)), compute)
+
+    assert again is first
+    assert len(calls) == 1
+    assert cache.stats() == {'entries': 1, 'hits': 1, 'misses': 1, 'hit_rate': 0.5}
+
+
+def test_key_changes_with_new_candle_and_intrabar_update():
+    cache = IndicatorCache()
+    data = make_ohlcv(51)['close']
+    close = data.iloc[:50]
+    key = cache.make_key('KRW-BTC', 'minute60', close, 'rsi', (14,))
+
+    # 새 캔들 추가 (마지막 시각, 길이 변경)
+    appended = cache.make_key('KRW-BTC', 'minute60', data, 'rsi', (14,))
+    # 같은 길이로 한 칸 밀린 윈도우 (마지막 시각 변경)
+    rolled = cache.make_key('KRW-BTC', 'minute60', data.iloc[1:], 'rsi', (14,))
+    # 진행 중인 캔들의 종가만 변경 (시각/길이 동일)
+    updated_close = close.copy()
+    updated_close.iloc[-1] *= 1.001
+    updated = cache.make_key('KRW-BTC', 'minute60', updated_close, 'rsi', (14,))
+
+    assert appended[2] != key[2] and appended[4] != key[4]
+    assert rolled[2] != key[2] and rolled[4] == key[4]
+    assert updated[2] == key[2] and updated != key
+    assert len({key, appended, rolled, updated}) == 4
+    # 파라미터/지표명도 키에 포함
+    assert cache.make_key('KRW-BTC', 'minute60', close, 'rsi', (7,)) != key
+    assert cache.make_key('KRW-BTC', 'minute60', close, 'ema', (14,)) != key
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = IndicatorCache(max_entries=2)
+    cache.get_or_compute('a', lambda: 1)
+    cache.get_or_compute('b', lambda: 2)
+    cache.get_or_compute('a', lambda: pytest.fail('a는 캐시에 있어야 함'))
+    cache.get_or_compute('c', lambda: 3)
+
+    assert cache.get_or_compute('a', lambda: 'recomputed') == 1
+    assert cache.get_or_compute('b', lambda: 'recomputed') == 'recomputed'
+
+
+def test_bot_reuses_indicators_until_a_new_candle(bot):
+    bot.predict_next_move = lambda data: (0, 0)
+    data = make_ohlcv(201, seed=12)
+    window = data.iloc[:200]
+
+    first = bot.calculate_indicators(window)
+    misses = bot.indicator_cache.stats()['misses']
+    hits = bot.indicator_cache.stats()['hits']
+
+    assert bot.calculate_indicators(window.copy()) == first
+    stats = bot.indicator_cache.stats()
+    assert stats['misses'] == misses
+    assert stats['hits'] > hits
+
+    latest = bot.calculate_indicators(data.iloc[1:])
+    assert bot.indicator_cache.stats()['misses'] > misses
+    expected_rsi = bot.calculate_rsi(data['close'].iloc[1:].to_numpy())[-1]
+    assert latest['rsi'] == pytest.approx(expected_rsi)
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from conftest import make_ohlcv
+
+
+def live_inputs(bot, data):
+    features, labels = bot.prepare_knn_features(data)
+    current = bot.prepare_current_features(data.tail(50).copy())
+    k = bot.calculate_adaptive_k(len(features), data['close'].pct_change().std())
+    volatility = bot.get_return_volatility(data['close'], 20).iloc[-1]
+    return features[:-1], labels[:-1], current, k, volatility
+
+
+@pytest.mark.parametrize('window', [None, 199])
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_batch_matches_predict_next_move(bot, window, seed):
+    data = make_ohlcv(200, seed=seed)
+    bot.last_prediction = None
+    prediction, confidence = bot.predict_next_move(data)
+
+    features, labels, current, k, volatility = live_inputs(bot, data)
+    predictions, confidences = bot.predict_next_move_batch(
+        features, labels, current, len(features), k=k, volatility=[volatility], window=window
+    )
+    assert predictions[0] == pytest.approx(prediction, abs=1e-9)
+    assert confidences[0] == pytest.approx(confidence, rel=1e-4)
+
+
+@pytest.mark.parametrize('window', [None, 199])
+def test_batch_chunking_does_not_change_results(bot, window):
+    data = make_ohlcv(1200, seed=5)
+    features, labels = bot.prepare_knn_features(data)
+    positions = np.arange(300, len(features))
+    common = dict(k=16, window=window)
+    small = bot.predict_next_move_batch(features, labels, features[positions], positions, memory_budget_mb=0.05, **common)
+    large = bot.predict_next_move_batch(features, labels, features[positions], positions, memory_budget_mb=512, **common)
+    np.testing.assert_array_equal(small[0], large[0])
+    np.testing.assert_allclose(small[1], large[1], rtol=1e-5)
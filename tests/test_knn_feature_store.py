@@ -0,0 +1,54 @@
+import numpy as np
+
+from conftest import make_ohlcv
+from knn_feature_store import KNNFeatureStore
+
+
+def full_matrix(store):
+    rows = store.count - 1
+    features = store._normalize(np.asarray(store.features[:rows]))
+    closes = np.asarray(store.closes[:rows + 1])
+    return features, np.where(closes[1:] > closes[:-1], 1, -1)
+
+
+def test_incremental_matrix_matches_full_normalization(tmp_path):
+    data = make_ohlcv(1500, seed=4)
+    store = KNNFeatureStore(str(tmp_path / 'store'))
+    versions = set()
+    for end in range(200, len(data), 37):
+        store.sync(data.iloc[end - 200:end])
+        features, labels, timestamps = store.matrix()
+        expected_features, expected_labels = full_matrix(store)
+        np.testing.assert_allclose(features, expected_features)
+        np.testing.assert_array_equal(labels, expected_labels)
+        assert len(timestamps) == len(features) == store.count - 1
+        versions.add(store.normalization_version)
+
+    # 누적 통계가 안정되면 정규화 기준 갱신이 드물어짐
+    assert 1 < len(versions) < len(range(200, len(data), 37))
+
+
+def test_normalization_is_frozen_within_tolerance(tmp_path):
+    data = make_ohlcv(600, seed=8)
+    store = KNNFeatureStore(str(tmp_path / 'store'), renormalize_tolerance=10.0)
+    store.sync(data.iloc[:300])
+    first, _, _ = store.matrix()
+    first = first.copy()
+    store.sync(data.iloc[:600])
+    second, _, _ = store.matrix()
+    np.testing.assert_array_equal(second[:len(first)], first)
+
+
+def test_reload_keeps_rows_and_normalization(tmp_path):
+    path = str(tmp_path / 'store')
+    data = make_ohlcv(400, seed=9)
+    store = KNNFeatureStore(path)
+    store.sync(data)
+    features, labels, _ = store.matrix()
+
+    loaded = KNNFeatureStore.load(path)
+    assert loaded.count == store.count
+    assert loaded.normalization_version == store.normalization_version
+    loaded_features, loaded_labels, _ = loaded.matrix()
+    np.testing.assert_array_equal(loaded_features, features)
+    np.testing.assert_array_equal(loaded_labels, labels)
@@ -0,0 +1,63 @@
+import numpy as np
+
+from knn_index import IVFKNNIndex, KNNIndex, time_decay_multiplier
+
+
+WEIGHTS = np.array([1.2, 1.0, 1.5, 1.3, 1.0, 0.8, 0.7, 1.1, 1.4, 1.2])
+
+
+def brute_force(points, labels, query, k, time_decay=100, window=199):
+    raw = np.sqrt((((points - query) * WEIGHTS) ** 2).sum(axis=1))
+    final = raw * time_decay_multiplier(np.arange(len(points)), len(points) - 1, time_decay, window)
+    return np.argsort(final, kind='stable')[:k]
+
+
+def test_multiplier_matches_live_window():
+    rows = np.arange(199)
+    np.testing.assert_allclose(time_decay_multiplier(rows, 198), np.exp(rows / 100))
+
+
+def test_multiplier_is_bounded_for_long_history():
+    rows = np.arange(200000)
+    multiplier = time_decay_multiplier(rows, len(rows) - 1)
+    assert np.all(np.isfinite(multiplier))
+    assert multiplier[0] == 1.0
+    assert multiplier[-1] == np.exp(198 / 100)
+
+
+def test_query_matches_brute_force():
+    rng = np.random.default_rng(0)
+    points = rng.normal(size=(5000, len(WEIGHTS)))
+    labels = rng.choice([-1, 1], size=len(points))
+    index = KNNIndex(WEIGHTS)
+    index.build(points[:4000], labels[:4000], np.arange(4000))
+    index.append(points[4000:], labels[4000:], np.arange(4000, 5000))
+
+    for query in rng.normal(size=(20, len(WEIGHTS))):
+        _, _, weights, rows = index.query(query, 16)
+        expected = brute_force(points, labels, query, 16)
+        assert sorted(rows.tolist()) == sorted(expected.tolist())
+        assert np.all(np.isfinite(weights))
+
+
+def test_save_load_keeps_normalization_version(tmp_path):
+    index = KNNIndex(WEIGHTS)
+    index.build(np.zeros((40, len(WEIGHTS))), np.ones(40), np.arange(40))
+    index.normalization_version = 3
+    path = str(tmp_path / 'index.npz')
+    index.save(path)
+    assert KNNIndex.load(path).normalization_version == 3
+
+
+def test_ivf_full_probe_matches_brute_force():
+    rng = np.random.default_rng(1)
+    points = rng.normal(size=(3000, len(WEIGHTS)))
+    labels = rng.choice([-1, 1], size=len(points))
+    index = IVFKNNIndex(WEIGHTS, n_lists=16)
+    index.build(points, labels, np.arange(len(points)))
+
+    for query in rng.normal(size=(10, len(WEIGHTS))):
+        _, distances, _, rows = index.query(query, 16, n_probe=16)
+        expected = brute_force(points, labels, query, 16)
+        assert sorted(rows.tolist()) == sorted(expected.tolist())
+        assert np.all(np.isfinite(distances))
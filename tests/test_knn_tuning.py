@@ -0,0 +1,36 @@
+import numpy as np
+
+import autotrade
+import knn_tuning
+from conftest import make_ohlcv
+
+
+def test_normalize_matches_prepare_knn_features(bot):
+    data = make_ohlcv(300, seed=6)
+    normalized, labels = bot.prepare_knn_features(data)
+    raw, raw_labels = bot.prepare_knn_features(data, normalize=False)
+    np.testing.assert_array_equal(bot.normalize_knn_features(raw), normalized)
+    np.testing.assert_array_equal(raw_labels, labels)
+
+
+def test_fold_normalization_ignores_test_rows(bot):
+    data = make_ohlcv(900, seed=7)
+    raw, labels = bot.prepare_knn_features(data, normalize=False)
+    volatility = bot.get_return_volatility(data['close'], 20).to_numpy(dtype=float)
+    params = knn_tuning.parameter_grid([bot.KNN_FEATURE_WEIGHTS], [100], [(16, 8, 32)])[0]
+    folds = [(0, 500, 800)]
+
+    def evaluate(features):
+        knn_tuning._worker_state.update(
+            features=features, labels=labels.astype(float), volatility=volatility, bot_cls=autotrade.BTCTradingBot
+        )
+        return knn_tuning._evaluate_config(params, folds, memory_budget_mb=64)
+
+    baseline = evaluate(raw)
+
+    # 검증 구간 마지막 행을 크게 바꿔도 학습 정규화 통계와 앞선 예측은 그대로여야 함
+    shifted = raw.copy()
+    shifted[799, [0, 1, 3, 4, 5, 6, 7, 8]] *= 1000
+    changed = evaluate(shifted)
+    assert baseline['n_predictions'] - changed['n_predictions'] in (-1, 0, 1)
+    assert abs(baseline['hit_rate'] * baseline['n_predictions'] - changed['hit_rate'] * changed['n_predictions']) <= 1
@@ -0,0 +1,68 @@
+import pytest
+
+from backtester import SimulatedUpbit
+from conftest import make_ohlcv
+from market_snapshot import AccountSnapshot, CycleSnapshot, MarketSnapshot
+
+BUY = {'trade_recommendation': '매수', 'investment_percentage': 50, 'confidence_score': 80, 'reasoning': 'test'}
+
+
+class CountingUpbit(SimulatedUpbit):
+    """잔고/평단가/시세 조회 횟수를 세는 모의 거래소"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = {'get_balance': 0, 'get_avg_buy_price': 0, 'get_current_price': 0}
+
+    def get_balance(self, ticker="KRW"):
+        self.calls['get_balance'] += 1
+        return super().get_balance(ticker)
+
+    def get_avg_buy_price(self, ticker):
+        self.calls['get_avg_buy_price'] += 1
+        return super().get_avg_buy_price(ticker)
+
+    def get_current_price(self, ticker):
+        self.calls['get_current_price'] += 1
+        return super().get_current_price(ticker)
+
+
+@pytest.fixture
+def counting(bot, monkeypatch):
+    data = make_ohlcv(260, seed=2)
+    upbit = CountingUpbit(initial_krw=1_000_000)
+    upbit.set_price(float(data['close'].iloc[-1]))
+    bot.upbit = upbit
+    bot.price_fn = upbit.get_current_price
+    bot.predict_next_move = lambda data: (0, 0)
+    monkeypatch.setattr(bot, 'consult_gpt_for_trading', lambda *args, **kwargs: dict(BUY))
+    return bot, data, upbit
+
+
+def test_one_balance_fetch_per_cycle(counting):
+    bot, data, upbit = counting
+
+    # 라이브 루프의 자문 주기와 같은 순서 (스냅샷 → 포트폴리오 → 신호 → 주문)
+    snapshot = bot.refresh_cycle_snapshot()
+    bot.get_portfolio_status(snapshot)
+    buy_signal, sell_signal, advice, _ = bot.generate_trading_signal(data, market_changed=True, snapshot=snapshot)
+    assert (buy_signal, sell_signal) == (True, False)
+    assert bot.execute_trade(buy_signal, sell_signal, advice, bot.calculate_indicators(data), snapshot=snapshot)
+
+    # KRW/BTC 잔고 각 1번, 평단가 1번, 시세 1번
+    assert upbit.calls == {'get_balance': 2, 'get_avg_buy_price': 1, 'get_current_price': 1}
+    assert bot.cycle_snapshot is None  # 체결 후 무효화
+
+
+def test_execute_trade_sizes_order_from_shared_snapshot(counting):
+    bot, data, upbit = counting
+    price = upbit.price
+    # 거래소 잔고(100만원)와 다른 스냅샷 잔고로 주문 금액이 정해지는지 확인
+    snapshot = CycleSnapshot(
+        market=MarketSnapshot(ticker=bot.ticker, current_price=price, fetched_at=0.0),
+        account=AccountSnapshot(krw_balance=400_000.0, coin_balance=0.0, avg_buy_price=0.0, fetched_at=0.0)
+    )
+
+    assert bot.execute_trade(True, False, dict(BUY), bot.calculate_indicators(data), snapshot=snapshot)
+    assert upbit.calls == {'get_balance': 0, 'get_avg_buy_price': 0, 'get_current_price': 0}
+    assert upbit.orders[-1]['funds'] == pytest.approx(400_000 * 0.5 * 0.9995)
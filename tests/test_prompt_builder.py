@@ -0,0 +1,107 @@
+import pandas as pd
+import pytest
+
+from prompt_builder import count_tokens, fit_prompt, format_ohlcv
+
+
+def candles(closes, volume=12.34):
+    index = pd.date_range('2024-03-01 00:00', periods=len(closes), freq='4h')
+    opens = [closes[0]] + list(closes[:-1])
+    return pd.DataFrame({
+        'open': opens,
+        'high': [max(o, c) * 1.01 for o, c in zip(opens, closes)],
+        'low': [min(o, c) * 0.99 for o, c in zip(opens, closes)],
+        'close': closes,
+        'volume': [volume] * len(closes)
+    }, index=index)
+
+
+def test_csv_format_is_one_line_per_candle():
+    data = candles([100_000_000, 101_000_000, 99_990_000])
+    lines = format_ohlcv(data, 'csv').splitlines()
+
+    assert lines[0] == '최근 3개 캔들 OHLCV (KRW, 시간순):'
+    assert lines[1] == 'time,open,high,low,close,volume'
+    assert lines[2:] == [
+        '03-01 00:00,100000000,101000000,99000000,100000000,12.3',
+        '03-01 04:00,100000000,102010000,99000000,101000000,12.3',
+        '03-01 08:00,101000000,102010000,98990100,99990000,12.3',
+    ]
+
+
+def test_delta_format_is_basis_points_from_previous_close():
+    data = candles([100_000_000, 101_000_000, 99_990_000])
+    lines = format_ohlcv(data, 'delta').splitlines()
+
+    assert lines[0] == '최근 3개 캔들 OHLCV (시간순, 2024-03-01 00:00 시작):'
+    assert lines[1] == '첫 캔들: open=100000000,high=101000000,low=99000000,close=100000000,volume=12.3'
+    # open,high,low,close (bp) 직전 종가 기준
+    assert lines[3] == '+0,+201,-100,+100,12.3'
+    assert lines[4] == '+0,+100,-199,-100,12.3'
+    assert lines[-1] == '마지막 종가: 99990000'
+    assert format_ohlcv(data.iloc[:0], 'delta') == 'OHLCV 데이터 없음'
+
+
+def test_compact_formats_are_smaller_than_verbose():
+    data = candles([100_000_000 + i * 50_000 for i in range(60)])
+    verbose = count_tokens(format_ohlcv(data, 'verbose'))
+    assert count_tokens(format_ohlcv(data, 'csv')) < verbose
+    assert count_tokens(format_ohlcv(data, 'delta')) < verbose
+
+    with pytest.raises(ValueError):
+        format_ohlcv(data, 'json')
+
+
+def make_render(calls):
+    def render(ohlcv_rows, advice_limit, news):
+        calls.append((ohlcv_rows, advice_limit, len(news)))
+        return ' '.join(['candle'] * ohlcv_rows + ['advice'] * (advice_limit * 20)) + ' ' + news
+    return render
+
+
+def test_fit_prompt_trims_advice_then_news_then_candles():
+    calls = []
+    news = '뉴스' * 400
+    prompt, tokens, plan = fit_prompt(make_render(calls), budget=1, ohlcv_rows=60, advice_limit=3, news=news)
+
+    # 축소할 수 있는 만큼 모두 줄인 뒤 중단 (최소값까지)
+    assert plan == {'ohlcv_rows': 20, 'advice_limit': 0, 'news_chars': 200}
+    assert tokens == count_tokens(prompt) > 1
+    assert prompt.endswith(news[:200] + ' …')
+
+    rows, advice, news_chars = zip(*calls)
+    first_news_cut = news_chars.index(400 + len(' …'))
+    first_rows_cut = rows.index(45)
+    last_advice_cut = advice.index(0)
+    assert advice[:first_news_cut] == (3, 2, 1)  # 이전 자문은 1개까지 먼저
+    assert set(rows[:first_rows_cut]) == {60}  # 뉴스를 최소 길이까지 줄인 뒤 OHLCV
+    assert news_chars[first_rows_cut - 1] == 200 + len(' …')
+    assert rows[first_rows_cut:last_advice_cut] == (45, 33, 24, 20)
+    assert set(advice[first_news_cut:last_advice_cut]) == {1}  # 남은 자문은 마지막
+
+
+def test_fit_prompt_respects_floors():
+    calls = []
+    _, _, plan = fit_prompt(make_render(calls), budget=1, ohlcv_rows=60, advice_limit=2, news='가' * 300,
+                            min_ohlcv_rows=40, min_news_chars=250)
+    assert plan == {'ohlcv_rows': 40, 'advice_limit': 0, 'news_chars': 250}
+    assert min(rows for rows, _, _ in calls) == 40
+
+
+def test_fit_prompt_stops_once_within_budget():
+    calls = []
+    render = make_render(calls)
+    full = count_tokens(render(60, 3, ''))
+    budget = count_tokens(render(60, 1, ''))
+    calls.clear()
+
+    prompt, tokens, plan = fit_prompt(render, budget=budget, ohlcv_rows=60, advice_limit=3, news=None)
+    assert full > budget
+    assert tokens <= budget
+    assert plan == {'ohlcv_rows': 60, 'advice_limit': 1, 'news_chars': 0}
+
+    calls.clear()
+    _, tokens, plan = fit_prompt(render, budget=None, ohlcv_rows=60, advice_limit=3, news=None)
+    assert len(calls) == 1
+    assert tokens == full
+    assert plan['advice_limit'] == 3
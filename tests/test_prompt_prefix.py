@@ -0,0 +1,39 @@
+import pytest
+
+from conftest import make_ohlcv
+from prompt_builder import STATIC_SYSTEM_PROMPT, PrefixGuard, prefix_hash
+
+SYSTEM_ONLY = [{'role': 'system', 'content': STATIC_SYSTEM_PROMPT}]
+
+
+@pytest.mark.parametrize('fmt', ['verbose', 'csv', 'delta'])
+def test_prefix_hash_is_stable_across_cycles(bot, fmt):
+    bot.predict_next_move = lambda data: (0, 0)
+    bot.GPT_OHLCV_FORMAT = fmt
+    data = make_ohlcv(260, seed=8)
+
+    result = bot.verify_gpt_prompt_prefix(data, cycles=6)
+    assert result == {'prefix_hash': prefix_hash(SYSTEM_ONLY), 'stable': True, 'cycles': 6}
+
+    # build_gpt_messages의 주기별 확인도 접두부 변경 없이 통과
+    assert bot.gpt_prefix_guard.checks == 6
+    assert bot.gpt_prefix_guard.changes == 0
+    assert bot.gpt_prefix_guard.expected == result['prefix_hash']
+
+
+def test_prefix_hash_ignores_user_message():
+    first = SYSTEM_ONLY + [{'role': 'user', 'content': '주기 1'}]
+    second = SYSTEM_ONLY + [{'role': 'user', 'content': '주기 2'}]
+    assert prefix_hash(first) == prefix_hash(second) == prefix_hash(SYSTEM_ONLY)
+
+
+def test_prefix_guard_reports_changed_prefix(capsys):
+    guard = PrefixGuard()
+    assert guard.check(SYSTEM_ONLY + [{'role': 'user', 'content': 'a'}])
+    assert guard.check(SYSTEM_ONLY + [{'role': 'user', 'content': 'b'}])
+
+    changed = [{'role': 'system', 'content': STATIC_SYSTEM_PROMPT + ' 현재가: 1원'}]
+    assert not guard.check(changed)
+    assert '접두부 변경' in capsys.readouterr().out
+    assert guard.check(changed)  # 새 해시가 기준
+    assert (guard.checks, guard.changes) == (4, 1)
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import make_ohlcv
+
+
+def reference_rsi(prices, periods):
+    """기존 Pine Script 스타일 루프 구현"""
+    changes = prices.diff()
+    gains = changes.clip(lower=0)
+    losses = (-changes).clip(lower=0)
+    avg_gains = pd.Series(np.nan, index=prices.index)
+    avg_losses = pd.Series(np.nan, index=prices.index)
+    avg_gains.iloc[periods] = gains.iloc[1:periods + 1].mean()
+    avg_losses.iloc[periods] = losses.iloc[1:periods + 1].mean()
+    for i in range(periods + 1, len(prices)):
+        avg_gains.iloc[i] = (gains.iloc[i] + (periods - 1) * avg_gains.iloc[i - 1]) / periods
+        avg_losses.iloc[i] = (losses.iloc[i] + (periods - 1) * avg_losses.iloc[i - 1]) / periods
+    rsi = 100 - (100 / (1 + avg_gains / avg_losses))
+    return rsi.replace([np.inf, -np.inf], np.nan).fillna(50).clip(0, 100)
+
+
+def reference_stoch_rsi(rsi, period, smooth_k, smooth_d):
+    """기존 행 단위 Stoch RSI 구현"""
+    k = pd.Series(np.nan, index=rsi.index)
+    for i in range(period, len(rsi)):
+        window = rsi.iloc[i - period + 1:i + 1]
+        high, low = window.max(), window.min()
+        k.iloc[i] = 50.0 if high == low else 100 * (rsi.iloc[i] - low) / (high - low)
+    k = k.rolling(window=smooth_k, min_periods=1).mean()
+    d = k.rolling(window=smooth_d, min_periods=1).mean()
+    frame = pd.DataFrame({'K': k, 'D': d}).ffill().fillna(50).clip(0, 100)
+    return frame['K'], frame['D']
+
+
+@pytest.mark.parametrize('periods', [1, 2, 14, 30])
+def test_rsi_matches_loop(bot, periods):
+    prices = make_ohlcv(400, seed=periods)['close']
+    expected = reference_rsi(prices, periods)
+    np.testing.assert_allclose(bot.calculate_rsi(prices, periods).to_numpy(), expected.to_numpy(), atol=1e-9)
+
+
+def test_rsi_accepts_ndarray(bot):
+    prices = make_ohlcv(100, seed=3)['close']
+    result = bot.calculate_rsi(prices.to_numpy(), 14)
+    assert isinstance(result, np.ndarray)
+    np.testing.assert_allclose(result, reference_rsi(prices, 14).to_numpy(), atol=1e-9)
+
+
+def test_wilder_rma_period_one_returns_input(bot):
+    values = np.array([np.nan, 1.0, 3.0, 2.0])
+    np.testing.assert_array_equal(bot._wilder_rma(values, 1), values)
+
+
+def test_stoch_rsi_matches_loop(bot):
+    data = make_ohlcv(300, seed=11)
+    k, d = bot.calculate_stoch_rsi(data['close'], period=14, smoothK=3, smoothD=3)
+    rsi = bot.calculate_rsi(data['close'], 14)
+    expected_k, expected_d = reference_stoch_rsi(rsi, 14, 3, 3)
+    np.testing.assert_allclose(k.to_numpy(), expected_k.to_numpy(), atol=1e-9)
+    np.testing.assert_allclose(d.to_numpy(), expected_d.to_numpy(), atol=1e-9)
@@ -0,0 +1,67 @@
+from market_snapshot import AccountSnapshot, CycleSnapshot, MarketSnapshot
+from speculative_consultation import SpeculativePrefetcher
+
+ADVICE = {'trade_recommendation': '매수', 'investment_percentage': 20, 'confidence_score': 70, 'reasoning': 'test'}
+
+
+def make_snapshot(price, krw_balance=1_000_000.0, coin_balance=0.0):
+    return CycleSnapshot(
+        market=MarketSnapshot(ticker='KRW-BTC', current_price=price, fetched_at=0),
+        account=AccountSnapshot(krw_balance=krw_balance, coin_balance=coin_balance, avg_buy_price=0, fetched_at=0)
+    )
+
+
+def started_prefetcher(now=1000.0, max_age=900):
+    prefetcher = SpeculativePrefetcher(max_age=max_age, max_wasted=2)
+    assert prefetcher.start(lambda: ADVICE, make_snapshot(100.0), {}, state=(1,), now=now)
+    prefetcher.worker.pending.future.result(timeout=5)
+    return prefetcher
+
+
+def test_fresh_prefetch_is_used():
+    prefetcher = started_prefetcher()
+    advice, reason = prefetcher.take(make_snapshot(100.2), (1,), now=1100.0)
+    assert (advice, reason) == (ADVICE, 'used')
+    assert prefetcher.stats()['used'] == 1
+    prefetcher.shutdown()
+
+
+def test_stale_prefetch_is_discarded():
+    # 유효 시간 초과, 양자화 상태 변경, 가격 변화, 잔고 변화는 모두 폐기
+    for snapshot, state, now in [
+        (make_snapshot(100.0), (1,), 2000.0),
+        (make_snapshot(100.0), (2,), 1100.0),
+        (make_snapshot(101.0), (1,), 1100.0),
+        (make_snapshot(100.0, krw_balance=500_000.0, coin_balance=0.01), (1,), 1100.0),
+    ]:
+        prefetcher = started_prefetcher()
+        assert prefetcher.take(snapshot, state, now=now) == (None, 'stale')
+        assert prefetcher.stats()['wasted'] == 1
+        assert not prefetcher.busy()
+        prefetcher.shutdown()
+
+
+def test_wasted_budget_blocks_new_prefetch():
+    prefetcher = SpeculativePrefetcher(max_age=10, max_wasted=1, window=100)
+    prefetcher.start(lambda: ADVICE, make_snapshot(100.0), {}, state=(1,), now=0.0)
+    assert prefetcher.expire(now=11.0)
+    assert not prefetcher.can_start(now=50.0)
+    assert prefetcher.can_start(now=112.0)
+    prefetcher.shutdown()
+
+
+def test_discarded_prefetch_leaves_prompt_state_untouched(bot):
+    """버려진 선행 자문은 델타 프롬프트 횟수/뉴스 지문을 바꾸지 않음"""
+    prompt_state = {'delta': True, 'news_digest': 'abc'}
+    bot.gpt_delta_prompt_count = 0
+    bot.last_prompt_news_digest = None
+
+    bot.speculative_prefetcher.start(
+        lambda: (ADVICE, prompt_state), make_snapshot(100.0), {}, state=(1,), now=bot.clock.time()
+    )
+    bot.speculative_prefetcher.worker.pending.future.result(timeout=5)
+    assert bot.take_speculative_advice(make_snapshot(120.0), (1,)) == (None, None)
+    assert (bot.gpt_delta_prompt_count, bot.last_prompt_news_digest) == (0, None)
+
+    bot.apply_prompt_state(prompt_state)
+    assert (bot.gpt_delta_prompt_count, bot.last_prompt_news_digest) == (1, 'abc')
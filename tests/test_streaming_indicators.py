@@ -0,0 +1,53 @@
+import contextlib
+import io
+
+import pytest
+
+from conftest import make_ohlcv
+from streaming_indicators import StreamingIndicators
+
+FIELDS = ('rsi', 'stoch_rsi_k', 'stoch_rsi_d', 'bb_upper', 'bb_middle', 'bb_lower', 'volatility_ratio', 'momentum')
+
+
+def batch_indicators(bot, window):
+    bot.indicator_cache.clear()
+    with contextlib.redirect_stdout(io.StringIO()):
+        return bot.calculate_indicators(window)
+
+
+def test_snapshot_matches_batch_indicators(bot):
+    bot.predict_next_move = lambda data: (0, 0)
+    data = make_ohlcv(260, seed=4)
+    engine = StreamingIndicators(bollinger_period=bot.BOLLINGER_PERIOD, bollinger_std=bot.BOLLINGER_STD)
+    engine.seed(data.iloc[:200])
+
+    for t in range(200, 260):
+        row = data.iloc[t]
+        # 진행 중 캔들 갱신 후 최종값 (같은 시각)
+        engine.update(data.index[t], row['open'], row['high'], row['low'], row['open'], row['volume'])
+        snapshot = engine.update(data.index[t], row['open'], row['high'], row['low'], row['close'], row['volume'])
+        expected = batch_indicators(bot, data.iloc[:t + 1])
+
+        for name in FIELDS:
+            assert snapshot[name] == pytest.approx(expected[name], rel=1e-9, abs=1e-9), (t, name)
+        for period in engine.ema_periods:
+            ema = data['close'].iloc[:t + 1].ewm(span=period, adjust=False).mean().iloc[-1]
+            assert snapshot['ema'][period] == pytest.approx(ema, rel=1e-12), (t, period)
+
+
+def test_streaming_calculate_indicators_matches_batch(bot):
+    bot.predict_next_move = lambda data: (0, 0)
+    data = make_ohlcv(240, seed=9)
+
+    for t in range(199, 240, 5):
+        window = data.iloc[:t + 1]
+        bot.USE_STREAMING_INDICATORS = False
+        expected = batch_indicators(bot, window)
+        bot.USE_STREAMING_INDICATORS = True
+        actual = batch_indicators(bot, window)
+
+        for name, value in expected.items():
+            if isinstance(value, float):
+                assert actual[name] == pytest.approx(value, rel=1e-9, abs=1e-9), (t, name)
+            else:
+                assert actual[name] == value, (t, name)
@@ -0,0 +1,30 @@
+import time
+from datetime import datetime
+
+
+class SystemClock:
+    """실제 시각 (라이브 트레이딩 기본값)"""
+
+    def now(self, tz=None):
+        return datetime.now(tz)
+
+    def time(self):
+        return time.time()
+
+
+class SimulatedClock:
+    """백테스트용 시각 (set으로 지정한 시각을 반환)"""
+
+    def __init__(self, start=None):
+        self.current = start
+
+    def set(self, current):
+        self.current = current
+
+    def now(self, tz=None):
+        if tz is not None and self.current.tzinfo is not None:
+            return self.current.astimezone(tz)
+        return self.current
+
+    def time(self):
+        return self.current.timestamp()